@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+ARP发现 + 设备压力测试 (route-stress-test.nse 的Python实现)
+NSE脚本的hostrule对每个被扫描主机都返回true，每个主机都会重复一次arp-scan和全部压力测试；
+这里只做一次发现，路由器判断规则预编译并缓存，各设备的压力测试并发执行
+"""
+
+import ipaddress
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from hping_parser import run_hping
+from resource_governor import get_governor
+from rtt_model import TimingModel
+
+ARP_LINE_RE = re.compile(r'^(\d+\.\d+\.\d+\.\d+)\s+([0-9A-Fa-f]{2}(?::[0-9A-Fa-f]{2}){5})\s*(.*)$')
+ROUTER_VENDOR_RE = re.compile(r'router|cisco|tp[-_]?link|d[-_]?link|netgear|linksys', re.IGNORECASE)
+_PING_SUMMARY_RE = re.compile(r'(\d+) packets transmitted, (\d+) received')
+_PING_RTT_RE = re.compile(r'min/avg/max[^=]*= [\d.]+/([\d.]+)/([\d.]+)')
+
+STRESS_TYPES = ('ping', 'hping')
+DEFAULT_WORKERS = 16
+# 没有RTT模型时，单次ping/hping3在预期发包时间之外额外等待的秒数
+DEFAULT_WAIT = 30
+# ping按 -w 截止时间自行退出并输出统计，进程超时再多留的秒数
+PING_GRACE = 5
+HPING_INTERVAL = 0.0001
+
+
+@lru_cache(maxsize=None)
+def vendor_is_router(vendor: str) -> bool:
+    """厂商名是否属于常见路由器厂商 (按厂商名缓存)"""
+    return bool(ROUTER_VENDOR_RE.search(vendor))
+
+
+def is_router(ip: str, vendor: str) -> bool:
+    """与NSE脚本相同的判断: .1/.254 或路由器厂商"""
+    return ip.endswith(('.1', '.254')) or vendor_is_router(vendor)
+
+
+def interface_network(interface: str) -> Optional[str]:
+    """接口所在网段；大于/24时与NSE一致只扫描本机所在的/24"""
+    try:
+        result = get_governor().run(['ip', '-o', '-4', 'addr', 'show', 'dev', interface],
+                                    capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r'inet\s+(\d+\.\d+\.\d+\.\d+/\d+)', result.stdout)
+    if not match:
+        return None
+    address = ipaddress.IPv4Interface(match.group(1))
+    if address.network.prefixlen < 24:
+        return str(ipaddress.IPv4Network(f"{address.ip}/24", strict=False))
+    return str(address.network)
+
+
+def arp_scan(network_range: str, interface: Optional[str] = None, timeout: float = 60) -> List[Dict]:
+    """运行一次arp-scan，返回设备列表 (arp-scan未安装时抛出FileNotFoundError)"""
+    cmd = ['arp-scan', network_range]
+    if interface:
+        cmd[1:1] = ['-I', interface]
+    result = get_governor().run(cmd, capture_output=True, text=True, timeout=timeout)
+    devices = []
+    seen = set()
+    for line in result.stdout.split('\n'):
+        match = ARP_LINE_RE.match(line)
+        if not match or match.group(1) in seen:
+            continue
+        ip, mac, vendor = match.group(1), match.group(2).lower(), match.group(3).strip() or 'Unknown'
+        seen.add(ip)
+        devices.append({'ip': ip, 'mac': mac, 'vendor': vendor, 'is_router': is_router(ip, vendor)})
+    return devices
+
+
+def ping_device(target: str, count: int = 50, timeout: Optional[float] = None, interval: float = 0.2,
+                interface: Optional[str] = None, timing: Optional[TimingModel] = None) -> Dict:
+    """ping压力测试，结果格式与报告中的其他压力测试一致 (interface: 绑定出接口)
+
+    timeout为ping的截止时间，未给出时由timing的RTT模型决定；进程超时后按模型的重试次数加倍重试
+    """
+    result = {'target': target, 'test_type': 'PING', 'success': False,
+              'sent': count, 'received': 0, 'loss_percent': 100.0}
+    expected = count * interval
+    if timeout is None:
+        timeout = timing.timeout_for(target, 'ping', expected) if timing else expected + DEFAULT_WAIT
+    retries = timing.retries_for(target, 'ping') if timing else 0
+    for attempt in range(retries + 1):
+        cmd = ['ping', '-c', str(count), '-i', str(interval), '-w', str(max(int(timeout), 1)), target]
+        if interface:
+            cmd[1:1] = ['-I', interface]
+        begin = time.monotonic()
+        try:
+            output = get_governor().run(cmd, capture_output=True, text=True,
+                                        timeout=timeout + PING_GRACE).stdout
+        except subprocess.TimeoutExpired:
+            if timing:
+                timing.record(target, 'ping', timeout, attempt, 'timeout', time.monotonic() - begin,
+                              expected)
+                timing.observe_timeout(target)
+                timeout = timing.backoff('ping', timeout)
+            continue
+        if timing:
+            timing.record(target, 'ping', timeout, attempt, 'done', time.monotonic() - begin, expected)
+        break
+    else:
+        return result
+    summary = _PING_SUMMARY_RE.search(output)
+    if summary:
+        sent, received = int(summary.group(1)), int(summary.group(2))
+        result.update(sent=sent, received=received, success=received > 0,
+                      loss_percent=round(100 * (sent - received) / sent, 2) if sent else 0.0)
+        rtt = _PING_RTT_RE.search(output)
+        if rtt:
+            result['rtt_avg'], result['rtt_max'] = float(rtt.group(1)), float(rtt.group(2))
+    return result
+
+
+def hping_device(target: str, count: int = 50, timeout: Optional[float] = None,
+                 timing: Optional[TimingModel] = None) -> Dict:
+    """hping3 SYN压力测试，timeout未给出时由timing的RTT模型决定 (超时保留已解析的部分结果)"""
+    expected = count * HPING_INTERVAL
+    if timeout is None:
+        timeout = timing.timeout_for(target, 'hping3', expected) if timing else expected + DEFAULT_WAIT
+    began = time.monotonic()
+    result = run_hping(target, count, timeout=timeout)
+    if timing:
+        timing.record(target, 'hping3', timeout, 0, 'timeout' if result['timed_out'] else 'done',
+                      time.monotonic() - began, expected)
+    result['success'] = result['received'] > 0
+    return result
+
+
+def stress_device(device: Dict, stress_types: List[str], count: int = 50,
+                  timeout: Optional[float] = None, timing: Optional[TimingModel] = None) -> List[Dict]:
+    """依次对一个设备运行各项压力测试；timeout为None时各项超时由timing的RTT模型给出"""
+    results = []
+    for stress_type in stress_types:
+        try:
+            if stress_type == 'hping':
+                result = hping_device(device['ip'], count, timeout, timing)
+            else:
+                result = ping_device(device['ip'], count, timeout, timing=timing)
+        except FileNotFoundError:
+            result = {'target': device['ip'], 'success': False,
+                      'test_type': 'HPING_SYN' if stress_type == 'hping' else 'PING',
+                      'sent': 0, 'received': None, 'loss_percent': None,
+                      'error': f"{'hping3' if stress_type == 'hping' else 'ping'}未安装"}
+        result['is_router'] = device['is_router']
+        results.append(result)
+    return results
+
+
+def run_arp_stress(devices: List[Dict], stress_types: List[str], count: int = 50,
+                   timeout: Optional[float] = None, workers: Optional[int] = None,
+                   on_done: Optional[Callable[[List[Dict]], None]] = None,
+                   timing: Optional[TimingModel] = None) -> List[Dict]:
+    """并发压力测试所有设备，路由器优先提交；结果按设备顺序返回
+
+    timing为RTT模型，每个设备的超时和重试次数按该设备的RTT计算并记入模型；
+    on_done 在每个设备测试完成时 (工作线程中) 以该设备的结果列表调用
+    """
+    if not devices:
+        return []
+    order = sorted(range(len(devices)), key=lambda i: not devices[i]['is_router'])
+    workers = min(workers or DEFAULT_WORKERS, len(devices))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {i: executor.submit(stress_device, devices[i], stress_types, count, timeout, timing)
+                   for i in order}
+        if on_done is not None:
+            for future in futures.values():
+                future.add_done_callback(lambda f: f.exception() or on_done(f.result()))
+        return [result for i in range(len(devices)) for result in futures[i].result()]
+
@@ -0,0 +1,4 @@
+"""
+性能基准和演示脚本，在仓库根目录下以模块方式运行，例如:
+    python -m benchmarks.bench_port_store 10.0.0.0/16
+"""
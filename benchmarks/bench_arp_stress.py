@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""用桩工具对比NSE调用方式 (每个被扫描主机一次arp-scan+串行压测) 与 --arp-stress"""
+
+import os
+import sys
+import tempfile
+import time
+
+from arp_stress import arp_scan, run_arp_stress, stress_device
+
+
+_STUB_ARP_SCAN = """#!/bin/sh
+echo arp-scan >> "$STUB_LOG"
+sleep {scan_delay}
+i=1
+while [ $i -le {devices} ]; do
+  printf '10.99.0.%d\\t02:00:00:00:00:%02x\\tStub Vendor\\n' $i $i
+  i=$((i + 1))
+done
+"""
+
+_STUB_PING = """#!/bin/sh
+echo ping >> "$STUB_LOG"
+sleep {ping_delay}
+echo "5 packets transmitted, 5 received, 0% packet loss, time 4ms"
+echo "rtt min/avg/max/mdev = 0.100/0.200/0.300/0.050 ms"
+"""
+
+
+def benchmark(hosts: int = 16, devices: int = 16, scan_delay: float = 0.05,
+              ping_delay: float = 0.02):
+    print(f"基准测试: nmap扫描 {hosts} 个主机, 局域网 {devices} 个设备 "
+          f"(桩arp-scan {scan_delay}s, 桩ping {ping_delay}s)")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, template in (('arp-scan', _STUB_ARP_SCAN), ('ping', _STUB_PING)):
+            path = os.path.join(tmpdir, name)
+            with open(path, 'w') as f:
+                f.write(template.format(scan_delay=scan_delay, devices=devices,
+                                        ping_delay=ping_delay))
+            os.chmod(path, 0o755)
+        log = os.path.join(tmpdir, 'calls.log')
+        saved_path = os.environ.get('PATH', '')
+        os.environ['PATH'] = f"{tmpdir}:{saved_path}"
+        os.environ['STUB_LOG'] = log
+
+        def calls():
+            if not os.path.exists(log):
+                return {}
+            with open(log) as f:
+                names = f.read().split()
+            os.remove(log)
+            return {name: names.count(name) for name in set(names)}
+
+        try:
+            # NSE方式: hostrule恒为true，每个主机都跑一遍完整流程
+            started = time.perf_counter()
+            for _ in range(hosts):
+                found = arp_scan('10.99.0.0/24')
+                for device in found:
+                    stress_device(device, ['ping'], count=5)
+            nse_elapsed = time.perf_counter() - started
+            nse_calls = calls()
+
+            started = time.perf_counter()
+            found = arp_scan('10.99.0.0/24')
+            results = run_arp_stress(found, ['ping'], count=5)
+            port_elapsed = time.perf_counter() - started
+            port_calls = calls()
+        finally:
+            os.environ['PATH'] = saved_path
+            os.environ.pop('STUB_LOG', None)
+
+    print(f"  NSE方式:      {nse_elapsed:.2f}s, arp-scan {nse_calls.get('arp-scan', 0)} 次, "
+          f"ping {nse_calls.get('ping', 0)} 次")
+    print(f"  --arp-stress: {port_elapsed:.2f}s, arp-scan {port_calls.get('arp-scan', 0)} 次, "
+          f"ping {port_calls.get('ping', 0)} 次 ({len(results)} 个结果)")
+    print(f"  加速 {nse_elapsed / port_elapsed:.1f}x; 扫描/24 (254个主机) 时NSE方式的压测流量为 254 倍")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
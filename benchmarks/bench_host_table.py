@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""对比 list-of-dicts 与 HostTable 的内存占用，换算为每百万主机"""
+
+import ipaddress
+import sys
+import tracemalloc
+
+from host_table import HostTable, unpack_mac
+
+
+def benchmark(count: int = 200000, vendors: int = 50):
+    base = int(ipaddress.IPv4Address("10.0.0.0"))
+    vendor_names = [f"Vendor {i} Technologies Co., Ltd." for i in range(vendors)]
+
+    def generate():
+        for i in range(count):
+            yield (str(ipaddress.IPv4Address(base + i)),
+                   unpack_mac(0x001122000000 + i),
+                   # 模拟从netdiscover输出中切出的独立字符串
+                   (vendor_names[i % vendors] + " ")[:-1])
+
+    print(f"基准测试: {count} 个主机, {vendors} 个厂商")
+    scale = 1000000 / count
+
+    tracemalloc.start()
+    legacy = [{'ip': ip, 'mac': mac, 'vendor': vendor} for ip, mac, vendor in generate()]
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del legacy
+
+    tracemalloc.start()
+    table = HostTable()
+    for ip, mac, vendor in generate():
+        table.add(ip, mac, vendor)
+    table_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    print(f"  list-of-dicts: {legacy_bytes * scale / 1024 / 1024:.1f} MB/百万主机")
+    print(f"  HostTable:     {table_bytes * scale / 1024 / 1024:.1f} MB/百万主机")
+    print(f"  内存节省: {100 * (1 - table_bytes / legacy_bytes):.1f}%")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""环回地址上每秒完成的主机数 (两种套接字)，对比逐个目标启动进程的下限，
+并用无人应答的TEST-NET-2地址测量超时重试的总耗时；
+参数为timestamps时比较CPU争用下用户态RTT与内核时间戳RTT"""
+
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from typing import List
+
+from icmp_sweep import BACKOFF, IcmpSweeper, loopback_hosts
+from resource_governor import get_governor
+
+
+def benchmark(hosts: int = 20000, dead: int = 254, spawns: int = 200):
+    targets = loopback_hosts(hosts)
+    for backend in ('dgram', 'raw'):
+        try:
+            sweeper = IcmpSweeper(backend=backend)
+        except PermissionError as e:
+            print(f"{backend}: {e}")
+            continue
+        with sweeper:
+            started = time.perf_counter()
+            result = sweeper.sweep(targets)
+            elapsed = time.perf_counter() - started
+        alive = sum(1 for s in result.values() if s.alive)
+        rtts = [rtt for s in result.values() for rtt in s.rtts]
+        print(f"{backend:>5}: {hosts} 个环回地址 {elapsed:.2f}s ({hosts / elapsed:,.0f} 主机/s), "
+              f"存活 {alive}, 重试 {sweeper.counters['retries']}, RTT中位数 {statistics.median(rtts):.3f} ms")
+
+    # ping_stress_test 的方式: 每个目标至少一次进程启动，且逐个串行
+    governor = get_governor()
+    started = time.perf_counter()
+    for _ in range(spawns):
+        governor.run(['true'])
+    per_spawn = (time.perf_counter() - started) / spawns
+    print(f"每目标一个进程 (仅启动/bin/true的下限): {1 / per_spawn:,.0f} 主机/s")
+
+    with IcmpSweeper(timeout=0.2, retries=1) as sweeper:
+        started = time.perf_counter()
+        result = sweeper.sweep([f"198.51.100.{i}" for i in range(1, dead + 1)])
+        elapsed = time.perf_counter() - started
+    serial = dead * 0.2 * (1 + BACKOFF)
+    print(f"{sweeper.backend:>5}: {dead} 个无应答地址 {elapsed:.2f}s (串行等待需 {serial:.0f}s), "
+          f"存活 {sum(1 for s in result.values() if s.alive)}, 发送 {sweeper.counters['sent']}, "
+          f"发送错误 {sweeper.counters['send_errors']}")
+
+
+def _busy_loop():
+    while True:
+        pass
+
+
+def _percentiles(values: List[float]) -> str:
+    if len(values) < 2:
+        return "-"
+    cuts = statistics.quantiles(values, n=100)
+    return f"{statistics.median(values):.3f}/{cuts[98]:.3f}"
+
+
+def timestamps(hosts: int = 2000, probes: int = 400, busy: int = 0):
+    """环回地址上比较用户态RTT和内核时间戳RTT: 空闲时，以及busy个忙循环进程争用CPU时
+
+    分别测量单个主机逐个发送probes个请求 (相隔5ms)，和一次扫描hosts个地址 (发送突发时应答排队)
+    """
+    busy = busy or 2 * (os.cpu_count() or 1)
+    cases = (('单主机', ['127.0.0.1'], probes), (f"{hosts} 个地址", loopback_hosts(hosts), 1))
+
+    def measure(load):
+        for name, targets, count in cases:
+            with IcmpSweeper(sockets=1, interval=0.005, timestamps=True) as sweeper:
+                result = sweeper.sweep(targets, count)
+            rtts = [rtt for stats in result.values() for rtt in stats.rtts]
+            kernel = [rtt for stats in result.values() for rtt in stats.kernel_rtts]
+            print(f"{load} {name}: RTT p50/p99 (ms) 用户态 {_percentiles(rtts)}, "
+                  f"内核{sweeper.timestamping or '(不支持)'} {_percentiles(kernel)} "
+                  f"({len(kernel)}/{len(rtts)} 个样本有内核时间戳, 硬件 {sweeper.counters['hw_timestamps']})")
+
+    measure("空闲")
+    workers = [multiprocessing.Process(target=_busy_loop, daemon=True) for _ in range(busy)]
+    for worker in workers:
+        worker.start()
+    try:
+        measure(f"{busy}个忙循环争用CPU")
+    finally:
+        for worker in workers:
+            worker.terminate()
+            worker.join()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ['timestamps']:
+        timestamps(*(int(arg) for arg in sys.argv[2:]))
+    else:
+        benchmark(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""生成合成OUI数据库，对比索引查询与整表读入dict的耗时和内存"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from host_table import unpack_mac
+from neighbor_cache import OuiIndex, build_oui_index, parse_oui_source, read_neighbors
+
+
+def benchmark(entries: int = 30000, lookups: int = 200000):
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        source = os.path.join(tmpdir, 'nmap-mac-prefixes')
+        with open(source, 'w') as f:
+            for prefix in rng.sample(range(1 << 24), entries):
+                f.write(f"{prefix:06X} Vendor {prefix % 5000} Networks Co., Ltd.\n")
+        macs = [unpack_mac(rng.getrandbits(48)) for _ in range(lookups)]
+        print(f"基准测试: {entries} 条OUI, {lookups} 次查询")
+
+        started = time.perf_counter()
+        build_oui_index(source, os.path.join(tmpdir, 'oui.idx'))
+        print(f"  生成索引: {(time.perf_counter() - started) * 1000:.1f} ms "
+              f"({os.path.getsize(os.path.join(tmpdir, 'oui.idx')) / 1024:.0f} KB)")
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = OuiIndex(os.path.join(tmpdir, 'oui.idx'))
+        opened = time.perf_counter() - started
+        index_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        started = time.perf_counter()
+        hits = sum(1 for mac in macs if index.lookup(mac))
+        indexed = time.perf_counter() - started
+        index.close()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        table = dict(parse_oui_source(source))
+        loaded = time.perf_counter() - started
+        dict_bytes = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+    print(f"  mmap索引: 打开 {opened * 1000:.2f} ms, 常驻 {index_bytes / 1024:.1f} KB, "
+          f"查询 {lookups / indexed:,.0f} 次/秒, 命中 {hits}")
+    print(f"  整表dict: 加载 {loaded * 1000:.1f} ms, 常驻 {dict_bytes / 1024:.1f} KB")
+
+    started = time.perf_counter()
+    neighbors, source = read_neighbors()
+    print(f"  读取本机邻居表 ({source}): {len(neighbors)} 个邻居, "
+          f"{(time.perf_counter() - started) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""桩ping下对比 每作业一个CLI进程 与 单进程批量执行 的吞吐"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict
+
+from network_api import load_jobs, run_jobs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+_STUB_PING = """#!/bin/sh
+sleep {delay}
+echo "64 bytes from x: icmp_seq=1 ttl=64 time=0.4 ms"
+echo "1 packets transmitted, 1 received, 0% packet loss, time 0ms"
+echo "rtt min/avg/max/mdev = 0.400/0.400/0.400/0.000 ms"
+"""
+
+
+def benchmark(jobs: int = 2000, workers: int = 64, delay: float = 0.02):
+    print(f"基准测试: {jobs} 个ping作业, 桩ping耗时 {delay}s, 并发 {workers}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stub = os.path.join(tmpdir, 'ping')
+        with open(stub, 'w') as f:
+            f.write(_STUB_PING.format(delay=delay))
+        os.chmod(stub, 0o755)
+        jobs_file = os.path.join(tmpdir, 'jobs.jsonl')
+        with open(jobs_file, 'w') as f:
+            for i in range(jobs):
+                f.write(json.dumps({'target': f"10.{i // 65536}.{i // 256 % 256}.{i % 256}",
+                                    'test': 'ping', 'count': 1}) + "\n")
+        saved_path = os.environ.get('PATH', '')
+        os.environ['PATH'] = f"{tmpdir}:{saved_path}"
+        try:
+            # 每作业一个CLI进程 (只取前50个作业，按比例换算)
+            sample = min(50, jobs)
+            script = os.path.join(ROOT, 'route_stress_test.py')
+            started = time.perf_counter()
+            for i in range(sample):
+                subprocess.run([sys.executable, script, '-t', f"10.0.0.{i % 256}", '-c', '1',
+                                '--log-file', os.path.join(tmpdir, 'cli.log')],
+                               capture_output=True, cwd=tmpdir, timeout=60)
+            per_cli = (time.perf_counter() - started) / sample
+
+            started = time.perf_counter()
+            statuses: Dict[str, int] = {}
+            for result in run_jobs(load_jobs(jobs_file), workers):
+                statuses[result.status] = statuses.get(result.status, 0) + 1
+            batch = time.perf_counter() - started
+        finally:
+            os.environ['PATH'] = saved_path
+
+    print(f"  每作业一个CLI进程: {per_cli * 1000:.0f} ms/作业 (估算 {jobs} 个作业 {per_cli * jobs:.1f}s)")
+    print(f"  单进程批量:        {batch:.2f}s, {jobs / batch:.0f} 作业/s, 状态 {statuses}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:3]))
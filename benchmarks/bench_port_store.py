@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""对比 dict-of-lists 与 PortStore 的内存占用和查询耗时"""
+
+import ipaddress
+import sys
+import time
+import tracemalloc
+
+from port_store import PortStore
+
+
+def benchmark(prefix: str = "10.0.0.0/16", ports=(22, 80, 443)):
+    network = ipaddress.IPv4Network(prefix)
+    hosts = [str(ip) for ip in network.hosts()]
+    print(f"基准测试: {len(hosts)} 个主机, 每主机 {len(ports)} 个开放端口")
+
+    tracemalloc.start()
+    legacy = {}
+    for ip in hosts:
+        for port in ports:
+            legacy.setdefault(ip, []).append(f"{port}/tcp")
+    legacy_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = PortStore()
+    for ip in hosts:
+        for port in ports:
+            store.add(ip, port)
+    store._compact()
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    legacy_hits = [ip for ip, entries in legacy.items()
+                   if any(e.split('/')[0] == '443' for e in entries)]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    store_hits = store.hosts_with_port(443)
+    store_time = time.perf_counter() - start
+
+    assert len(legacy_hits) == len(store_hits)
+    print(f"  dict-of-lists: {legacy_bytes / 1024 / 1024:.2f} MB, "
+          f"查询443耗时 {legacy_time * 1000:.1f} ms")
+    print(f"  PortStore:     {store_bytes / 1024 / 1024:.2f} MB, "
+          f"查询443耗时 {store_time * 1000:.1f} ms")
+    print(f"  内存节省: {100 * (1 - store_bytes / legacy_bytes):.1f}%")
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:2])
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""多线程并行处理时比较逐行打印与限频进度显示的输出量"""
+
+import io
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from progress import ProgressRenderer
+
+
+def demo(items: int = 400, workers: int = 16, delay: float = 0.01):
+    def work(stage, i):
+        time.sleep(delay)
+        stage.advance()
+        if i % 7 == 0:
+            stage.finding(f"10.0.{i // 256}.{i % 256} open 80/tcp")
+
+    spam = io.StringIO()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda i: (time.sleep(delay), print(f"10.0.{i // 256}.{i % 256}: 结果", file=spam)),
+                          range(items)))
+    spam_elapsed = time.perf_counter() - started
+
+    quiet = io.StringIO()
+    renderer = ProgressRenderer(quiet, interval=0.1, tty=False)
+    started = time.perf_counter()
+    with renderer.stage('demo', items) as stage:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda i: work(stage, i), range(items)))
+    elapsed = time.perf_counter() - started
+    print(f"逐行打印: {spam.getvalue().count(chr(10))} 行, 用时 {spam_elapsed:.2f}s")
+    print(f"进度显示: {quiet.getvalue().count(chr(10))} 行, 用时 {elapsed:.2f}s, 最后一行:")
+    print("  " + quiet.getvalue().strip().splitlines()[-1])
+
+    # 在终端中运行时再演示原地刷新
+    if sys.stdout.isatty():
+        renderer = ProgressRenderer()
+        with renderer.stage('tty', items) as stage:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(lambda i: work(stage, i), range(items)))
+
+
+if __name__ == "__main__":
+    demo()
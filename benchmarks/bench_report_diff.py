@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""生成两份合成报告并比对，输出耗时和峰值内存"""
+
+import ipaddress
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from report_diff import diff_reports
+
+
+def write_synthetic_report(path: str, hosts: int, shift: int):
+    """生成测试用报告: shift 控制与另一份报告的差异"""
+    base = int(ipaddress.IPv4Address("10.0.0.0"))
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"timestamp": %d, "scan_date": "synthetic", "hosts": [' % (1700000000 + shift))
+        for i in range(hosts):
+            j = i + shift
+            host = {'ip': str(ipaddress.IPv4Address(base + j)),
+                    'mac': f"00:11:22:{j >> 16 & 255:02x}:{j >> 8 & 255:02x}:{j & 255:02x}",
+                    'vendor': f"Vendor {j % 50}"}
+            f.write((',' if i else '') + json.dumps(host))
+        f.write('], "open_ports": {')
+        for i in range(hosts):
+            ip = str(ipaddress.IPv4Address(base + i + shift))
+            ports = ["22/tcp", "80/tcp"] + (["443/tcp"] if (i + shift) % 7 == 0 else [])
+            f.write((',' if i else '') + json.dumps(ip) + ':' + json.dumps(ports))
+        f.write('}, "vulnerabilities": []}')
+
+
+def benchmark(hosts: int = 200000):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        old_path = os.path.join(tmpdir, 'old.json')
+        new_path = os.path.join(tmpdir, 'new.json')
+        write_synthetic_report(old_path, hosts, 0)
+        write_synthetic_report(new_path, hosts, 1000)
+        size_mb = os.path.getsize(old_path) / 1024 / 1024
+        print(f"基准测试: 每份报告 {hosts} 个主机 ({size_mb:.0f} MB)")
+        start = time.perf_counter()
+        result = diff_reports(old_path, new_path, os.path.join(tmpdir, 'diff'))
+        elapsed = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"  耗时 {elapsed:.1f}s, 峰值RSS {peak:.0f} MB")
+        print(f"  变化: {result['summary']}")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
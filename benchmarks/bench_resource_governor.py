@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""资源管控器的基准测试
+
+spawn_benchmark: 父进程RSS增大时经由管控器启动子进程的每秒次数，
+fork: Python 3.10之前subprocess的路径 (这里通过关闭_USE_VFORK模拟)；
+vfork: 3.10+在无preexec_fn时的默认路径，也是管控器实际使用的路径；
+concurrency_benchmark: 多线程同时启动 sleep 子进程时的并发上限和背压等待
+"""
+
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from resource_governor import ResourceGovernor, read_rss
+
+
+def spawn_benchmark(sizes_mb=(0, 256, 1024), launches: int = 200):
+    def rate(governor, vfork=True):
+        saved = getattr(subprocess, '_USE_VFORK', None)
+        if saved is not None:
+            subprocess._USE_VFORK = vfork
+        try:
+            started = time.perf_counter()
+            for _ in range(launches):
+                governor.run(['true'])
+            return launches / (time.perf_counter() - started)
+        finally:
+            if saved is not None:
+                subprocess._USE_VFORK = saved
+
+    print(f"{'父进程RSS':>10} {'fork':>10} {'vfork':>10}  (次/秒, 各 {launches} 次)")
+    ballast = b''
+    for size in sizes_mb:
+        # 逐页写入，使内存真正计入RSS
+        ballast = b'\x01' * (size * 1024 * 1024)
+        governor = ResourceGovernor()
+        forked = rate(governor, vfork=False) if hasattr(subprocess, '_USE_VFORK') else float('nan')
+        print(f"{read_rss(os.getpid()) / 1048576:>8.0f}MB {forked:>10.0f} {rate(governor):>10.0f}")
+    del ballast
+
+
+def concurrency_benchmark(launches: int = 40, threads: int = 20):
+    governor = ResourceGovernor({'sleep': 4}, max_children=16)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda _: governor.run(['sleep', '0.2']), range(launches)))
+    elapsed = time.perf_counter() - started
+    stats = governor.stats()['tools']['sleep']
+    print(f"{threads} 个线程启动 {launches} 个 sleep 0.2 (上限4): 用时 {elapsed:.2f}s, "
+          f"峰值并发 {stats['peak_concurrent']}, 等待 {stats['waits']} 次, "
+          f"子进程峰值RSS {stats['peak_child_rss_mb']} MB")
+
+
+if __name__ == "__main__":
+    concurrency_benchmark()
+    spawn_benchmark(*(tuple(int(size) for size in sys.argv[1].split(',')),) if sys.argv[1:] else ())
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""路由监视在空闲时的CPU占用: rtnetlink阻塞等待 vs 按间隔轮询"""
+
+import sys
+import time
+
+from route_watch import RouteWatcher
+
+
+def benchmark(idle: float = 3.0, debounce: float = 0.5):
+    for use_netlink in (True, False):
+        with RouteWatcher(debounce, poll_interval=1.0, use_netlink=use_netlink) as watcher:
+            started = time.process_time()
+            watcher.wait(idle)
+            cpu = time.process_time() - started
+        print(f"{watcher.backend:>7}: 空闲 {idle:.0f}s 占用CPU {cpu * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    benchmark(*(float(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""模拟一次扫描: 局域网主机 (~1ms)、抖动大的广域网主机 (~150ms) 和无响应主机，
+比较固定超时与自适应超时下等待无响应主机的总时长"""
+
+import random
+
+from rtt_model import TimingModel
+
+
+# 改造前各工具的固定超时
+_FIXED_TIMEOUTS = {'ping': 60, 'hping3': 30, 'nmap': 60, 'whatweb': 30, 'nikto': 120}
+
+
+def demo(lan: int = 200, wan: int = 20, dead: int = 34):
+    rng = random.Random(1)
+    model = TimingModel()
+    for i in range(lan):
+        model.observe_many(f"10.0.0.{i}", [rng.uniform(0.5, 2.0) for _ in range(20)])
+    for i in range(wan):
+        model.observe_many(f"198.51.100.{i}", [rng.uniform(80, 300) for _ in range(20)])
+    # 无响应主机按实际顺序依次运行ping、hping3、nmap，每次无应答都计入模型
+    adaptive_wait = 0.0
+    for i in range(dead):
+        ip = f"10.0.1.{i}"
+        for tool, expected in (('ping', 10), ('hping3', 0), ('nmap', 0)):
+            adaptive_wait += model.timeout_for(ip, tool, expected)
+            model.observe_timeout(ip)
+
+    print(f"{'工具':<8} {'固定':>6} {'局域网':>8} {'广域网':>8} {'无响应':>8}  (超时秒数/重试次数)")
+    for tool, fixed in _FIXED_TIMEOUTS.items():
+        expected = 10 if tool == 'ping' else 0
+        row = [f"{model.timeout_for(ip, tool, expected)}/{model.retries_for(ip, tool)}"
+               for ip in ('10.0.0.0', '198.51.100.0', '10.0.1.0')]
+        print(f"{tool:<8} {fixed:>6} {row[0]:>8} {row[1]:>8} {row[2]:>8}")
+
+    fixed_wait = dead * (_FIXED_TIMEOUTS['ping'] + _FIXED_TIMEOUTS['hping3'] + _FIXED_TIMEOUTS['nmap'])
+    print(f"{dead} 个无响应主机依次ping/hping3/nmap的等待时间: 固定超时 {fixed_wait}s, "
+          f"自适应 {adaptive_wait:.0f}s")
+
+
+if __name__ == "__main__":
+    demo()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""对同一个综合扫描计划比较默认值与模拟历史数据校准后的估算"""
+
+import ipaddress
+import json
+import os
+import sys
+import tempfile
+
+from scan_plan import (Calibration, format_plan, plan_discovery, plan_masscan, plan_services,
+                       plan_web, summarize, web_targets)
+
+
+def write_history(log_path: str):
+    """模拟以前的运行: masscan实际比预期快，whatweb常超时"""
+    with open(log_path, 'w') as f:
+        for i in range(20):
+            f.write(json.dumps({'msg': 'masscan done', 'tool': 'masscan', 'target': None,
+                                'attempt': i, 'outcome': 'done', 'elapsed': 50.0 + i,
+                                'expected': 80.0}) + "\n")
+            f.write(json.dumps({'msg': 'whatweb', 'tool': 'whatweb', 'target': f"10.0.0.{i}",
+                                'attempt': 0, 'outcome': 'timeout' if i % 4 == 0 else 'done',
+                                'elapsed': 25.0 if i % 4 == 0 else 6.0}) + "\n")
+        f.write(json.dumps({'msg': '服务识别完成', 'tool': 'nmap-sV', 'elapsed': 120.0,
+                            'probes': 600, 'batches': 4}) + "\n")
+
+
+def compare(network: str = '10.0.0.0/16'):
+    size = ipaddress.IPv4Network(network, strict=False).num_addresses
+    with tempfile.TemporaryDirectory() as directory:
+        log_path = os.path.join(directory, 'network_test.log')
+        write_history(log_path)
+        calibrated = Calibration.from_history([log_path])
+
+    for title, cal in (('默认值', Calibration()), ('历史校准', calibrated)):
+        alive = int(size * cal.alive())
+        rows = [plan_discovery(size, cal), plan_masscan(alive, 1000, 1000, cal),
+                plan_services(alive, 4, cal), plan_web(web_targets(alive, cal), cal, 3)]
+        print(f"\n{title} ({cal.describe()}): --comprehensive --network {network} --service-scan")
+        for line in format_plan(rows, summarize(rows, 64)):
+            print("  " + line)
+
+
+if __name__ == "__main__":
+    compare(*sys.argv[1:])
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""用桩nmap对比逐目标 --top-ports 100 与两阶段批量 -sV 的扫描耗时"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from port_store import PortStore
+from service_scan import run_service_scan
+
+
+_STUB_NMAP = r'''#!/usr/bin/env python3
+import sys, time
+args = sys.argv[1:]
+ports, hosts = 0, []
+if '--top-ports' in args:
+    ports = int(args[args.index('--top-ports') + 1])
+if '-p' in args:
+    ports = sum(len(part.split(':')[-1].split(',')) for part in args[args.index('-p') + 1].split(',U:'))
+if '-iL' in args:
+    hosts = open(args[args.index('-iL') + 1]).read().split()
+else:
+    hosts = [args[-1]]
+# 启动开销 + 每个(主机, 端口)探测的耗时
+time.sleep({startup} + {per_probe} * ports * len(hosts))
+if '-oX' in args:
+    out = ['<?xml version="1.0"?><nmaprun>']
+    for ip in hosts:
+        out.append(f'<host><address addr="{{ip}}" addrtype="ipv4"/><ports>'
+                   f'<port protocol="tcp" portid="80"><state state="open"/>'
+                   f'<service name="http" product="stub-httpd" version="1.0"/></port></ports></host>')
+    out.append('</nmaprun>')
+    print("".join(out))
+else:
+    print("80/tcp open http")
+'''
+
+
+def benchmark(hosts: int = 64, startup: float = 0.15, per_probe: float = 0.0002):
+    store = PortStore()
+    for i in range(hosts):
+        ip = f"10.77.{i // 256}.{i % 256 + 1}"
+        store.add(ip, 80)
+        if i % 3 == 0:
+            store.add(ip, 443)
+        if i % 5 == 0:
+            store.add(ip, 22)
+    print(f"基准测试: {hosts} 个主机, 桩nmap启动 {startup}s + 每探测 {per_probe * 1000:.1f}ms")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        stub = os.path.join(tmpdir, 'nmap')
+        with open(stub, 'w') as f:
+            f.write(_STUB_NMAP.replace('{startup}', str(startup)).replace('{per_probe}', str(per_probe))
+                    .replace('{{ip}}', '{ip}'))
+        os.chmod(stub, 0o755)
+        saved_path = os.environ.get('PATH', '')
+        os.environ['PATH'] = f"{tmpdir}:{saved_path}"
+        try:
+            started = time.perf_counter()
+            for ip in store:
+                subprocess.run(['nmap', '-sS', '-T4', '--top-ports', '100', ip],
+                               capture_output=True, text=True, timeout=60)
+            per_target = time.perf_counter() - started
+
+            started = time.perf_counter()
+            result = run_service_scan(store)
+            two_stage = time.perf_counter() - started
+        finally:
+            os.environ['PATH'] = saved_path
+
+    print(f"  逐目标 nmap --top-ports 100: {per_target:.2f}s, {len(store)} 次调用")
+    print(f"  两阶段批量 -sV:              {two_stage:.2f}s, {result['batches']} 次调用, "
+          f"识别 {result['hosts']} 个主机的服务")
+    print(f"  加速 {per_target / two_stage:.1f}x")
+
+
+if __name__ == "__main__":
+    benchmark(*(int(arg) for arg in sys.argv[1:2]))
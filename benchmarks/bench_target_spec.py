@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""在/8上测试构造耗时、随机顺序产出速率、内存占用和子网分散程度，不物化地址列表"""
+
+import sys
+import time
+import tracemalloc
+
+from target_spec import TargetSpec
+
+
+def benchmark(spec: str = "10.0.0.0/8", limit: int = 1000000):
+    print(f"基准测试: {spec}, 随机产出前 {limit} 个地址")
+
+    started = time.perf_counter()
+    targets = TargetSpec([spec], exclude=["10.255.0.0/16"], randomize=True, seed=1)
+    built = time.perf_counter() - started
+    print(f"  目标数: {len(targets):,}, 区间数: {len(targets.ranges)}, 构造 {built * 1000:.2f} ms")
+
+    started = time.perf_counter()
+    count = 0
+    for _ in targets:
+        count += 1
+        if count >= limit:
+            break
+    elapsed = time.perf_counter() - started
+    print(f"  随机产出: {count / elapsed:,.0f} 地址/秒, 遍历全部约需 {len(targets) / (count / elapsed):.0f}s")
+
+    # tracemalloc会显著拖慢分配，单独跑一小段测内存
+    tracemalloc.start()
+    for _, _ in zip(range(100000), targets.shard(3, 7)):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  内存峰值: {peak / 1024:.1f} KB (物化为字符串列表约需 "
+          f"{len(targets) * 64 / 1024 / 1024:.0f} MB)")
+
+    window = 4096
+    sequential = TargetSpec([spec], exclude=["10.255.0.0/16"])
+    spread = {value >> 8 for _, value in zip(range(window), targets.iter_ints())}
+    linear = {value >> 8 for _, value in zip(range(window), sequential.iter_ints())}
+    print(f"  前 {window} 个地址覆盖的/24数: 随机 {len(spread)}, 顺序 {len(linear)}")
+
+    shards = [targets.shard(i, 7) for i in range(7)]
+    print(f"  7个分片大小之和: {sum(len(s) for s in shards):,} (应等于 {len(targets):,})")
+
+
+if __name__ == "__main__":
+    benchmark(*sys.argv[1:2], *(int(arg) for arg in sys.argv[2:3]))
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+"""回环UDP基准: 不同发送进程数下的每核pps"""
+
+import sys
+
+from traffic_gen import _cpus, _sendmmsg, run_traffic
+
+
+def benchmark(duration: float = 3, size: int = 64):
+    cpus = _cpus()
+    print(f"回环UDP基准测试: 负载 {size} 字节, sendmmsg={'是' if _sendmmsg else '否'}, CPU {len(cpus)} 个")
+    counts = sorted({1, max(len(cpus) // 2, 1)})
+    for workers in counts:
+        result = run_traffic('127.0.0.1', 0, 'udp', duration, workers, size, local_sink=True)
+        print(f"  {workers} 发送进程: 发送 {result['pps']:,} pps (每核 {result['pps_per_worker']:,}), "
+              f"{result['mbps']} Mbps, 接收丢包 {result['loss_percent']}%")
+
+
+if __name__ == "__main__":
+    benchmark(*(float(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+发现主机的紧凑列式存储
+IP/MAC 打包为整数列，厂商字符串去重后只保存编号，
+按IP和MAC均可O(1)查找，并可无损还原为原有的 {'ip','mac','vendor'} 字典格式
+"""
+
+import ipaddress
+import re
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Iterable, List, Optional
+
+_MAC_RE = re.compile(r'^[0-9a-f]{2}(:[0-9a-f]{2}){5}$')
+# MAC列中表示"原始字符串另存"的占位值 (超出48位)
+_RAW_MAC = 1 << 48
+# 未知的MAC/厂商，更新已有主机时不覆盖已知值
+_UNKNOWN = ('', 'Unknown')
+
+
+def normalize_mac(mac: str) -> str:
+    """统一MAC格式: 小写、'-' 分隔改为 ':' (nmap -oX 等输出为大写)"""
+    return mac.strip().lower().replace('-', ':')
+
+
+def pack_mac(mac: str) -> Optional[int]:
+    """MAC (大小写和 ':'/'-' 分隔不敏感) -> 48位整数，其他格式返回None"""
+    mac = normalize_mac(mac)
+    if _MAC_RE.match(mac):
+        return int(mac.replace(':', ''), 16)
+    return None
+
+
+def unpack_mac(value: int) -> str:
+    """48位整数 -> aa:bb:cc:dd:ee:ff"""
+    raw = f"{value:012x}"
+    return ":".join(raw[i:i + 2] for i in range(0, 12, 2))
+
+
+class _IntIndex:
+    """开放寻址哈希索引: 整数键 -> 行号
+
+    表中只存 行号+1 (0表示空位)，键本身从外部列读取，每项仅占4字节；
+    列值被改写后留下的旧项不会再匹配，查找时自然跳过，扩容时丢弃；
+    列值等于skip的行 (占位值) 不进入索引
+    """
+
+    def __init__(self, column: array, skip: Optional[int] = None):
+        self._column = column
+        self._skip = skip
+        self._bits = 3
+        self._table = array('I', bytes(4 << self._bits))
+        self._used = 0
+
+    def _slot(self, key: int) -> int:
+        return ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+
+    def get(self, key: int) -> Optional[int]:
+        table, column = self._table, self._column
+        mask = len(table) - 1
+        pos = self._slot(key)
+        while table[pos]:
+            row = table[pos] - 1
+            if column[row] == key:
+                return row
+            pos = (pos + 1) & mask
+        return None
+
+    def add(self, key: int, row: int):
+        if (self._used + 1) * 2 > len(self._table):
+            self._grow()
+        table = self._table
+        mask = len(table) - 1
+        pos = self._slot(key)
+        while table[pos]:
+            pos = (pos + 1) & mask
+        table[pos] = row + 1
+        self._used += 1
+
+    def _grow(self):
+        """按各行当前的列值重建，每行只保留一项；旧项占多数时不扩大表"""
+        rows = sorted({entry - 1 for entry in self._table if entry})
+        if (len(rows) + 1) * 4 > len(self._table):
+            self._bits += 1
+        self._table = array('I', bytes(4 << self._bits))
+        self._used = 0
+        for row in rows:
+            if self._column[row] != self._skip:
+                self.add(self._column[row], row)
+
+
+class HostTable(Sequence):
+    """主机表
+
+    每行一个主机，按列存储：
+      - _ips:     array('I') 打包IPv4
+      - _macs:    array('Q') 打包MAC，无法打包的原样存于 _raw_macs
+      - _vendors: array('I') 厂商编号，编号 -> 字符串见 _vendor_names
+    IP和MAC各有一个 _IntIndex 哈希索引，不为每个主机创建Python对象
+    下标访问返回与原报告一致的字典，便于兼容现有代码
+    """
+
+    def __init__(self, hosts: Iterable[Dict] = ()):
+        self.clear()
+        for host in hosts:
+            self.add(host['ip'], host.get('mac', 'Unknown'), host.get('vendor', 'Unknown'))
+
+    def clear(self):
+        """清空所有主机"""
+        self._ips = array('I')
+        self._macs = array('Q')
+        self._vendors = array('I')
+        self._vendor_names: List[str] = []
+        self._vendor_ids: Dict[str, int] = {}
+        self._raw_macs: Dict[int, str] = {}
+        self._by_ip = _IntIndex(self._ips)
+        self._by_mac = _IntIndex(self._macs, skip=_RAW_MAC)
+
+    def _intern_vendor(self, vendor: str) -> int:
+        vendor_id = self._vendor_ids.get(vendor)
+        if vendor_id is None:
+            vendor_id = len(self._vendor_names)
+            self._vendor_names.append(vendor)
+            self._vendor_ids[vendor] = vendor_id
+        return vendor_id
+
+    def add(self, ip: str, mac: str = 'Unknown', vendor: str = 'Unknown') -> int:
+        """添加或更新主机，返回行号"""
+        return self.add_packed(int(ipaddress.IPv4Address(ip)), mac, vendor)
+
+    def add_packed(self, packed_ip: int, mac: str = 'Unknown', vendor: str = 'Unknown') -> int:
+        """按打包IP添加或更新主机，批量导入时省去地址解析
+
+        更新已有主机时，未知 ('Unknown'或空) 的MAC/厂商不覆盖已有的值
+        """
+        row = self._by_ip.get(packed_ip)
+        if row is None:
+            row = len(self._ips)
+            self._ips.append(packed_ip)
+            self._macs.append(_RAW_MAC)
+            self._vendors.append(self._intern_vendor(vendor))
+            self._by_ip.add(packed_ip, row)
+        else:
+            if vendor not in _UNKNOWN:
+                self._vendors[row] = self._intern_vendor(vendor)
+            if mac in _UNKNOWN:
+                return row
+            self._raw_macs.pop(row, None)
+
+        packed_mac = pack_mac(mac)
+        if packed_mac is None:
+            self._macs[row] = _RAW_MAC
+            self._raw_macs[row] = mac
+        elif self._macs[row] != packed_mac:
+            self._macs[row] = packed_mac
+            self._by_mac.add(packed_mac, row)
+        return row
+
+    def _row(self, row: int) -> Dict:
+        packed_mac = self._macs[row]
+        mac = self._raw_macs[row] if packed_mac == _RAW_MAC else unpack_mac(packed_mac)
+        return {
+            'ip': str(ipaddress.IPv4Address(self._ips[row])),
+            'mac': mac,
+            'vendor': self._vendor_names[self._vendors[row]],
+        }
+
+    def by_ip(self, ip: str) -> Optional[Dict]:
+        """按IP查找主机"""
+        try:
+            row = self._by_ip.get(int(ipaddress.IPv4Address(ip)))
+        except ValueError:
+            return None
+        return None if row is None else self._row(row)
+
+    def has_packed(self, packed_ip: int) -> bool:
+        return self._by_ip.get(packed_ip) is not None
+
+    def by_mac(self, mac: str) -> Optional[Dict]:
+        """按MAC查找主机 (大小写和分隔符不敏感)"""
+        packed = pack_mac(mac)
+        row = None if packed is None else self._by_mac.get(packed)
+        return None if row is None else self._row(row)
+
+    def ips(self) -> List[str]:
+        """按发现顺序返回所有IP"""
+        return [str(ipaddress.IPv4Address(ip)) for ip in self._ips]
+
+    def vendor_counts(self) -> Dict[str, int]:
+        """各厂商的主机数"""
+        counts = [0] * len(self._vendor_names)
+        for vendor_id in self._vendors:
+            counts[vendor_id] += 1
+        return {name: count for name, count in zip(self._vendor_names, counts) if count}
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(row) for row in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return self._row(index)
+
+    def __len__(self) -> int:
+        return len(self._ips)
+
+    def __contains__(self, ip) -> bool:
+        if isinstance(ip, dict):
+            ip = ip.get('ip')
+        return self.by_ip(ip) is not None
+
+    def to_list(self) -> List[Dict]:
+        """转换为原有报告格式"""
+        return [self._row(row) for row in range(len(self))]
+
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+hping3输出流式解析
+逐行统计每个探测包的RTT、SA/RA/超时分布、重复和乱序seq，
+不保存原始输出；最终统计以字典形式写入扫描报告
+"""
+
+import logging
+import re
+import subprocess
+import threading
+from typing import Dict, Optional
+
+from ping_soak import RttHistogram
+from resource_governor import get_governor
+
+_REPLY_RE = re.compile(r'flags=(\S+).*?seq=(\d+).*?rtt=([\d.]+)\s*ms')
+_SUMMARY_RE = re.compile(r'(\d+) packets transmitted, (\d+) packets received')
+
+# hping3的seq为16位，回绕时视为新一轮
+_SEQ_SPACE = 1 << 16
+
+
+class HpingStats:
+    """单次hping3运行的统计
+
+    seq去重用65536位的位图 (8KB)，内存与包数无关
+    """
+
+    def __init__(self, target: str, expected: int = 0):
+        self.target = target
+        self.expected = expected
+        self.sent = None
+        self.replies = 0
+        self.flags = {'SA': 0, 'RA': 0, 'other': 0}
+        self.duplicates = 0
+        self.out_of_order = 0
+        self.seq_wraps = 0
+        self.rtt = RttHistogram()
+        self.timed_out = False
+        self._seen = bytearray(_SEQ_SPACE // 8)
+        self._max_seq = -1
+
+    def feed(self, line: str):
+        """处理一行hping3输出"""
+        reply = _REPLY_RE.search(line)
+        if reply:
+            flags, seq, rtt = reply.group(1), int(reply.group(2)), float(reply.group(3))
+            self._on_reply(flags, seq, rtt, 'DUP!' in line)
+            return
+        summary = _SUMMARY_RE.search(line)
+        if summary:
+            self.sent = int(summary.group(1))
+
+    def _on_reply(self, flags: str, seq: int, rtt: float, dup_marker: bool):
+        if self._max_seq - seq > _SEQ_SPACE // 2:
+            # seq回绕
+            self.seq_wraps += 1
+            self._seen = bytearray(_SEQ_SPACE // 8)
+            self._max_seq = -1
+
+        index, bit = seq >> 3, 1 << (seq & 7)
+        if dup_marker or self._seen[index] & bit:
+            self.duplicates += 1
+            return
+        self._seen[index] |= bit
+
+        if seq < self._max_seq:
+            self.out_of_order += 1
+        else:
+            self._max_seq = seq
+
+        self.replies += 1
+        self.rtt.add(rtt)
+        if flags in ('SA', 'RA'):
+            self.flags[flags] += 1
+        else:
+            self.flags['other'] += 1
+
+    def sent_at_least(self) -> int:
+        """按已收到应答的最大seq推算的发送数下限 (hping3的seq从0开始)"""
+        return self.seq_wraps * _SEQ_SPACE + self._max_seq + 1
+
+    def to_dict(self) -> Dict:
+        sent = self.sent
+        if sent is None and not self.timed_out:
+            sent = self.expected
+        if sent is None:
+            # 被超时杀掉时hping3不输出汇总行，实际发送数未知，不按预期包数估算丢包
+            timeouts = loss = None
+        else:
+            timeouts = max(sent - self.replies, 0)
+            loss = round(100 * timeouts / sent, 2) if sent else 0.0
+        return {
+            'target': self.target,
+            'test_type': 'HPING_SYN',
+            'sent': sent,
+            'sent_at_least': self.sent_at_least(),
+            'received': self.replies,
+            'loss_percent': loss,
+            'flags': dict(self.flags, timeout=timeouts),
+            'duplicates': self.duplicates,
+            'out_of_order': self.out_of_order,
+            'seq_wraps': self.seq_wraps,
+            'rtt': self.rtt.to_dict(),
+            'timed_out': self.timed_out,
+        }
+
+
+def run_hping(target: str, count: int = 100, interval: str = 'u100',
+              timeout: float = 30, extra_args=()) -> Optional[Dict]:
+    """运行hping3并流式解析输出，超时后保留已解析的部分结果"""
+    cmd = ['hping3', '-S', '-c', str(count), '-i', interval, *extra_args, target]
+    stats = HpingStats(target, expected=count)
+
+    with get_governor().popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                              text=True, bufsize=1) as proc:
+
+        def kill():
+            stats.timed_out = True
+            proc.kill()
+
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        try:
+            for line in proc.stdout:
+                stats.feed(line)
+        finally:
+            timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+
+    if stats.timed_out:
+        logging.warning(f"hping3超时: {target}, 已解析 {stats.replies} 个应答")
+    return stats.to_dict()
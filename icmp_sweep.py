@@ -0,0 +1,429 @@
+#!/usr/bin/env python3
+"""
+进程内ICMP存活扫描 (类似fping)
+在少量非阻塞ICMP套接字上同时保持成千上万个未应答的回显请求，按 (套接字, 序号) 匹配应答，
+超时后对从未应答的主机按退避重试，逐主机统计发送/接收和RTT；不为每个目标启动ping进程
+
+优先使用无需特权的 SOCK_DGRAM ICMP 套接字 (net.ipv4.ping_group_range 包含当前组时可用，
+内核填写标识符并只投递本套接字的应答)；不可用时以root身份使用原始套接字，按标识符过滤应答
+
+可选内核时间戳 (SO_TIMESTAMPING，不支持时退回只有接收时间戳的SO_TIMESTAMPNS)：
+发送时间取错误队列中的发送时间戳，接收时间取应答报文附带的接收时间戳，
+不受本进程被调度延迟的影响；网卡和驱动已开启硬件时间戳时 (如运行ptp4l) 优先使用硬件时间。
+用户态RTT与内核RTT并列统计，扫描机本身负载很高时两者的差即为调度延迟
+"""
+
+import heapq
+import itertools
+import os
+import selectors
+import socket
+import statistics
+import struct
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+ICMP_ECHO_REPLY = 0
+ICMP_ECHO_REQUEST = 8
+_ICMP_HEADER = struct.Struct('!BBHHH')
+# 与ping默认相同的56字节负载
+PAYLOAD = b'kali-network-tester sweep'.ljust(56, b'\0')
+
+DEFAULT_SOCKETS = 4
+DEFAULT_TIMEOUT = 1.0
+DEFAULT_RETRIES = 2
+# 同时未应答的请求上限，防止一次灌满发送队列和对端限速
+DEFAULT_WINDOW = 4096
+# 每轮最多连续发送的请求数，之后先收取应答，避免应答在缓冲区里排队把RTT拉长
+BURST = 64
+# 重试超时的退避倍数 (与fping一致)
+BACKOFF = 1.5
+RCVBUF = 4 << 20
+
+# asm-generic/socket.h 和 linux/net_tstamp.h，socket模块未导出
+SO_TIMESTAMPNS = 35
+SO_TIMESTAMPING = 37
+_TS_TX_HARDWARE = 1 << 0
+_TS_TX_SOFTWARE = 1 << 1
+_TS_RX_HARDWARE = 1 << 2
+_TS_RX_SOFTWARE = 1 << 3
+_TS_SOFTWARE = 1 << 4
+_TS_RAW_HARDWARE = 1 << 6
+_TIMESTAMPING_FLAGS = (_TS_TX_HARDWARE | _TS_TX_SOFTWARE | _TS_RX_HARDWARE | _TS_RX_SOFTWARE
+                       | _TS_SOFTWARE | _TS_RAW_HARDWARE)
+# SCM_TIMESTAMPING 为三个timespec: 软件、(废弃)、原始硬件时间
+_SCM_TIMESTAMPING = struct.Struct('qqqqqq')
+_TIMESPEC = struct.Struct('qq')
+_ANCILLARY_SIZE = 256
+
+
+def checksum(data: bytes) -> int:
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xffff)
+    total += total >> 16
+    return ~total & 0xffff
+
+
+def echo_request(ident: int, seq: int, payload: bytes = PAYLOAD) -> bytes:
+    header = _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, 0, ident, seq)
+    return _ICMP_HEADER.pack(ICMP_ECHO_REQUEST, 0, checksum(header + payload), ident, seq) + payload
+
+
+def _timestamps(ancdata) -> Tuple[int, int]:
+    """控制消息中的 (软件时间戳, 硬件时间戳)，单位ns，没有时为0"""
+    for level, kind, data in ancdata:
+        if level != socket.SOL_SOCKET:
+            continue
+        if kind == SO_TIMESTAMPING and len(data) >= _SCM_TIMESTAMPING.size:
+            sw_sec, sw_nsec, _, _, hw_sec, hw_nsec = _SCM_TIMESTAMPING.unpack_from(data)
+            return sw_sec * 1000000000 + sw_nsec, hw_sec * 1000000000 + hw_nsec
+        if kind == SO_TIMESTAMPNS and len(data) >= _TIMESPEC.size:
+            sec, nsec = _TIMESPEC.unpack_from(data)
+            return sec * 1000000000 + nsec, 0
+    return 0, 0
+
+
+class _IcmpSocket:
+    __slots__ = ('sock', 'raw', 'ident', 'next_seq', 'timestamps', 'tx_times')
+
+    def __init__(self, raw: bool, ident: int):
+        if raw:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+            # 内核用本地"端口"作为标识符
+            self.sock.bind(('0.0.0.0', 0))
+            ident = self.sock.getsockname()[1]
+        self.raw = raw
+        self.ident = ident & 0xffff
+        self.next_seq = 0
+        self.timestamps: Optional[str] = None
+        # seq -> 错误队列中取得的 (软件, 硬件) 发送时间戳
+        self.tx_times: Dict[int, Tuple[int, int]] = {}
+        try:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RCVBUF)
+        except OSError:
+            pass
+        self.sock.setblocking(False)
+
+    def enable_timestamps(self) -> Optional[str]:
+        """开启内核时间戳，返回使用的选项名；都不支持时返回None"""
+        for option, value in ((SO_TIMESTAMPING, _TIMESTAMPING_FLAGS), (SO_TIMESTAMPNS, 1)):
+            try:
+                self.sock.setsockopt(socket.SOL_SOCKET, option, value)
+            except OSError:
+                continue
+            self.timestamps = 'SO_TIMESTAMPING' if option == SO_TIMESTAMPING else 'SO_TIMESTAMPNS'
+            break
+        return self.timestamps
+
+    def read_tx_timestamps(self, size: int):
+        """取出错误队列中的发送时间戳；队列中的报文以发出的ICMP报文结尾，据此取seq"""
+        while True:
+            try:
+                data, ancdata, _, _ = self.sock.recvmsg(2048, _ANCILLARY_SIZE, socket.MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                return
+            if len(data) < size:
+                continue
+            seq = _ICMP_HEADER.unpack_from(data, len(data) - size)[4]
+            stamps = _timestamps(ancdata)
+            if stamps[0] or stamps[1]:
+                self.tx_times[seq] = stamps
+
+
+def open_sockets(count: int = DEFAULT_SOCKETS, backend: Optional[str] = None) -> Tuple[List[_IcmpSocket], str]:
+    """打开count个ICMP套接字，backend为 'dgram'/'raw'/None (自动)"""
+    last_error = None
+    for kind in ((backend,) if backend else ('dgram', 'raw')):
+        sockets: List[_IcmpSocket] = []
+        try:
+            for i in range(count):
+                sockets.append(_IcmpSocket(kind == 'raw', (os.getpid() + i) & 0xffff))
+            return sockets, kind
+        except OSError as e:
+            last_error = e
+            for item in sockets:
+                item.sock.close()
+    raise PermissionError(f"无法创建ICMP套接字 (需要root或net.ipv4.ping_group_range包含当前组): {last_error}")
+
+
+class HostStats:
+    __slots__ = ('address', 'sent', 'received', 'rtts', 'kernel_rtts', 'error')
+
+    def __init__(self, address: Optional[str]):
+        self.address = address
+        self.sent = 0
+        self.received = 0
+        self.rtts: List[float] = []
+        # 按内核时间戳计算的RTT (开启时间戳时)
+        self.kernel_rtts: List[float] = []
+        self.error: Optional[str] = None
+
+    @property
+    def alive(self) -> bool:
+        return self.received > 0
+
+    def to_dict(self, target: str) -> Dict:
+        """与ping测试结果相同的字段"""
+        result = {'target': target, 'test_type': 'ICMP_SWEEP', 'success': self.alive,
+                  'sent': self.sent, 'received': self.received,
+                  'loss_percent': round(100 * (self.sent - self.received) / self.sent, 2) if self.sent else None}
+        if self.rtts:
+            result.update(rtt_min=round(min(self.rtts), 3), rtt_avg=round(statistics.fmean(self.rtts), 3),
+                          rtt_max=round(max(self.rtts), 3),
+                          rtt_mdev=round(statistics.pstdev(self.rtts), 3))
+        if self.kernel_rtts:
+            kernel = self.kernel_rtts
+            result.update(kernel_rtt_min=round(min(kernel), 3),
+                          kernel_rtt_avg=round(statistics.fmean(kernel), 3),
+                          kernel_rtt_max=round(max(kernel), 3),
+                          kernel_rtt_mdev=round(statistics.pstdev(kernel), 3))
+        if self.error:
+            result['error'] = self.error
+        return result
+
+
+def _resolve(host: str) -> Optional[str]:
+    try:
+        socket.inet_aton(host)
+        return host
+    except OSError:
+        pass
+    try:
+        return socket.gethostbyname(host)
+    except OSError:
+        return None
+
+
+class IcmpSweeper:
+    """多路复用的ICMP回显引擎
+
+    每个主机发送count个请求 (相隔interval秒)；主机从未应答时超时的请求最多重试retries次，
+    超时按BACKOFF递增；已应答过的主机不再重试，超时只计为丢包；
+    timestamps为True时另按内核时间戳统计RTT (self.timestamping为所用选项，不支持时为None)
+    """
+
+    def __init__(self, sockets: int = DEFAULT_SOCKETS, timeout: float = DEFAULT_TIMEOUT,
+                 retries: int = DEFAULT_RETRIES, window: int = DEFAULT_WINDOW,
+                 rate: Optional[float] = None, interval: float = 1.0, backend: Optional[str] = None,
+                 timestamps: bool = False):
+        self.timeout = timeout
+        self.retries = retries
+        self.window = window
+        self.rate = rate
+        self.interval = interval
+        self.sockets, self.backend = open_sockets(sockets, backend)
+        self.timestamping = None
+        if timestamps:
+            for item in self.sockets:
+                self.timestamping = item.enable_timestamps()
+        self.counters = {'sent': 0, 'received': 0, 'retries': 0, 'send_errors': 0, 'ignored': 0,
+                         'hw_timestamps': 0}
+
+    def close(self):
+        for item in self.sockets:
+            item.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def sweep(self, hosts: Iterable[str], count: int = 1,
+              on_result: Optional[Callable[[str, HostStats], None]] = None) -> Dict[str, HostStats]:
+        """探测所有主机 (可以是惰性迭代器)，返回 主机 -> HostStats；每个主机完成时调用on_result"""
+        stats: Dict[str, HostStats] = {}
+        left: Dict[str, int] = {}
+        # (发送时间, 序号, 主机, 第几个请求, 第几次尝试)
+        scheduled: List[tuple] = []
+        ready: deque = deque()
+        # (套接字序号, seq) -> (主机, 第几个请求, 第几次尝试, 发送时间, 发送时的系统时间ns)
+        outstanding: Dict[Tuple[int, int], tuple] = {}
+        deadlines: List[tuple] = []
+        order = itertools.count()
+        host_iter = iter(hosts)
+        exhausted = False
+        selector = selectors.DefaultSelector()
+        for index, item in enumerate(self.sockets):
+            selector.register(item.sock, selectors.EVENT_READ, index)
+        rr = itertools.cycle(range(len(self.sockets)))
+        started = time.perf_counter()
+        budget_sent = 0
+
+        def finish(host):
+            left[host] -= 1
+            if not left[host]:
+                del left[host]
+                if on_result is not None:
+                    on_result(host, stats[host])
+
+        def expire(host, probe, attempt):
+            host_stats = stats[host]
+            if not host_stats.received and attempt < self.retries:
+                self.counters['retries'] += 1
+                ready.append((host, probe, attempt + 1))
+            else:
+                finish(host)
+
+        try:
+            while True:
+                now = time.perf_counter()
+                # 1. 到期的后续请求进入就绪队列
+                while scheduled and scheduled[0][0] <= now:
+                    _, _, host, probe, attempt = heapq.heappop(scheduled)
+                    ready.append((host, probe, attempt))
+                # 2. 在窗口和速率限制内发送
+                next_send = None
+                burst = 0
+                while len(outstanding) < self.window and burst < BURST:
+                    if self.rate is not None:
+                        allowed = (now - started) * self.rate - budget_sent
+                        if allowed < 1:
+                            next_send = now + (1 - allowed) / self.rate
+                            break
+                    if ready:
+                        host, probe, attempt = ready.popleft()
+                    elif not exhausted:
+                        host = next(host_iter, None)
+                        if host is None:
+                            exhausted = True
+                            break
+                        if host in stats:
+                            continue
+                        stats[host] = HostStats(_resolve(host))
+                        if stats[host].address is None:
+                            stats[host].error = "无法解析主机名"
+                            left[host] = 1
+                            finish(host)
+                            continue
+                        left[host] = count
+                        for later in range(1, count):
+                            heapq.heappush(scheduled, (now + later * self.interval, next(order),
+                                                       host, later, 0))
+                        probe, attempt = 0, 0
+                    else:
+                        break
+                    index = next(rr)
+                    item = self.sockets[index]
+                    seq = item.next_seq
+                    while (index, seq) in outstanding:
+                        seq = (seq + 1) & 0xffff
+                    item.next_seq = (seq + 1) & 0xffff
+                    packet = echo_request(item.ident, seq)
+                    host_stats = stats[host]
+                    try:
+                        item.sock.sendto(packet, (host_stats.address, 0))
+                    except BlockingIOError:
+                        # 发送队列已满，先处理应答再发
+                        ready.appendleft((host, probe, attempt))
+                        break
+                    except OSError as e:
+                        # 无路由等错误: 计为一次无应答的尝试
+                        self.counters['send_errors'] += 1
+                        host_stats.sent += 1
+                        host_stats.error = e.strerror or str(e)
+                        expire(host, probe, attempt)
+                        continue
+                    sent_at = time.perf_counter()
+                    # 只有接收时间戳时，内核RTT的起点取发送后的系统时间 (与时间戳同一时钟)
+                    sent_ns = time.time_ns() if item.timestamps else 0
+                    host_stats.sent += 1
+                    budget_sent += 1
+                    burst += 1
+                    self.counters['sent'] += 1
+                    outstanding[(index, seq)] = (host, probe, attempt, sent_at, sent_ns)
+                    heapq.heappush(deadlines, (sent_at + self.timeout * BACKOFF ** attempt, index, seq))
+
+                if exhausted and not ready and not scheduled and not outstanding:
+                    break
+
+                # 3. 等待应答，最多等到下一个超时/计划发送时刻
+                wake = [t for t in (deadlines[0][0] if deadlines else None,
+                                    scheduled[0][0] if scheduled else None, next_send) if t is not None]
+                more = ready or (not exhausted and burst == BURST)
+                if more and len(outstanding) < self.window and next_send is None:
+                    wait = 0
+                else:
+                    wait = max(0.0, min(wake) - time.perf_counter()) if wake else None
+                for key, _ in selector.select(wait):
+                    self._receive(key.data, outstanding, stats, finish)
+
+                # 4. 处理超时
+                now = time.perf_counter()
+                while deadlines and deadlines[0][0] <= now:
+                    _, index, seq = heapq.heappop(deadlines)
+                    entry = outstanding.pop((index, seq), None)
+                    if entry is not None:
+                        self.sockets[index].tx_times.pop(seq, None)
+                        host, probe, attempt, _, _ = entry
+                        expire(host, probe, attempt)
+        finally:
+            selector.close()
+        return stats
+
+    def _receive(self, index: int, outstanding, stats, finish):
+        item = self.sockets[index]
+        if item.timestamps == 'SO_TIMESTAMPING':
+            # 发送时间戳先于应答产生，先取出再匹配应答
+            item.read_tx_timestamps(len(PAYLOAD) + _ICMP_HEADER.size)
+        while True:
+            try:
+                if item.timestamps:
+                    data, ancdata, _, (source, _) = item.sock.recvmsg(2048, _ANCILLARY_SIZE)
+                else:
+                    data, (source, _) = item.sock.recvfrom(2048)
+            except BlockingIOError:
+                return
+            received_at = time.perf_counter()
+            if item.raw:
+                data = data[(data[0] & 0x0f) * 4:]
+            if len(data) < _ICMP_HEADER.size:
+                continue
+            icmp_type, _, _, ident, seq = _ICMP_HEADER.unpack_from(data)
+            # 原始套接字会收到本机所有ICMP，按标识符只取自己的应答
+            if icmp_type != ICMP_ECHO_REPLY or (item.raw and ident != item.ident):
+                continue
+            entry = outstanding.get((index, seq))
+            if entry is None or stats[entry[0]].address != source:
+                # 超时后才到的应答或无关报文
+                self.counters['ignored'] += 1
+                continue
+            del outstanding[(index, seq)]
+            host, _, _, sent_at, sent_ns = entry
+            host_stats = stats[host]
+            host_stats.received += 1
+            host_stats.rtts.append((received_at - sent_at) * 1000)
+            if item.timestamps:
+                self._kernel_rtt(item, seq, ancdata, sent_ns, host_stats)
+            self.counters['received'] += 1
+            finish(host)
+
+    def _kernel_rtt(self, item: _IcmpSocket, seq: int, ancdata, sent_ns: int, host_stats: HostStats):
+        """收发都有硬件时间戳时用硬件时间，否则用软件时间戳 (没有发送时间戳时以sent_ns为起点)"""
+        rx_sw, rx_hw = _timestamps(ancdata)
+        tx_sw, tx_hw = item.tx_times.pop(seq, (0, 0))
+        if rx_hw and tx_hw:
+            elapsed = rx_hw - tx_hw
+            self.counters['hw_timestamps'] += 1
+        elif rx_sw:
+            elapsed = rx_sw - (tx_sw or sent_ns)
+        else:
+            return
+        if elapsed > 0:
+            host_stats.kernel_rtts.append(elapsed / 1e6)
+
+
+def sweep(hosts: Iterable[str], count: int = 1, **options) -> Dict[str, HostStats]:
+    with IcmpSweeper(**options) as sweeper:
+        return sweeper.sweep(hosts, count)
+
+
+def loopback_hosts(count: int, base: str = '127.1.0.0') -> List[str]:
+    """127.0.0.0/8 中的count个地址，都由lo应答"""
+    start = struct.unpack('!I', socket.inet_aton(base))[0] + 1
+    return [socket.inet_ntoa(struct.pack('!I', start + i)) for i in range(count)]
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+离线导入已有的masscan/nmap结果文件
+支持 masscan -oL/-oJ/-oB 和 nmap -oX；文件以mmap只读映射后按固定大小切块，各块在进程池中并行解析:
+文本格式按行对齐，nmap XML按 <host> 元素对齐，-oB 二进制从块内第一个能连续解析出多条合法记录的位置重新同步；
+块内结果以打包数组 (IP、编码端口) 返回，主进程合并进 PortStore/HostTable，不在进程间传递字符串
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+import socket
+import struct
+import sys
+import time
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from host_table import HostTable
+from port_store import PROTOCOLS, PortStore
+from service_scan import service_info
+
+CHUNK_SIZE = 64 << 20
+_PROTO_ID = {name.encode(): i for i, name in enumerate(PROTOCOLS)}
+
+# masscan -oL: "open tcp 80 10.0.0.1 1700000000"
+_LIST_RE = re.compile(rb'^open (\w+) (\d+) (\d+\.\d+\.\d+\.\d+)', re.M)
+# masscan -oJ: 每行一个主机对象
+_JSON_HOST_RE = re.compile(rb'"ip":\s*"(\d+\.\d+\.\d+\.\d+)"[^\n]*?"ports":\s*\[([^\n]*)')
+_JSON_PORT_RE = re.compile(rb'"port":\s*(\d+),\s*"proto":\s*"(\w+)",\s*"status":\s*"open"')
+# nmap -oX 的主机元素 (不匹配 <hosthint>)
+_HOST_START_RE = re.compile(rb'<host[\s>]')
+
+# masscan -oB: 99字节文件头，之后是 [类型][长度 1或2字节][数据] 记录
+_BINARY_MAGIC = b'masscan/1.1'
+_BINARY_HEADER = 99
+# 类型 -> 固定长度 (None为变长)，见masscan in-binary.c
+_BINARY_TYPES = {1: 12, 2: 12, 3: None, 4: None, 5: None, 6: 13, 7: 13, 9: None,
+                 10: None, 11: None, 13: None, ord('m'): None}
+_OPEN_V1, _OPEN_V2 = 1, 6
+_STATUS_V1 = struct.Struct('>IIHBB')
+_STATUS_V2 = struct.Struct('>IIBHBB')
+# 重新同步时要求连续解析成功的记录数
+_SYNC_RECORDS = 8
+_IP_PROTOCOLS = {6: 0, 17: 1, 132: 2, 1: 3}
+
+
+def detect_format(path: str) -> str:
+    """按文件开头判断格式: masscan-list / masscan-json / masscan-binary / nmap-xml"""
+    with open(path, 'rb') as f:
+        head = f.read(4096)
+    if head.startswith(_BINARY_MAGIC):
+        return 'masscan-binary'
+    text = head.lstrip()
+    if text.startswith(b'<?xml') or text.startswith(b'<nmaprun') or b'<nmaprun' in head:
+        return 'nmap-xml'
+    if text.startswith(b'[') or text.startswith(b'{'):
+        return 'masscan-json'
+    if text.startswith(b'#masscan') or text.startswith(b'open ') or not text:
+        return 'masscan-list'
+    raise ValueError(f"无法识别的结果文件格式: {path}")
+
+
+def plan_chunks(size: int, chunk_size: int = CHUNK_SIZE) -> List[Tuple[int, int]]:
+    return [(start, min(start + chunk_size, size)) for start in range(0, size, chunk_size)] or [(0, 0)]
+
+
+def _line_bounds(mm, start: int, end: int) -> Tuple[int, int]:
+    """块边界对齐到行: 从start之后第一个完整行开始，到覆盖end的那一行结束"""
+    if start:
+        newline = mm.find(b'\n', start - 1)
+        start = len(mm) if newline < 0 else newline + 1
+    if end < len(mm):
+        newline = mm.find(b'\n', end - 1)
+        end = len(mm) if newline < 0 else newline + 1
+    return start, end
+
+
+def _code(proto: bytes, port: bytes) -> Optional[int]:
+    proto_id = _PROTO_ID.get(proto.lower())
+    port = int(port)
+    if proto_id is None or port > 0xFFFF:
+        return None
+    return (proto_id << 16) | port
+
+
+def _packed(ip: bytes) -> Optional[int]:
+    try:
+        return int.from_bytes(socket.inet_aton(ip.decode()), 'big')
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class _Chunk:
+    """一个块的解析结果 (可pickle)"""
+
+    __slots__ = ('ips', 'codes', 'hosts', 'services', 'records', 'skipped', 'size')
+
+    def __init__(self, size: int = 0):
+        self.ips = array('I')
+        self.codes = array('I')
+        self.hosts: List[Tuple[str, str, str]] = []
+        self.services: Dict[str, Dict[str, Dict]] = {}
+        self.records = 0
+        self.skipped = 0
+        self.size = size
+
+    def add(self, packed: Optional[int], code: Optional[int]):
+        if packed is None or code is None:
+            self.skipped += 1
+            return
+        self.ips.append(packed)
+        self.codes.append(code)
+        self.records += 1
+
+
+def _parse_list(mm, start: int, end: int, out: _Chunk):
+    pos, endpos = _line_bounds(mm, start, end)
+    for match in _LIST_RE.finditer(mm, pos, endpos):
+        proto, port, ip = match.groups()
+        out.add(_packed(ip), _code(proto, port))
+
+
+def _parse_json(mm, start: int, end: int, out: _Chunk):
+    pos, endpos = _line_bounds(mm, start, end)
+    for match in _JSON_HOST_RE.finditer(mm, pos, endpos):
+        packed = _packed(match.group(1))
+        for port in _JSON_PORT_RE.finditer(match.group(2)):
+            out.add(packed, _code(port.group(2), port.group(1)))
+
+
+def _parse_nmap(mm, start: int, end: int, out: _Chunk):
+    """块内每个起始于 [start, end) 的 <host> 元素 (可以跨越end)"""
+    for match in _HOST_START_RE.finditer(mm, start):
+        if match.start() >= end:
+            break
+        close = mm.find(b'</host>', match.start())
+        if close < 0:
+            out.skipped += 1
+            break
+        try:
+            host = ET.fromstring(mm[match.start():close + 7])
+        except ET.ParseError:
+            out.skipped += 1
+            continue
+        status = host.find('status')
+        if status is not None and status.get('state') != 'up':
+            continue
+        ip, mac, vendor = None, 'Unknown', 'Unknown'
+        for address in host.findall('address'):
+            if address.get('addrtype') == 'ipv4':
+                ip = address.get('addr')
+            elif address.get('addrtype') == 'mac':
+                mac = address.get('addr') or mac
+                vendor = address.get('vendor') or vendor
+        packed = _packed(ip.encode()) if ip else None
+        if packed is None:
+            out.skipped += 1
+            continue
+        out.hosts.append((ip, mac, vendor))
+        for port in host.iter('port'):
+            info = service_info(port)
+            if info['state'] != 'open':
+                continue
+            out.add(packed, _code(port.get('protocol', '').encode(), port.get('portid', '0').encode()))
+            if len(info) > 1:
+                out.services.setdefault(ip, {})[f"{port.get('portid')}/{port.get('protocol')}"] = info
+
+
+def _binary_record(mm, offset: int, size: int) -> Optional[Tuple[int, int, int]]:
+    """offset处的记录 -> (类型, 数据起点, 数据长度)，不合法时返回None"""
+    if offset + 2 > size:
+        return None
+    record_type, length = mm[offset], mm[offset + 1]
+    header = 2
+    if length & 0x80:
+        if offset + 3 > size:
+            return None
+        length = ((length & 0x7F) << 7) | (mm[offset + 2] & 0x7F)
+        header = 3
+    expected = _BINARY_TYPES.get(record_type, -1)
+    if expected == -1 or (expected is not None and length != expected) or length == 0:
+        return None
+    if offset + header + length > size:
+        return None
+    return record_type, offset + header, length
+
+
+def _binary_sync(mm, start: int, end: int) -> Optional[int]:
+    """[start, end) 内第一个记录边界: 从该位置起连续_SYNC_RECORDS条记录都合法 (或恰好到文件末尾)"""
+    size = len(mm)
+    for offset in range(start, min(end, size)):
+        position = offset
+        for _ in range(_SYNC_RECORDS):
+            if position == size:
+                break
+            record = _binary_record(mm, position, size)
+            if record is None:
+                break
+            position = record[1] + record[2]
+        else:
+            return offset
+        if position == size:
+            return offset
+    return None
+
+
+def _parse_binary(mm, start: int, end: int, out: _Chunk):
+    size = len(mm)
+    offset = _binary_sync(mm, max(start, _BINARY_HEADER), end)
+    while offset is not None and offset < end:
+        record = _binary_record(mm, offset, size)
+        if record is None:
+            # 记录链断开 (文件损坏): 跳到下一个同步点
+            out.skipped += 1
+            offset = _binary_sync(mm, offset + 1, end)
+            continue
+        record_type, data, length = record
+        if record_type == _OPEN_V1:
+            _, ip, port, _, _ = _STATUS_V1.unpack_from(mm, data)
+            out.add(ip, port)
+        elif record_type == _OPEN_V2:
+            _, ip, ip_proto, port, _, _ = _STATUS_V2.unpack_from(mm, data)
+            proto_id = _IP_PROTOCOLS.get(ip_proto)
+            out.add(ip, None if proto_id is None else (proto_id << 16) | port)
+        offset = data + length
+
+
+_PARSERS = {
+    'masscan-list': _parse_list,
+    'masscan-json': _parse_json,
+    'masscan-binary': _parse_binary,
+    'nmap-xml': _parse_nmap,
+}
+
+
+def parse_chunk(task: Tuple[str, str, int, int]) -> _Chunk:
+    """进程池任务: (路径, 格式, 起点, 终点)，每个进程自己映射文件"""
+    path, fmt, start, end = task
+    out = _Chunk(end - start)
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return out
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _PARSERS[fmt](mm, start, end, out)
+    return out
+
+
+def iter_chunks(paths: List[str], workers: Optional[int] = None,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, _Chunk]]:
+    """并行解析所有文件的所有块，按完成顺序产出 (路径, 块结果)"""
+    tasks = []
+    for path in paths:
+        fmt = detect_format(path)
+        tasks.extend((path, fmt, start, end) for start, end in plan_chunks(os.path.getsize(path), chunk_size))
+    workers = min(workers or os.cpu_count() or 1, len(tasks))
+    if workers <= 1:
+        for task in tasks:
+            yield task[0], parse_chunk(task)
+        return
+    ctx = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+    with ctx.Pool(workers) as pool:
+        for task, chunk in zip(tasks, pool.imap(parse_chunk, tasks)):
+            yield task[0], chunk
+
+
+def ingest_files(paths: List[str], store: PortStore, hosts: HostTable,
+                 services: Optional[Dict[str, Dict]] = None, workers: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE,
+                 on_chunk: Optional[Callable[[str, _Chunk], None]] = None) -> Dict:
+    """导入结果文件到端口存储和主机表 (已有主机的MAC/厂商不会被masscan结果覆盖)"""
+    totals = {'files': len(paths), 'bytes': 0, 'chunks': 0, 'records': 0, 'skipped': 0,
+              'new_ports': 0, 'new_hosts': 0}
+    started = time.perf_counter()
+    before = len(hosts)
+    add = store.add_packed
+    for path, chunk in iter_chunks(paths, workers, chunk_size):
+        new_ports = sum(1 for packed, code in zip(chunk.ips, chunk.codes) if add(packed, code))
+        for ip, mac, vendor in chunk.hosts:
+            hosts.add(ip, mac, vendor)
+        for packed in set(chunk.ips):
+            if not hosts.has_packed(packed):
+                hosts.add_packed(packed)
+        if services is not None:
+            for ip, found in chunk.services.items():
+                services.setdefault(ip, {}).update(found)
+        totals['bytes'] += chunk.size
+        totals['chunks'] += 1
+        totals['records'] += chunk.records
+        totals['skipped'] += chunk.skipped
+        totals['new_ports'] += new_ports
+        if on_chunk is not None:
+            on_chunk(path, chunk)
+    totals['new_hosts'] = len(hosts) - before
+    totals['elapsed'] = round(time.perf_counter() - started, 2)
+    return totals
+
+
+# ---- 测试数据 ----
+
+def write_sample(path: str, fmt: str, entries: List[Tuple[str, int, str]]):
+    """按masscan/nmap的输出格式写出 (ip, 端口, 协议) 列表"""
+    with open(path, 'wb') as f:
+        if fmt == 'masscan-list':
+            f.write(b'#masscan\n')
+            for ip, port, proto in entries:
+                f.write(f"open {proto} {port} {ip} 1700000000\n".encode())
+            f.write(b'# end\n')
+        elif fmt == 'masscan-json':
+            f.write(b'[\n')
+            for i, (ip, port, proto) in enumerate(entries):
+                f.write(f'{"," if i else ""}{{   "ip": "{ip}",   "timestamp": "1700000000", "ports": '
+                        f'[ {{"port": {port}, "proto": "{proto}", "status": "open", "reason": "syn-ack", '
+                        f'"ttl": 64}} ] }}\n'.encode())
+            f.write(b']\n')
+        elif fmt == 'masscan-binary':
+            f.write(f"masscan/1.1\ns:1700000000\n".encode().ljust(_BINARY_HEADER, b'\0'))
+            protocols = {name: number for number, name in
+                         ((number, PROTOCOLS[index]) for number, index in _IP_PROTOCOLS.items())}
+            for i, (ip, port, proto) in enumerate(entries):
+                if i % 50 == 0:
+                    # 夹杂变长的banner记录
+                    banner = b'\0' * 14 + b'HTTP/1.1 200 OK ' * (i % 12)
+                    length = len(banner)
+                    f.write(bytes([9, 0x80 | (length >> 7), length & 0x7F]) + banner)
+                packed = struct.unpack('>I', socket.inet_aton(ip))[0]
+                f.write(bytes([_OPEN_V2, 13]) + _STATUS_V2.pack(1700000000, packed, protocols[proto],
+                                                               port, 2, 64))
+        elif fmt == 'nmap-xml':
+            f.write(b'<?xml version="1.0"?>\n<nmaprun scanner="nmap">\n')
+            by_host: Dict[str, List[Tuple[int, str]]] = {}
+            for ip, port, proto in entries:
+                by_host.setdefault(ip, []).append((port, proto))
+            for ip, ports in by_host.items():
+                f.write(f'<host starttime="1700000000"><status state="up" reason="syn-ack"/>'
+                        f'<address addr="{ip}" addrtype="ipv4"/><ports>'.encode())
+                for port, proto in ports:
+                    f.write(f'<port protocol="{proto}" portid="{port}"><state state="open" reason="syn-ack"/>'
+                            f'<service name="http" product="nginx" method="probed"/></port>\n'.encode())
+                f.write(b'</ports></host>\n')
+            f.write(b'</nmaprun>\n')
+
@@ -10,6 +10,7 @@ import sys
 import subprocess
 import os
 import json
+import shutil
 import time
 from pathlib import Path
 
@@ -19,9 +20,8 @@ def check_dependencies():
     missing = []
     
     for tool in tools:
-        try:
-            subprocess.run(['which', tool], capture_output=True, check=True)
-        except subprocess.CalledProcessError:
+        # 直接查找PATH，不再为每个工具启动一次which
+        if not shutil.which(tool):
             missing.append(tool)
     
     if missing:
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+负载曲线调度
+读取JSON/YAML描述的阶段 (爬升、稳态、突发、多流并发)，
+把每个阶段的ping/hping实例分发到进程池并绑定到不同CPU核，
+所有实例按同一个起始时钟切换阶段，最后合并为一条按秒的时间线
+
+配置示例:
+{
+  "name": "router-soak",
+  "targets": ["192.168.1.1"],
+  "phases": [
+    {"name": "ramp", "duration": 60, "steps": 6,
+     "flows": [{"tool": "ping", "rate_start": 5, "rate": 50}]},
+    {"name": "steady", "duration": 300,
+     "flows": [{"tool": "ping", "rate": 50, "instances": 2},
+               {"tool": "hping", "rate": 1000}]},
+    {"name": "spike", "duration": 10,
+     "flows": [{"tool": "hping", "rate": 10000, "instances": 4}]}
+  ]
+}
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from hping_parser import HpingStats
+from log_pipeline import process_log_queue, setup_worker_logging
+from ping_soak import REPLY_RE, NO_ANSWER_RE
+from resource_governor import ResourceGovernor, get_governor, set_governor
+
+TOOLS = ('ping', 'hping')
+# 各实例在共同起始时钟前的准备时间
+START_LEAD = 2.0
+# 实例运行超过 duration + DEADLINE_GRACE 秒后被终止 (包括一直没有输出的工具)
+DEADLINE_GRACE = 5.0
+# ping -i 允许的最小间隔 (秒)：非root用户0.2s，root 2ms；更高速率应使用hping
+PING_MIN_INTERVAL_USER = 0.2
+PING_MIN_INTERVAL_ROOT = 0.002
+
+
+def max_ping_rate() -> float:
+    """当前用户可用的ping最高速率 (包/秒)"""
+    is_root = hasattr(os, 'geteuid') and os.geteuid() == 0
+    return 1 / (PING_MIN_INTERVAL_ROOT if is_root else PING_MIN_INTERVAL_USER)
+
+
+def load_profile(path: str) -> Dict:
+    """读取负载曲线文件 (.json / .yaml / .yml)"""
+    text = Path(path).read_text(encoding='utf-8')
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取YAML配置需要安装PyYAML (pip install pyyaml)，或改用JSON格式")
+        profile = yaml.safe_load(text)
+    else:
+        profile = json.loads(text)
+    validate_profile(profile)
+    return profile
+
+
+def validate_profile(profile: Dict):
+    if not isinstance(profile, dict) or not profile.get('phases'):
+        raise ValueError("负载曲线缺少 phases")
+    ping_limit = max_ping_rate()
+    for index, phase in enumerate(profile['phases']):
+        name = phase.get('name', f"phase{index}")
+        if float(phase.get('duration', 0)) <= 0:
+            raise ValueError(f"阶段 {name} 的 duration 必须大于0")
+        for flow in phase.get('flows', []):
+            if flow.get('tool') not in TOOLS:
+                raise ValueError(f"阶段 {name} 使用了不支持的工具: {flow.get('tool')}")
+            rates = [float(flow.get('rate', 0)), float(flow.get('rate_start', flow.get('rate', 0)))]
+            if min(rates) <= 0:
+                raise ValueError(f"阶段 {name} 的 rate 必须大于0")
+            if flow['tool'] == 'ping' and max(rates) > ping_limit:
+                raise ValueError(f"阶段 {name} 的ping速率 {max(rates):g} 包/秒超出ping的上限 "
+                                 f"{ping_limit:g} 包/秒 (当前用户)，请降低速率或改用hping")
+
+
+def expand_profile(profile: Dict, default_targets: List[str]) -> List[Dict]:
+    """把阶段展开为带绝对偏移的实例任务列表
+
+    设置了 rate_start 的流在 steps 个子段内线性爬升到 rate
+    """
+    tasks = []
+    offset = 0.0
+    targets = profile.get('targets') or default_targets
+    for index, phase in enumerate(profile['phases']):
+        name = phase.get('name', f"phase{index}")
+        duration = float(phase['duration'])
+        steps = max(int(phase.get('steps', 1)), 1)
+        step_duration = duration / steps
+        for flow in phase.get('flows', []):
+            flow_targets = [flow['target']] if flow.get('target') else targets
+            rate = float(flow['rate'])
+            rate_start = float(flow.get('rate_start', rate))
+            for step in range(steps):
+                step_rate = rate if steps == 1 else rate_start + (rate - rate_start) * step / (steps - 1)
+                for target in flow_targets:
+                    for _ in range(int(flow.get('instances', 1))):
+                        tasks.append({
+                            'phase': name,
+                            'tool': flow['tool'],
+                            'target': target,
+                            'rate': round(step_rate, 3),
+                            'offset': offset + step * step_duration,
+                            'duration': step_duration,
+                        })
+        offset += duration
+    # 按起始时间排序，保证进程池先取到先开始的实例
+    tasks.sort(key=lambda task: task['offset'])
+    return tasks
+
+
+def _peak_concurrency(tasks: List[Dict]) -> int:
+    events = sorted([(t['offset'], 1) for t in tasks] +
+                    [(t['offset'] + t['duration'], -1) for t in tasks])
+    current = peak = 0
+    for _, delta in events:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def _init_worker(counter, cpus: List[int], log_queue=None, log_level: int = logging.INFO,
+                 governor_settings: Optional[Dict] = None):
+    """进程池初始化: 日志交回父进程写出，沿用父进程的子进程资源限制，按启动顺序轮流绑定CPU核"""
+    setup_worker_logging(log_queue, log_level)
+    if governor_settings is not None:
+        # fork后子进程的管控器被重置为默认值，按父进程的设置重建 (如 --child-nofile)
+        set_governor(ResourceGovernor(**governor_settings))
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+    if hasattr(os, 'sched_setaffinity') and cpus:
+        try:
+            os.sched_setaffinity(0, {cpus[index % len(cpus)]})
+        except OSError:
+            pass
+
+
+def _run_instance(task: Dict, clock_start: float) -> Dict:
+    """在进程池中运行单个实例，按秒记录发送/接收/RTT"""
+    start_at = clock_start + task['offset']
+    delay = start_at - time.time()
+    if delay > 0:
+        time.sleep(delay)
+    skew = time.time() - start_at
+
+    duration = task['duration']
+    rate = task['rate']
+    if task['tool'] == 'ping':
+        cmd = ['ping', '-D', '-O', '-i', f"{1 / rate:.6f}", '-w', str(max(int(round(duration)), 1)),
+               task['target']]
+    else:
+        count = max(int(rate * duration), 1)
+        cmd = ['hping3', '-S', '-c', str(count), '-i', f"u{max(int(1e6 / rate), 1)}", task['target']]
+
+    timeline: Dict[int, List[float]] = {}
+
+    def bucket(ts: float) -> List[float]:
+        second = int(ts - clock_start)
+        return timeline.setdefault(second, [0, 0, 0.0])
+
+    hping = HpingStats(task['target'], expected=max(int(rate * duration), 1))
+    error = None
+    parsed = False
+    killed = threading.Event()
+    # 未被解析的输出 (错误信息等)，只保留最后一行
+    last_output = ''
+    started = time.time()
+    try:
+        with get_governor().popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                  text=True, bufsize=1) as proc:
+            # 看门狗在截止时间终止子进程，不依赖子进程继续输出
+            def kill():
+                killed.set()
+                proc.kill()
+
+            watchdog = threading.Timer(duration + DEADLINE_GRACE, kill)
+            watchdog.start()
+            try:
+                for line in proc.stdout:
+                    now = time.time()
+                    if task['tool'] == 'ping':
+                        reply = REPLY_RE.search(line)
+                        if reply and 'DUP!' not in line:
+                            entry = bucket(now)
+                            entry[0] += 1
+                            entry[1] += 1
+                            entry[2] += float(reply.group(2))
+                            parsed = True
+                        elif NO_ANSWER_RE.search(line):
+                            bucket(now)[0] += 1
+                            parsed = True
+                        elif line.strip():
+                            last_output = line.strip()
+                    else:
+                        before, rtt_before = hping.replies, hping.rtt.sum
+                        hping.feed(line)
+                        if hping.replies > before:
+                            entry = bucket(now)
+                            entry[1] += 1
+                            entry[2] += hping.rtt.sum - rtt_before
+                        elif hping.sent is None and line.strip():
+                            last_output = line.strip()
+                        parsed = parsed or hping.replies > 0 or hping.sent is not None
+                proc.wait()
+            finally:
+                watchdog.cancel()
+        # ping在-w到期仍有丢包时返回1，其余非0返回码或没有任何可解析输出都视为失败
+        if killed.is_set() and not parsed:
+            error = f"{cmd[0]}超过截止时间被终止: {last_output or '无输出'}"
+        elif not killed.is_set() and (proc.returncode not in (0, 1) or not parsed):
+            error = f"{cmd[0]}异常退出 (返回码 {proc.returncode}): {last_output or '无输出'}"
+    except FileNotFoundError:
+        error = f"{cmd[0]}未安装"
+    if error:
+        logging.warning(f"负载实例失败: {error}", extra={'tool': cmd[0], 'target': task['target'],
+                                                     'phase': task['phase']})
+
+    if task['tool'] == 'hping' and error is None:
+        # hping3不逐包报告超时，把汇总行中的实际发送数均摊到实例运行的每一秒；
+        # 超时被杀时没有汇总行，按收到应答的最大seq取下限
+        sent = hping.sent if hping.sent is not None else hping.sent_at_least()
+        first = int(started - clock_start)
+        seconds = max(int(time.time() - clock_start) - first + 1, 1)
+        for index, second in enumerate(range(first, first + seconds)):
+            share = sent // seconds + (1 if index < sent % seconds else 0)
+            timeline.setdefault(second, [0, 0, 0.0])[0] += share
+
+    return {
+        'phase': task['phase'],
+        'tool': task['tool'],
+        'target': task['target'],
+        'rate': rate,
+        'offset': task['offset'],
+        'duration': duration,
+        'start_skew': round(skew, 4),
+        'pid': os.getpid(),
+        'error': error,
+        'timeline': {str(k): v for k, v in timeline.items()},
+    }
+
+
+def run_profile(profile: Dict, default_targets: List[str],
+                workers: Optional[int] = None) -> Dict:
+    """执行负载曲线并汇总为一条时间线"""
+    tasks = expand_profile(profile, default_targets)
+    if not tasks:
+        raise ValueError("负载曲线没有可执行的实例")
+
+    cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else []
+    # 进程数需覆盖峰值并发，否则后续实例会错过共同时钟
+    workers = workers or max(_peak_concurrency(tasks), 1)
+    counter = multiprocessing.Value('i', 0)
+    clock_start = time.time() + START_LEAD
+    total = max(t['offset'] + t['duration'] for t in tasks)
+    logging.info(f"负载曲线开始: {len(tasks)} 个实例, {workers} 个进程, 总时长 {total:.0f}s")
+
+    with multiprocessing.Pool(workers, initializer=_init_worker,
+                              initargs=(counter, cpus, process_log_queue(),
+                                        logging.getLogger().level, get_governor().settings())) as pool:
+        pending = [pool.apply_async(_run_instance, (task, clock_start)) for task in tasks]
+        instances = [job.get() for job in pending]
+
+    return aggregate(profile, tasks, instances)
+
+
+def aggregate(profile: Dict, tasks: List[Dict], instances: List[Dict]) -> Dict:
+    """合并各实例的按秒统计"""
+    merged: Dict[int, List[float]] = {}
+    for instance in instances:
+        for second, (sent, received, rtt_sum) in instance['timeline'].items():
+            entry = merged.setdefault(int(second), [0, 0, 0.0, 0])
+            entry[0] += sent
+            entry[1] += received
+            entry[2] += rtt_sum
+            entry[3] += received
+
+    # 每秒所属阶段
+    phase_at = []
+    offset = 0.0
+    for index, phase in enumerate(profile['phases']):
+        offset += float(phase['duration'])
+        phase_at.append((offset, phase.get('name', f"phase{index}")))
+
+    def phase_of(second: int) -> str:
+        for end, name in phase_at:
+            if second < end:
+                return name
+        return phase_at[-1][1]
+
+    timeline = []
+    phases: Dict[str, Dict] = {}
+    for second in sorted(merged):
+        sent, received, rtt_sum, rtt_count = merged[second]
+        name = phase_of(second)
+        timeline.append({
+            't': second,
+            'phase': name,
+            'sent': int(sent),
+            'received': int(received),
+            'loss_percent': round(100 * max(sent - received, 0) / sent, 2) if sent else 0.0,
+            'rtt_avg': round(rtt_sum / rtt_count, 3) if rtt_count else None,
+        })
+        summary = phases.setdefault(name, {'phase': name, 'sent': 0, 'received': 0})
+        summary['sent'] += int(sent)
+        summary['received'] += int(received)
+    for summary in phases.values():
+        sent = summary['sent']
+        summary['loss_percent'] = round(100 * max(sent - summary['received'], 0) / sent, 2) if sent else 0.0
+
+    sent = sum(p['sent'] for p in phases.values())
+    received = sum(p['received'] for p in phases.values())
+    return {
+        'target': ",".join(sorted({t['target'] for t in tasks})),
+        'test_type': 'LOAD_PROFILE',
+        'profile': profile.get('name', 'unnamed'),
+        'sent': sent,
+        'received': received,
+        'loss_percent': round(100 * max(sent - received, 0) / sent, 2) if sent else 0.0,
+        'instances': len(instances),
+        'max_start_skew': max(i['start_skew'] for i in instances),
+        'errors': sorted({i['error'] for i in instances if i['error']}),
+        'phases': list(phases.values()),
+        'timeline': timeline,
+    }
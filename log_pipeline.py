@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+异步结构化日志
+扫描线程只把日志记录放入队列，由后台 QueueListener 线程负责
+JSON-lines 格式化、按大小轮转写文件；DEBUG 事件按调用点限速，
+避免详细模式拖慢大规模扫描
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+DEFAULT_LOG_FILE = 'network_test.log'
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# LogRecord 自带的属性，其余属性视为 extra 字段写入JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': round(record.created, 6),
+            'time': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'thread': record.threadName,
+            'msg': record.getMessage(),
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DebugRateLimiter(logging.Filter):
+    """DEBUG事件令牌桶限速
+
+    按调用位置 (文件, 行号) 分桶，每个桶每秒最多放行 rate 条，可突发 burst 条；
+    INFO及以上级别不受影响。被丢弃的条数记在下一条放行记录的 suppressed 字段中
+    """
+
+    def __init__(self, rate: float = 10.0, burst: int = 20, max_keys: int = 4096):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.dropped = 0
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._buckets.clear()
+                bucket = self._buckets[key] = [float(self.burst), now, 0]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens < 1:
+                bucket[0] = tokens
+                bucket[2] += 1
+                self.dropped += 1
+                return False
+            bucket[0] = tokens - 1
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_rate_limiter: Optional[DebugRateLimiter] = None
+# 子进程的日志队列及其监听线程，首次需要时创建
+_process_queue = None
+_process_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(log_file: str = DEFAULT_LOG_FILE, verbose: bool = False,
+                  max_bytes: int = DEFAULT_MAX_BYTES,
+                  backup_count: int = DEFAULT_BACKUP_COUNT,
+                  debug_rate: float = 10.0):
+    """安装队列日志管道，可重复调用以更换配置
+
+    日志文件在第一条记录写入时才创建，仅安装管道 (例如解析命令行参数之前) 不会留下空文件
+    """
+    global _listener, _rate_limiter
+    shutdown_logging()
+
+    path = Path(log_file)
+    if path.parent != Path('.'):
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    file_handler = logging.handlers.RotatingFileHandler(
+        path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+    file_handler.setFormatter(JsonLineFormatter())
+    handlers = [file_handler]
+    if verbose:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        handlers.append(stream_handler)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    _rate_limiter = DebugRateLimiter(rate=debug_rate)
+    queue_handler.addFilter(_rate_limiter)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(logging.DEBUG if verbose else logging.INFO)
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def process_log_queue():
+    """供进程池子进程使用的日志队列，未安装日志管道时返回None
+
+    进程内的队列在fork后只是子进程里的副本，子进程的记录须经multiprocessing队列
+    交回父进程，由单独的监听线程写到同一组处理器
+    """
+    global _process_queue, _process_listener
+    if _listener is None:
+        return None
+    if _process_queue is None:
+        _process_queue = multiprocessing.Queue()
+        _process_listener = logging.handlers.QueueListener(_process_queue, *_listener.handlers,
+                                                           respect_handler_level=True)
+        _process_listener.start()
+    return _process_queue
+
+
+def setup_worker_logging(log_queue, level: int = logging.INFO):
+    """在子进程中调用 (进程池initializer): 根日志器的记录改为放入log_queue"""
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    if log_queue is not None:
+        handler = logging.handlers.QueueHandler(log_queue)
+        handler.addFilter(DebugRateLimiter(_rate_limiter.rate if _rate_limiter else 10.0))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def shutdown_logging():
+    """停止后台线程并刷新所有待写日志"""
+    global _listener, _process_queue, _process_listener
+    if _listener is None:
+        return
+    if _rate_limiter is not None and _rate_limiter.dropped:
+        logging.info(f"DEBUG日志限速共丢弃 {_rate_limiter.dropped} 条")
+    if _process_listener is not None:
+        _process_listener.stop()
+        _process_queue.close()
+        _process_queue = _process_listener = None
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+多出口链路并行压力测试
+从路由表中取出每个 (网关, 出接口) 组合，所有链路同时测试；
+每项测试都绑定出接口和源地址 (ping -I、hping3 -I、套接字SO_BINDTODEVICE)，
+保证流量确实走该链路而不是内核选出的默认出口，最后按链路对比丢包和延迟
+"""
+
+import re
+import socket
+import statistics
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from arp_stress import ping_device
+from hping_parser import run_hping
+from resource_governor import get_governor
+from traffic_gen import bind_to_device, run_traffic
+
+LINK_TESTS = ('ping', 'hping', 'udp', 'tcp')
+# TCP握手探测的目标端口: 网关不监听时回RST，同样能测出RTT
+PROBE_PORT = 80
+
+
+def interface_address(interface: str) -> Optional[str]:
+    """接口的第一个IPv4地址"""
+    try:
+        result = get_governor().run(['ip', '-o', '-4', 'addr', 'show', 'dev', interface],
+                                    capture_output=True, text=True, timeout=5)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r'inet\s+(\d+\.\d+\.\d+\.\d+)', result.stdout)
+    return match.group(1) if match else None
+
+
+def route_key(route: Dict) -> Optional[Tuple[str, str]]:
+    """路由经由的 (网关, 出接口)，直连路由返回None"""
+    gateway = route.get('gateway')
+    interface = route.get('interface')
+    if not interface:
+        # 默认路由的解析结果不含接口
+        match = re.search(r'dev\s+(\S+)', route.get('raw', ''))
+        interface = match.group(1) if match else None
+    if not gateway or not interface:
+        return None
+    return gateway, interface
+
+
+def route_links(routes: List[Dict]) -> List[Dict]:
+    """路由表 -> 链路列表，每个 (网关, 接口) 组合一项，附带经由它的网段"""
+    links: Dict[tuple, Dict] = {}
+    for route in routes:
+        key = route_key(route)
+        if key is None:
+            continue
+        gateway, interface = key
+        link = links.setdefault((gateway, interface), {
+            'interface': interface, 'gateway': gateway, 'source': None, 'routes': []})
+        link['routes'].append(route.get('network', 'default'))
+        src = re.search(r'src\s+(\S+)', route.get('raw', ''))
+        if src and not link['source']:
+            link['source'] = src.group(1)
+    for link in links.values():
+        if not link['source']:
+            link['source'] = interface_address(link['interface'])
+    return list(links.values())
+
+
+def tcp_probe(gateway: str, interface: str, source: Optional[str] = None, count: int = 20,
+              interval: float = 0.05, timeout: float = 1.0, port: int = PROBE_PORT) -> Dict:
+    """绑定出接口的TCP握手时延探测 (SYN -> SYN/ACK或RST)，不需要外部工具"""
+    rtts = []
+    binding = None
+    for _ in range(count):
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            binding = bind_to_device(sock, interface, source)
+            sock.settimeout(timeout)
+            started = time.perf_counter()
+            try:
+                sock.connect((gateway, port))
+                rtts.append((time.perf_counter() - started) * 1000)
+            except ConnectionRefusedError:
+                rtts.append((time.perf_counter() - started) * 1000)
+            except (socket.timeout, OSError):
+                pass
+        finally:
+            sock.close()
+        time.sleep(interval)
+    result = {'target': gateway, 'test_type': 'TCP_PROBE', 'interface': interface,
+              'binding': binding, 'sent': count, 'received': len(rtts),
+              'loss_percent': round(100 * (count - len(rtts)) / count, 2) if count else 0.0}
+    if rtts:
+        result.update(rtt_avg=round(statistics.fmean(rtts), 3), rtt_max=round(max(rtts), 3),
+                      rtt_min=round(min(rtts), 3))
+    return result
+
+
+def test_link(link: Dict, tests: List[str], count: int = 50, timeout: float = 30,
+              traffic_duration: float = 5, traffic_port: int = 9) -> Dict:
+    """对一条链路运行各项测试，外部工具和套接字都绑定该链路的出接口"""
+    gateway, interface, source = link['gateway'], link['interface'], link['source']
+    results = [tcp_probe(gateway, interface, source, min(count, 20))]
+    for test in tests:
+        try:
+            if test == 'ping':
+                result = ping_device(gateway, count, timeout, interval=0.2, interface=interface)
+            elif test == 'hping':
+                result = run_hping(gateway, count, timeout=timeout, extra_args=('-I', interface))
+                result['success'] = result['received'] > 0
+            elif test in ('udp', 'tcp'):
+                result = run_traffic(gateway, traffic_port, test, traffic_duration, workers=1,
+                                     interface=(interface, source))
+            else:
+                continue
+        except FileNotFoundError:
+            tool = 'hping3' if test == 'hping' else 'ping'
+            result = {'target': gateway, 'test_type': 'HPING_SYN' if test == 'hping' else 'PING',
+                      'success': False, 'sent': 0, 'received': None, 'loss_percent': None,
+                      'error': f"{tool}未安装"}
+        except OSError as e:
+            result = {'target': gateway, 'test_type': f"NATIVE_{test.upper()}", 'success': False,
+                      'sent': 0, 'received': None, 'loss_percent': None, 'error': str(e)}
+        result['interface'] = interface
+        results.append(result)
+    return dict(link, results=results)
+
+
+def _latency(result: Dict) -> Optional[float]:
+    if 'rtt_avg' in result:
+        return result['rtt_avg']
+    rtt = result.get('rtt')
+    if rtt and rtt.get('count'):
+        return rtt['avg']
+    return None
+
+
+def summarize_link(link: Dict) -> Dict:
+    """链路汇总: 各延迟类测试的丢包率和平均延迟取最差值"""
+    losses = [r['loss_percent'] for r in link['results']
+              if r.get('loss_percent') is not None and r.get('sent')]
+    latencies = [lat for lat in (_latency(r) for r in link['results']) if lat is not None]
+    pps = [r['pps'] for r in link['results'] if 'pps' in r]
+    return {
+        'loss_percent': max(losses) if losses else None,
+        'rtt_avg': round(max(latencies), 3) if latencies else None,
+        'pps': sum(pps) if pps else None,
+    }
+
+
+def run_multi_link(links: List[Dict], tests: List[str], count: int = 50, timeout: float = 30,
+                   traffic_duration: float = 5, traffic_port: int = 9) -> List[Dict]:
+    """所有链路同时测试，结果按丢包率、延迟排序 (最好的链路在前)"""
+    if not links:
+        return []
+    with ThreadPoolExecutor(max_workers=len(links)) as executor:
+        done = list(executor.map(
+            lambda link: test_link(link, tests, count, timeout, traffic_duration, traffic_port),
+            links))
+    for link in done:
+        link['summary'] = summarize_link(link)
+
+    def rank(link):
+        summary = link['summary']
+        loss = summary['loss_percent']
+        rtt = summary['rtt_avg']
+        return (loss is None, loss or 0, rtt is None, rtt or 0)
+
+    done.sort(key=rank)
+    for position, link in enumerate(done, 1):
+        link['rank'] = position
+    return done
+
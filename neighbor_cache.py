@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+被动邻居发现
+在发送任何ARP之前，从内核邻居表 (rtnetlink RTM_GETNEIGH，失败时读 /proc/net/arp)
+读取已知的活跃主机，并通过内存映射的OUI有序索引解析厂商
+
+OUI索引由本地OUI数据库 (nmap-mac-prefixes / IEEE oui.txt / Wireshark manuf) 生成，
+格式为 定长记录(前缀, 名称偏移) + 名称区，查询时在mmap上二分，不把数据库读入内存
+"""
+
+import bisect
+import ipaddress
+import mmap
+import os
+import re
+import socket
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+PROC_ARP = '/proc/net/arp'
+OUI_INDEX = os.path.join(os.path.expanduser('~'), '.cache', 'kali-network-tester', 'oui.idx')
+OUI_SOURCES = (
+    '/usr/share/nmap/nmap-mac-prefixes',
+    '/usr/share/ieee-data/oui.txt',
+    '/usr/share/wireshark/manuf',
+    '/usr/share/arp-scan/ieee-oui.txt',
+)
+
+_INDEX_MAGIC = b'OUI1'
+_HEADER = struct.Struct('>4sI')
+_RECORD = struct.Struct('>II')
+
+# /proc/net/arp 中 ATF_COM 表示地址已解析
+_ATF_COM = 0x02
+
+# rtnetlink常量 (linux/rtnetlink.h, linux/neighbour.h)
+_RTM_NEWNEIGH = 28
+_RTM_GETNEIGH = 30
+_NLMSG_DONE = 3
+_NLMSG_ERROR = 2
+_NLM_F_REQUEST = 0x01
+_NLM_F_DUMP = 0x300
+_NDA_DST = 1
+_NDA_LLADDR = 2
+# 视为活跃的邻居状态: REACHABLE | STALE | DELAY | PROBE | PERMANENT
+_NUD_VALID = 0x02 | 0x04 | 0x08 | 0x10 | 0x80
+_NLMSG_HEADER = struct.Struct('=IHHII')
+_NDMSG = struct.Struct('=BxxxiHBB')
+_RTATTR = struct.Struct('=HH')
+
+
+def read_proc_arp(path: str = PROC_ARP) -> Iterator[Tuple[str, str, str]]:
+    """读取 /proc/net/arp，产出已解析的 (ip, mac, 接口)"""
+    with open(path, 'r') as f:
+        next(f, None)
+        for line in f:
+            parts = line.split()
+            if len(parts) < 6:
+                continue
+            ip, flags, mac, device = parts[0], int(parts[2], 16), parts[3], parts[5]
+            if flags & _ATF_COM and mac != '00:00:00:00:00:00':
+                yield ip, mac, device
+
+
+def read_netlink_neighbors() -> Iterator[Tuple[str, str, str]]:
+    """通过rtnetlink导出IPv4邻居表，产出有效状态的 (ip, mac, 接口)"""
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+    try:
+        sock.bind((0, 0))
+        body = _NDMSG.pack(socket.AF_INET, 0, 0, 0, 0)
+        sock.send(_NLMSG_HEADER.pack(_NLMSG_HEADER.size + len(body), _RTM_GETNEIGH,
+                                     _NLM_F_REQUEST | _NLM_F_DUMP, 1, 0) + body)
+        while True:
+            data = sock.recv(65536)
+            offset = 0
+            while offset + _NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, _, _ = _NLMSG_HEADER.unpack_from(data, offset)
+                if length < _NLMSG_HEADER.size:
+                    return
+                if msg_type == _NLMSG_DONE:
+                    return
+                if msg_type == _NLMSG_ERROR:
+                    raise OSError("rtnetlink返回错误")
+                if msg_type == _RTM_NEWNEIGH:
+                    neighbor = _parse_neighbor(data[offset + _NLMSG_HEADER.size:offset + length])
+                    if neighbor:
+                        yield neighbor
+                offset += (length + 3) & ~3
+    finally:
+        sock.close()
+
+
+def _parse_neighbor(payload: bytes) -> Optional[Tuple[str, str, str]]:
+    family, ifindex, state, _, _ = _NDMSG.unpack_from(payload)
+    if family != socket.AF_INET or not state & _NUD_VALID:
+        return None
+    ip = mac = None
+    offset = _NDMSG.size
+    while offset + _RTATTR.size <= len(payload):
+        length, attr_type = _RTATTR.unpack_from(payload, offset)
+        if length < _RTATTR.size:
+            break
+        value = payload[offset + _RTATTR.size:offset + length]
+        if attr_type == _NDA_DST and len(value) == 4:
+            ip = socket.inet_ntoa(value)
+        elif attr_type == _NDA_LLADDR and len(value) == 6:
+            mac = value.hex(':')
+        offset += (length + 3) & ~3
+    if not ip or not mac or mac == '00:00:00:00:00:00':
+        return None
+    try:
+        device = socket.if_indextoname(ifindex)
+    except OSError:
+        device = str(ifindex)
+    return ip, mac, device
+
+
+def read_neighbors() -> Tuple[List[Tuple[str, str, str]], str]:
+    """合并邻居表，返回 (邻居列表, 数据来源)"""
+    try:
+        neighbors = list(read_netlink_neighbors())
+        source = 'netlink'
+    except OSError:
+        neighbors = []
+        source = None
+    try:
+        # /proc/net/arp 可能包含netlink导出时已过期的条目，两者合并
+        seen = {ip for ip, _, _ in neighbors}
+        extra = [entry for entry in read_proc_arp() if entry[0] not in seen]
+        neighbors.extend(extra)
+        source = f"{source}+proc" if source and extra else (source or 'proc')
+    except OSError:
+        pass
+    return neighbors, source or 'none'
+
+
+def find_oui_source() -> Optional[str]:
+    for path in OUI_SOURCES:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+_OUI_LINE_RE = re.compile(r'^\s*([0-9A-Fa-f]{2})[:\-]?([0-9A-Fa-f]{2})[:\-]?([0-9A-Fa-f]{2})'
+                          r'(?:\s+\(hex\))?\s+(.+?)\s*$')
+
+
+def parse_oui_source(path: str) -> Iterator[Tuple[int, str]]:
+    """解析各种格式的OUI数据库，只取24位前缀 (MA-L)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.startswith('#') or '(base 16)' in line:
+                continue
+            match = _OUI_LINE_RE.match(line)
+            if not match:
+                continue
+            # Wireshark manuf 格式为 "短名\t长名"，优先取长名
+            name = match.group(4).split('\t')[-1].strip()
+            yield int(match.group(1) + match.group(2) + match.group(3), 16), name
+
+
+def build_oui_index(source: str, dest: str = OUI_INDEX) -> int:
+    """由OUI数据库生成有序索引文件 (原子替换)，返回条目数"""
+    entries = {}
+    for prefix, name in parse_oui_source(source):
+        entries.setdefault(prefix, name)
+
+    names = bytearray()
+    name_offsets = {}
+    records = bytearray()
+    for prefix in sorted(entries):
+        name = entries[prefix]
+        if name not in name_offsets:
+            name_offsets[name] = len(names)
+            names += name.encode('utf-8') + b'\0'
+        records += _RECORD.pack(prefix, name_offsets[name])
+
+    os.makedirs(os.path.dirname(dest) or '.', exist_ok=True)
+    tmp = dest + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(_HEADER.pack(_INDEX_MAGIC, len(entries)))
+        f.write(records)
+        f.write(names)
+    os.replace(tmp, dest)
+    return len(entries)
+
+
+class _RecordView:
+    """把mmap中的定长记录暴露为前缀序列，供bisect使用"""
+
+    def __init__(self, buf, count: int):
+        self.buf = buf
+        self.count = count
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index: int) -> int:
+        return _RECORD.unpack_from(self.buf, _HEADER.size + index * _RECORD.size)[0]
+
+
+class OuiIndex:
+    """内存映射的OUI索引，查询为 O(log n) 次页内读取"""
+
+    def __init__(self, path: str = OUI_INDEX):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = _HEADER.unpack_from(self._map)
+        if magic != _INDEX_MAGIC:
+            self._map.close()
+            raise ValueError(f"无效的OUI索引: {path}")
+        self._names_start = _HEADER.size + self.count * _RECORD.size
+        self._prefixes = _RecordView(self._map, self.count)
+
+    @classmethod
+    def open_default(cls, source: Optional[str] = None,
+                     path: str = OUI_INDEX) -> Optional['OuiIndex']:
+        """打开默认索引，索引缺失或比数据库旧时重新生成；没有数据库时返回None"""
+        source = source or find_oui_source()
+        try:
+            stale = not os.path.exists(path) or (
+                source is not None and os.path.getmtime(source) > os.path.getmtime(path))
+            if stale:
+                if source is None:
+                    return None
+                build_oui_index(source, path)
+            return cls(path)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, mac: str) -> Optional[str]:
+        try:
+            prefix = int(mac.replace(':', '').replace('-', '')[:6], 16)
+        except ValueError:
+            return None
+        pos = bisect.bisect_left(self._prefixes, prefix)
+        if pos == self.count or self._prefixes[pos] != prefix:
+            return None
+        offset = self._names_start + _RECORD.unpack_from(
+            self._map, _HEADER.size + pos * _RECORD.size)[1]
+        end = self._map.find(b'\0', offset)
+        return self._map[offset:end].decode('utf-8')
+
+    def close(self):
+        self._map.close()
+
+
+def passive_discover(network_range: Optional[str] = None,
+                     oui: Optional[OuiIndex] = None) -> Tuple[List[Tuple[str, str, str]], str]:
+    """从邻居表中取出属于network_range的主机，返回 ([(ip, mac, vendor)], 数据来源)"""
+    network = ipaddress.IPv4Network(network_range, strict=False) if network_range else None
+    neighbors, source = read_neighbors()
+    hosts = []
+    for ip, mac, _ in neighbors:
+        if network is not None and ipaddress.IPv4Address(ip) not in network:
+            continue
+        vendor = (oui.lookup(mac) if oui else None) or 'Unknown'
+        hosts.append((ip, mac, vendor))
+    return hosts, source
+
+
+def remainder_networks(network_range: str, known: List[str]) -> List[str]:
+    """network_range中扣除已知主机后剩余的CIDR列表 (供 netdiscover -l 使用)"""
+    network = ipaddress.IPv4Network(network_range, strict=False)
+    cursor = int(network.network_address)
+    last = int(network.broadcast_address)
+    result = []
+    for value in sorted({int(ipaddress.IPv4Address(ip)) for ip in known}):
+        if value < cursor or value > last:
+            continue
+        if value > cursor:
+            result.extend(str(net) for net in ipaddress.summarize_address_range(
+                ipaddress.IPv4Address(cursor), ipaddress.IPv4Address(value - 1)))
+        cursor = value + 1
+    if cursor <= last:
+        result.extend(str(net) for net in ipaddress.summarize_address_range(
+            ipaddress.IPv4Address(cursor), ipaddress.IPv4Address(last)))
+    return result
+
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+结构化结果的库接口与批量作业
+各测试函数不打印任何内容，只返回结果字典 (字段与扫描报告中的压力测试结果一致)；
+run_jobs 在同一个进程内用共享线程池执行作业文件中的大量 目标 x 测试 组合，
+完成一个产出一个 JobResult，内存中只保留正在执行的作业
+
+库用法:
+    from network_api import ping_test, run_jobs, load_jobs
+    result = ping_test('192.168.1.1', count=5)      # {'sent': 5, 'received': 5, ...}
+    for job in run_jobs(load_jobs('jobs.jsonl'), workers=32):
+        print(job.to_dict())
+
+作业文件 (JSONL每行一个作业；YAML为作业列表或 {"jobs": [...]})，
+target 支持TargetSpec的所有写法，tests 可以一次列出多个测试:
+    {"id": "core", "target": "10.0.0.0/28", "tests": ["ping", "hping"], "count": 20}
+    {"target": "10.0.1.1", "test": "nmap", "timeout": 90}
+"""
+
+import io
+import itertools
+import json
+import re
+import subprocess
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional
+
+from hping_parser import run_hping
+from ping_soak import REPLY_RE
+from resource_governor import get_governor
+from rtt_model import TimingModel
+from service_scan import iter_nmap_hosts
+from target_spec import TargetSpec
+from traffic_gen import run_traffic
+
+TESTS = ('ping', 'hping', 'nmap', 'udp', 'tcp')
+# 作业字段中可传给测试函数的参数
+_PARAMS = {
+    'ping': ('count', 'interval', 'timeout', 'interface'),
+    'hping': ('count', 'timeout', 'interface'),
+    'nmap': ('ports', 'timeout'),
+    'udp': ('port', 'duration', 'workers', 'size', 'rate', 'interface'),
+    'tcp': ('port', 'duration', 'workers', 'size', 'rate', 'interface'),
+}
+# 同一作业的多个测试共用参数，某个测试不适用的参数忽略，任何测试都不认识的参数报错
+_ALL_PARAMS = {key for keys in _PARAMS.values() for key in keys} | {'id', 'target', 'test', 'exclude'}
+
+_PING_SUMMARY_RE = re.compile(r'(\d+) packets transmitted, (\d+) received')
+_PING_RTT_RE = re.compile(r'min/avg/max/mdev = ([\d.]+)/([\d.]+)/([\d.]+)/([\d.]+)')
+
+
+class JobResult:
+    """一个作业的结果
+
+    status: ok (有应答) / failed (工具正常结束但无应答) / timeout / error (工具缺失、参数错误等)
+    data 为测试函数返回的结果字典
+    """
+
+    __slots__ = ('job_id', 'target', 'test', 'status', 'started', 'elapsed', 'data', 'error')
+
+    def __init__(self, job_id: str, target: str, test: str, status: str, started: float,
+                 elapsed: float, data: Optional[Dict] = None, error: Optional[str] = None):
+        self.job_id = job_id
+        self.target = target
+        self.test = test
+        self.status = status
+        self.started = started
+        self.elapsed = elapsed
+        self.data = data
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 'ok'
+
+    def to_dict(self) -> Dict:
+        return {slot: getattr(self, slot) for slot in self.__slots__}
+
+
+# ---- 测试函数 (不打印) ----
+
+def parse_ping_summary(output: str) -> Dict:
+    """解析ping的统计行，没有统计行时视为全部丢失"""
+    result = {'sent': 0, 'received': 0, 'loss_percent': 100.0}
+    summary = _PING_SUMMARY_RE.search(output)
+    if summary:
+        sent, received = int(summary.group(1)), int(summary.group(2))
+        result.update(sent=sent, received=received,
+                      loss_percent=round(100 * (sent - received) / sent, 2) if sent else 0.0)
+    rtt = _PING_RTT_RE.search(output)
+    if rtt:
+        result.update(rtt_min=float(rtt.group(1)), rtt_avg=float(rtt.group(2)),
+                      rtt_max=float(rtt.group(3)), rtt_mdev=float(rtt.group(4)))
+    return result
+
+
+def ping_test(target: str, count: int = 10, interval: float = 0.2, timeout: Optional[float] = None,
+              interface: Optional[str] = None, timing: Optional[TimingModel] = None) -> Dict:
+    """ping测试；timeout为空时由timing给出 (再没有则按包数估算)"""
+    if timeout is None:
+        timeout = timing.timeout_for(target, 'ping', count * interval) if timing \
+            else count * interval + 5
+    cmd = ['ping', '-c', str(count), '-i', str(interval), '-w', str(max(int(timeout), 1)), target]
+    if interface:
+        cmd[1:1] = ['-I', interface]
+    output = get_governor().run(cmd, capture_output=True, text=True, timeout=timeout + 5).stdout
+    result = parse_ping_summary(output)
+    result.update(target=target, test_type='PING', timeout=timeout)
+    if timing:
+        rtts = [float(match.group(2)) for match in REPLY_RE.finditer(output)]
+        if rtts:
+            timing.observe_many(target, rtts)
+        else:
+            timing.observe_timeout(target)
+    return result
+
+
+def hping_test(target: str, count: int = 100, timeout: Optional[float] = None,
+               interface: Optional[str] = None, timing: Optional[TimingModel] = None) -> Dict:
+    """hping3 SYN测试，超时后保留已收到的部分结果"""
+    if timeout is None:
+        timeout = timing.timeout_for(target, 'hping3', count * 0.0001) if timing else 30
+    result = run_hping(target, count, timeout=timeout,
+                       extra_args=('-I', interface) if interface else ())
+    result['timeout'] = timeout
+    if timing:
+        if result['rtt']['count']:
+            timing.observe(target, result['rtt']['avg'])
+        elif not result['received']:
+            timing.observe_timeout(target)
+    return result
+
+
+def nmap_test(target: str, ports: Optional[str] = None, timeout: Optional[float] = None,
+              timing: Optional[TimingModel] = None) -> Dict:
+    """nmap SYN扫描 (默认 --top-ports 100)，XML输出解析为端口字典"""
+    if timeout is None:
+        timeout = timing.timeout_for(target, 'nmap') if timing else 60
+    cmd = ['nmap', '-sS', '-T4', '-oX', '-', target]
+    cmd[3:3] = ['-p', ports] if ports else ['--top-ports', '100']
+    output = get_governor().run(cmd, capture_output=True, timeout=timeout).stdout
+    found: Dict[str, Dict] = {}
+    for _, services in iter_nmap_hosts(io.BytesIO(output), timing.seed if timing else None):
+        found.update(services)
+    open_ports = sorted((key for key, info in found.items() if info['state'] == 'open'),
+                        key=lambda key: (key.split('/')[1], int(key.split('/')[0])))
+    return {'target': target, 'test_type': 'NMAP', 'timeout': timeout,
+            'ports': found, 'open_ports': open_ports}
+
+
+def traffic_test(target: str, proto: str = 'udp', port: int = 9, duration: float = 5,
+                 workers: Optional[int] = None, size: int = 64, rate: Optional[float] = None,
+                 interface: Optional[str] = None) -> Dict:
+    """原生UDP/TCP流量测试 (traffic_gen)"""
+    return run_traffic(target, port, proto, duration, workers, size, rate=rate,
+                       interface=(interface, None) if interface else None)
+
+
+def _call(test: str, target: str, params: Dict, timing: Optional[TimingModel]) -> Dict:
+    if test == 'ping':
+        return ping_test(target, timing=timing, **params)
+    if test == 'hping':
+        return hping_test(target, timing=timing, **params)
+    if test == 'nmap':
+        return nmap_test(target, timing=timing, **params)
+    return traffic_test(target, test, **params)
+
+
+def _status(test: str, data: Dict) -> str:
+    if test == 'nmap':
+        return 'ok' if data['ports'] else 'failed'
+    if test in ('udp', 'tcp'):
+        return 'ok' if data['sent'] else 'failed'
+    if data.get('timed_out') and not data['received']:
+        return 'timeout'
+    return 'ok' if data['received'] else 'failed'
+
+
+# ---- 作业 ----
+
+def load_jobs(path: str) -> Iterator[Dict]:
+    """逐个读取作业 (.jsonl流式读取；.yaml/.yml/.json整体读取)
+
+    无法解析的行产出带 "error" 字段的作业，由run_job记为出错而不中断整批
+    """
+    if path.endswith(('.yaml', '.yml')):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("读取YAML作业文件需要安装PyYAML (pip install pyyaml)，或改用JSONL格式")
+        data = yaml.safe_load(Path(path).read_text(encoding='utf-8'))
+    elif path.endswith('.json'):
+        data = json.loads(Path(path).read_text(encoding='utf-8'))
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                try:
+                    job = json.loads(line)
+                except json.JSONDecodeError as e:
+                    job = {'error': f"第{line_no}行JSON错误: {e}"}
+                if not isinstance(job, dict):
+                    job = {'error': f"第{line_no}行不是JSON对象"}
+                job.setdefault('id', f"line{line_no}")
+                yield job
+        return
+    if isinstance(data, dict):
+        data = data.get('jobs')
+    if not isinstance(data, list):
+        raise ValueError("作业文件应为作业列表或包含 jobs 列表")
+    for index, job in enumerate(data, 1):
+        if isinstance(job, dict):
+            job.setdefault('id', f"job{index}")
+            yield job
+        else:
+            yield {'id': f"job{index}", 'error': f"第{index}个作业不是对象"}
+
+
+def expand_job(job: Dict) -> Iterator[Dict]:
+    """作业 -> 单个 (目标, 测试) 的任务；目标范围按需逐个展开"""
+    if job.get('error'):
+        yield {'id': job['id'], 'target': str(job.get('target', '')), 'test': '', 'error': job['error']}
+        return
+    tests = job.get('tests') or [job.get('test', 'ping')]
+    if isinstance(tests, str):
+        tests = [tests]
+    try:
+        targets = job['target']
+        spec = TargetSpec(targets if isinstance(targets, list) else [targets], job.get('exclude', []))
+    except (KeyError, ValueError, OSError) as e:
+        message = "缺少 target" if isinstance(e, KeyError) else f"目标解析错误: {e}"
+        yield {'id': job['id'], 'target': str(job.get('target', '')), 'test': ','.join(tests),
+               'error': message}
+        return
+    multiple = len(spec) > 1 or len(tests) > 1
+    for target in spec:
+        for test in tests:
+            task = {key: value for key, value in job.items() if key not in ('target', 'tests')}
+            task.update(target=target, test=test)
+            if multiple:
+                task['id'] = f"{job['id']}:{target}:{test}"
+            yield task
+
+
+def run_job(task: Dict, timing: Optional[TimingModel] = None) -> JobResult:
+    """执行单个任务，所有异常都转换为 status=error/timeout 的结果"""
+    job_id, target, test = str(task.get('id')), task.get('target', ''), task.get('test', '')
+    started = time.time()
+    begin = time.monotonic()
+
+    def finish(status, data=None, error=None):
+        return JobResult(job_id, target, test, status, started, round(time.monotonic() - begin, 3),
+                         data, error)
+
+    if task.get('error'):
+        return finish('error', error=task['error'])
+    if test not in TESTS:
+        return finish('error', error=f"不支持的测试: {test}")
+    unknown = set(task) - _ALL_PARAMS
+    if unknown:
+        return finish('error', error=f"不支持的参数: {', '.join(sorted(unknown))}")
+    params = {key: task[key] for key in _PARAMS[test] if key in task}
+    try:
+        data = _call(test, target, params, timing)
+    except subprocess.TimeoutExpired:
+        if timing:
+            timing.observe_timeout(target)
+        return finish('timeout', error=f"超过 {params.get('timeout', '模型')} 秒")
+    except FileNotFoundError as e:
+        return finish('error', error=f"工具未安装: {e.filename or test}")
+    except (OSError, ValueError, TypeError, ET.ParseError) as e:
+        return finish('error', error=str(e))
+    return finish(_status(test, data), data)
+
+
+def run_jobs(jobs: Iterable[Dict], workers: int = 16,
+             timing: Optional[TimingModel] = None) -> Iterator[JobResult]:
+    """用共享线程池执行作业，按完成顺序产出结果
+
+    同时在途的任务不超过 workers 的两倍，作业文件再大内存也不随之增长；
+    各外部工具的实际并发仍由资源管控器限制
+    """
+    timing = timing if timing is not None else TimingModel()
+    tasks = (task for job in jobs for task in expand_job(job))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = {executor.submit(run_job, task, timing)
+                   for task in itertools.islice(tasks, workers * 2)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            for task in itertools.islice(tasks, len(done)):
+                pending.add(executor.submit(run_job, task, timing))
+
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+ping长时间浸泡测试
+逐行读取ping输出，只保留固定大小的滚动统计窗口 (每分钟丢包、RTT分位数)
+和中断记录，并定期原子写入检查点文件，内存占用与运行时长无关
+"""
+
+import json
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from array import array
+from collections import deque
+from typing import Dict, Optional
+
+from resource_governor import get_governor
+
+# RTT直方图桶上界 (ms)：0.01ms 到约60s，每十倍程10个对数桶
+RTT_BUCKETS = [0.01 * 10 ** (i / 10) for i in range(68)]
+
+_TS_RE = re.compile(r'^\[(\d+\.\d+)\]\s*')
+REPLY_RE = re.compile(r'icmp_seq=(\d+).*?time[=<]([\d.]+)\s*ms')
+NO_ANSWER_RE = re.compile(r'no answer yet for icmp_seq=(\d+)')
+# 判定丢包后仍计为迟到应答的时限 (秒)，与ping默认的10s应答等待一致
+LATE_WINDOW = 10.0
+
+
+class RttHistogram:
+    """固定桶的RTT直方图，用于常量内存的分位数估计"""
+
+    __slots__ = ('counts', 'total', 'sum', 'min', 'max')
+
+    def __init__(self):
+        self.counts = array('I', bytes(4 * (len(RTT_BUCKETS) + 1)))
+        self.total = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, rtt: float):
+        lo, hi = 0, len(RTT_BUCKETS)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RTT_BUCKETS[mid] < rtt:
+                lo = mid + 1
+            else:
+                hi = mid
+        self.counts[lo] += 1
+        self.total += 1
+        self.sum += rtt
+        self.min = rtt if self.min is None else min(self.min, rtt)
+        self.max = rtt if self.max is None else max(self.max, rtt)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """返回第p百分位所在桶的上界 (不超过实测最大值)"""
+        if not self.total:
+            return None
+        rank = p / 100 * self.total
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                bound = RTT_BUCKETS[index] if index < len(RTT_BUCKETS) else self.max
+                return round(min(bound, self.max), 3)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        return {
+            'count': self.total,
+            'min': self.min,
+            'avg': round(self.sum / self.total, 3) if self.total else None,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+        }
+
+
+class _Window:
+    __slots__ = ('start', 'sent', 'received', 'rtt')
+
+    def __init__(self, start: float):
+        self.start = start
+        self.sent = 0
+        self.received = 0
+        self.rtt = RttHistogram()
+
+    def to_dict(self) -> Dict:
+        loss = 100 * (self.sent - self.received) / self.sent if self.sent else 0.0
+        return {
+            'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.start)),
+            'sent': self.sent,
+            'received': self.received,
+            'loss_percent': round(loss, 2),
+            'rtt': self.rtt.to_dict(),
+        }
+
+
+class SoakStats:
+    """浸泡测试的滚动统计
+
+    - 按 window 秒划分窗口，只保留最近 keep_windows 个
+    - 连续丢失 outage_threshold 个包视为一次中断，记录起止时间
+    - 中断记录最多保留 max_outages 条，总数和总时长单独累计
+    - 已计为丢包的序号在 late_window 秒内收到应答才算迟到；ICMP序号按65536回绕
+      (0.2s间隔约3.6小时一轮)，回绕后的同号新应答不会被误判
+    """
+
+    def __init__(self, target: str, window: int = 60, keep_windows: int = 60,
+                 outage_threshold: int = 3, max_outages: int = 1000,
+                 late_window: float = LATE_WINDOW):
+        self.target = target
+        self.window = window
+        self.outage_threshold = outage_threshold
+        self.late_window = late_window
+        self.started = time.time()
+        self.first_seen = None
+        self.last_seen = None
+        self.sent = 0
+        self.received = 0
+        self.late = 0
+        self.duplicates = 0
+        self.rtt = RttHistogram()
+        self.windows = deque(maxlen=keep_windows)
+        self.outages = deque(maxlen=max_outages)
+        self.outage_count = 0
+        self.outage_seconds = 0.0
+        self._current: Optional[_Window] = None
+        # (序号, 判定丢包的时间)，按时间递增
+        self._lost_seqs = deque(maxlen=256)
+        self._loss_run = 0
+        self._loss_run_start = None
+
+    def _window_for(self, ts: float) -> _Window:
+        start = ts - ts % self.window
+        if self._current is None or self._current.start != start:
+            if self._current is not None:
+                self.windows.append(self._current.to_dict())
+            self._current = _Window(start)
+        return self._current
+
+    def _seen(self, ts: float):
+        if self.first_seen is None:
+            self.first_seen = ts
+        self.last_seen = ts
+
+    def on_reply(self, ts: float, seq: int, rtt: float, duplicate: bool = False):
+        self._seen(ts)
+        if duplicate:
+            self.duplicates += 1
+            return
+        lost = self._lost_seqs
+        while lost and lost[0][1] < ts - self.late_window:
+            lost.popleft()
+        if any(lost_seq == seq for lost_seq, _ in lost):
+            # 已按丢包计数后迟到的应答
+            self.late += 1
+            return
+        window = self._window_for(ts)
+        window.sent += 1
+        window.received += 1
+        window.rtt.add(rtt)
+        self.sent += 1
+        self.received += 1
+        self.rtt.add(rtt)
+
+        if self._loss_run >= self.outage_threshold:
+            duration = ts - self._loss_run_start
+            self.outages.append({
+                'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._loss_run_start)),
+                'end': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(ts)),
+                'duration': round(duration, 3),
+                'lost': self._loss_run,
+            })
+            self.outage_count += 1
+            self.outage_seconds += duration
+            logging.warning(f"{self.target} 中断恢复: 持续 {duration:.1f}s, 丢失 {self._loss_run} 包")
+        self._loss_run = 0
+        self._loss_run_start = None
+
+    def on_loss(self, ts: float, seq: int):
+        self._seen(ts)
+        self._lost_seqs.append((seq, ts))
+        self._window_for(ts).sent += 1
+        self.sent += 1
+        if self._loss_run == 0:
+            self._loss_run_start = ts
+        self._loss_run += 1
+        if self._loss_run == self.outage_threshold:
+            logging.warning(f"{self.target} 检测到中断: 连续丢失 {self._loss_run} 包")
+
+    def snapshot(self) -> Dict:
+        windows = list(self.windows)
+        if self._current is not None:
+            windows.append(self._current.to_dict())
+        loss = 100 * (self.sent - self.received) / self.sent if self.sent else 0.0
+        ongoing = None
+        if self._loss_run >= self.outage_threshold:
+            ongoing = {
+                'start': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self._loss_run_start)),
+                'lost': self._loss_run,
+            }
+        return {
+            'target': self.target,
+            'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.started)),
+            'elapsed': round(self.last_seen - self.first_seen, 1) if self.first_seen else 0.0,
+            'sent': self.sent,
+            'received': self.received,
+            'late': self.late,
+            'duplicates': self.duplicates,
+            'loss_percent': round(loss, 3),
+            'rtt': self.rtt.to_dict(),
+            'outage_count': self.outage_count,
+            'outage_seconds': round(self.outage_seconds, 3),
+            'ongoing_outage': ongoing,
+            'outages': list(self.outages),
+            'windows': windows,
+        }
+
+
+def feed_ping_line(stats: SoakStats, line: str):
+    """解析一行 `ping -D -O` 输出并更新统计"""
+    ts = time.time()
+    ts_match = _TS_RE.match(line)
+    if ts_match:
+        ts = float(ts_match.group(1))
+
+    reply = REPLY_RE.search(line)
+    if reply:
+        stats.on_reply(ts, int(reply.group(1)), float(reply.group(2)),
+                       duplicate='DUP!' in line)
+        return
+    no_answer = NO_ANSWER_RE.search(line)
+    if no_answer:
+        stats.on_loss(ts, int(no_answer.group(1)))
+
+
+def write_checkpoint(path: str, data: Dict):
+    """原子写入检查点 (先写临时文件再rename)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def run_ping_soak(target: str, duration: int = 0, interval: float = 0.2,
+                  checkpoint_file: Optional[str] = None,
+                  checkpoint_every: int = 60, output_dir: str = '.') -> Dict:
+    """流式运行ping浸泡测试，duration为0时运行到被中断为止
+
+    检查点由后台线程按 checkpoint_every 秒定时写入，ping长时间无输出时也不会中断
+    """
+    cmd = ['ping', '-D', '-O', '-i', str(interval)]
+    if duration:
+        cmd += ['-w', str(duration)]
+    cmd.append(target)
+
+    stats = SoakStats(target)
+    lock = threading.Lock()
+    stopped = threading.Event()
+    checkpoint_file = checkpoint_file or os.path.join(output_dir, f"ping_soak_{target}.json")
+    logging.info(f"开始ping浸泡测试: {target}, 时长: {duration or '不限'}s, 间隔: {interval}s")
+
+    def checkpoint_loop():
+        while not stopped.wait(checkpoint_every):
+            with lock:
+                snapshot = stats.snapshot()
+            write_checkpoint(checkpoint_file, snapshot)
+            print(f"[{target}] 已运行 {snapshot['elapsed']:.0f}s, 发送 {snapshot['sent']}, "
+                  f"丢包 {snapshot['loss_percent']}%, 中断 {snapshot['outage_count']} 次")
+
+    writer = threading.Thread(target=checkpoint_loop, name=f"soak-checkpoint-{target}", daemon=True)
+    try:
+        with get_governor().popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                  text=True, bufsize=1) as proc:
+            writer.start()
+            try:
+                for line in proc.stdout:
+                    with lock:
+                        feed_ping_line(stats, line)
+            finally:
+                if proc.poll() is None:
+                    proc.terminate()
+    finally:
+        stopped.set()
+        if writer.is_alive():
+            writer.join()
+        snapshot = stats.snapshot()
+        write_checkpoint(checkpoint_file, snapshot)
+        logging.info(f"ping浸泡测试结束: {target}, 发送: {snapshot['sent']}, "
+                     f"丢包: {snapshot['loss_percent']}%, 中断: {snapshot['outage_count']} 次")
+
+    return snapshot
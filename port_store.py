@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+开放端口紧凑存储
+用打包的整数IP + 端口->主机位图 替代 {ip: ["port/proto", ...]}，
+提供O(1)的端口判断和跨主机的位图集合运算
+"""
+
+import ipaddress
+from array import array
+from collections.abc import Mapping
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# 协议编号占用编码后的高位，端口占低16位
+PROTOCOLS = ('tcp', 'udp', 'sctp', 'icmp')
+_PROTO_ID = {name: i for i, name in enumerate(PROTOCOLS)}
+
+
+def pack_ip(ip: str) -> int:
+    """IPv4字符串 -> 32位整数"""
+    return int(ipaddress.IPv4Address(ip))
+
+
+def unpack_ip(value: int) -> str:
+    """32位整数 -> IPv4字符串"""
+    return str(ipaddress.IPv4Address(value))
+
+
+def _encode(port: int, proto: str) -> int:
+    if not 0 <= port <= 0xFFFF:
+        raise ValueError(f"无效端口: {port}")
+    try:
+        return (_PROTO_ID[proto.lower()] << 16) | port
+    except KeyError:
+        raise ValueError(f"不支持的协议: {proto}")
+
+
+def _decode(code: int) -> str:
+    return f"{code & 0xFFFF}/{PROTOCOLS[code >> 16]}"
+
+
+def _mask_to_slots(mask: int) -> Iterator[int]:
+    """按升序遍历位图中置位的槽位号"""
+    if mask <= 0:
+        return
+    data = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+class PortStore(Mapping):
+    """开放端口存储
+
+    对外仍表现为只读映射 ip -> ["port/proto", ...]，兼容原有报告代码；
+    内部每个主机占一个槽位 (发现顺序)：
+      - _slots:   打包IP -> 槽位号
+      - _addrs:   槽位号 -> 打包IP, array('I')
+      - _bitmaps: 编码端口 -> 槽位位图 (bytearray)，用于O(1)判断和跨主机运算
+      - _pairs:   (槽位号<<32 | 编码端口) 的追加日志, array('Q')
+    按主机列出端口时才把 _pairs 排序压缩为CSR (偏移数组 + 端口数组)
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """清空所有主机和端口"""
+        self._slots: Dict[int, int] = {}
+        self._addrs = array('I')
+        self._bitmaps: Dict[int, bytearray] = {}
+        self._pairs = array('Q')
+        self._offsets: Optional[array] = None
+        self._codes: Optional[array] = None
+
+    # ---- 写入 ----
+
+    def add(self, ip: str, port: int, proto: str = 'tcp') -> bool:
+        """记录一个开放端口，已存在时返回False"""
+        return self.add_packed(pack_ip(ip), _encode(int(port), proto))
+
+    def add_packed(self, packed: int, code: int) -> bool:
+        """按打包IP和编码端口 ((PROTOCOLS序号 << 16) | 端口) 写入，批量导入时省去字符串解析"""
+        slot = self._slots.get(packed)
+        if slot is None:
+            slot = len(self._addrs)
+            self._slots[packed] = slot
+            self._addrs.append(packed)
+
+        bitmap = self._bitmaps.get(code)
+        if bitmap is None:
+            bitmap = self._bitmaps[code] = bytearray()
+        index, bit = slot >> 3, 1 << (slot & 7)
+        if index >= len(bitmap):
+            bitmap.extend(bytes(index - len(bitmap) + 1))
+        elif bitmap[index] & bit:
+            return False
+        bitmap[index] |= bit
+        self._pairs.append((slot << 32) | code)
+        self._offsets = None
+        return True
+
+    def add_entry(self, ip: str, entry: str) -> bool:
+        """按原有 "port/proto" 字符串格式写入"""
+        port, _, proto = entry.partition('/')
+        return self.add(ip, int(port), proto or 'tcp')
+
+    def update(self, data: Dict[str, Iterable[str]]):
+        """合并 {ip: ["port/proto", ...]} 格式的数据"""
+        for ip, entries in data.items():
+            for entry in entries:
+                self.add_entry(ip, entry)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Iterable[str]]) -> 'PortStore':
+        store = cls()
+        store.update(data)
+        return store
+
+    # ---- 单主机查询 ----
+
+    def has(self, ip: str, port: int, proto: str = 'tcp') -> bool:
+        """判断主机端口是否开放，O(1)"""
+        slot = self._slots.get(pack_ip(ip))
+        bitmap = self._bitmaps.get(_encode(int(port), proto))
+        if slot is None or bitmap is None or (slot >> 3) >= len(bitmap):
+            return False
+        return bool(bitmap[slot >> 3] & (1 << (slot & 7)))
+
+    def _compact(self):
+        """将追加日志压缩为按槽位分组的CSR结构"""
+        if self._offsets is not None:
+            return
+        pairs = array('Q', sorted(self._pairs))
+        self._pairs = pairs
+        offsets = array('I', bytes(4 * (len(self._addrs) + 1)))
+        codes = array('I')
+        for pair in pairs:
+            offsets[(pair >> 32) + 1] += 1
+            codes.append(pair & 0xFFFFFFFF)
+        for slot in range(len(self._addrs)):
+            offsets[slot + 1] += offsets[slot]
+        self._offsets, self._codes = offsets, codes
+
+    def _slot_codes(self, slot: int) -> array:
+        self._compact()
+        return self._codes[self._offsets[slot]:self._offsets[slot + 1]]
+
+    def ports(self, ip: str, proto: Optional[str] = 'tcp') -> List[int]:
+        """返回主机的开放端口号列表，proto为None时返回所有协议"""
+        slot = self._slots.get(pack_ip(ip))
+        if slot is None:
+            return []
+        codes = self._slot_codes(slot)
+        if proto is None:
+            return [code & 0xFFFF for code in codes]
+        proto_id = _encode(0, proto) >> 16
+        return [code & 0xFFFF for code in codes if code >> 16 == proto_id]
+
+    # ---- 跨主机集合运算 ----
+
+    def host_mask(self, port: int, proto: str = 'tcp') -> int:
+        """返回开放指定端口的主机槽位位图 (整数，便于 & | ^ 运算)"""
+        bitmap = self._bitmaps.get(_encode(int(port), proto))
+        return int.from_bytes(bitmap, 'little') if bitmap else 0
+
+    def hosts_from_mask(self, mask: int) -> List[str]:
+        """将槽位位图还原为IP列表 (按发现顺序)"""
+        addrs = self._addrs
+        return [unpack_ip(addrs[slot]) for slot in _mask_to_slots(mask)]
+
+    def hosts_with_port(self, port: int, proto: str = 'tcp') -> List[str]:
+        """所有开放指定端口的主机"""
+        return self.hosts_from_mask(self.host_mask(port, proto))
+
+    def hosts_with_all(self, ports: Iterable[int], proto: str = 'tcp') -> List[str]:
+        """同时开放所有指定端口的主机"""
+        mask = None
+        for port in ports:
+            port_mask = self.host_mask(port, proto)
+            mask = port_mask if mask is None else mask & port_mask
+            if not mask:
+                return []
+        return self.hosts_from_mask(mask or 0)
+
+    def hosts_with_any(self, ports: Iterable[int], proto: str = 'tcp') -> List[str]:
+        """开放任一指定端口的主机"""
+        mask = 0
+        for port in ports:
+            mask |= self.host_mask(port, proto)
+        return self.hosts_from_mask(mask)
+
+    def port_counts(self) -> Dict[str, int]:
+        """各端口的开放主机数"""
+        return {_decode(code): sum(bin(byte).count('1') for byte in bitmap)
+                for code, bitmap in sorted(self._bitmaps.items())}
+
+    # ---- 映射接口 (兼容 dict-of-lists) ----
+
+    def __getitem__(self, ip: str) -> List[str]:
+        try:
+            slot = self._slots[pack_ip(ip)]
+        except (KeyError, ValueError):
+            raise KeyError(ip)
+        return [_decode(code) for code in self._slot_codes(slot)]
+
+    def __iter__(self) -> Iterator[str]:
+        for packed in self._addrs:
+            yield unpack_ip(packed)
+
+    def __len__(self) -> int:
+        return len(self._addrs)
+
+    def __contains__(self, ip) -> bool:
+        try:
+            return pack_ip(ip) in self._slots
+        except ValueError:
+            return False
+
+    def to_dict(self) -> Dict[str, List[str]]:
+        """转换为原有报告格式"""
+        return {ip: self[ip] for ip in self}
+
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+限频的进度/ETA显示
+各阶段 (主机发现、端口扫描、压力测试等) 只更新计数器和最近发现，
+后台线程按固定频率统一渲染: 计数、吞吐、ETA和最近几条发现；
+逐项详情写入日志和结果存储，不再逐行打印
+
+终端 (TTY) 下原地刷新底部状态区，其他输出经代理先清除状态区再写出，不会交错；
+输出被重定向时每隔interval秒打印一行普通摘要，阶段结束时打印最终统计
+"""
+
+import logging
+import shutil
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, List, Optional
+
+TTY_INTERVAL = 0.25
+PLAIN_INTERVAL = 10.0
+RECENT_FINDINGS = 3
+
+
+class Stage:
+    """一个阶段的进度计数，advance/finding 可在任意线程调用"""
+
+    __slots__ = ('name', 'total', 'done', 'found', 'started', 'recent', '_lock')
+
+    def __init__(self, name: str, total: Optional[int] = None):
+        self.name = name
+        self.total = total
+        self.done = 0
+        self.found = 0
+        self.started = time.monotonic()
+        self.recent: Deque[str] = deque(maxlen=RECENT_FINDINGS)
+        self._lock = threading.Lock()
+
+    def advance(self, count: int = 1):
+        with self._lock:
+            self.done += count
+
+    def finding(self, text: str, detail: Optional[str] = None):
+        """记录一条发现: 状态区只显示最近几条，完整内容写入日志"""
+        with self._lock:
+            self.found += 1
+            self.recent.append(text)
+        logging.info(f"[{self.name}] {detail or text}")
+
+    def set_total(self, total: int):
+        self.total = total
+
+    def set_done(self, done: int):
+        """按工具自身报告的进度直接设置已完成数"""
+        with self._lock:
+            self.done = done
+
+    def line(self) -> str:
+        with self._lock:
+            done, total, found, recent = self.done, self.total, self.found, list(self.recent)
+        elapsed = time.monotonic() - self.started
+        rate = done / elapsed if elapsed > 0 else 0.0
+        if total:
+            text = f"[{self.name}] {done}/{total} {100 * done / total:.0f}%"
+            if rate > 0 and done < total:
+                text += f" {rate:.1f}/s ETA {_duration((total - done) / rate)}"
+        else:
+            text = f"[{self.name}] {done} 项" + (f" {rate:.1f}/s" if done else "")
+        text += f" 用时 {_duration(elapsed)}"
+        if found:
+            text += f" | 发现 {found}: {'; '.join(reversed(recent))}"
+        return text
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m"
+
+
+class _StreamProxy:
+    """TTY下替换sys.stdout: 写出前先清除状态区，由渲染线程重绘"""
+
+    def __init__(self, renderer: 'ProgressRenderer', stream):
+        self._renderer = renderer
+        self._stream = stream
+
+    def write(self, text: str) -> int:
+        with self._renderer._lock:
+            self._renderer._clear()
+            return self._stream.write(text)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+class ProgressRenderer:
+    """进度渲染器；同一时间可有多个阶段并行"""
+
+    def __init__(self, stream=None, interval: Optional[float] = None, tty: Optional[bool] = None):
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty() if tty is None else tty
+        self.interval = interval or (TTY_INTERVAL if self.tty else PLAIN_INTERVAL)
+        self._stages: List[Stage] = []
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._drawn = 0
+        self._saved_stdout = None
+
+    @contextmanager
+    def stage(self, name: str, total: Optional[int] = None):
+        """阶段上下文: 进入时开始显示，退出时打印最终统计"""
+        stage = Stage(name, total)
+        with self._lock:
+            self._stages.append(stage)
+            self._start()
+        try:
+            yield stage
+        finally:
+            with self._lock:
+                self._stages.remove(stage)
+                self._clear()
+                self.stream.write(stage.line().replace(f"[{name}]", f"[{name}] 完成", 1) + "\n")
+                self.stream.flush()
+                if not self._stages:
+                    self._stop()
+
+    def _start(self):
+        if self._thread is not None:
+            return
+        if self.tty and sys.stdout is self.stream:
+            self._saved_stdout = sys.stdout
+            sys.stdout = _StreamProxy(self, self.stream)
+        self._wake.clear()
+        self._thread = threading.Thread(target=self._loop, name='progress', daemon=True)
+        self._thread.start()
+
+    def _stop(self):
+        thread, self._thread = self._thread, None
+        self._wake.set()
+        if self._saved_stdout is not None:
+            sys.stdout, self._saved_stdout = self._saved_stdout, None
+        if thread is not None and thread is not threading.current_thread():
+            # 渲染线程可能正等待本锁，释放后再等待其退出
+            self._lock.release()
+            try:
+                thread.join(1)
+            finally:
+                self._lock.acquire()
+
+    def _loop(self):
+        while not self._wake.wait(self.interval):
+            with self._lock:
+                if self._thread is not threading.current_thread():
+                    return
+                self._render()
+
+    def _clear(self):
+        """清除TTY状态区 (光标停在状态区第一行行首)"""
+        if self.tty and self._drawn:
+            self.stream.write("\r\x1b[J")
+            self._drawn = 0
+
+    def _render(self):
+        lines = [stage.line() for stage in self._stages]
+        if not lines:
+            return
+        if self.tty:
+            width = shutil.get_terminal_size((120, 24)).columns - 1
+            self._clear()
+            self.stream.write("\n".join(line[:width] for line in lines))
+            # 光标回到状态区第一行行首，后续输出从这里覆盖
+            if len(lines) > 1:
+                self.stream.write(f"\x1b[{len(lines) - 1}A")
+            self.stream.write("\r")
+            self._drawn = len(lines)
+        else:
+            for line in lines:
+                self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+_default_renderer: Optional[ProgressRenderer] = None
+
+
+def get_progress() -> ProgressRenderer:
+    """进程内共享的进度渲染器"""
+    global _default_renderer
+    if _default_renderer is None:
+        _default_renderer = ProgressRenderer()
+    return _default_renderer
+
+
+def set_progress(renderer: ProgressRenderer):
+    global _default_renderer
+    _default_renderer = renderer
+
@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+扫描报告差异比对
+流式读取两个 network_scan_report_*.json，用紧凑的整数哈希索引
+(IP、IP+端口、发现项) 比对新增/消失的主机、端口和问题，
+结果先写入临时JSON-lines文件，再流式生成JSON和HTML差异报告，内存与主机数呈线性的小常数关系
+"""
+
+import hashlib
+import html
+import ipaddress
+import json
+import os
+import tempfile
+import time
+from array import array
+from typing import Dict, Iterator, Optional, Tuple
+
+from port_store import PROTOCOLS
+
+_PROTO_ID = {name: i for i, name in enumerate(PROTOCOLS)}
+_CHUNK = 1 << 20
+_STREAM_SECTIONS = ('hosts', 'open_ports', 'vulnerabilities')
+
+# 索引项状态
+_EMPTY, _PRESENT, _MATCHED = 0, 1, 2
+
+
+class IntHashMap:
+    """开放寻址的 64位整数键 -> 64位整数值 哈希表
+
+    每个槽位占 8+8+1 字节，另带"已匹配"标记，用于找出只在旧报告中出现的项
+    """
+
+    def __init__(self):
+        self._bits = 10
+        self._keys = array('Q', bytes(8 << self._bits))
+        self._values = array('Q', bytes(8 << self._bits))
+        self._state = bytearray(1 << self._bits)
+        self._used = 0
+
+    def __len__(self) -> int:
+        return self._used
+
+    def _find(self, key: int) -> int:
+        mask = len(self._state) - 1
+        pos = ((key * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF) >> (64 - self._bits)
+        state, keys = self._state, self._keys
+        while state[pos] != _EMPTY and keys[pos] != key:
+            pos = (pos + 1) & mask
+        return pos
+
+    def put(self, key: int, value: int = 0):
+        if (self._used + 1) * 2 > len(self._state):
+            self._grow()
+        pos = self._find(key)
+        if self._state[pos] == _EMPTY:
+            self._used += 1
+            self._state[pos] = _PRESENT
+            self._keys[pos] = key
+        self._values[pos] = value
+
+    def match(self, key: int) -> Optional[int]:
+        """查找并标记为已匹配，不存在返回None"""
+        pos = self._find(key)
+        if self._state[pos] == _EMPTY:
+            return None
+        self._state[pos] = _MATCHED
+        return self._values[pos]
+
+    def is_unmatched(self, key: int) -> bool:
+        pos = self._find(key)
+        return self._state[pos] == _PRESENT
+
+    def _grow(self):
+        keys, values, state = self._keys, self._values, self._state
+        self._bits += 1
+        self._keys = array('Q', bytes(8 << self._bits))
+        self._values = array('Q', bytes(8 << self._bits))
+        self._state = bytearray(1 << self._bits)
+        self._used = 0
+        for pos, flag in enumerate(state):
+            if flag != _EMPTY:
+                self.put(keys[pos], values[pos])
+                self._state[self._find(keys[pos])] = flag
+
+
+def _hash64(*parts: str, bits: int = 63) -> int:
+    digest = hashlib.blake2b("\0".join(parts).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') >> (64 - bits)
+
+
+def _ip_key(ip: str) -> int:
+    """IPv4打包为32位整数，其他地址取40位哈希并置第41位"""
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except ValueError:
+        return (1 << 40) | _hash64(ip, bits=40)
+
+
+def _port_key(ip: str, entry: str) -> int:
+    port, _, proto = entry.partition('/')
+    proto_id = _PROTO_ID.get(proto.lower(), len(PROTOCOLS))
+    return (_ip_key(ip) << 20) | (proto_id << 16) | (int(port) & 0xFFFF)
+
+
+def _finding_key(target: str, kind: str, issue: str) -> int:
+    return _hash64(target, kind, issue)
+
+
+def _host_fingerprint(host: Dict) -> int:
+    return _hash64(str(host.get('mac', '')), str(host.get('vendor', '')))
+
+
+def stream_report(path: str) -> Iterator[Tuple[str, object]]:
+    """流式遍历报告，产出 (section, item)
+
+    hosts/vulnerabilities 逐个数组元素产出，open_ports 逐个 (ip, ports) 产出，
+    其他顶层字段整体解码后以 ('meta', (key, value)) 产出
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        buf = ''
+        pos = 0
+        eof = False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            if eof:
+                return False
+            chunk = f.read(_CHUNK)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n':
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        def peek() -> str:
+            skip_ws()
+            return buf[pos] if pos < len(buf) else ''
+
+        def expect(char: str):
+            nonlocal pos
+            if peek() != char:
+                raise ValueError(f"报告格式错误: 位置 {f.tell()} 附近期望 '{char}'")
+            pos += 1
+
+        def value():
+            nonlocal pos
+            skip_ws()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                    # 值恰好在缓冲区末尾时可能被截断 (如数字)，需读入更多再确认
+                    if end < len(buf) or eof:
+                        pos = end
+                        return obj
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                if not fill():
+                    continue
+
+        expect('{')
+        while peek() != '}':
+            key = value()
+            expect(':')
+            if key in _STREAM_SECTIONS and peek() in '[{':
+                closing = ']' if peek() == '[' else '}'
+                expect(peek())
+                while peek() != closing:
+                    if closing == ']':
+                        yield key, value()
+                    else:
+                        ip = value()
+                        expect(':')
+                        yield key, (ip, value())
+                    if peek() == ',':
+                        expect(',')
+                expect(closing)
+            else:
+                yield 'meta', (key, value())
+            if peek() == ',':
+                expect(',')
+        expect('}')
+
+
+def _iter_items(path: str) -> Iterator[Tuple[str, int, Dict]]:
+    """把报告展开为 (类别, 索引键, 明细)"""
+    for section, item in stream_report(path):
+        if section == 'hosts':
+            yield 'host', _ip_key(item['ip']), item
+        elif section == 'open_ports':
+            ip, entries = item
+            for entry in entries:
+                yield 'port', _port_key(ip, entry), {'ip': ip, 'port': entry}
+        elif section == 'vulnerabilities':
+            for issue in item.get('issues', []):
+                detail = {'target': item.get('target'), 'type': item.get('type'), 'issue': issue}
+                yield 'finding', _finding_key(str(detail['target']), str(detail['type']), str(issue)), detail
+        else:
+            key, val = item
+            if key in ('timestamp', 'scan_date'):
+                yield 'meta', 0, {key: val}
+
+
+class _EventSink:
+    """差异事件按类别写入临时JSON-lines文件"""
+
+    CATEGORIES = ('hosts_added', 'hosts_removed', 'hosts_changed',
+                  'ports_opened', 'ports_closed', 'findings_new', 'findings_resolved')
+
+    def __init__(self, tmpdir: str):
+        self.counts = {name: 0 for name in self.CATEGORIES}
+        self.paths = {name: os.path.join(tmpdir, f"{name}.jsonl") for name in self.CATEGORIES}
+        self._files = {name: open(path, 'w', encoding='utf-8') for name, path in self.paths.items()}
+
+    def emit(self, category: str, detail: Dict):
+        self.counts[category] += 1
+        self._files[category].write(json.dumps(detail, ensure_ascii=False) + '\n')
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+
+    def read(self, category: str) -> Iterator[Dict]:
+        with open(self.paths[category], 'r', encoding='utf-8') as f:
+            for line in f:
+                yield json.loads(line)
+
+
+def diff_reports(old_path: str, new_path: str, output_prefix: Optional[str] = None) -> Dict:
+    """比对两个扫描报告并生成 JSON/HTML 差异报告，返回摘要"""
+    output_prefix = output_prefix or f"network_scan_diff_{int(time.time())}"
+    indexes = {'host': IntHashMap(), 'port': IntHashMap(), 'finding': IntHashMap()}
+    meta = {'old': {}, 'new': {}}
+
+    # 第一遍: 为旧报告建立索引
+    for kind, key, detail in _iter_items(old_path):
+        if kind == 'meta':
+            meta['old'].update(detail)
+        elif kind == 'host':
+            indexes['host'].put(key, _host_fingerprint(detail))
+        else:
+            indexes[kind].put(key)
+
+    with tempfile.TemporaryDirectory(prefix='scan_diff_') as tmpdir:
+        events = _EventSink(tmpdir)
+
+        # 第二遍: 流式读取新报告，与索引比对
+        for kind, key, detail in _iter_items(new_path):
+            if kind == 'meta':
+                meta['new'].update(detail)
+                continue
+            found = indexes[kind].match(key)
+            if kind == 'host':
+                if found is None:
+                    events.emit('hosts_added', detail)
+                elif found != _host_fingerprint(detail):
+                    events.emit('hosts_changed', detail)
+            elif found is None:
+                events.emit('ports_opened' if kind == 'port' else 'findings_new', detail)
+
+        # 第三遍: 旧报告中未被匹配的项即为消失的项
+        removed = {'host': 'hosts_removed', 'port': 'ports_closed', 'finding': 'findings_resolved'}
+        for kind, key, detail in _iter_items(old_path):
+            if kind != 'meta' and indexes[kind].is_unmatched(key):
+                events.emit(removed[kind], detail)
+        events.close()
+
+        summary = dict(events.counts)
+        _write_json(f"{output_prefix}.json", old_path, new_path, meta, summary, events)
+        _write_html(f"{output_prefix}.html", old_path, new_path, meta, summary, events)
+
+    return {'old': old_path, 'new': new_path, 'summary': summary,
+            'json': f"{output_prefix}.json", 'html': f"{output_prefix}.html"}
+
+
+def _write_json(path, old_path, new_path, meta, summary, events: _EventSink):
+    with open(path, 'w', encoding='utf-8') as f:
+        header = {
+            'old_report': old_path,
+            'new_report': new_path,
+            'old_scan_date': meta['old'].get('scan_date'),
+            'new_scan_date': meta['new'].get('scan_date'),
+            'summary': summary,
+        }
+        f.write(json.dumps(header, indent=2, ensure_ascii=False)[:-2])
+        for category in events.CATEGORIES:
+            f.write(f',\n  "{category}": [')
+            for index, detail in enumerate(events.read(category)):
+                f.write(('\n    ' if index == 0 else ',\n    ') + json.dumps(detail, ensure_ascii=False))
+            f.write('\n  ]' if summary[category] else ']')
+        f.write('\n}\n')
+
+
+_HTML_TITLES = {
+    'hosts_added': ('🆕 新增主机', ('ip', 'mac', 'vendor')),
+    'hosts_removed': ('➖ 消失主机', ('ip', 'mac', 'vendor')),
+    'hosts_changed': ('🔄 MAC/厂商变化的主机', ('ip', 'mac', 'vendor')),
+    'ports_opened': ('🔓 新开放端口', ('ip', 'port')),
+    'ports_closed': ('🔒 已关闭端口', ('ip', 'port')),
+    'findings_new': ('⚠️ 新增问题', ('target', 'type', 'issue')),
+    'findings_resolved': ('✅ 已消失问题', ('target', 'type', 'issue')),
+}
+
+
+def _write_html(path, old_path, new_path, meta, summary, events: _EventSink):
+    esc = html.escape
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"""
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>扫描差异报告</title>
+    <style>
+        body {{ font-family: Arial, sans-serif; margin: 20px; }}
+        .header {{ background: #2c3e50; color: white; padding: 20px; border-radius: 5px; }}
+        .summary {{ background: #ecf0f1; padding: 15px; margin: 20px 0; border-radius: 5px; }}
+        .section {{ margin: 20px 0; }}
+        table {{ width: 100%; border-collapse: collapse; margin: 10px 0; }}
+        th, td {{ border: 1px solid #ddd; padding: 8px; text-align: left; }}
+        th {{ background-color: #f2f2f2; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>🔒 网络扫描差异报告</h1>
+        <p>旧报告: {esc(old_path)} ({esc(str(meta['old'].get('scan_date')))})</p>
+        <p>新报告: {esc(new_path)} ({esc(str(meta['new'].get('scan_date')))})</p>
+    </div>
+
+    <div class="summary">
+        <h2>📊 变化摘要</h2>
+        <ul>
+""")
+        for category in events.CATEGORIES:
+            f.write(f"            <li>{_HTML_TITLES[category][0]}: {summary[category]} 项</li>\n")
+        f.write("        </ul>\n    </div>\n")
+
+        for category in events.CATEGORIES:
+            if not summary[category]:
+                continue
+            title, columns = _HTML_TITLES[category]
+            f.write(f'\n    <div class="section">\n        <h2>{title}</h2>\n        <table>\n')
+            f.write("            <tr>" + "".join(f"<th>{c}</th>" for c in columns) + "</tr>\n")
+            for detail in events.read(category):
+                f.write("<tr>" + "".join(f"<td>{esc(str(detail.get(c, '')))}</td>" for c in columns) + "</tr>\n")
+            f.write("        </table>\n    </div>\n")
+        f.write("</body>\n</html>\n")
+
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+子进程资源管控
+所有外部工具都经由同一个管控器启动:
+- 按工具类型限制并发子进程数，另有全局子进程上限
+- 对子进程设置RLIMIT (文件描述符、core、可选的地址空间)
+- 后台采样存活子进程的RSS，超过总RSS上限或本进程fd将耗尽时
+  新的启动请求阻塞等待 (背压) 而不是失败
+
+RLIMIT由 prlimit(1) 在exec工具之前设置 (命令前加 prlimit --nofile=N: ... --):
+日志监听线程等后台线程存在时 preexec_fn 不安全，且不设置 preexec_fn 时
+Python 3.10+ 的Popen以vfork启动子进程，启动耗时不随父进程RSS增长；
+系统没有prlimit命令时退回到启动后通过 prlimit(2) 设置
+"""
+
+import logging
+import os
+import resource
+import shutil
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+# 各工具默认并发上限，未列出的工具使用 DEFAULT_TOOL_LIMIT
+TOOL_LIMITS = {
+    'masscan': 1,
+    'netdiscover': 1,
+    'arp-scan': 1,
+    'nmap': 4,
+    'nikto': 2,
+    'whatweb': 4,
+    'dnsrecon': 2,
+    'hping3': 8,
+    'ping': 64,
+}
+DEFAULT_TOOL_LIMIT = 8
+# 每个带管道的子进程在本进程中大约占用的fd数
+_FDS_PER_CHILD = 3
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+_PRLIMIT = shutil.which('prlimit')
+
+
+def read_rss(pid: int) -> int:
+    """读取进程RSS字节数，进程已退出时返回0"""
+    try:
+        with open(f'/proc/{pid}/statm', 'rb') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def count_open_fds() -> int:
+    try:
+        return len(os.listdir('/proc/self/fd'))
+    except OSError:
+        return 0
+
+
+class ResourceGovernor:
+    """子进程并发、RLIMIT和内存的统一管控"""
+
+    def __init__(self, tool_limits: Optional[Dict[str, int]] = None, max_children: int = 64,
+                 max_rss_mb: Optional[float] = None, child_nofile: Optional[int] = 1024,
+                 child_mem_mb: Optional[float] = None, fd_reserve: int = 32,
+                 sample_interval: float = 0.2):
+        # 构造参数，fork出的子进程 (负载曲线进程池) 据此重建相同限制的管控器
+        self._settings = {
+            'tool_limits': dict(tool_limits or {}), 'max_children': max_children,
+            'max_rss_mb': max_rss_mb, 'child_nofile': child_nofile, 'child_mem_mb': child_mem_mb,
+            'fd_reserve': fd_reserve, 'sample_interval': sample_interval,
+        }
+        self.tool_limits = dict(TOOL_LIMITS)
+        self.tool_limits.update(tool_limits or {})
+        self.max_children = max_children
+        self.max_rss = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+        self.child_nofile = child_nofile
+        self.child_mem = int(child_mem_mb * 1024 * 1024) if child_mem_mb else None
+        self.fd_reserve = fd_reserve
+        self.sample_interval = sample_interval
+
+        self._cond = threading.Condition()
+        self._active: Dict[str, int] = {}
+        self._children: Dict[int, str] = {}
+        self._live_rss = 0
+        self._sampler: Optional[threading.Thread] = None
+        self._stats: Dict[str, Dict] = {}
+        self._peak_children = 0
+        self._peak_rss = 0
+        self._spawn_count = 0
+        self._spawn_seconds = 0.0
+        self._fd_count = (0, 0.0)
+
+    def settings(self) -> Dict:
+        """可传给子进程的构造参数: ResourceGovernor(**governor.settings())"""
+        return dict(self._settings, tool_limits=dict(self._settings['tool_limits']))
+
+    def limit_for(self, tool: str) -> int:
+        return self.tool_limits.get(tool, DEFAULT_TOOL_LIMIT)
+
+    def _tool_stats(self, tool: str) -> Dict:
+        return self._stats.setdefault(tool, {
+            'launched': 0, 'peak_concurrent': 0, 'waits': 0,
+            'wait_seconds': 0.0, 'peak_child_rss_mb': 0.0,
+        })
+
+    # ---- 背压 ----
+
+    def _blocked_reason(self, tool: str) -> Optional[str]:
+        if self._active.get(tool, 0) >= self.limit_for(tool):
+            return f"{tool}并发已达上限 {self.limit_for(tool)}"
+        if not self._children:
+            # 没有存活子进程时总是放行，避免永久等待
+            return None
+        if len(self._children) >= self.max_children:
+            return f"子进程总数已达上限 {self.max_children}"
+        if self.max_rss and self._live_rss >= self.max_rss:
+            return f"子进程RSS {self._live_rss / 1048576:.0f}MB 超过上限"
+        soft_nofile = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if soft_nofile != resource.RLIM_INFINITY and \
+                self._open_fds() + _FDS_PER_CHILD > soft_nofile - self.fd_reserve:
+            return "本进程文件描述符即将耗尽"
+        return None
+    
+    def _open_fds(self) -> int:
+        # 列目录的开销与fd数成正比，高频启动时按采样间隔复用结果，
+        # 期间新增的fd按每个子进程的估计值计入
+        count, checked = self._fd_count
+        now = time.monotonic()
+        if now - checked >= self.sample_interval:
+            self._fd_count = (count_open_fds() - _FDS_PER_CHILD * len(self._children), now)
+            count = self._fd_count[0]
+        return count + _FDS_PER_CHILD * len(self._children)
+
+    @contextmanager
+    def slot(self, tool: str):
+        """占用一个tool的并发名额，条件不满足时阻塞等待"""
+        started = time.monotonic()
+        waited = False
+        with self._cond:
+            stats = self._tool_stats(tool)
+            reason = self._blocked_reason(tool)
+            while reason:
+                if not waited:
+                    logging.debug(f"启动{tool}等待资源: {reason}")
+                    waited = True
+                # RSS和fd的变化不会触发通知，定期重新检查
+                self._cond.wait(self.sample_interval)
+                if self.max_rss:
+                    self._live_rss = self._sum_rss()
+                reason = self._blocked_reason(tool)
+            self._active[tool] = self._active.get(tool, 0) + 1
+            stats['launched'] += 1
+            stats['peak_concurrent'] = max(stats['peak_concurrent'], self._active[tool])
+            if waited:
+                stats['waits'] += 1
+                stats['wait_seconds'] += time.monotonic() - started
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[tool] -= 1
+                self._cond.notify_all()
+
+    # ---- 启动子进程 ----
+
+    def _child_limits(self) -> List:
+        limits = [(resource.RLIMIT_CORE, 0, 'core')]
+        if self.child_nofile:
+            limits.append((resource.RLIMIT_NOFILE, self.child_nofile, 'nofile'))
+        if self.child_mem:
+            limits.append((resource.RLIMIT_AS, self.child_mem, 'as'))
+        return limits
+
+    def _limited_cmd(self, cmd: List[str], env: Optional[Dict] = None) -> Optional[List[str]]:
+        """在命令前加prlimit，子进程exec工具前即受限；系统没有prlimit时返回None
+
+        工具不存在时与直接Popen一样抛出FileNotFoundError (而不是prlimit以127退出)
+        """
+        if not _PRLIMIT:
+            return None
+        path = shutil.which(cmd[0], path=(env or os.environ).get('PATH'))
+        if path is None:
+            raise FileNotFoundError(2, 'No such file or directory', cmd[0])
+        options = []
+        for which, value, name in self._child_limits():
+            hard = resource.getrlimit(which)[1]
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            # "soft:" 只设置软限制，硬限制沿用本进程的值
+            options.append(f"--{name}={value}:")
+        return [_PRLIMIT, *options, '--', path, *cmd[1:]]
+
+    def _limit_child(self, pid: int):
+        for which, value, _ in self._child_limits():
+            try:
+                hard = resource.prlimit(pid, which)[1]
+                if hard != resource.RLIM_INFINITY:
+                    value = min(value, hard)
+                resource.prlimit(pid, which, (value, hard))
+            except (OSError, ValueError, AttributeError):
+                # 子进程已退出或平台不支持prlimit
+                return
+
+    @contextmanager
+    def popen(self, cmd: List[str], **kwargs):
+        """受管控的Popen，退出上下文时确保子进程结束并释放名额"""
+        tool = os.path.basename(cmd[0])
+        with self.slot(tool):
+            started = time.perf_counter()
+            limited = self._limited_cmd(cmd, kwargs.get('env'))
+            proc = subprocess.Popen(limited or cmd, **kwargs)
+            spawn_seconds = time.perf_counter() - started
+            if limited is None:
+                self._limit_child(proc.pid)
+            else:
+                # 对调用方保持原始命令，与直接Popen一致
+                proc.args = cmd
+            self._register(proc.pid, tool, spawn_seconds)
+            try:
+                with proc:
+                    try:
+                        yield proc
+                    except BaseException:
+                        proc.kill()
+                        raise
+            finally:
+                self._unregister(proc.pid)
+
+    def run(self, cmd: List[str], input=None, capture_output: bool = False,
+            timeout: Optional[float] = None, check: bool = False, **kwargs):
+        """与 subprocess.run 接口一致"""
+        if capture_output:
+            kwargs['stdout'] = kwargs['stderr'] = subprocess.PIPE
+        if input is not None:
+            kwargs['stdin'] = subprocess.PIPE
+        with self.popen(cmd, **kwargs) as proc:
+            try:
+                stdout, stderr = proc.communicate(input, timeout=timeout)
+            except subprocess.TimeoutExpired as e:
+                proc.kill()
+                proc.communicate()
+                raise subprocess.TimeoutExpired(proc.args, timeout, output=e.output, stderr=e.stderr)
+            returncode = proc.poll()
+        if check and returncode:
+            raise subprocess.CalledProcessError(returncode, proc.args, output=stdout, stderr=stderr)
+        return subprocess.CompletedProcess(proc.args, returncode, stdout, stderr)
+
+    # ---- RSS采样 ----
+
+    def _register(self, pid: int, tool: str, spawn_seconds: float = 0.0):
+        with self._cond:
+            self._children[pid] = tool
+            self._spawn_count += 1
+            self._spawn_seconds += spawn_seconds
+            self._peak_children = max(self._peak_children, len(self._children))
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_loop, name='rss-sampler',
+                                                 daemon=True)
+                self._sampler.start()
+            self._cond.notify_all()
+
+    def _unregister(self, pid: int):
+        with self._cond:
+            self._children.pop(pid, None)
+            self._cond.notify_all()
+
+    def _sum_rss(self) -> int:
+        return self._record_rss(self._read_children(list(self._children.items())))
+
+    @staticmethod
+    def _read_children(children: List) -> List:
+        return [(tool, read_rss(pid)) for pid, tool in children]
+
+    def _record_rss(self, samples: List) -> int:
+        total = 0
+        for tool, rss in samples:
+            total += rss
+            stats = self._tool_stats(tool)
+            stats['peak_child_rss_mb'] = max(stats['peak_child_rss_mb'], round(rss / 1048576, 2))
+        self._peak_rss = max(self._peak_rss, total)
+        return total
+
+    def _sample_loop(self):
+        while True:
+            with self._cond:
+                while not self._children:
+                    self._cond.wait()
+                children = list(self._children.items())
+            # 读取/proc时不持锁，启动和释放名额不必等待采样
+            samples = self._read_children(children)
+            with self._cond:
+                self._live_rss = self._record_rss(samples)
+            time.sleep(self.sample_interval)
+
+    def live_rss(self) -> int:
+        """当前存活子进程的RSS总和 (字节)"""
+        with self._cond:
+            return self._sum_rss()
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                'max_children': self.max_children,
+                'peak_children': self._peak_children,
+                'peak_children_rss_mb': round(self._peak_rss / 1048576, 2),
+                'spawn_backend': 'vfork' if getattr(subprocess, '_USE_VFORK', False) else 'fork',
+                'spawn_ms_avg': round(1000 * self._spawn_seconds / self._spawn_count, 3)
+                if self._spawn_count else None,
+                'tools': {tool: dict(stats, limit=self.limit_for(tool),
+                                     wait_seconds=round(stats['wait_seconds'], 3))
+                          for tool, stats in sorted(self._stats.items())},
+            }
+
+
+_default_governor: Optional[ResourceGovernor] = None
+_default_lock = threading.Lock()
+
+
+def get_governor() -> ResourceGovernor:
+    """进程内共享的管控器，各模块启动外部工具时使用"""
+    global _default_governor
+    with _default_lock:
+        if _default_governor is None:
+            _default_governor = ResourceGovernor()
+        return _default_governor
+
+
+def set_governor(governor: ResourceGovernor):
+    global _default_governor
+    with _default_lock:
+        _default_governor = governor
+
+
+def _reset_after_fork():
+    # fork出的子进程 (如负载曲线进程池) 不继承父进程的采样线程和锁状态
+    global _default_governor, _default_lock
+    _default_governor = None
+    _default_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
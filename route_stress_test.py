@@ -13,40 +13,172 @@ import threading
 import json
 import os
 import logging
+import statistics
 from typing import List, Dict, Optional, Tuple
 import ipaddress
+import tempfile
 from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
 
+from arp_stress import arp_scan, interface_network, is_router, run_arp_stress
+from host_table import HostTable
+from hping_parser import run_hping
+from load_profile import load_profile, run_profile
+from log_pipeline import DEFAULT_LOG_FILE, setup_logging
+from icmp_sweep import DEFAULT_RETRIES as SWEEP_RETRIES, IcmpSweeper
+from ingest import CHUNK_SIZE, ingest_files, plan_chunks
+from multi_link import route_links, run_multi_link
+from neighbor_cache import OuiIndex, passive_discover, remainder_networks
+from network_api import load_jobs, parse_ping_summary, run_jobs
+from ping_soak import REPLY_RE as PING_REPLY_RE, run_ping_soak
+from port_store import PortStore
+from progress import ProgressRenderer, get_progress, set_progress
+from report_diff import diff_reports
+from resource_governor import ResourceGovernor, get_governor, set_governor
+from route_watch import (DEFAULT_DEBOUNCE, DEFAULT_MIN_INTERVAL, RouteWatcher,
+                         watch_routes)
+from rtt_model import TimingModel
+from service_scan import DEFAULT_BATCHES, run_service_scan
+from scan_checkpoint import CHECKPOINT_FILE, ScanCheckpoint, shard_size, shard_targets
+from scan_plan import (Calibration, format_plan, plan_arp_stress, plan_discovery, plan_masscan,
+                       plan_services, plan_stress, plan_sweep, plan_web, summarize, web_targets)
+from target_spec import TargetSpec
+from task_scheduler import (DeadlineScheduler, PRIORITY_GATEWAY, PRIORITY_HOST,
+                            PRIORITY_ROUTER, TaskFailed)
+from traffic_gen import run_sink, run_traffic
+
+# 控制台报告中每个列表最多显示的条数，完整内容见JSON/HTML报告
+REPORT_LIST_LIMIT = 50
+# 综合扫描中做Web指纹识别的目标数上限
+WEB_SCAN_LIMIT = 3
+
 class KaliNetworkTester:
     def __init__(self, verbose=False):
         self.routes = []
         self.gateway = None
+        self.gateways = set()
         self.targets = []
-        self.discovered_hosts = []
-        self.open_ports = {}
+        self.discovered_hosts = HostTable()
+        self.open_ports = PortStore()
         self.web_services = []
+        self.services = {}
+        self.service_detection = False
+        self.service_batches = DEFAULT_BATCHES
+        self.scan_ports = "1-1000"
+        self.masscan_rate = 1000
         self.vulnerabilities = []
+        self.stress_results = []
+        self.link_results = []
+        self.sweep_stats = {}
+        self.ingest_stats = {}
+        self.schedule_records = []
+        self.passive_discovery = True
+        self.governor = get_governor()
+        self.timing = TimingModel()
+        self.progress = get_progress()
+        self.discovery_stats = {}
+        self.traffic_port = 9
+        self.traffic_duration = 10
+        self.traffic_workers = None
+        self.traffic_size = 64
         self.verbose = verbose
+        self.output_dir = '.'
+        self.log_file = DEFAULT_LOG_FILE
+        self.log_max_bytes = 10 * 1024 * 1024
         self._setup_logging()
         
     def _setup_logging(self):
-        """设置日志记录"""
-        log_level = logging.DEBUG if self.verbose else logging.INFO
-        logging.basicConfig(
-            level=log_level,
-            format='%(asctime)s - %(levelname)s - %(message)s',
-            handlers=[
-                logging.FileHandler('network_test.log'),
-                logging.StreamHandler(sys.stdout) if self.verbose else logging.NullHandler()
-            ]
-        )
+        """设置日志记录 (队列异步写入JSON-lines文件，按大小轮转)"""
+        setup_logging(self.log_file, verbose=self.verbose, max_bytes=self.log_max_bytes)
+    
+    def _timed_run(self, target: Optional[str], tool: str, cmd, expected: float = 0.0,
+                   limit: float = None, grace: float = 0, on_line=None, on_status=None):
+        """按RTT模型确定超时和重试次数运行工具，超时后加倍重试，每次尝试记入报告
+        
+        cmd可以是以超时秒数为参数的函数 (工具自身也需要超时参数时)；
+        limit为调度器分配的时限，模型给出的超时不会超过它；
+        给出on_line时边运行边把stdout逐行交给它 (返回结果的stdout为空)，
+        on_status接收stderr中的状态行 (按回车或换行分行)
+        """
+        timeout = self.timing.timeout_for(target, tool, expected)
+        if limit is not None:
+            timeout = min(timeout, limit)
+        retries = self.timing.retries_for(target, tool)
+        started = time.monotonic()
+        for attempt in range(retries + 1):
+            args = cmd(timeout) if callable(cmd) else cmd
+            begin = time.monotonic()
+            try:
+                if on_line:
+                    result = self._stream_run(args, timeout + grace, on_line, on_status)
+                else:
+                    result = self.governor.run(args, capture_output=True, text=True,
+                                               timeout=timeout + grace)
+            except subprocess.TimeoutExpired:
+                self.timing.record(target, tool, timeout, attempt, 'timeout',
+                                   time.monotonic() - begin, expected)
+                if target:
+                    self.timing.observe_timeout(target)
+                if attempt == retries:
+                    raise
+                timeout = self.timing.backoff(tool, timeout)
+                if limit is not None:
+                    remaining = limit - (time.monotonic() - started)
+                    if remaining < 1:
+                        raise
+                    timeout = min(timeout, remaining)
+                logging.info(f"{tool}超时，重试 {target or ''} (第{attempt + 1}次, 超时 {timeout:.1f}s)")
+                continue
+            self.timing.record(target, tool, timeout, attempt, 'done', time.monotonic() - begin, expected)
+            return result
+    
+    def _stream_run(self, cmd: List[str], timeout: float, on_line, on_status=None):
+        """运行工具并逐行回调输出，超时后终止并抛出TimeoutExpired"""
+        with self.governor.popen(cmd, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE if on_status else subprocess.DEVNULL) as proc:
+            timed_out = threading.Event()
+            
+            def kill():
+                timed_out.set()
+                proc.kill()
+            
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            reader = None
+            if on_status:
+                reader = threading.Thread(target=self._read_status, args=(proc.stderr, on_status),
+                                          name='status-reader', daemon=True)
+                reader.start()
+            try:
+                for line in proc.stdout:
+                    on_line(line.decode(errors='replace'))
+                proc.wait()
+            finally:
+                timer.cancel()
+                if reader:
+                    reader.join(1)
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return subprocess.CompletedProcess(cmd, proc.returncode, '', '')
+    
+    @staticmethod
+    def _read_status(stream, on_status):
+        """状态行多以回车原地刷新，按已读到的数据立即分行，不等待后续换行"""
+        pending = b''
+        for chunk in iter(lambda: stream.read1(4096), b''):
+            *lines, pending = re.split(rb'[\r\n]', pending + chunk)
+            for line in lines:
+                if line.strip():
+                    on_status(line.decode(errors='replace'))
+        if pending.strip():
+            on_status(pending.decode(errors='replace'))
         
     def get_route_table(self) -> List[Dict]:
         """读取系统路由表"""
         try:
             # 使用ip route命令获取路由信息
-            result = subprocess.run(['ip', 'route', 'show'], 
+            result = self.governor.run(['ip', 'route', 'show'], 
                                   capture_output=True, text=True, check=True)
             
             routes = []
@@ -106,13 +238,24 @@ class KaliNetworkTester:
         
         # 获取本机IP地址
         try:
-            result = subprocess.run(['hostname', '-I'], 
+            result = self.governor.run(['hostname', '-I'], 
                                   capture_output=True, text=True, check=True)
             local_ips = result.stdout.strip().split()
             
+            # 本机地址所在网段优先取路由表中的直连网段，找不到时按/24处理
+            on_link = []
+            for route in self.routes:
+                if route.get('type') == 'network' and 'gateway' not in route:
+                    try:
+                        on_link.append(ipaddress.IPv4Network(route['network'], strict=False))
+                    except ValueError:
+                        continue
+            
             for ip in local_ips:
                 try:
-                    network = ipaddress.IPv4Network(f"{ip}/24", strict=False)
+                    address = ipaddress.IPv4Address(ip)
+                    network = next((net for net in on_link if address in net),
+                                   ipaddress.IPv4Network(f"{ip}/24", strict=False))
                     # 添加网关和网络段的几个常见地址
                     targets.extend([
                         str(network.network_address + 1),  # 通常是路由器
@@ -127,8 +270,13 @@ class KaliNetworkTester:
             
         return list(set(targets))
     
-    def ping_stress_test(self, target: str, count: int = 100, interval: float = 0.1):
-        """使用ping进行压力测试"""
+    def ping_stress_test(self, target: str, count: int = 100, interval: float = 0.1,
+                         timeout: float = None) -> Dict:
+        """使用ping进行压力测试 (超时由RTT模型给出，到时ping自行结束并输出已有统计)
+        
+        返回与 network_api.ping_test 相同的结果字典，另加 success；
+        无效目标、ping未安装、超时或出错时抛出TaskFailed
+        """
         print(f"正在对 {target} 进行ping压力测试...")
         logging.info(f"开始ping测试: {target}, 包数: {count}, 间隔: {interval}s")
         
@@ -138,114 +286,257 @@ class KaliNetworkTester:
         except ValueError:
             print(f"无效的IP地址: {target}")
             logging.error(f"无效的IP地址: {target}")
-            return False
+            raise TaskFailed(f"无效的IP地址: {target}")
         
-        cmd = ['ping', '-c', str(count), '-i', str(interval), target]
+        def cmd(deadline):
+            return ['ping', '-c', str(count), '-i', str(interval), '-w', str(max(int(deadline), 1)), target]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            result = self._timed_run(target, 'ping', cmd, count * interval,
+                                     limit=timeout, grace=5)
+            
+            # 每个应答的RTT都作为模型样本
+            rtts = [float(m.group(2)) for m in PING_REPLY_RE.finditer(result.stdout)]
+            if rtts:
+                self.timing.observe_many(target, rtts)
+            else:
+                self.timing.observe_timeout(target)
             
             # 解析ping结果
-            if result.returncode == 0:
-                lines = result.stdout.split('\n')
-                success_rate = None
-                avg_latency = None
-                
-                for line in lines:
+            stats = parse_ping_summary(result.stdout)
+            stats.update(target=target, test_type='PING', success=result.returncode == 0)
+            if stats['success']:
+                for line in result.stdout.split('\n'):
                     if 'packets transmitted' in line:
                         print(f"Ping结果: {line}")
-                        # 提取成功率
-                        loss_match = re.search(r'(\d+)% packet loss', line)
-                        if loss_match:
-                            success_rate = 100 - int(loss_match.group(1))
                     elif 'min/avg/max' in line:
                         print(f"延迟统计: {line}")
-                        # 提取平均延迟
-                        avg_match = re.search(r'min/avg/max/mdev = [\d.]+/([\d.]+)/', line)
-                        if avg_match:
-                            avg_latency = float(avg_match.group(1))
                 
-                logging.info(f"Ping测试完成: {target}, 成功率: {success_rate}%, 平均延迟: {avg_latency}ms")
-                return True
+                logging.info(f"Ping测试完成: {target}, 成功率: {100 - stats['loss_percent']}%, "
+                             f"平均延迟: {stats.get('rtt_avg')}ms")
             else:
                 print(f"Ping失败: {target}")
                 logging.warning(f"Ping失败: {target}, 返回码: {result.returncode}")
-                return False
+            self.stress_results.append(stats)
+            return stats
                 
+        except FileNotFoundError:
+            print("警告: ping未安装，跳过此测试")
+            raise TaskFailed("ping未安装", 'skipped')
         except subprocess.TimeoutExpired:
             print(f"Ping超时: {target}")
             logging.warning(f"Ping超时: {target}")
-            return False
+            raise TaskFailed("ping超时", 'timeout')
         except Exception as e:
             print(f"Ping错误: {e}")
             logging.error(f"Ping错误: {target}, 异常: {e}")
-            return False
+            raise TaskFailed(f"ping错误: {e}")
     
-    def hping_stress_test(self, target: str, count: int = 100):
-        """使用hping3进行TCP SYN压力测试"""
-        print(f"正在对 {target} 进行hping3 SYN压力测试...")
+    def ping_soak_test(self, targets: List[str], duration: int = 0, interval: float = 0.2,
+                       checkpoint_every: int = 60) -> Dict[str, Dict]:
+        """长时间ping浸泡测试，多个目标并行，流式统计且内存恒定"""
+        print(f"开始ping浸泡测试: {', '.join(targets)} (时长: {duration or '直到中断'}s)")
+        results = {}
+        
+        def soak(target):
+            try:
+                ipaddress.ip_address(target)
+            except ValueError:
+                print(f"无效的IP地址: {target}")
+                return
+            checkpoint = os.path.join(self.output_dir, f"ping_soak_{target}.json")
+            try:
+                results[target] = run_ping_soak(target, duration, interval,
+                                                checkpoint, checkpoint_every)
+                print(f"浸泡测试结果已保存: {checkpoint}")
+            except FileNotFoundError:
+                print("警告: ping未安装")
+            except Exception as e:
+                print(f"浸泡测试错误: {target}, {e}")
+                logging.error(f"浸泡测试错误: {target}, 异常: {e}")
+        
+        with ThreadPoolExecutor(max_workers=len(targets) or 1) as executor:
+            list(executor.map(soak, targets))
         
-        cmd = ['hping3', '-S', '-c', str(count), '-i', 'u100', target]
+        for target, stats in results.items():
+            rtt = stats['rtt']
+            print(f"  {target}: 发送 {stats['sent']}, 接收 {stats['received']}, "
+                  f"丢包 {stats['loss_percent']}%, p50/p99 {rtt['p50']}/{rtt['p99']} ms, "
+                  f"中断 {stats['outage_count']} 次 (共 {stats['outage_seconds']}s)")
+        return results
+    
+    def hping_stress_test(self, target: str, count: int = 100, timeout: float = None) -> Dict:
+        """使用hping3进行TCP SYN压力测试 (hping3未安装或出错时抛出TaskFailed)"""
+        print(f"正在对 {target} 进行hping3 SYN压力测试...")
         
+        # 默认发包间隔 u100
+        limit = self.timing.timeout_for(target, 'hping3', count * 0.0001)
+        if timeout is not None:
+            limit = min(limit, timeout)
+        began = time.monotonic()
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            print(f"hping3结果输出:\n{result.stdout}")
-            if result.stderr:
-                print(f"hping3错误输出:\n{result.stderr}")
-                
-        except subprocess.TimeoutExpired:
-            print(f"hping3超时: {target}")
+            stats = run_hping(target, count, timeout=limit)
         except FileNotFoundError:
             print("警告: hping3未安装，跳过此测试")
+            raise TaskFailed("hping3未安装", 'skipped')
         except Exception as e:
             print(f"hping3错误: {e}")
+            raise TaskFailed(f"hping3错误: {e}")
+        
+        self.timing.record(target, 'hping3', limit, 0, 'timeout' if stats['timed_out'] else 'done',
+                           time.monotonic() - began, count * 0.0001)
+        flags, rtt = stats['flags'], stats['rtt']
+        if rtt['count']:
+            self.timing.observe(target, rtt['avg'])
+        elif not stats['received']:
+            self.timing.observe_timeout(target)
+        # 控制台只打印一行摘要，flags/RTT分位/重复乱序等详情写入日志和报告
+        sent = stats['sent'] if stats['sent'] is not None else f"≥{stats['sent_at_least']}"
+        loss = stats['loss_percent'] if stats['loss_percent'] is not None else '-'
+        print(f"hping3结果: {sent}包发送, {stats['received']}包接收, {loss}%丢包率"
+              f"{', RTT avg %s ms' % rtt['avg'] if rtt['count'] else ''}"
+              f"{' (超时，保留已收到的结果)' if stats['timed_out'] else ''}")
+        logging.info(f"hping3测试完成: {target}, 接收: {stats['received']}/{sent}, "
+                     f"flags: SA={flags['SA']} RA={flags['RA']} 其他={flags['other']} 超时={flags['timeout']}, "
+                     f"RTT min/avg/max/p99 = {rtt['min']}/{rtt['avg']}/{rtt['max']}/{rtt['p99']} ms, "
+                     f"重复: {stats['duplicates']}, 乱序: {stats['out_of_order']}")
+        
+        self.stress_results.append(stats)
+        return stats
     
-    def nmap_scan_test(self, target: str):
-        """使用nmap进行端口扫描测试"""
+    def nmap_scan_test(self, target: str, timeout: float = None):
+        """使用nmap进行端口扫描测试 (nmap未安装、超时或出错时抛出TaskFailed)"""
         print(f"正在对 {target} 进行nmap扫描...")
         
         cmd = ['nmap', '-sS', '-T4', '--top-ports', '100', target]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            print(f"Nmap扫描结果:\n{result.stdout}")
+            result = self._timed_run(target, 'nmap', cmd, limit=timeout)
+            open_lines = [line.split()[0] for line in result.stdout.split('\n')
+                          if re.match(r'^\d+/\w+\s+open\s', line)]
+            print(f"Nmap扫描结果: {target} {len(open_lines)} 个开放端口"
+                  f"{': ' + ', '.join(open_lines) if open_lines else ''}")
+            logging.info(f"Nmap扫描结果: {target}\n{result.stdout}")
             
         except subprocess.TimeoutExpired:
             print(f"Nmap扫描超时: {target}")
+            raise TaskFailed("nmap超时", 'timeout')
         except FileNotFoundError:
             print("警告: nmap未安装，跳过此测试")
+            raise TaskFailed("nmap未安装", 'skipped')
         except Exception as e:
             print(f"Nmap扫描错误: {e}")
+            raise TaskFailed(f"nmap错误: {e}")
     
     def netdiscover_scan(self, network_range: str = None):
-        """使用netdiscover发现活跃主机"""
-        print("正在使用netdiscover扫描网络...")
-        
+        """发现活跃主机: 先读取内核邻居表，再用netdiscover对剩余地址做主动ARP"""
         if not network_range:
             network_range = "10.18.16.0/20"  # 使用当前网段
-            
-        cmd = ['netdiscover', '-r', network_range, '-P']
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            hosts = []
-            
-            for line in result.stdout.split('\n'):
-                # 解析netdiscover输出
-                if re.match(r'^\s*\d+\.\d+\.\d+\.\d+', line):
+            network_size = ipaddress.IPv4Network(network_range, strict=False).num_addresses
+        except ValueError as e:
+            print(f"无效的网络范围: {e}")
+            return []
+        
+        hosts = HostTable()
+        stats = {'network': network_range, 'passive_hosts': 0, 'passive_seconds': 0.0,
+                 'active_hosts': 0, 'active_seconds': 0.0, 'active_addresses': network_size}
+        
+        if self.passive_discovery:
+            started = time.perf_counter()
+            oui = OuiIndex.open_default()
+            try:
+                neighbors, source = passive_discover(network_range, oui)
+            finally:
+                if oui:
+                    oui.close()
+            for ip, mac, vendor in neighbors:
+                hosts.add(ip, mac, vendor)
+            stats['passive_hosts'] = len(hosts)
+            stats['passive_seconds'] = round(time.perf_counter() - started, 4)
+            stats['neighbor_source'] = source
+            print(f"被动发现: 邻居表({source})中已有 {len(hosts)} 个主机"
+                  f"{'' if oui else ' (未找到OUI数据库，厂商未知)'}")
+        
+        # 只对邻居表中没有的地址做主动ARP
+        remainder = remainder_networks(network_range, hosts.ips()) if len(hosts) else [network_range]
+        stats['active_addresses'] = sum(
+            ipaddress.IPv4Network(net).num_addresses for net in remainder)
+        if remainder:
+            self._active_arp_scan(network_range, remainder, hosts, stats)
+        
+        if stats['passive_hosts'] and stats['active_seconds']:
+            # 按主动扫描的单地址耗时估算被动路径省下的时间
+            per_address = stats['active_seconds'] / max(stats['active_addresses'], 1)
+            stats['seconds_saved'] = round(
+                per_address * stats['passive_hosts'] - stats['passive_seconds'], 3)
+        self.discovery_stats = stats
+        logging.info(f"主机发现统计: {stats}")
+        
+        self.discovered_hosts = hosts
+        print(f"发现 {len(hosts)} 个活跃主机 (被动 {stats['passive_hosts']}, "
+              f"主动ARP {stats['active_hosts']})")
+        if 'seconds_saved' in stats:
+            print(f"被动发现减少 {stats['passive_hosts']} 个主动探测地址，"
+                  f"估计节省 {stats['seconds_saved']}s")
+        
+        return hosts
+    
+    def _active_arp_scan(self, network_range: str, remainder: List[str],
+                         hosts: HostTable, stats: Dict):
+        """使用netdiscover扫描剩余网段，结果并入hosts"""
+        print("正在使用netdiscover扫描网络...")
+        
+        range_file = None
+        if remainder == [network_range]:
+            cmd = ['netdiscover', '-r', network_range, '-P']
+        else:
+            # 扣除已知主机后的网段较多，通过 -l 文件传入
+            range_file = tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='netdiscover_ranges_',
+                                                     delete=False)
+            with range_file:
+                range_file.write("\n".join(remainder) + "\n")
+            cmd = ['netdiscover', '-l', range_file.name, '-P']
+        
+        # netdiscover按顺序逐个地址发送ARP请求，已应答地址在待扫描地址中的位置即为进度下限
+        offsets = []
+        position = 0
+        for net in remainder:
+            network = ipaddress.IPv4Network(net)
+            offsets.append((network, position))
+            position += network.num_addresses
+        
+        started = time.perf_counter()
+        before = len(hosts)
+        try:
+            with self.progress.stage('netdiscover', stats['active_addresses']) as stage:
+                def on_line(line):
+                    # 解析netdiscover输出
+                    if not re.match(r'^\s*\d+\.\d+\.\d+\.\d+', line):
+                        return
                     parts = line.split()
-                    if len(parts) >= 2:
-                        ip = parts[0]
-                        mac = parts[1] if len(parts) > 1 else "Unknown"
-                        vendor = " ".join(parts[2:]) if len(parts) > 2 else "Unknown"
-                        hosts.append({'ip': ip, 'mac': mac, 'vendor': vendor})
-            
-            self.discovered_hosts = hosts
-            print(f"发现 {len(hosts)} 个活跃主机")
-            for host in hosts:
-                print(f"  {host['ip']} - {host['mac']} [{host['vendor']}]")
+                    if len(parts) < 2:
+                        return
+                    ip = parts[0]
+                    mac = parts[1]
+                    vendor = " ".join(parts[2:]) if len(parts) > 2 else "Unknown"
+                    try:
+                        hosts.add(ip, mac, vendor)
+                    except ValueError:
+                        logging.debug(f"忽略无法解析的netdiscover结果: {line.strip()}")
+                        return
+                    address = ipaddress.IPv4Address(ip)
+                    for network, offset in offsets:
+                        if address in network:
+                            stage.set_done(max(stage.done, offset + int(address) - int(network.network_address) + 1))
+                            break
+                    stage.finding(ip, f"{ip} - {mac} [{vendor}]")
                 
-            return hosts
+                # 网段级工具: 按待扫描地址数和已知主机RTO的中位数估算
+                self._timed_run(None, 'netdiscover', cmd, stats['active_addresses'] * 0.02,
+                                on_line=on_line)
+                stage.set_done(stats['active_addresses'])
             
         except subprocess.TimeoutExpired:
             print("Netdiscover扫描超时")
@@ -253,32 +544,67 @@ class KaliNetworkTester:
             print("警告: netdiscover未安装")
         except Exception as e:
             print(f"Netdiscover扫描错误: {e}")
+        finally:
+            if range_file:
+                os.unlink(range_file.name)
         
-        return []
+        stats['active_hosts'] = len(hosts) - before
+        stats['active_seconds'] = round(time.perf_counter() - started, 3)
     
-    def masscan_port_scan(self, targets: List[str], ports: str = "1-1000"):
-        """使用masscan进行快速端口扫描"""
+    def masscan_port_scan(self, targets, ports: str = "1-1000"):
+        """使用masscan进行快速端口扫描 (targets为IP列表或TargetSpec)"""
         print(f"正在使用masscan扫描端口 {ports}...")
         
-        target_list = ",".join(targets)
-        cmd = ['masscan', target_list, '-p', ports, '--rate', '1000']
+        spec = targets if isinstance(targets, TargetSpec) else TargetSpec.from_list(targets)
+        if spec.names:
+            logging.warning(f"masscan不支持主机名，已跳过: {', '.join(spec.names[:5])}")
+        # 以合并后的区间写入目标文件，避免把每个IP拼进命令行
+        target_file = tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='masscan_targets_',
+                                                  delete=False)
+        with target_file:
+            target_file.write("\n".join(spec.range_strings()) + "\n")
+        rate = self.masscan_rate
+        # 发包结束后等待应答的时间取已知主机RTO中位数的3倍 (masscan默认固定10s)
+        wait = max(int(3 * self.timing.median_rto() + 0.999), 1)
+        cmd = ['masscan', '-iL', target_file.name, '-p', ports, '--rate', str(rate),
+               '--wait', str(wait)]
+        if spec.shard_count > 1:
+            cmd += ['--shards', f"{spec.shard_index + 1}/{spec.shard_count}"]
+        if spec.randomize:
+            cmd += ['--seed', str(spec.seed)]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-            
-            for line in result.stdout.split('\n'):
-                if 'open' in line:
+            # len(spec) 已是本分片的地址数
+            probes = len(spec) * self._port_count(ports)
+            found_ips = set()
+            with self.progress.stage('masscan', len(spec)) as stage:
+                def on_line(line):
+                    if 'open' not in line:
+                        return
                     # 解析: Discovered open port 80/tcp on 192.168.1.1
                     match = re.search(r'port\s+(\d+)/(\w+)\s+on\s+(\S+)', line)
                     if match:
                         port, protocol, ip = match.groups()
-                        if ip not in self.open_ports:
-                            self.open_ports[ip] = []
-                        self.open_ports[ip].append(f"{port}/{protocol}")
+                        try:
+                            self.open_ports.add(ip, int(port), protocol)
+                        except ValueError:
+                            logging.debug(f"忽略无法解析的masscan结果: {line.strip()}")
+                            return
+                        found_ips.add(ip)
+                        stage.finding(f"{ip} {port}/{protocol}")
+                
+                def on_status(line):
+                    # 状态行: rate:  0.10-kpps, 12.34% done,   0:00:08 remaining, found=3
+                    match = re.search(r'([\d.]+)% done', line)
+                    if match:
+                        stage.set_done(int(len(spec) * min(float(match.group(1)), 100.0) / 100))
+                
+                self._timed_run(None, 'masscan', cmd, probes / rate * 1.2 + wait,
+                                on_line=on_line, on_status=on_status)
+                stage.set_done(len(spec))
             
-            print(f"发现开放端口:")
-            for ip, ports in self.open_ports.items():
-                print(f"  {ip}: {', '.join(ports)}")
+            # 逐主机的端口列表已在端口存储和报告中
+            print(f"发现开放端口: {len(found_ips)} 个主机, {sum(len(self.open_ports[ip]) for ip in found_ips)} 个端口")
                 
         except subprocess.TimeoutExpired:
             print("Masscan扫描超时")
@@ -286,6 +612,8 @@ class KaliNetworkTester:
             print("警告: masscan未安装")
         except Exception as e:
             print(f"Masscan扫描错误: {e}")
+        finally:
+            os.unlink(target_file.name)
     
     def nikto_web_scan(self, web_targets: List[str]):
         """使用nikto扫描Web服务"""
@@ -296,7 +624,7 @@ class KaliNetworkTester:
             cmd = ['nikto', '-h', target, '-Format', 'txt']
             
             try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=120)
+                result = self._timed_run(self._url_host(target), 'nikto', cmd)
                 
                 # 解析nikto输出查找漏洞
                 vulnerabilities = []
@@ -321,33 +649,53 @@ class KaliNetworkTester:
         """使用whatweb进行Web指纹识别"""
         print("正在使用whatweb进行Web指纹识别...")
         
-        for target in web_targets:
-            cmd = ['whatweb', target, '--format', 'json']
-            
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        with self.progress.stage('whatweb', len(web_targets)) as stage:
+            for target in web_targets:
+                cmd = ['whatweb', target, '--format', 'json']
                 
-                if result.stdout.strip():
-                    try:
-                        data = json.loads(result.stdout)
-                        if isinstance(data, list) and len(data) > 0:
-                            plugins = data[0].get('plugins', {})
-                            print(f"  {target}: {len(plugins)} 个Web技术")
+                try:
+                    result = self._timed_run(self._url_host(target), 'whatweb', cmd)
+                    
+                    if result.stdout.strip():
+                        try:
+                            data = json.loads(result.stdout)
+                            if isinstance(data, list) and len(data) > 0:
+                                plugins = data[0].get('plugins', {})
+                                # 重要技术栈进入状态区，完整插件列表写入日志
+                                important_tech = ['Apache', 'Nginx', 'PHP', 'MySQL', 'WordPress', 'Drupal', 'Joomla']
+                                found_tech = [tech for tech in important_tech if tech in plugins]
+                                stage.finding(f"{target} {'/'.join(found_tech) or len(plugins)}",
+                                              f"{target}: {len(plugins)} 个Web技术: {', '.join(plugins)}")
+                        except json.JSONDecodeError:
+                            pass
                             
-                            # 显示重要技术栈
-                            important_tech = ['Apache', 'Nginx', 'PHP', 'MySQL', 'WordPress', 'Drupal', 'Joomla']
-                            found_tech = [tech for tech in important_tech if tech in plugins]
-                            if found_tech:
-                                print(f"    技术栈: {', '.join(found_tech)}")
-                    except json.JSONDecodeError:
-                        pass
-                        
-            except subprocess.TimeoutExpired:
-                print(f"WhatWeb扫描超时: {target}")
-            except FileNotFoundError:
-                print("警告: whatweb未安装")
-            except Exception as e:
-                print(f"WhatWeb扫描错误: {e}")
+                except subprocess.TimeoutExpired:
+                    print(f"WhatWeb扫描超时: {target}")
+                except FileNotFoundError:
+                    print("警告: whatweb未安装")
+                    break
+                except Exception as e:
+                    print(f"WhatWeb扫描错误: {e}")
+                stage.advance()
+    
+    @staticmethod
+    def _port_count(ports: str) -> int:
+        """masscan端口参数中的端口数: "1-1000,U:53" -> 1001"""
+        total = 0
+        for part in ports.split(','):
+            part = part.split(':')[-1]
+            low, _, high = part.partition('-')
+            try:
+                total += int(high or low) - int(low) + 1
+            except ValueError:
+                total += 1
+        return max(total, 1)
+    
+    @staticmethod
+    def _url_host(url: str) -> Optional[str]:
+        """http://1.2.3.4:8080 -> 1.2.3.4 (用于查找RTT模型中的主机)"""
+        match = re.match(r'^\w+://([^/:]+)', url)
+        return match.group(1) if match else None
     
     def dns_enumeration(self, domain: str):
         """DNS枚举和信息收集"""
@@ -357,7 +705,7 @@ class KaliNetworkTester:
         cmd = ['dnsrecon', '-d', domain, '-t', 'std']
         
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+            result = self.governor.run(cmd, capture_output=True, text=True, timeout=60)
             
             # 提取DNS记录
             dns_records = []
@@ -377,43 +725,115 @@ class KaliNetworkTester:
         except Exception as e:
             print(f"DNS枚举错误: {e}")
     
-    def comprehensive_network_scan(self, network_range: str = None):
-        """综合网络扫描"""
+    def comprehensive_network_scan(self, network_range: str = None, resume: bool = False,
+                                   checkpoint_every: int = 60):
+        """综合网络扫描 (每 checkpoint_every 秒最多写入一次检查点，中断后可 --resume 继续)"""
         print("\n" + "="*60)
         print("开始综合网络安全扫描")
         print("="*60)
         
+        checkpoint = ScanCheckpoint(os.path.join(self.output_dir, CHECKPOINT_FILE), network_range,
+                                    min_interval=checkpoint_every)
+        if resume:
+            if checkpoint.load(self):
+                print(f"从检查点恢复: {checkpoint.describe()}")
+                logging.info(f"从检查点恢复综合扫描: {checkpoint.describe()}")
+            else:
+                print("未找到匹配的检查点，重新开始扫描")
+        
+        try:
+            self._comprehensive_stages(network_range, checkpoint)
+        except BaseException:
+            # Ctrl-C、异常等情况下保存当前进度
+            checkpoint.save(self, force=True)
+            print(f"\n进度已保存到 {checkpoint.path}，可使用 --resume 继续")
+            raise
+        checkpoint.remove()
+    
+    def _comprehensive_stages(self, network_range: str, checkpoint: ScanCheckpoint):
         # 1. 主机发现
-        hosts = self.netdiscover_scan(network_range)
+        if checkpoint.stage_done('discovery'):
+            hosts = self.discovered_hosts
+            print(f"跳过主机发现 (检查点中已有 {len(hosts)} 个主机)")
+        else:
+            hosts = self.netdiscover_scan(network_range)
+            checkpoint.complete_stage('discovery', self)
         if not hosts:
             print("未发现活跃主机，使用默认目标")
             hosts = [{'ip': self.gateway}] if self.gateway else []
         
-        # 2. 端口扫描
+        # 2. 端口扫描 (主机多时按大分片执行，每个分片完成后记录)
         if hosts:
             target_ips = [host['ip'] for host in hosts]
-            self.masscan_port_scan(target_ips)
+            shards = shard_targets(target_ips, shard_size(self._port_count(self.scan_ports),
+                                                          self.masscan_rate))
+            checkpoint.start_shards(len(shards))
+            for index, shard in enumerate(shards):
+                if checkpoint.shard_done(index):
+                    continue
+                if len(shards) > 1:
+                    print(f"端口扫描分片 {index + 1}/{len(shards)}")
+                self.masscan_port_scan(shard, self.scan_ports)
+                checkpoint.complete_shard(index, len(shards), self)
+        
+        # 2b. 只对发现的开放端口做nmap服务识别
+        if self.service_detection and not checkpoint.stage_done('services'):
+            self.service_scan(self.service_batches)
+            checkpoint.complete_stage('services', self)
         
         # 3. Web服务检测和扫描
-        web_targets = []
-        for ip, ports in self.open_ports.items():
-            for port in ports:
-                if '80/' in port or '443/' in port or '8080/' in port:
-                    protocol = 'https' if '443/' in port else 'http'
-                    port_num = port.split('/')[0]
-                    if port_num in ['80', '443']:
-                        web_targets.append(f"{protocol}://{ip}")
-                    else:
-                        web_targets.append(f"{protocol}://{ip}:{port_num}")
+        web_targets = self.find_web_targets()
+        self.web_services = web_targets
         
         if web_targets:
             print(f"\n发现 {len(web_targets)} 个Web服务")
-            self.whatweb_fingerprint(web_targets[:3])  # 限制扫描数量
+            for target in web_targets[:WEB_SCAN_LIMIT]:  # 限制扫描数量
+                if checkpoint.stage_done('web') or target in checkpoint.web_done:
+                    continue
+                self.whatweb_fingerprint([target])
+                checkpoint.complete_web(target, self)
             # self.nikto_web_scan(web_targets[:2])  # 注释掉以减少扫描时间
+        checkpoint.complete_stage('web', self)
         
         # 4. 生成报告
         self.generate_scan_report()
     
+    def service_scan(self, max_batches: int = DEFAULT_BATCHES) -> Dict:
+        """两阶段扫描第二阶段: 按端口集合分批运行nmap -sV，结果按主机合并"""
+        if not len(self.open_ports):
+            print("没有masscan发现的开放端口，跳过服务识别")
+            return {}
+        print(f"正在对 {len(self.open_ports)} 个主机的开放端口进行nmap服务识别...")
+        result = run_service_scan(self.open_ports, max_batches, on_times=self.timing.seed)
+        for error in result['errors']:
+            print(f"nmap服务识别错误: {error}")
+        if result['timed_out_batches']:
+            print(f"警告: {result['timed_out_batches']} 个批次超时，保留已解析的主机")
+        
+        # 逐端口的服务详情写入日志和报告，控制台只打印汇总
+        for ip, found in result['services'].items():
+            self.services.setdefault(ip, {}).update(found)
+            for key, info in sorted(found.items()):
+                detail = " ".join(info.get(k, '') for k in ('product', 'version')).strip()
+                logging.info(f"服务识别: {ip} {key}: {info.get('name', '?')} {detail}".rstrip())
+        services = sum(len(found) for found in result['services'].values())
+        print(f"服务识别完成: {result['batches']} 次nmap调用, {result['hosts']} 个主机, {services} 个服务")
+        return result
+    
+    # Web端口 -> (协议, 是否为默认端口)
+    WEB_PORTS = {80: ('http', True), 443: ('https', True), 8080: ('http', False)}
+
+    def find_web_targets(self) -> List[str]:
+        """根据开放端口索引查找Web服务"""
+        web_targets = []
+        for port, (protocol, default_port) in self.WEB_PORTS.items():
+            for ip in self.open_ports.hosts_with_port(port):
+                if default_port:
+                    web_targets.append(f"{protocol}://{ip}")
+                else:
+                    web_targets.append(f"{protocol}://{ip}:{port}")
+        return web_targets
+    
     def generate_scan_report(self):
         """生成扫描报告"""
         print("\n" + "="*60)
@@ -421,17 +841,88 @@ class KaliNetworkTester:
         print("="*60)
         
         print(f"\n📊 主机发现: {len(self.discovered_hosts)} 个")
-        for host in self.discovered_hosts:
+        if self.discovery_stats:
+            stats = self.discovery_stats
+            print(f"  (邻居表 {stats['passive_hosts']} 个 / {stats['passive_seconds']}s, "
+                  f"主动ARP {stats['active_hosts']} 个 / {stats['active_seconds']}s"
+                  f"{', 估计节省 %ss' % stats['seconds_saved'] if 'seconds_saved' in stats else ''})")
+        for host in islice(self.discovered_hosts, REPORT_LIST_LIMIT):
             print(f"  • {host['ip']} - {host['vendor']}")
+        if len(self.discovered_hosts) > REPORT_LIST_LIMIT:
+            print(f"  ... 另有 {len(self.discovered_hosts) - REPORT_LIST_LIMIT} 个主机，见JSON报告")
         
         print(f"\n🔍 端口扫描: {len(self.open_ports)} 个主机有开放端口")
-        for ip, ports in self.open_ports.items():
+        if self.ingest_stats:
+            stats = self.ingest_stats
+            print(f"  (导入 {stats['files']} 个文件 {stats['bytes'] / (1 << 20):.1f} MB, "
+                  f"{stats['records']} 条记录, 跳过 {stats['skipped']} 条, 用时 {stats['elapsed']}s)")
+        for ip, ports in islice(self.open_ports.items(), REPORT_LIST_LIMIT):
             print(f"  • {ip}: {', '.join(ports)}")
+        if len(self.open_ports) > REPORT_LIST_LIMIT:
+            print(f"  ... 另有 {len(self.open_ports) - REPORT_LIST_LIMIT} 个主机，见JSON报告")
         
         print(f"\n🌐 Web服务: {len(self.web_services)} 个")
         for service in self.web_services:
             print(f"  • {service}")
         
+        if self.services:
+            print(f"\n🧩 服务识别: {len(self.services)} 个主机")
+            for ip, found in self.services.items():
+                names = [f"{key} {info.get('name', '?')}" for key, info in sorted(found.items())]
+                print(f"  • {ip}: {', '.join(names)}")
+        
+        if self.stress_results:
+            print(f"\n⚡ 压力测试: {len(self.stress_results)} 项")
+            for result in self.stress_results:
+                print(f"  • {result['target']} [{result['test_type']}]: "
+                      f"{result['received'] if result['received'] is not None else '-'}/"
+                      f"{result['sent'] if result['sent'] is not None else '-'} 接收, "
+                      f"{result['loss_percent'] if result['loss_percent'] is not None else '-'}% 丢包")
+        
+        if self.sweep_stats:
+            sweep = self.sweep_stats
+            print(f"\n📡 ICMP存活扫描: {sweep['alive']}/{sweep['hosts']} 个主机存活, "
+                  f"用时 {sweep['elapsed']}s ({sweep['hosts_per_second']} 主机/s, {sweep['backend']}套接字)")
+            if sweep.get('rtt'):
+                rtt = sweep['rtt']
+                print(f"  RTT中位数/最大 (ms): 用户态 {rtt['userland_p50']}/{rtt['userland_max']}, "
+                      f"内核时间戳 ({sweep['timestamping']}) {rtt['kernel_p50']}/{rtt['kernel_max']}")
+        
+        if self.link_results:
+            print(f"\n🔀 多链路对比: {len(self.link_results)} 条链路")
+            for link in self.link_results:
+                summary = link['summary']
+                print(f"  • #{link['rank']} {link['interface']} -> {link['gateway']}: "
+                      f"丢包 {summary['loss_percent'] if summary['loss_percent'] is not None else '-'}%, "
+                      f"延迟 {summary['rtt_avg'] if summary['rtt_avg'] is not None else '-'} ms")
+        
+        if self.schedule_records:
+            counts = {}
+            for record in self.schedule_records:
+                counts[record['status']] = counts.get(record['status'], 0) + 1
+            print(f"\n⏱️  调度: {len(self.schedule_records)} 项测试, 完成 {counts.get('done', 0)}, "
+                  f"截短 {counts.get('truncated', 0)}, 超时 {counts.get('timeout', 0)}, "
+                  f"跳过 {counts.get('skipped', 0)}, 失败 {counts.get('failed', 0)}, "
+                  f"出错 {counts.get('error', 0)}")
+        
+        timing = self.timing.to_dict()
+        if timing['runs']:
+            timeouts = [run for run in timing['runs'] if run['outcome'] == 'timeout']
+            dead = sum(1 for host in timing['hosts'].values() if host['dead'])
+            print(f"\n📶 自适应超时: {len(timing['hosts'])} 个主机有RTT模型, "
+                  f"{len(timing['runs'])} 次工具运行, 超时 {len(timeouts)} 次, 判定无响应 {dead} 个")
+            for ip, host in sorted(timing['hosts'].items()):
+                if host['samples']:
+                    print(f"  • {ip}: SRTT {host['srtt_ms']} ms, RTTVAR {host['rttvar_ms']} ms, "
+                          f"RTO {host['rto_ms']} ms ({host['samples']} 个样本)")
+        
+        resources = self.governor.stats()
+        if resources['tools']:
+            waits = sum(tool['waits'] for tool in resources['tools'].values())
+            print(f"\n🧮 子进程: 峰值 {resources['peak_children']} 个, "
+                  f"峰值RSS {resources['peak_children_rss_mb']} MB, 因资源上限等待 {waits} 次, "
+                  f"启动方式 {resources['spawn_backend']} (平均 {resources['spawn_ms_avg']} ms)")
+        
         if self.vulnerabilities:
             print(f"\n⚠️  潜在问题: {len(self.vulnerabilities)} 个")
             for vuln in self.vulnerabilities:
@@ -447,15 +938,25 @@ class KaliNetworkTester:
         report_data = {
             'timestamp': timestamp,
             'scan_date': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)),
-            'hosts': self.discovered_hosts,
-            'open_ports': self.open_ports,
+            'hosts': self.discovered_hosts.to_list(),
+            'open_ports': self.open_ports.to_dict(),
             'web_services': self.web_services,
+            'services': self.services,
             'vulnerabilities': self.vulnerabilities,
+            'stress_results': self.stress_results,
+            'links': self.link_results,
+            'sweep': self.sweep_stats,
+            'ingest': self.ingest_stats,
+            'discovery': self.discovery_stats,
+            'schedule': self.schedule_records,
+            'resources': self.governor.stats(),
+            'timing': self.timing.to_dict(),
             'summary': {
                 'total_hosts': len(self.discovered_hosts),
                 'hosts_with_open_ports': len(self.open_ports),
                 'web_services_found': len(self.web_services),
-                'vulnerabilities_found': len(self.vulnerabilities)
+                'vulnerabilities_found': len(self.vulnerabilities),
+                'stress_tests_run': len(self.stress_results)
             }
         }
         
@@ -475,6 +976,24 @@ class KaliNetworkTester:
             print(f"报告保存失败: {e}")
             logging.error(f"报告保存失败: {e}")
     
+    def compare_reports(self, old_report: str, new_report: str, output_prefix: str = None) -> Optional[Dict]:
+        """比对两次扫描报告 (新增主机、关闭端口、新增问题等)"""
+        print(f"正在比对扫描报告: {old_report} -> {new_report}")
+        try:
+            result = diff_reports(old_report, new_report, output_prefix)
+        except (OSError, ValueError) as e:
+            print(f"报告比对失败: {e}")
+            logging.error(f"报告比对失败: {e}")
+            return None
+        
+        summary = result['summary']
+        print(f"  主机: +{summary['hosts_added']} / -{summary['hosts_removed']} / 变化 {summary['hosts_changed']}")
+        print(f"  端口: +{summary['ports_opened']} / -{summary['ports_closed']}")
+        print(f"  问题: +{summary['findings_new']} / -{summary['findings_resolved']}")
+        print(f"📄 差异报告已保存: {result['json']}, {result['html']}")
+        logging.info(f"报告比对完成: {result['json']}")
+        return result
+    
     def _generate_html_report(self, report_data, filename):
         """生成HTML格式报告"""
         html_content = f"""
@@ -541,6 +1060,123 @@ class KaliNetworkTester:
         for service in report_data['web_services']:
             html_content += f"<div class='host'>{service}</div>"
         
+        if report_data['services']:
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>🧩 服务识别</h2>
+        <table>
+            <tr><th>主机</th><th>端口</th><th>状态</th><th>服务</th><th>产品/版本</th></tr>
+"""
+            for ip, found in report_data['services'].items():
+                for key, info in sorted(found.items()):
+                    html_content += (f"<tr><td>{ip}</td><td>{key}</td><td>{info.get('state', '')}</td>"
+                                     f"<td>{info.get('name', '')}</td>"
+                                     f"<td>{info.get('product', '')} {info.get('version', '')}</td></tr>")
+            html_content += """
+        </table>"""
+        
+        if report_data['stress_results']:
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>⚡ 压力测试结果</h2>
+        <table>
+            <tr><th>目标</th><th>类型</th><th>发送</th><th>接收</th><th>丢包率</th><th>SA/RA/超时</th><th>RTT avg/p99 (ms)</th></tr>
+"""
+            for result in report_data['stress_results']:
+                flags = result.get('flags', {})
+                rtt = result.get('rtt', {})
+                html_content += (f"<tr><td>{result['target']}</td><td>{result['test_type']}</td>"
+                                 f"<td>{result['sent'] if result['sent'] is not None else '-'}</td>"
+                                 f"<td>{result.get('received') if result.get('received') is not None else '-'}</td>"
+                                 f"<td>{result.get('loss_percent') if result.get('loss_percent') is not None else '-'}%</td>"
+                                 f"<td>{flags.get('SA', '-')}/{flags.get('RA', '-')}/{flags.get('timeout', '-')}</td>"
+                                 f"<td>{rtt.get('avg')}/{rtt.get('p99')}</td></tr>")
+                for phase in result.get('phases', []):
+                    html_content += (f"<tr><td></td><td>阶段 {phase['phase']}</td>"
+                                     f"<td>{phase['sent']}</td><td>{phase['received']}</td>"
+                                     f"<td>{phase['loss_percent']}%</td><td>-</td><td>-</td></tr>")
+            html_content += """
+        </table>"""
+        
+        unfinished = [r for r in report_data.get('schedule', []) if r['status'] != 'done']
+        if unfinished:
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>⏱️ 未完成的测试</h2>
+        <table>
+            <tr><th>目标</th><th>工具</th><th>优先级</th><th>状态</th><th>分配/实际 (s)</th></tr>
+"""
+            for record in unfinished:
+                html_content += (f"<tr><td>{record['target']}</td><td>{record['tool']}</td>"
+                                 f"<td>{record['priority']}</td><td>{record['status']}</td>"
+                                 f"<td>{record['allotted']}/{record['elapsed']}</td></tr>")
+            html_content += """
+        </table>"""
+        
+        if report_data.get('links'):
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>🔀 多链路对比</h2>
+        <table>
+            <tr><th>排名</th><th>接口</th><th>源地址</th><th>网关</th><th>丢包率</th><th>平均延迟 (ms)</th><th>pps</th></tr>
+"""
+            for link in report_data['links']:
+                summary = link['summary']
+                html_content += (f"<tr><td>{link['rank']}</td><td>{link['interface']}</td>"
+                                 f"<td>{link['source'] or '-'}</td><td>{link['gateway']}</td>"
+                                 f"<td>{summary['loss_percent'] if summary['loss_percent'] is not None else '-'}%</td>"
+                                 f"<td>{summary['rtt_avg'] if summary['rtt_avg'] is not None else '-'}</td>"
+                                 f"<td>{summary['pps'] or '-'}</td></tr>")
+            html_content += """
+        </table>"""
+        
+        sweep = report_data.get('sweep') or {}
+        if sweep.get('timestamping') and sweep.get('results'):
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>📡 ICMP延迟: 用户态 vs 内核时间戳</h2>
+        <table>
+            <tr><th>目标</th><th>发送</th><th>接收</th><th>用户态 min/avg/max (ms)</th><th>内核 min/avg/max (ms)</th></tr>
+"""
+            for result in sweep['results']:
+                html_content += (f"<tr><td>{result['target']}</td><td>{result['sent']}</td>"
+                                 f"<td>{result['received']}</td>"
+                                 f"<td>{result.get('rtt_min', '-')}/{result.get('rtt_avg', '-')}/{result.get('rtt_max', '-')}</td>"
+                                 f"<td>{result.get('kernel_rtt_min', '-')}/{result.get('kernel_rtt_avg', '-')}/"
+                                 f"{result.get('kernel_rtt_max', '-')}</td></tr>")
+            html_content += """
+        </table>"""
+        
+        timing_runs = report_data.get('timing', {}).get('runs', [])
+        if timing_runs:
+            hosts = report_data['timing']['hosts']
+            html_content += """
+    </div>
+    
+    <div class="section">
+        <h2>📶 自适应超时</h2>
+        <table>
+            <tr><th>目标</th><th>工具</th><th>尝试</th><th>超时 (s)</th><th>实际 (s)</th><th>结果</th><th>RTO (ms)</th></tr>
+"""
+            for run in timing_runs:
+                host = hosts.get(run['target']) or {}
+                html_content += (f"<tr><td>{run['target'] or '-'}</td><td>{run['tool']}</td>"
+                                 f"<td>{run['attempt'] + 1}</td><td>{run['timeout']}</td>"
+                                 f"<td>{run['elapsed']}</td><td>{run['outcome']}</td>"
+                                 f"<td>{host.get('rto_ms', '-')}</td></tr>")
+            html_content += """
+        </table>"""
+        
         if report_data['vulnerabilities']:
             html_content += """
     </div>
@@ -560,31 +1196,412 @@ class KaliNetworkTester:
         with open(filename, 'w', encoding='utf-8') as f:
             f.write(html_content)
     
-    def run_stress_tests(self, targets: List[str], test_types: List[str]):
-        """运行压力测试"""
-        for target in targets:
-            print(f"\n{'='*50}")
-            print(f"测试目标: {target}")
-            print(f"{'='*50}")
-            
-            if 'ping' in test_types:
-                self.ping_stress_test(target)
-                time.sleep(1)
-            
-            if 'hping' in test_types:
-                self.hping_stress_test(target)
-                time.sleep(1)
-            
-            if 'nmap' in test_types:
-                self.nmap_scan_test(target)
-                time.sleep(1)
+    def run_stress_tests(self, targets: List[str], test_types: List[str],
+                         budget: float = None) -> List[Dict]:
+        """运行压力测试: 网关和疑似路由器优先，可在总时间预算内按截止时间调度"""
+        scheduler = DeadlineScheduler(budget, pause=1)
+        
+        # 工具: (执行函数, 默认超时 (None表示按RTT模型), 预估耗时, 最短有效时长)
+        tools = {
+            'ping': (lambda ip, t: self.ping_stress_test(ip, timeout=t), None, 11, 2),
+            'hping': (lambda ip, t: self.hping_stress_test(ip, timeout=t), None, 3, 1),
+            'nmap': (lambda ip, t: self.nmap_scan_test(ip, timeout=t), None, 30, 10),
+            'udp': (lambda ip, t: self.native_traffic_test(ip, 'udp', timeout=t),
+                    self.traffic_duration + 10, self.traffic_duration + 2, 3),
+            'tcp': (lambda ip, t: self.native_traffic_test(ip, 'tcp', timeout=t),
+                    self.traffic_duration + 10, self.traffic_duration + 2, 3),
+        }
+        # RTT模型中的工具名和预期耗时 (与各测试函数的默认参数一致)
+        modeled = {'ping': ('ping', 100 * 0.1), 'hping': ('hping3', 100 * 0.0001), 'nmap': ('nmap', 0)}
+        
+        def announce(target, run):
+            def task(timeout):
+                logging.info(f"测试目标: {target} (本项时限 {timeout:.0f}s)")
+                try:
+                    run(target, timeout)
+                finally:
+                    stage.advance()
+            return task
+        
+        selected = [tool for tool in ('ping', 'hping', 'nmap', 'udp', 'tcp') if tool in test_types]
+        
+        def task_args(target, tool, priority):
+            run, timeout, estimate, min_time = tools[tool]
+            if timeout is None:
+                timeout = self.timing.timeout_for(target, *modeled[tool])
+            return target, tool, announce(target, run), priority, timeout, estimate, min_time
+        
+        # 网关和疑似路由器数量很少，取自路由表和已发现主机而不是遍历全部目标，放入调度堆；
+        # 其余主机的任务按需生成，大网段 (如/16) 不会预先为每个 目标×工具 创建任务
+        prioritized = set()
+        for target in self.priority_candidates():
+            priority = self.target_priority(target)
+            if priority != PRIORITY_HOST and target not in prioritized and target in targets:
+                prioritized.add(target)
+                for tool in selected:
+                    scheduler.add(*task_args(target, tool, priority))
+        
+        def host_tasks():
+            for target in targets:
+                if target not in prioritized:
+                    for tool in selected:
+                        yield task_args(target, tool, PRIORITY_HOST)
+        
+        host_count = (len(targets) - len(prioritized)) * len(selected)
+        host_estimate = sum(tools[tool][2] for tool in selected) / len(selected) if selected else 0
+        scheduler.add_stream(host_tasks(), host_count, host_estimate)
+        
+        if budget is not None:
+            print(f"时间预算: {budget:.0f}s, 共 {scheduler.total} 项测试 (网关/路由器优先)")
+        with self.progress.stage('压力测试', scheduler.total) as stage:
+            records = scheduler.run()
+        self.schedule_records.extend(records)
+        
+        summary = scheduler.summary()
+        if summary.get('skipped') or summary.get('truncated') or summary.get('failed'):
+            print(f"\n未完成: 跳过 {summary.get('skipped', 0)} 项, 截短 {summary.get('truncated', 0)} 项, "
+                  f"失败 {summary.get('failed', 0)} 项")
+            for record in records:
+                if record['status'] == 'skipped':
+                    detail = f"跳过 ({record['reason']})"
+                elif record['status'] == 'truncated':
+                    detail = f"截短至 {record['allotted']}s"
+                elif record['status'] == 'failed':
+                    detail = f"失败 ({record['error']})"
+                else:
+                    continue
+                print(f"  {record['target']} [{record['tool']}/{record['priority']}]: {detail}")
+        return records
+    
+    def priority_candidates(self) -> List[str]:
+        """可能的网关和路由器: 路由表网关、直连网段的首尾地址、厂商为路由器的已发现主机"""
+        candidates = sorted(self.gateways)
+        for route in self.routes:
+            if 'gateway' in route:
+                candidates.append(route['gateway'])
+            elif route.get('type') == 'network':
+                try:
+                    network = ipaddress.IPv4Network(route['network'], strict=False)
+                except ValueError:
+                    continue
+                if network.num_addresses > 2:
+                    candidates += [str(network.network_address + 1), str(network.broadcast_address - 1)]
+        candidates += [host['ip'] for host in self.discovered_hosts
+                       if is_router(host['ip'], host['vendor'])]
+        return candidates
+    
+    def target_priority(self, target: str) -> int:
+        """网关 > 疑似路由器 (.1/.254或路由器厂商) > 普通主机"""
+        if target in self.gateways:
+            return PRIORITY_GATEWAY
+        host = self.discovered_hosts.by_ip(target)
+        if is_router(target, host['vendor'] if host else ''):
+            return PRIORITY_ROUTER
+        return PRIORITY_HOST
+    
+    def arp_stress_test(self, network_range: str = None, interface: str = None,
+                        stress_types: List[str] = None, count: int = 50,
+                        workers: int = None) -> List[Dict]:
+        """ARP发现局域网设备并并发压力测试 (route-stress-test.nse 的流程，只发现一次)"""
+        stress_types = stress_types or ['ping']
+        interface = interface or self.get_default_interface()
+        network_range = network_range or (interface and interface_network(interface))
+        if not network_range:
+            print("无法确定网络范围，请使用 --network 指定")
+            return []
+        
+        print(f"正在使用arp-scan发现设备: {network_range} (接口: {interface or '自动'})...")
+        try:
+            devices = arp_scan(network_range, interface)
+            for device in devices:
+                self.discovered_hosts.add(device['ip'], device['mac'], device['vendor'])
+        except FileNotFoundError:
+            print("警告: arp-scan未安装，改用邻居表+netdiscover发现")
+            devices = [{'ip': host['ip'], 'mac': host['mac'], 'vendor': host['vendor'],
+                        'is_router': is_router(host['ip'], host['vendor'])}
+                       for host in self.netdiscover_scan(network_range)]
+        except subprocess.TimeoutExpired:
+            print("arp-scan扫描超时")
+            return []
+        
+        if not devices:
+            print("未发现任何设备，请检查网络接口或权限")
+            return []
+        
+        routers = sum(1 for device in devices if device['is_router'])
+        print(f"ARP扫描发现 {len(devices)} 个设备, {routers} 个可能的路由器/网关")
+        for device in devices:
+            tag = " (可能是路由器/网关)" if device['is_router'] else ""
+            logging.info(f"ARP设备: {device['ip']} - {device['mac']} [{device['vendor']}]{tag}")
+        
+        print(f"\n并发压力测试 {len(devices)} 个设备 ({', '.join(stress_types)}, 每项 {count} 包)...")
+        logging.info(f"ARP压力测试开始: {len(devices)} 个设备, 类型: {stress_types}")
+        
+        def device_done(device_results):
+            # 逐项结果写入日志，状态区只显示失败和高丢包的设备
+            for result in device_results:
+                logging.info(f"ARP压力测试: {result['target']} {result['test_type']} "
+                             f"{result['received']}/{result['sent'] if result['sent'] is not None else '-'} 接收, "
+                             f"{result['loss_percent'] if result['loss_percent'] is not None else '-'}%丢包"
+                             f"{', RTT avg %s ms' % result['rtt_avg'] if 'rtt_avg' in result else ''}"
+                             f"{' (' + result['error'] + ')' if result.get('error') else ''}")
+                if not result['success']:
+                    stage.finding(f"{result['target']} {result['test_type']}失败")
+                elif result['loss_percent']:
+                    stage.finding(f"{result['target']} {result['loss_percent']}%丢包")
+            stage.advance()
+        
+        with self.progress.stage('ARP压力测试', len(devices)) as stage:
+            results = run_arp_stress(devices, stress_types, count, workers=workers,
+                                     on_done=device_done, timing=self.timing)
+        self.stress_results.extend(results)
+        for result in results:
+            if result.get('rtt_avg') is not None:
+                self.timing.observe(result['target'], result['rtt_avg'])
+            elif (result.get('rtt') or {}).get('count'):
+                self.timing.observe(result['target'], result['rtt']['avg'])
+        
+        succeeded = sum(1 for result in results if result['success'])
+        print(f"\n测试统计: 发现{len(devices)}个设备, {routers}个可能的路由器, {succeeded}个测试成功")
+        return results
+    
+    def run_batch(self, jobs_path: str, workers: int = 16, output: str = None) -> Dict[str, int]:
+        """批量作业: 单进程共享线程池执行作业文件，每个结果作为一行JSON写入output ('-' 为标准输出)"""
+        output = output or f"jobs_results_{int(time.time())}.jsonl"
+        to_stdout = output == '-'
+        if not to_stdout:
+            print(f"执行批量作业: {jobs_path} (并发 {workers})，结果写入 {output}")
+        logging.info(f"批量作业开始: {jobs_path}, 并发: {workers}")
+        
+        counts: Dict[str, int] = {}
+        started = time.monotonic()
+        out = sys.stdout if to_stdout else open(output, 'w', encoding='utf-8')
+        # 结果写到标准输出时进度显示改到标准错误，不混入JSON行
+        progress = ProgressRenderer(sys.stderr) if to_stdout else self.progress
+        try:
+            with progress.stage('批量作业') as stage:
+                for result in run_jobs(load_jobs(jobs_path), workers, self.timing):
+                    out.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+                    out.flush()
+                    counts[result.status] = counts.get(result.status, 0) + 1
+                    stage.advance()
+                    if not result.ok:
+                        stage.finding(f"{result.job_id} {result.status}",
+                                      f"作业 {result.job_id} ({result.target} {result.test}): "
+                                      f"{result.status} {result.error or ''}")
+        finally:
+            if not to_stdout:
+                out.close()
+        
+        elapsed = time.monotonic() - started
+        summary = ", ".join(f"{status} {count}" for status, count in sorted(counts.items()))
+        print(f"批量作业完成: {sum(counts.values())} 个, 用时 {elapsed:.1f}s ({summary})",
+              file=sys.stderr if to_stdout else sys.stdout)
+        logging.info(f"批量作业完成: {counts}, 用时 {elapsed:.1f}s")
+        return counts
+    
+    def ingest_results(self, paths: List[str], workers: int = None) -> Dict:
+        """离线导入masscan (-oL/-oJ/-oB) 和nmap (-oX) 结果文件到端口存储、主机表和服务信息"""
+        chunks = sum(len(plan_chunks(os.path.getsize(path), CHUNK_SIZE)) for path in paths)
+        print(f"正在导入 {len(paths)} 个结果文件 ({chunks} 块, {workers or os.cpu_count()} 进程)...")
+        
+        def chunk_done(path, chunk):
+            stage.advance()
+            if chunk.skipped:
+                stage.finding(f"{os.path.basename(path)} 跳过 {chunk.skipped} 条",
+                              f"{path}: 块内 {chunk.skipped} 条记录无法解析")
+        
+        with self.progress.stage('导入', chunks) as stage:
+            self.ingest_stats = ingest_files(paths, self.open_ports, self.discovered_hosts,
+                                             self.services, workers, on_chunk=chunk_done)
+        stats = self.ingest_stats
+        print(f"导入完成: {stats['records']} 条记录, 新增 {stats['new_ports']} 个开放端口, "
+              f"{stats['new_hosts']} 个主机, 用时 {stats['elapsed']}s")
+        logging.info(f"结果文件导入完成: {paths}, {stats}")
+        return stats
+    
+    def icmp_sweep(self, targets, count: int = 1, retries: int = SWEEP_RETRIES,
+                   timeout: float = None, timestamps: bool = False) -> Dict:
+        """进程内ICMP存活扫描: 所有目标的回显请求在少量套接字上并发，存活主机加入主机列表
+        
+        timestamps为True时另按内核收发时间戳计算RTT，与用户态RTT并列写入报告
+        """
+        # 单次探测超时取已知主机RTO的中位数 (未知时为1s)
+        timeout = timeout or self.timing.median_rto()
+        try:
+            sweeper = IcmpSweeper(timeout=timeout, retries=retries, timestamps=timestamps)
+        except PermissionError as e:
+            print(f"错误: {e}")
+            return {}
+        total = len(targets) if hasattr(targets, '__len__') else None
+        print(f"ICMP存活扫描: {total if total is not None else '?'} 个目标 ({sweeper.backend}套接字, "
+              f"每主机 {count} 个请求, 超时 {timeout:.2f}s, 重试 {retries} 次)...")
+        if timestamps and not sweeper.timestamping:
+            print("警告: 内核不支持套接字时间戳，只统计用户态RTT")
+        alive = []
+        
+        def host_done(host, stats):
+            stage.advance()
+            if stats.alive:
+                alive.append(stats.to_dict(host))
+                stage.finding(host, f"{host} 存活, RTT avg {alive[-1]['rtt_avg']} ms")
+        
+        started = time.monotonic()
+        with sweeper, self.progress.stage('ICMP扫描', total) as stage:
+            results = sweeper.sweep(targets, count, on_result=host_done)
+        elapsed = time.monotonic() - started
+        
+        for result in alive:
+            # 目标可以是主机名，主机表按扫描时解析出的地址记录
+            host_stats = results[result['target']]
+            if host_stats.address not in self.discovered_hosts:
+                self.discovered_hosts.add(host_stats.address)
+            # 有内核时间戳时RTT模型使用不含本机调度延迟的样本
+            self.timing.observe_many(result['target'], host_stats.kernel_rtts or host_stats.rtts)
+        self.sweep_stats = {
+            'backend': sweeper.backend, 'hosts': len(results), 'alive': len(alive),
+            'elapsed': round(elapsed, 2),
+            'hosts_per_second': round(len(results) / elapsed) if elapsed > 0 else None,
+            'timestamping': sweeper.timestamping,
+            'counters': dict(sweeper.counters), 'results': alive,
+        }
+        if sweeper.timestamping:
+            rtts = [rtt for stats in results.values() for rtt in stats.rtts]
+            kernel = [rtt for stats in results.values() for rtt in stats.kernel_rtts]
+            self.sweep_stats['rtt'] = {
+                'userland_p50': round(statistics.median(rtts), 3) if rtts else None,
+                'userland_max': round(max(rtts), 3) if rtts else None,
+                'kernel_p50': round(statistics.median(kernel), 3) if kernel else None,
+                'kernel_max': round(max(kernel), 3) if kernel else None,
+                'kernel_samples': len(kernel),
+                'hardware_samples': sweeper.counters['hw_timestamps'],
+            }
+        print(f"存活 {len(alive)}/{len(results)} 个主机, 用时 {elapsed:.2f}s")
+        logging.info(f"ICMP存活扫描完成: {self.sweep_stats['counters']}, 存活: {[r['target'] for r in alive]}")
+        return self.sweep_stats
+    
+    def multi_link_test(self, tests: List[str], count: int = 50,
+                        links: List[Dict] = None) -> List[Dict]:
+        """多出口并行测试: 路由表中每个 (网关, 接口) 组合同时测试，按链路对比丢包和延迟"""
+        links = route_links(self.routes) if links is None else links
+        if not links:
+            print("路由表中没有带网关的路由，无法进行多链路测试")
+            return []
+        
+        print(f"并行测试 {len(links)} 条链路 ({', '.join(tests)}, 每项 {count} 包):")
+        for link in links:
+            print(f"  {link['interface']} ({link['source'] or '无IPv4地址'}) -> {link['gateway']} "
+                  f"[{', '.join(link['routes'])}]")
+        logging.info(f"多链路测试开始: {len(links)} 条链路, 类型: {tests}")
+        # 各链路并行，超时取各网关中最长的
+        timeout = max(self.timing.timeout_for(link['gateway'], 'ping', count * 0.2) for link in links)
+        results = run_multi_link(links, tests, count, timeout, self.traffic_duration, self.traffic_port)
+        self.link_results.extend(results)
+        
+        print("\n链路对比 (按丢包率、延迟排序):")
+        for link in results:
+            summary = link['summary']
+            print(f"  #{link['rank']} {link['interface']} -> {link['gateway']}: "
+                  f"丢包 {summary['loss_percent'] if summary['loss_percent'] is not None else '-'}%, "
+                  f"延迟 {summary['rtt_avg'] if summary['rtt_avg'] is not None else '-'} ms"
+                  f"{', %s pps' % format(summary['pps'], ',') if summary['pps'] else ''}")
+            for result in link['results']:
+                if result.get('error'):
+                    print(f"      {result['test_type']}: {result['error']}")
+                elif result.get('rtt_avg') is not None:
+                    self.timing.observe(link['gateway'], result['rtt_avg'])
+        logging.info(f"多链路测试完成: {[(l['interface'], l['summary']) for l in results]}")
+        return results
+    
+    def route_watch(self, tests: List[str], count: int = 50, debounce: float = DEFAULT_DEBOUNCE,
+                    min_interval: float = DEFAULT_MIN_INTERVAL) -> int:
+        """监视路由/链路变化，只对新增或变化的 (网关, 接口) 运行链路测试，Ctrl-C 退出"""
+        def changed(diff, routes):
+            self.routes = routes
+            self.gateway, self.gateways = None, set()
+            self.extract_gateway_from_routes()
+            print(f"\n[{time.strftime('%H:%M:%S')}] 路由变化: 新增 {len(diff['added'])}, "
+                  f"变化 {len(diff['changed'])}, 消失 {len(diff['removed'])}"
+                  f"{', 接口状态变化: ' + ', '.join(diff['interfaces']) if diff['interfaces'] else ''}")
+            for gateway, interface in diff['removed']:
+                print(f"  - {interface} -> {gateway}")
+            keys = set(diff['added']) | set(diff['changed'])
+            links = [link for link in route_links(routes)
+                     if (link['gateway'], link['interface']) in keys]
+            if links:
+                self.multi_link_test(tests, count, links)
+        
+        with RouteWatcher(debounce) as watcher:
+            print(f"监视路由变化 (事件源: {watcher.backend}, 防抖 {debounce:g}s, "
+                  f"两次测试至少间隔 {min_interval:g}s)，Ctrl-C 退出")
+            logging.info(f"路由监视开始: {watcher.backend}, 测试: {tests}")
+            try:
+                return watch_routes(watcher, self.get_route_table, changed, min_interval,
+                                    baseline=self.routes)
+            except KeyboardInterrupt:
+                print("\n停止监视")
+                return 0
+    
+    def get_default_interface(self) -> Optional[str]:
+        """默认路由所在接口"""
+        for route in self.routes:
+            if route.get('type') == 'default':
+                match = re.search(r'dev\s+(\S+)', route['raw'])
+                if match:
+                    return match.group(1)
+        return None
+    
+    def native_traffic_test(self, target: str, proto: str = 'udp',
+                            timeout: float = None) -> Dict:
+        """使用内置多进程流量生成器进行UDP/TCP压力测试 (无需外部工具和root，出错时抛出TaskFailed)"""
+        print(f"正在对 {target}:{self.traffic_port} 进行原生{proto.upper()}流量测试...")
+        duration = self.traffic_duration
+        if timeout is not None:
+            # 留出进程启动和汇总的时间
+            duration = max(min(duration, timeout - 2), 1)
+        try:
+            result = run_traffic(target, self.traffic_port, proto, duration,
+                                 self.traffic_workers, self.traffic_size)
+        except OSError as e:
+            print(f"流量生成错误: {e}")
+            logging.error(f"流量生成错误: {target}, 异常: {e}")
+            raise TaskFailed(f"流量生成错误: {e}")
+        
+        print(f"  {result['workers']} 个发送进程, {result['sent']} 包, "
+              f"{result['pps']:,} pps (每核 {result['pps_per_worker']:,}), {result['mbps']} Mbps")
+        logging.info(f"原生{proto.upper()}测试完成: {target}, {result['pps']} pps")
+        if result['error']:
+            print(f"  发送进程错误: {result['error']}")
+            logging.warning(f"原生{proto.upper()}测试错误: {target}, {result['error']}")
+        self.stress_results.append(result)
+        return result
+    
+    def run_load_profile(self, profile_path: str, targets: List[str]) -> Optional[Dict]:
+        """按负载曲线文件在多核进程池上协同执行ping/hping"""
+        try:
+            profile = load_profile(profile_path)
+        except (OSError, ValueError) as e:
+            print(f"负载曲线读取失败: {e}")
+            return None
+        
+        print(f"执行负载曲线: {profile.get('name', profile_path)} ({len(profile['phases'])} 个阶段)")
+        result = run_profile(profile, targets)
+        for error in result['errors']:
+            print(f"警告: {error}")
+        for phase in result['phases']:
+            print(f"  阶段 {phase['phase']}: {phase['received']}/{phase['sent']} 接收, {phase['loss_percent']}% 丢包")
+        print(f"  实例: {result['instances']}, 最大启动偏差: {result['max_start_skew'] * 1000:.1f} ms")
+        
+        self.stress_results.append(result)
+        return result
     
     def extract_gateway_from_routes(self):
         """从路由信息中提取网关"""
         for route in self.routes:
-            if route['type'] == 'default' and 'gateway' in route:
-                self.gateway = route['gateway']
-                break
+            if 'gateway' in route:
+                self.gateways.add(route['gateway'])
+                if route['type'] == 'default' and not self.gateway:
+                    self.gateway = route['gateway']
                 
     def display_route_info(self):
         """显示路由信息"""
@@ -602,14 +1619,117 @@ class KaliNetworkTester:
             print(f"原始: {route['raw']}")
             print("-" * 60)
     
+    def resolve_targets(self, args):
+        """按 -t/--auto 确定测试目标，未指定时测试默认网关；无目标时退出"""
+        targets = []
+        
+        if args.targets:
+            try:
+                shard = (0, 1)
+                if args.shard:
+                    index, count = (int(part) for part in args.shard.split('/'))
+                    shard = (index - 1, count)
+                targets = TargetSpec(args.targets, args.exclude, randomize=args.random_order,
+                                     seed=args.seed, shard=shard)
+            except (ValueError, OSError) as e:
+                print(f"目标解析错误: {e}")
+                sys.exit(1)
+        elif args.auto:
+            print("自动发现网络目标...")
+            targets = self.get_network_targets()
+            if self.gateway:
+                targets.append(self.gateway)
+        else:
+            # 默认测试网关
+            if self.gateway:
+                targets = [self.gateway]
+            else:
+                print("未找到默认网关，请手动指定目标")
+                sys.exit(1)
+        
+        if not targets:
+            print("未找到测试目标")
+            sys.exit(1)
+        return targets
+    
+    def plan_scan(self, args) -> Optional[Dict]:
+        """干跑: 按命令行参数估算各阶段的发包数、流量、带宽、耗时和并发进程，不发送数据包"""
+        calibration = Calibration.from_history(args.plan_from, log_file=self.log_file)
+        print(f"校准数据: {calibration.describe()}")
+        
+        if args.comprehensive or args.arp_stress:
+            if args.comprehensive:
+                network_range = args.network or "10.18.16.0/20"
+            else:
+                interface = args.interface or self.get_default_interface()
+                network_range = args.network or (interface and interface_network(interface))
+            if not network_range:
+                print("无法确定网络范围，请使用 --network 指定")
+                return None
+            try:
+                addresses = ipaddress.IPv4Network(network_range, strict=False).num_addresses
+            except ValueError as e:
+                print(f"无效的网络范围: {e}")
+                return None
+            mode = f"{'综合扫描' if args.comprehensive else 'ARP压力测试'} {network_range}"
+            if args.comprehensive:
+                alive = max(int(addresses * calibration.alive()), 1)
+                rows = [plan_discovery(addresses, calibration),
+                        plan_masscan(alive, self._port_count(self.scan_ports), self.masscan_rate,
+                                     calibration)]
+                if self.service_detection:
+                    rows.append(plan_services(alive, self.service_batches, calibration))
+                rows.append(plan_web(web_targets(alive, calibration), calibration, WEB_SCAN_LIMIT))
+            else:
+                stress_types = [t for t in args.tests if t in ('ping', 'hping')] or ['ping']
+                rows = plan_arp_stress(addresses, stress_types, args.count, args.arp_workers,
+                                       calibration)
+        elif args.watch or args.multi_link or args.soak is not None or args.load_profile:
+            print("--plan 目前支持综合扫描、ARP压力测试、ICMP扫描、两阶段扫描、Web扫描和压力测试")
+            return None
+        else:
+            targets = self.resolve_targets(args)
+            count = len(targets)
+            if args.sweep:
+                mode = 'ICMP扫描'
+                rows = [plan_sweep(count, args.sweep_count, args.sweep_retries,
+                                   calibration.median_rto(), calibration)]
+            elif args.service_scan:
+                mode = '两阶段扫描'
+                rows = [plan_masscan(count, self._port_count(self.scan_ports), self.masscan_rate,
+                                     calibration),
+                        plan_services(count, self.service_batches, calibration)]
+            elif args.web_scan:
+                mode = 'Web扫描'
+                rows = [plan_web(count, calibration)]
+            else:
+                mode = f"压力测试 {', '.join(args.tests)}"
+                rows = plan_stress(count, args.tests, calibration, self.traffic_duration,
+                                   self.traffic_size, self.traffic_workers, args.budget)
+        
+        totals = summarize(rows, args.max_children)
+        print(f"\n扫描计划: {mode} (估算值，未发送任何数据包)")
+        for line in format_plan(rows, totals):
+            print("  " + line)
+        logging.info(f"扫描计划: {mode}, 合计: {totals}")
+        return {'mode': mode, 'stages': rows, 'totals': totals}
+    
     def main(self):
         parser = argparse.ArgumentParser(description='Kali Linux 网络安全自动化测试工具')
         parser.add_argument('-t', '--targets', nargs='+', 
-                          help='指定测试目标IP地址')
+                          help='指定测试目标: IP、CIDR、范围(10.0.0.1-50)或@文件')
+        parser.add_argument('--exclude', nargs='+', default=[],
+                          help='从目标中排除的IP、CIDR、范围或@文件')
+        parser.add_argument('--random-order', action='store_true',
+                          help='按伪随机顺序遍历目标，把负载分散到各子网')
+        parser.add_argument('--seed', type=int,
+                          help='随机顺序的种子，相同种子得到相同顺序')
+        parser.add_argument('--shard', type=str, metavar='I/N',
+                          help='只处理N个分片中的第I个 (从1开始)')
         parser.add_argument('--auto', action='store_true',
                           help='自动发现网络目标')
         parser.add_argument('--tests', nargs='+', 
-                          choices=['ping', 'hping', 'nmap'],
+                          choices=['ping', 'hping', 'nmap', 'udp', 'tcp'],
                           default=['ping'],
                           help='选择测试类型 (默认: ping)')
         parser.add_argument('--show-routes', action='store_true',
@@ -620,21 +1740,173 @@ class KaliNetworkTester:
                           help='执行综合网络安全扫描')
         parser.add_argument('--network', type=str, 
                           help='指定网络范围 (例如: 192.168.1.0/24)')
+        parser.add_argument('--no-passive', action='store_true',
+                          help='跳过邻居表被动发现，直接对整个网段做主动ARP')
+        parser.add_argument('--resume', action='store_true',
+                          help='从上次中断的综合扫描检查点继续')
+        parser.add_argument('--arp-stress', action='store_true',
+                          help='arp-scan发现局域网设备后并发压力测试 (NSE脚本流程)')
+        parser.add_argument('--interface', type=str,
+                          help='--arp-stress使用的网络接口 (默认: 默认路由接口)')
+        parser.add_argument('--arp-workers', type=int, default=16,
+                          help='--arp-stress并发测试的设备数 (默认: 16)')
+        parser.add_argument('--jobs', type=str, metavar='FILE',
+                          help='批量执行JSONL/YAML作业文件，结构化结果逐行输出为JSON')
+        parser.add_argument('--job-workers', type=int, default=16,
+                          help='批量作业并发数 (默认: 16)')
+        parser.add_argument('--jobs-output', type=str, metavar='FILE',
+                          help="批量作业结果文件，'-' 表示标准输出 (默认: jobs_results_<时间戳>.jsonl)")
+        parser.add_argument('--progress-interval', type=float, metavar='SECONDS',
+                          help='进度显示刷新间隔 (默认: 终端0.25s，输出重定向时每10s一行摘要)')
+        parser.add_argument('--ingest', nargs='+', metavar='FILE',
+                          help='导入已有的masscan -oL/-oJ/-oB或nmap -oX结果文件 (可与--service-scan组合)')
+        parser.add_argument('--ingest-workers', type=int,
+                          help='--ingest 并行解析的进程数 (默认: CPU核数)')
+        parser.add_argument('--sweep', action='store_true',
+                          help='进程内ICMP存活扫描目标 (类似fping，可一次扫描整个/16)，存活主机写入报告')
+        parser.add_argument('--sweep-count', type=int, default=1,
+                          help='--sweep 每个主机的回显请求数 (默认: 1，大于1时统计丢包和RTT)')
+        parser.add_argument('--sweep-retries', type=int, default=SWEEP_RETRIES,
+                          help=f'--sweep 无应答主机的重试次数 (默认: {SWEEP_RETRIES})')
+        parser.add_argument('--kernel-rtt', action='store_true',
+                          help='--sweep 同时按内核收发时间戳 (SO_TIMESTAMPING) 计算RTT，不受本机负载引起的调度延迟影响')
+        parser.add_argument('--watch', action='store_true',
+                          help='监视路由/链路变化 (rtnetlink事件，不可用时轮询)，只测试新增或变化的网关/接口')
+        parser.add_argument('--watch-debounce', type=float, default=DEFAULT_DEBOUNCE, metavar='SECONDS',
+                          help=f'--watch 事件停止多久后才处理 (默认: {DEFAULT_DEBOUNCE:g})')
+        parser.add_argument('--watch-interval', type=float, default=DEFAULT_MIN_INTERVAL, metavar='SECONDS',
+                          help=f'--watch 两次测试的最小间隔，期间的变化合并 (默认: {DEFAULT_MIN_INTERVAL:g})')
+        parser.add_argument('--multi-link', action='store_true',
+                          help='并行测试路由表中每个网关/接口组合，测试绑定出接口并按链路对比')
+        parser.add_argument('--service-scan', action='store_true',
+                          help='两阶段扫描: masscan发现开放端口后分批nmap -sV识别服务')
+        parser.add_argument('--service-batches', type=int, default=DEFAULT_BATCHES,
+                          help=f'服务识别的nmap批次数 (默认: {DEFAULT_BATCHES})')
+        parser.add_argument('--ports', type=str, default='1-1000',
+                          help='masscan扫描端口范围 (默认: 1-1000)')
+        parser.add_argument('--masscan-rate', type=int, default=1000,
+                          help='masscan发包速率pps (默认: 1000)')
+        parser.add_argument('--plan', action='store_true',
+                          help='干跑: 估算所选模式的发包数、流量、带宽、耗时和并发进程，不发送数据包')
+        parser.add_argument('--plan-from', nargs='+', metavar='FILE',
+                          help='--plan 校准用的日志/报告 (默认: --log-file及其轮转文件和最新的扫描报告)')
         parser.add_argument('--web-scan', action='store_true',
                           help='执行Web服务扫描')
         parser.add_argument('--dns-enum', type=str,
                           help='对指定域名进行DNS枚举')
         parser.add_argument('-v', '--verbose', action='store_true',
                           help='启用详细日志输出')
+        parser.add_argument('--budget', type=float, metavar='SECONDS',
+                          help='压力测试总时间预算，网关/路由器优先，超出预算的任务截短或跳过')
+        parser.add_argument('--max-children', type=int, default=64,
+                          help='同时存在的外部工具子进程总数上限 (默认: 64)')
+        parser.add_argument('--tool-limit', nargs='+', default=[], metavar='TOOL=N',
+                          help='单个工具的并发上限，例如 nmap=2 masscan=1')
+        parser.add_argument('--max-child-rss', type=float, metavar='MB',
+                          help='子进程RSS总和上限，超过时暂停启动新工具')
+        parser.add_argument('--child-nofile', type=int, default=1024,
+                          help='子进程RLIMIT_NOFILE (默认: 1024)')
+        parser.add_argument('--child-mem', type=float, metavar='MB',
+                          help='子进程RLIMIT_AS地址空间上限')
         parser.add_argument('--output-dir', type=str, default='.',
                           help='指定报告输出目录')
+        parser.add_argument('--traffic-port', type=int, default=9,
+                          help='原生udp/tcp测试的目标端口 (默认: 9)')
+        parser.add_argument('--traffic-duration', type=float, default=10,
+                          help='原生udp/tcp测试时长秒数 (默认: 10)')
+        parser.add_argument('--traffic-workers', type=int,
+                          help='原生udp/tcp发送进程数 (默认: CPU核数)')
+        parser.add_argument('--traffic-size', type=int, default=64,
+                          help='原生udp/tcp负载字节数 (默认: 64)')
+        parser.add_argument('--sink', type=str, choices=['udp', 'tcp'],
+                          help='在本机运行流量接收端，统计对端原生测试的pps和丢包')
+        parser.add_argument('--load-profile', type=str, metavar='FILE',
+                          help='按JSON/YAML负载曲线执行多阶段并发压力测试')
+        parser.add_argument('--soak', type=int, metavar='SECONDS',
+                          help='ping长时间浸泡测试时长(秒)，0表示直到中断')
+        parser.add_argument('--soak-interval', type=float, default=0.2,
+                          help='浸泡测试ping间隔秒数 (默认: 0.2)')
+        parser.add_argument('--checkpoint-every', type=int, default=60,
+                          help='浸泡测试和综合扫描检查点写入间隔秒数 (默认: 60)')
+        parser.add_argument('--diff', nargs=2, metavar=('OLD', 'NEW'),
+                          help='比对两个扫描报告JSON，生成差异报告')
+        parser.add_argument('--diff-output', type=str,
+                          help='差异报告文件名前缀 (默认: network_scan_diff_<时间戳>)')
+        parser.add_argument('--log-file', type=str, default=DEFAULT_LOG_FILE,
+                          help=f'JSON-lines日志文件路径 (默认: {DEFAULT_LOG_FILE})')
+        parser.add_argument('--log-max-size', type=int, default=10,
+                          help='单个日志文件大小上限MB，超出后轮转 (默认: 10)')
         
         args = parser.parse_args()
         
-        # 设置详细模式
+        self.traffic_port = args.traffic_port
+        self.traffic_duration = args.traffic_duration
+        self.traffic_workers = args.traffic_workers
+        self.traffic_size = args.traffic_size
+        self.passive_discovery = not args.no_passive
+        self.service_detection = args.service_scan
+        self.service_batches = args.service_batches
+        self.scan_ports = args.ports
+        self.masscan_rate = args.masscan_rate
+        
+        # 设置详细模式和日志输出
         self.verbose = args.verbose
+        self.log_file = os.path.abspath(args.log_file)
+        self.log_max_bytes = args.log_max_size * 1024 * 1024
+        self._setup_logging()
+        
+        # 所有外部工具经由同一个资源管控器启动
+        tool_limits = {}
+        for item in args.tool_limit:
+            tool, _, limit = item.partition('=')
+            if not limit.isdigit() or int(limit) < 1:
+                parser.error(f"无效的 --tool-limit: {item}")
+            tool_limits[tool] = int(limit)
+        self.governor = ResourceGovernor(tool_limits, args.max_children, args.max_child_rss,
+                                         args.child_nofile, args.child_mem)
+        set_governor(self.governor)
+        if args.progress_interval is not None:
+            if args.progress_interval <= 0:
+                parser.error("--progress-interval 必须大于0")
+            self.progress = ProgressRenderer(interval=args.progress_interval)
+            set_progress(self.progress)
+        
+        # 报告比对不需要路由信息
+        if args.diff:
+            self.compare_reports(args.diff[0], args.diff[1], args.diff_output)
+            return
+        
+        # 离线导入结果文件，不需要路由信息
+        if args.ingest:
+            try:
+                self.ingest_results(args.ingest, args.ingest_workers)
+            except (OSError, ValueError) as e:
+                print(f"导入错误: {e}")
+                sys.exit(1)
+            if args.service_scan:
+                self.service_scan(self.service_batches)
+            self.generate_scan_report()
+            return
+        
+        # 批量作业不需要路由信息
+        if args.jobs:
+            try:
+                self.run_batch(args.jobs, args.job_workers, args.jobs_output)
+            except (OSError, ValueError) as e:
+                print(f"批量作业错误: {e}")
+                sys.exit(1)
+            return
+        
+        # 接收端模式不需要路由信息
+        if args.sink:
+            print(f"流量接收端监听 {args.sink}/{args.traffic_port}，按Ctrl-C结束...")
+            stats = run_sink(args.traffic_port, args.sink, size=args.traffic_size)
+            print(f"接收 {stats['received']} 包, {stats['pps']:,} pps, {stats['mbps']} Mbps, "
+                  f"估算丢包 {stats['loss_percent']}%")
+            return
         
         # 创建输出目录
+        self.output_dir = os.path.abspath(args.output_dir)
         if args.output_dir != '.':
             Path(args.output_dir).mkdir(parents=True, exist_ok=True)
             os.chdir(args.output_dir)
@@ -653,6 +1925,11 @@ class KaliNetworkTester:
         if args.show_routes:
             self.display_route_info()
         
+        # 干跑估算: 只读取路由表和历史日志
+        if args.plan:
+            self.plan_scan(args)
+            return
+        
         # DNS枚举
         if args.dns_enum:
             self.dns_enumeration(args.dns_enum)
@@ -661,45 +1938,80 @@ class KaliNetworkTester:
         # 综合扫描模式
         if args.comprehensive:
             network_range = args.network or "10.18.16.0/20"  # 默认使用当前网段
-            self.comprehensive_network_scan(network_range)
+            self.comprehensive_network_scan(network_range, resume=args.resume,
+                                            checkpoint_every=args.checkpoint_every)
             return
         
-        # 确定测试目标
-        targets = []
+        # ARP发现 + 设备压力测试
+        if args.arp_stress:
+            stress_types = [t for t in args.tests if t in ('ping', 'hping')] or ['ping']
+            self.arp_stress_test(args.network, args.interface, stress_types, args.count,
+                                 workers=args.arp_workers)
+            if self.stress_results:
+                self.generate_scan_report()
+            return
         
-        if args.targets:
-            targets = args.targets
-        elif args.auto:
-            print("自动发现网络目标...")
-            targets = self.get_network_targets()
-            if self.gateway:
-                targets.append(self.gateway)
-        else:
-            # 默认测试网关
-            if self.gateway:
-                targets = [self.gateway]
-            else:
-                print("未找到默认网关，请手动指定目标")
-                sys.exit(1)
+        # 路由变化监视: 只测试变化的链路，退出时生成报告
+        if args.watch:
+            self.route_watch([t for t in args.tests if t != 'nmap'] or ['ping'], args.count,
+                             args.watch_debounce, args.watch_interval)
+            if self.link_results:
+                self.generate_scan_report()
+            return
         
-        if not targets:
-            print("未找到测试目标")
-            sys.exit(1)
+        # 多出口链路并行测试
+        if args.multi_link:
+            self.multi_link_test([t for t in args.tests if t != 'nmap'] or ['ping'], args.count)
+            if self.link_results:
+                self.generate_scan_report()
+            return
+        
+        # 确定测试目标
+        targets = self.resolve_targets(args)
         
         print(f"测试目标: {targets}")
         print(f"测试类型: {args.tests}")
         
+        # ICMP存活扫描
+        if args.sweep:
+            self.icmp_sweep(targets, args.sweep_count, args.sweep_retries,
+                            timestamps=args.kernel_rtt)
+            if self.sweep_stats:
+                self.generate_scan_report()
+            return
+        
+        # 两阶段扫描: masscan -> nmap -sV
+        if args.service_scan:
+            self.masscan_port_scan(targets, self.scan_ports)
+            self.service_scan(self.service_batches)
+            self.generate_scan_report()
+            return
+        
         # Web服务扫描
         if args.web_scan:
             web_targets = [f"http://{target}" for target in targets]
             self.whatweb_fingerprint(web_targets)
             return
         
+        # 负载曲线测试
+        if args.load_profile:
+            if self.run_load_profile(args.load_profile, list(targets)):
+                self.generate_scan_report()
+            return
+        
+        # 长时间浸泡测试
+        if args.soak is not None:
+            self.ping_soak_test(list(targets), args.soak, args.soak_interval, args.checkpoint_every)
+            return
+        
         # 运行传统压力测试
         print(f"\n开始压力测试...")
-        self.run_stress_tests(targets, args.tests)
+        self.run_stress_tests(targets, args.tests, args.budget)
         
         print(f"\n压力测试完成!")
+        # 只要调度过任务就生成报告，工具缺失或失败的任务也记录在报告中
+        if self.schedule_records:
+            self.generate_scan_report()
 
 if __name__ == "__main__":
     if sys.platform != 'linux':
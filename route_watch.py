@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+路由/链路变化监视
+通过rtnetlink订阅内核的链路、地址和IPv4路由变化事件，无事件时阻塞在select上，不占用CPU；
+无法创建netlink套接字时退回按间隔轮询 /proc/net/route 和 /sys/class/net/*/operstate
+
+一次变化通常伴随一串事件 (接口up、加地址、加多条路由)，等事件停止debounce秒后才重新读取路由表，
+与上次测试时的路由表比较，只把新增或变化的 (网关, 接口) 交给回调；
+两次回调之间至少间隔min_interval秒，期间的变化合并到下一次
+"""
+
+import errno
+import logging
+import os
+import select
+import socket
+import struct
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from multi_link import route_key
+
+PROC_ROUTE = '/proc/net/route'
+SYS_NET = '/sys/class/net'
+
+# rtnetlink多播组和消息类型 (linux/rtnetlink.h)
+_RTMGRP_LINK = 0x01
+_RTMGRP_IPV4_IFADDR = 0x10
+_RTMGRP_IPV4_ROUTE = 0x40
+_RTM_NEWLINK, _RTM_DELLINK = 16, 17
+_RTM_NEWADDR, _RTM_DELADDR = 20, 21
+_RTM_NEWROUTE, _RTM_DELROUTE = 24, 25
+_EVENT_TYPES = {_RTM_NEWLINK, _RTM_DELLINK, _RTM_NEWADDR, _RTM_DELADDR,
+                _RTM_NEWROUTE, _RTM_DELROUTE}
+_NLMSG_HEADER = struct.Struct('=IHHII')
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_MIN_INTERVAL = 60.0
+DEFAULT_POLL_INTERVAL = 5.0
+# 事件持续不断时最多推迟这么久也要处理
+MAX_DEBOUNCE_DELAY = 30.0
+
+
+def link_states(path: str = SYS_NET) -> Dict[str, str]:
+    """各接口的operstate (up/down/unknown...)"""
+    states = {}
+    try:
+        names = os.listdir(path)
+    except OSError:
+        return states
+    for name in names:
+        try:
+            with open(os.path.join(path, name, 'operstate')) as f:
+                states[name] = f.read().strip()
+        except OSError:
+            continue
+    return states
+
+
+def diff_routes(old: List[Dict], new: List[Dict], old_states: Dict[str, str] = None,
+                new_states: Dict[str, str] = None) -> Dict[str, list]:
+    """比较两次解析的路由表，按 (网关, 接口) 分组
+
+    changed 包括经由该链路的路由有增减/属性变化 (如linkdown)，以及出接口状态变化
+    """
+    def group(routes):
+        grouped: Dict[tuple, set] = {}
+        for route in routes:
+            key = route_key(route)
+            if key is not None:
+                grouped.setdefault(key, set()).add(route.get('raw', ''))
+        return grouped
+
+    before, after = group(old), group(new)
+    old_states, new_states = old_states or {}, new_states or {}
+    flapped = sorted(name for name in set(old_states) | set(new_states)
+                     if old_states.get(name) != new_states.get(name))
+    return {
+        'added': sorted(key for key in after if key not in before),
+        'changed': sorted(key for key in after if key in before
+                          and (after[key] != before[key] or key[1] in flapped)),
+        'removed': sorted(key for key in before if key not in after),
+        'interfaces': flapped,
+    }
+
+
+def _poll_snapshot() -> bytes:
+    try:
+        with open(PROC_ROUTE, 'rb') as f:
+            routes = f.read()
+    except OSError:
+        routes = b''
+    return routes + repr(sorted(link_states().items())).encode()
+
+
+class RouteWatcher:
+    """等待路由/链路变化；wait() 返回合并后的事件数，超时返回0"""
+
+    def __init__(self, debounce: float = DEFAULT_DEBOUNCE,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL, use_netlink: bool = True):
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._sock: Optional[socket.socket] = None
+        self._snapshot = b''
+        if use_netlink:
+            try:
+                sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+                sock.bind((0, _RTMGRP_LINK | _RTMGRP_IPV4_IFADDR | _RTMGRP_IPV4_ROUTE))
+                sock.setblocking(False)
+                self._sock = sock
+            except (AttributeError, OSError) as e:
+                logging.info(f"无法订阅rtnetlink事件，改为轮询: {e}")
+        if self._sock is None:
+            self._snapshot = _poll_snapshot()
+        self.backend = 'netlink' if self._sock is not None else 'poll'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def wait(self, timeout: Optional[float] = None) -> int:
+        """阻塞到第一个事件，再等到连续debounce秒没有新事件 (最多推迟MAX_DEBOUNCE_DELAY)"""
+        events = self._events(timeout)
+        if not events:
+            return 0
+        deadline = time.monotonic() + MAX_DEBOUNCE_DELAY
+        while True:
+            quiet = min(self.debounce, deadline - time.monotonic())
+            if quiet <= 0:
+                return events
+            more = self._events(quiet)
+            if not more:
+                return events
+            events += more
+
+    def drain(self) -> int:
+        """丢弃已排队的事件 (调用方随后会重新读取路由表)"""
+        if self._sock is not None:
+            return self._read_netlink()
+        self._snapshot = _poll_snapshot()
+        return 0
+
+    def _events(self, timeout: Optional[float]) -> int:
+        if self._sock is not None:
+            if not select.select([self._sock], [], [], timeout)[0]:
+                return 0
+            return self._read_netlink() or 1
+        return self._poll(timeout)
+
+    def _read_netlink(self) -> int:
+        count = 0
+        while True:
+            try:
+                data = self._sock.recv(65536)
+            except BlockingIOError:
+                return count
+            except OSError as e:
+                # 接收缓冲区溢出丢了事件: 反正会重新读取完整路由表
+                if e.errno == errno.ENOBUFS:
+                    count += 1
+                    continue
+                raise
+            offset = 0
+            while offset + _NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, _, _ = _NLMSG_HEADER.unpack_from(data, offset)
+                if length < _NLMSG_HEADER.size:
+                    break
+                if msg_type in _EVENT_TYPES:
+                    count += 1
+                offset += (length + 3) & ~3
+
+    def _poll(self, timeout: Optional[float]) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            step = self.poll_interval
+            if deadline is not None:
+                step = min(step, deadline - time.monotonic())
+                if step <= 0:
+                    return 0
+            time.sleep(step)
+            snapshot = _poll_snapshot()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return 1
+
+
+def watch_routes(watcher: RouteWatcher, read_routes: Callable[[], List[Dict]],
+                 on_change: Callable[[Dict[str, list], List[Dict]], None],
+                 min_interval: float = DEFAULT_MIN_INTERVAL, baseline: List[Dict] = None,
+                 max_runs: Optional[int] = None, stop: Optional[threading.Event] = None) -> int:
+    """监视循环: 路由表有变化时以 (差异, 新路由表) 调用on_change，返回调用次数
+
+    差异总是相对上次回调时的路由表，限频期间的多次变化会合并成一次
+    """
+    routes = read_routes() if baseline is None else baseline
+    states = link_states()
+    last_run = float('-inf')
+    runs = 0
+    while (max_runs is None or runs < max_runs) and not (stop and stop.is_set()):
+        # 有stop时定期醒来检查，否则一直阻塞到事件发生
+        events = watcher.wait(1.0 if stop else None)
+        if not events:
+            continue
+        remaining = last_run + min_interval - time.monotonic()
+        if remaining > 0:
+            logging.info(f"路由变化 ({events} 个事件)，限频等待 {remaining:.0f}s")
+            if stop:
+                stop.wait(remaining)
+            else:
+                time.sleep(remaining)
+            watcher.drain()
+        new_routes, new_states = read_routes(), link_states()
+        diff = diff_routes(routes, new_routes, states, new_states)
+        routes, states = new_routes, new_states
+        if not any(diff[key] for key in ('added', 'changed', 'removed')):
+            logging.debug(f"{events} 个事件未改变带网关的路由")
+            continue
+        logging.info(f"路由变化: {diff}")
+        on_change(diff, new_routes)
+        last_run = time.monotonic()
+        runs += 1
+    return runs
+
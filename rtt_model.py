@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+按主机自适应的超时模型
+与nmap/TCP相同，按每个主机的平滑RTT (SRTT) 和RTT偏差 (RTTVAR) 计算探测超时
+RTO = SRTT + 4 * RTTVAR，再按各工具的特点换算成整次运行的超时和重试次数；
+RTT样本来自ping/hping结果和nmap XML中的 <times>，多次超时且从无应答的主机按死主机快速放弃
+"""
+
+import logging
+import statistics
+import threading
+import time
+from typing import Dict, List, Optional
+
+# RFC 6298 平滑系数
+ALPHA = 1 / 8
+BETA = 1 / 4
+# 单次探测超时范围 (秒)，未知主机使用初始值 (与nmap默认一致)
+INITIAL_RTO = 1.0
+MIN_RTO = 0.1
+MAX_RTO = 10.0
+# 连续超时达到该次数且从未收到应答即视为死主机
+DEAD_AFTER = 2
+
+# 工具: (固定开销s, RTO倍数, 最小超时s, 最大超时s, 最大重试次数)
+TOOL_PROFILES = {
+    'ping': (1, 2, 2, 300, 1),
+    'hping3': (1, 2, 2, 300, 1),
+    'nmap': (5, 20, 10, 600, 1),
+    'whatweb': (3, 20, 5, 120, 2),
+    'nikto': (60, 500, 60, 1800, 0),
+    'netdiscover': (5, 3, 10, 300, 0),
+    'masscan': (5, 3, 10, 3600, 0),
+}
+_DEFAULT_PROFILE = (5, 10, 5, 300, 1)
+
+
+class HostTiming:
+    __slots__ = ('srtt', 'rttvar', 'samples', 'failures', 'updated')
+
+    def __init__(self):
+        self.srtt: Optional[float] = None
+        self.rttvar: Optional[float] = None
+        self.samples = 0
+        self.failures = 0
+        self.updated = 0.0
+
+    def observe(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = (1 - BETA) * self.rttvar + BETA * abs(self.srtt - rtt)
+            self.srtt = (1 - ALPHA) * self.srtt + ALPHA * rtt
+        self.samples += 1
+        self.failures = 0
+        self.updated = time.time()
+
+    @property
+    def rto(self) -> float:
+        if self.srtt is None:
+            return INITIAL_RTO
+        return min(max(self.srtt + 4 * self.rttvar, MIN_RTO), MAX_RTO)
+
+    @property
+    def dead(self) -> bool:
+        return self.samples == 0 and self.failures >= DEAD_AFTER
+
+
+class TimingModel:
+    """所有主机的计时状态，线程安全"""
+
+    def __init__(self):
+        self._hosts: Dict[str, HostTiming] = {}
+        self._lock = threading.Lock()
+        self.runs: List[Dict] = []
+
+    def _host(self, ip: str) -> HostTiming:
+        host = self._hosts.get(ip)
+        if host is None:
+            host = self._hosts[ip] = HostTiming()
+        return host
+
+    # ---- 样本输入 ----
+
+    def observe(self, ip: str, rtt_ms: float):
+        """记录一个RTT样本 (毫秒)"""
+        with self._lock:
+            self._host(ip).observe(rtt_ms / 1000)
+
+    def observe_many(self, ip: str, rtts_ms: List[float]):
+        with self._lock:
+            host = self._host(ip)
+            for rtt in rtts_ms:
+                host.observe(rtt / 1000)
+
+    def seed(self, ip: str, srtt_ms: float, rttvar_ms: float):
+        """使用nmap等工具已经平滑过的SRTT/RTTVAR"""
+        with self._lock:
+            host = self._host(ip)
+            if host.srtt is None:
+                host.srtt, host.rttvar = srtt_ms / 1000, rttvar_ms / 1000
+                host.samples += 1
+                host.failures = 0
+                host.updated = time.time()
+            else:
+                host.observe(srtt_ms / 1000)
+
+    def observe_timeout(self, ip: str):
+        with self._lock:
+            self._host(ip).failures += 1
+
+    # ---- 超时计算 ----
+
+    def rto(self, ip: str) -> float:
+        with self._lock:
+            host = self._hosts.get(ip)
+            return host.rto if host else INITIAL_RTO
+
+    def median_rto(self) -> float:
+        """已知主机RTO的中位数，用于网段级工具"""
+        with self._lock:
+            known = [host.rto for host in self._hosts.values() if host.samples]
+        return statistics.median(known) if known else INITIAL_RTO
+
+    def is_dead(self, ip: str) -> bool:
+        with self._lock:
+            host = self._hosts.get(ip)
+            return bool(host and host.dead)
+
+    def timeout_for(self, ip: Optional[str], tool: str, expected: float = 0.0) -> float:
+        """一次工具运行的超时: 预期耗时 + 固定开销 + RTO倍数，死主机直接取下限"""
+        overhead, factor, low, high, _ = TOOL_PROFILES.get(tool, _DEFAULT_PROFILE)
+        if ip is None:
+            rto = self.median_rto()
+        elif self.is_dead(ip):
+            return float(low)
+        else:
+            rto = self.rto(ip)
+        return round(min(max(expected + overhead + factor * rto, low), high), 2)
+
+    def backoff(self, tool: str, timeout: float) -> float:
+        """超时后重试: 超时时间加倍，不超过该工具的上限"""
+        return min(timeout * 2, TOOL_PROFILES.get(tool, _DEFAULT_PROFILE)[3])
+
+    def retries_for(self, ip: Optional[str], tool: str) -> int:
+        """死主机不重试；RTT抖动大的主机多重试一次"""
+        max_retries = TOOL_PROFILES.get(tool, _DEFAULT_PROFILE)[4]
+        if ip is None or max_retries == 0:
+            return max_retries
+        with self._lock:
+            host = self._hosts.get(ip)
+            if host is None:
+                return min(1, max_retries)
+            if host.dead:
+                return 0
+            jittery = host.srtt is not None and host.rttvar > host.srtt / 2
+        return max_retries if jittery else min(1, max_retries)
+
+    # ---- 记录与报告 ----
+
+    def record(self, ip: Optional[str], tool: str, timeout: float, attempt: int,
+               outcome: str, elapsed: float, expected: float = 0.0):
+        """记入报告，并以结构化字段写入日志 (供 --plan 校准耗时)"""
+        run = {
+            'target': ip, 'tool': tool, 'timeout': round(timeout, 2), 'attempt': attempt,
+            'outcome': outcome, 'elapsed': round(elapsed, 3), 'expected': round(expected, 3),
+        }
+        with self._lock:
+            self.runs.append(run)
+        logging.info(f"{tool} {outcome}: {ip or ''} {elapsed:.2f}s", extra=run)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            hosts = {
+                ip: {
+                    'srtt_ms': round(host.srtt * 1000, 3) if host.srtt is not None else None,
+                    'rttvar_ms': round(host.rttvar * 1000, 3) if host.rttvar is not None else None,
+                    'rto_ms': round(host.rto * 1000, 1),
+                    'samples': host.samples,
+                    'failures': host.failures,
+                    'dead': host.dead,
+                }
+                for ip, host in self._hosts.items()
+            }
+            return {'hosts': hosts, 'runs': list(self.runs)}
+
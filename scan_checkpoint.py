@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+综合扫描检查点
+记录各阶段完成情况、已完成的端口扫描分片、已完成的Web目标以及部分结果，
+阶段完成时原子写盘，分片/Web目标完成时按时间间隔节流写盘；中断 (Ctrl-C、超时、异常，
+包括无法捕获的SIGKILL) 后可用 --resume 从最近检查点继续
+"""
+
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+from host_table import HostTable
+from ping_soak import write_checkpoint
+from port_store import PortStore
+
+CHECKPOINT_FILE = 'comprehensive_checkpoint.json'
+CHECKPOINT_VERSION = 1
+# 每个masscan分片至少发送约 SHARD_SECONDS 秒的探测包且至少包含 SHARD_MIN_HOSTS 个主机，
+# 使每片1~2秒的启动和 --wait 开销相对发包时间可以忽略
+SHARD_SECONDS = 600
+SHARD_MIN_HOSTS = 4096
+
+
+class ScanCheckpoint:
+    """综合扫描的流水线状态
+
+    min_interval > 0 时分片和Web目标的写盘按该间隔节流 (阶段完成总是写盘)，
+    进程被SIGKILL时最多重做最近 min_interval 秒内完成的分片和Web目标
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE, network_range: Optional[str] = None,
+                 min_interval: float = 0.0):
+        self.path = path
+        self.network_range = network_range
+        self.min_interval = min_interval
+        self.stages: List[str] = []
+        self.completed_shards: List[int] = []
+        self.shard_count = 0
+        self.web_done: List[str] = []
+        self.saves = 0
+        self._last_save = 0.0
+
+    # ---- 状态查询与推进 ----
+
+    def stage_done(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def shard_done(self, index: int) -> bool:
+        return index in self.completed_shards
+
+    def complete_stage(self, stage: str, tester):
+        if stage not in self.stages:
+            self.stages.append(stage)
+        self.save(tester, force=True)
+
+    def start_shards(self, shard_count: int):
+        """分片数与检查点记录的不一致 (端口范围或速率改变) 时，已完成的分片不再有效"""
+        if self.shard_count and self.shard_count != shard_count:
+            self.completed_shards = []
+        self.shard_count = shard_count
+
+    def complete_shard(self, index: int, shard_count: int, tester):
+        self.shard_count = shard_count
+        if index not in self.completed_shards:
+            self.completed_shards.append(index)
+        self.save(tester)
+
+    def complete_web(self, target: str, tester):
+        if target not in self.web_done:
+            self.web_done.append(target)
+        self.save(tester)
+
+    # ---- 持久化 ----
+
+    def save(self, tester, force: bool = False):
+        """写入检查点；非强制写入时按 min_interval 节流"""
+        now = time.monotonic()
+        if not force and now - self._last_save < self.min_interval:
+            return
+        self._last_save = now
+        self.saves += 1
+        write_checkpoint(self.path, {
+            'version': CHECKPOINT_VERSION,
+            'network': self.network_range,
+            'saved_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'stages': self.stages,
+            'shard_count': self.shard_count,
+            'completed_shards': self.completed_shards,
+            'web_done': self.web_done,
+            'hosts': tester.discovered_hosts.to_list(),
+            'open_ports': tester.open_ports.to_dict(),
+            'web_services': tester.web_services,
+            'services': tester.services,
+            'vulnerabilities': tester.vulnerabilities,
+        })
+
+    def load(self, tester) -> bool:
+        """读取检查点并恢复到tester，网络范围不一致或文件无效时返回False"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != CHECKPOINT_VERSION or data.get('network') != self.network_range:
+            return False
+
+        self.stages = data['stages']
+        self.shard_count = data['shard_count']
+        self.completed_shards = data['completed_shards']
+        self.web_done = data['web_done']
+        tester.discovered_hosts = HostTable(data['hosts'])
+        tester.open_ports = PortStore.from_dict(data['open_ports'])
+        tester.web_services = data['web_services']
+        tester.services = data.get('services', {})
+        tester.vulnerabilities = data['vulnerabilities']
+        return True
+
+    def remove(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def describe(self) -> Dict:
+        return {
+            'stages': list(self.stages),
+            'shards': f"{len(self.completed_shards)}/{self.shard_count or '?'}",
+            'web_done': len(self.web_done),
+        }
+
+
+def shard_size(ports: int, rate: int) -> int:
+    """按端口数和发包速率计算每个masscan分片的主机数"""
+    return max(SHARD_MIN_HOSTS, int(SHARD_SECONDS * rate / max(ports, 1)))
+
+
+def shard_targets(targets: List[str], size: int) -> List[List[str]]:
+    return [targets[i:i + size] for i in range(0, len(targets), size)]
+
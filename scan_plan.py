@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+扫描成本预估 (--plan 干跑)
+按命令行参数展开目标和测试，逐阶段估算发包数、流量、峰值带宽、耗时和并发子进程数，不发送任何数据包
+
+各工具的单次耗时 (及相对预期耗时的比例)、超时率、主机RTO、存活率、开放端口密度、
+原生流量pps等从以前运行的日志 (JSON-lines中带tool/elapsed字段的记录) 和JSON报告中校准；
+没有历史数据的项使用与调度器预估一致的默认值
+"""
+
+import glob
+import ipaddress
+import json
+import math
+import os
+import statistics
+from typing import Dict, Iterable, List, Optional
+
+from log_pipeline import DEFAULT_LOG_FILE, DEFAULT_BACKUP_COUNT
+from rtt_model import INITIAL_RTO
+from scan_checkpoint import shard_size
+
+# 线路上的帧长 (字节，以太网头+IP头，不含前导码和FCS，不足60字节按60计)
+ICMP_FRAME = 98
+SYN_FRAME = 60
+ARP_FRAME = 60
+UDP_OVERHEAD = 42
+TCP_OVERHEAD = 54
+# nmap -sV 每个端口的探测报文数和平均长度、whatweb每个目标的报文数和平均长度 (粗略值)
+SERVICE_PACKETS_PER_PORT = 12
+SERVICE_PACKET_BYTES = 120
+WEB_PACKETS_PER_TARGET = 60
+WEB_PACKET_BYTES = 400
+
+# 无历史数据时各工具单次运行的耗时 (与 run_stress_tests 中调度器的预估一致)
+DEFAULT_TOOL_SECONDS = {'ping': 11, 'hping3': 3, 'nmap': 30, 'whatweb': 10}
+# 无历史数据时的网络特征
+DEFAULT_ALIVE_RATIO = 0.1
+DEFAULT_OPEN_HOST_RATIO = 0.3
+DEFAULT_PORTS_PER_HOST = 3
+DEFAULT_WEB_RATIO = 0.3
+DEFAULT_SERVICE_PROBE_SECONDS = 0.5
+DEFAULT_SWEEP_RATE = 20000
+DEFAULT_TRAFFIC_PPS = {'udp': 150000, 'tcp': 50000}
+# arp-scan默认带宽256kbit/s，约每2ms一个ARP请求
+ARP_SCAN_SECONDS_PER_ADDRESS = 0.002
+# 压力测试之间的停顿 (DeadlineScheduler pause)
+STRESS_PAUSE = 1.0
+# 最多读取的历史报告数 (按修改时间取最新)
+MAX_REPORTS = 20
+
+
+def _median(values: List[float], default):
+    return statistics.median(values) if values else default
+
+
+class Calibration:
+    """从历史日志和报告中收集的耗时与网络特征样本"""
+
+    def __init__(self):
+        self.runs: Dict[str, List[Dict]] = {}
+        self.rto: List[float] = []
+        self.alive_ratio: List[float] = []
+        self.open_host_ratio: List[float] = []
+        self.ports_per_host: List[float] = []
+        self.web_ratio: List[float] = []
+        self.service_probe_seconds: List[float] = []
+        self.sweep_rate: List[float] = []
+        self.traffic_pps: Dict[str, List[float]] = {'udp': [], 'tcp': []}
+        self.sources: List[str] = []
+        # 同一次运行既写日志又写报告，按 (目标, 工具, 尝试, 耗时) 去重
+        self._seen = set()
+
+    @classmethod
+    def from_history(cls, paths: Optional[Iterable[str]] = None, directory: str = '.',
+                     log_file: str = DEFAULT_LOG_FILE) -> 'Calibration':
+        """paths为空时读取log_file及其轮转文件和directory中最新的扫描报告"""
+        calibration = cls()
+        for path in (paths if paths else history_files(directory, log_file)):
+            calibration.load(path)
+        return calibration
+
+    def load(self, path: str) -> bool:
+        """.json按报告读取，其他按JSON-lines日志读取；无法读取时返回False"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                if path.endswith('.json'):
+                    loaded = self._load_report(json.load(f))
+                else:
+                    loaded = self._load_log(f)
+        except (OSError, UnicodeDecodeError, ValueError):
+            return False
+        if loaded:
+            self.sources.append(path)
+        return bool(loaded)
+
+    def _add_run(self, run: Dict) -> bool:
+        tool, elapsed = run.get('tool'), run.get('elapsed')
+        if not isinstance(tool, str) or not isinstance(elapsed, (int, float)):
+            return False
+        key = (run.get('target'), tool, run.get('attempt'), round(elapsed, 3))
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        self.runs.setdefault(tool, []).append(run)
+        return True
+
+    def _load_log(self, lines) -> int:
+        count = 0
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if not isinstance(entry, dict) or 'tool' not in entry:
+                continue
+            if entry['tool'] == 'nmap-sV':
+                if entry.get('probes') and entry.get('elapsed'):
+                    # 各批次并行，换算成单批次内每个 (主机, 端口) 的耗时
+                    self.service_probe_seconds.append(
+                        entry['elapsed'] * max(entry.get('batches') or 1, 1) / entry['probes'])
+                    count += 1
+                continue
+            count += self._add_run(entry)
+        return count
+
+    def _load_report(self, report: Dict) -> int:
+        if not isinstance(report, dict):
+            return 0
+        count = 0
+        timing = report.get('timing') or {}
+        for run in timing.get('runs') or []:
+            count += self._add_run(run)
+        for host in (timing.get('hosts') or {}).values():
+            if host.get('samples') and host.get('rto_ms'):
+                self.rto.append(host['rto_ms'] / 1000)
+                count += 1
+
+        summary = report.get('summary') or {}
+        discovery = report.get('discovery') or {}
+        if discovery.get('network') and summary.get('total_hosts') is not None:
+            size = ipaddress.IPv4Network(discovery['network'], strict=False).num_addresses
+            self.alive_ratio.append(summary['total_hosts'] / size)
+            count += 1
+        sweep = report.get('sweep') or {}
+        if sweep.get('hosts'):
+            self.alive_ratio.append(sweep['alive'] / sweep['hosts'])
+            if sweep.get('hosts_per_second'):
+                self.sweep_rate.append(sweep['hosts_per_second'])
+            count += 1
+
+        open_ports = report.get('open_ports') or {}
+        if open_ports and summary.get('total_hosts'):
+            self.open_host_ratio.append(min(len(open_ports) / summary['total_hosts'], 1.0))
+            self.ports_per_host.append(sum(len(ports) for ports in open_ports.values()) / len(open_ports))
+            self.web_ratio.append(len(report.get('web_services') or []) / len(open_ports))
+            count += 1
+
+        for result in report.get('stress_results') or []:
+            proto = str(result.get('test_type', '')).replace('NATIVE_', '').lower()
+            if proto in self.traffic_pps and result.get('pps_per_worker'):
+                self.traffic_pps[proto].append(result['pps_per_worker'])
+                count += 1
+        return count
+
+    # ---- 估算使用的参数 ----
+
+    def tool_seconds(self, tool: str, default: Optional[float] = None) -> float:
+        """单次运行的期望耗时: 完成耗时的中位数，加上按超时率折算的超时耗时"""
+        runs = self.runs.get(tool, [])
+        done = [run['elapsed'] for run in runs if run.get('outcome') == 'done']
+        timed_out = [run['elapsed'] for run in runs if run.get('outcome') == 'timeout']
+        if not done and not timed_out:
+            return DEFAULT_TOOL_SECONDS.get(tool, 10) if default is None else default
+        seconds = _median(done, default or 0)
+        if timed_out:
+            seconds += len(timed_out) / len(runs) * statistics.median(timed_out)
+        return seconds
+
+    def tool_ratio(self, tool: str) -> Optional[float]:
+        """实际耗时与调用时预期耗时之比的中位数 (网段级工具)，无样本时返回None"""
+        ratios = [run['elapsed'] / run['expected'] for run in self.runs.get(tool, [])
+                  if run.get('outcome') == 'done' and run.get('expected')]
+        return _median(ratios, None)
+
+    def timeout_rate(self, tool: str) -> float:
+        runs = self.runs.get(tool, [])
+        return sum(run.get('outcome') == 'timeout' for run in runs) / len(runs) if runs else 0.0
+
+    def median_rto(self) -> float:
+        return _median(self.rto, INITIAL_RTO)
+
+    def alive(self) -> float:
+        return _median(self.alive_ratio, DEFAULT_ALIVE_RATIO)
+
+    def describe(self) -> str:
+        if not self.sources:
+            return "无历史数据，全部使用默认值"
+        tools = ", ".join(f"{tool}×{len(runs)}" for tool, runs in sorted(self.runs.items()))
+        return (f"{len(self.sources)} 个日志/报告, 工具运行 {tools or '无'}, "
+                f"主机RTO样本 {len(self.rto)}, 存活率样本 {len(self.alive_ratio)}")
+
+
+def history_files(directory: str = '.', log_file: str = DEFAULT_LOG_FILE) -> List[str]:
+    """日志 (含轮转的 .1 ~ .N) 和directory中最新的MAX_REPORTS个扫描报告"""
+    logs = [log_file] + [f"{log_file}.{i}" for i in range(1, DEFAULT_BACKUP_COUNT + 1)]
+    reports = sorted(glob.glob(os.path.join(directory, 'network_scan_report_*.json')),
+                     key=os.path.getmtime, reverse=True)[:MAX_REPORTS]
+    return [path for path in logs if os.path.exists(path)] + reports
+
+
+def _stage(name: str, targets: int, packets: float, frame_bytes: float, seconds: float,
+           mbps: float, processes: int, note: str = '') -> Dict:
+    return {'stage': name, 'targets': int(targets), 'packets': int(packets),
+            'bytes': int(packets * frame_bytes), 'seconds': round(seconds, 1),
+            'mbps': round(mbps, 3), 'processes': processes, 'note': note}
+
+
+# ---- 各阶段的估算 ----
+
+def plan_discovery(addresses: int, cal: Calibration) -> Dict:
+    """netdiscover主动ARP (被动发现命中的地址会减少实际探测量，此处按上限估算)"""
+    # 与 _active_arp_scan 传给 _timed_run 的预期耗时相同
+    expected = addresses * 0.02
+    seconds = expected * (cal.tool_ratio('netdiscover') or 1.0)
+    return _stage('主机发现', addresses, addresses, ARP_FRAME, seconds,
+                  addresses * ARP_FRAME * 8 / max(seconds, 1e-9) / 1e6, 1,
+                  f"预计存活 {int(addresses * cal.alive())} 个")
+
+
+def plan_masscan(hosts: int, ports: int, rate: int, cal: Calibration) -> Dict:
+    """masscan按 shard_size 分片依次运行，每片发包结束后等待3倍RTO"""
+    shards = max(math.ceil(hosts / shard_size(ports, rate)), 1)
+    probes = hosts * ports
+    wait = max(int(3 * cal.median_rto() + 0.999), 1)
+    ratio = cal.tool_ratio('masscan')
+    if ratio is None:
+        seconds = probes / rate + shards * wait
+    else:
+        seconds = (probes / rate * 1.2 + shards * wait) * ratio
+    return _stage('masscan', hosts, probes, SYN_FRAME, seconds, rate * SYN_FRAME * 8 / 1e6, 1,
+                  f"{ports} 端口, {rate} pps, {shards} 个分片")
+
+
+def open_hosts(hosts: int, cal: Calibration) -> int:
+    return int(math.ceil(hosts * _median(cal.open_host_ratio, DEFAULT_OPEN_HOST_RATIO)))
+
+
+def plan_services(hosts: int, batches: int, cal: Calibration) -> Dict:
+    """对开放端口分批并行运行nmap -sV"""
+    found = open_hosts(hosts, cal)
+    probes = found * _median(cal.ports_per_host, DEFAULT_PORTS_PER_HOST)
+    batches = max(min(batches, found), 1)
+    seconds = probes * _median(cal.service_probe_seconds, DEFAULT_SERVICE_PROBE_SECONDS) / batches
+    packets = probes * SERVICE_PACKETS_PER_PORT
+    return _stage('服务识别', found, packets, SERVICE_PACKET_BYTES, seconds,
+                  packets * SERVICE_PACKET_BYTES * 8 / max(seconds, 1e-9) / 1e6, batches,
+                  f"约 {int(probes)} 个开放端口, {batches} 批")
+
+
+def plan_web(targets: int, cal: Calibration, limit: Optional[int] = None) -> Dict:
+    """whatweb逐个目标串行运行，limit为综合扫描中的数量上限"""
+    scanned = targets if limit is None else min(targets, limit)
+    seconds = scanned * cal.tool_seconds('whatweb')
+    packets = scanned * WEB_PACKETS_PER_TARGET
+    note = f"发现约 {targets} 个, 扫描前 {limit} 个" if limit is not None and targets > limit else ''
+    return _stage('Web指纹', scanned, packets, WEB_PACKET_BYTES, seconds,
+                  WEB_PACKETS_PER_TARGET * WEB_PACKET_BYTES * 8 / max(cal.tool_seconds('whatweb'), 1e-9) / 1e6,
+                  1 if scanned else 0, note)
+
+
+def web_targets(hosts: int, cal: Calibration) -> int:
+    return int(round(open_hosts(hosts, cal) * _median(cal.web_ratio, DEFAULT_WEB_RATIO)))
+
+
+def plan_stress(targets: int, tests: List[str], cal: Calibration, traffic_duration: float = 10,
+                traffic_size: int = 64, traffic_workers: Optional[int] = None,
+                budget: Optional[float] = None) -> List[Dict]:
+    """压力测试按目标和测试类型依次调度，每项之后停顿STRESS_PAUSE秒"""
+    workers = traffic_workers or os.cpu_count() or 1
+    rows = []
+    for test in ('ping', 'hping', 'nmap', 'udp', 'tcp'):
+        if test not in tests:
+            continue
+        if test == 'ping':
+            # 100包, 间隔0.1s
+            per = cal.tool_seconds('ping')
+            row = _stage('ping', targets, targets * 100, ICMP_FRAME, targets * (per + STRESS_PAUSE),
+                         10 * ICMP_FRAME * 8 / 1e6, 1)
+        elif test == 'hping':
+            # 100个SYN, 间隔u100
+            per = cal.tool_seconds('hping3')
+            row = _stage('hping3', targets, targets * 100, SYN_FRAME, targets * (per + STRESS_PAUSE),
+                         10000 * SYN_FRAME * 8 / 1e6, 1)
+        elif test == 'nmap':
+            # --top-ports 100 加上主机发现的几个探测
+            per = cal.tool_seconds('nmap')
+            row = _stage('nmap', targets, targets * 104, SYN_FRAME, targets * (per + STRESS_PAUSE),
+                         104 * SYN_FRAME * 8 / max(per, 1e-9) / 1e6, 1)
+        else:
+            pps = _median(cal.traffic_pps[test], DEFAULT_TRAFFIC_PPS[test]) * workers
+            frame = traffic_size + (UDP_OVERHEAD if test == 'udp' else TCP_OVERHEAD)
+            row = _stage(f"原生{test.upper()}", targets, targets * pps * traffic_duration, frame,
+                         targets * (traffic_duration + 2 + STRESS_PAUSE), pps * frame * 8 / 1e6, workers,
+                         f"{workers} 个发送进程")
+        rate = cal.timeout_rate('hping3' if test == 'hping' else test)
+        if rate:
+            row['note'] = ", ".join(filter(None, [row['note'], f"历史超时率 {rate:.0%}"]))
+        rows.append(row)
+
+    total = sum(row['seconds'] for row in rows)
+    if budget is not None and total > budget:
+        # 调度器在预算内截短或跳过，按比例缩减
+        scale = budget / total
+        for row in rows:
+            row['seconds'] = round(row['seconds'] * scale, 1)
+            row['packets'] = int(row['packets'] * scale)
+            row['bytes'] = int(row['bytes'] * scale)
+            row['note'] = ", ".join(filter(None, [row['note'], f"预算截断至 {scale:.0%}"]))
+    return rows
+
+
+def plan_sweep(targets: int, count: int, retries: int, timeout: float, cal: Calibration) -> Dict:
+    """进程内ICMP扫描: 按历史扫描速率发送，无应答主机按1.5倍退避重试"""
+    alive = cal.alive()
+    rate = _median(cal.sweep_rate, DEFAULT_SWEEP_RATE)
+    packets = targets * count + targets * (1 - alive) * count * retries
+    # 最后一批无应答主机的重试尾巴
+    tail = sum(timeout * 1.5 ** i for i in range(retries + 1))
+    seconds = targets / rate + tail
+    return _stage('ICMP扫描', targets, packets, ICMP_FRAME, seconds,
+                  rate * count * ICMP_FRAME * 8 / 1e6, 0,
+                  f"预计存活 {int(targets * alive)} 个, 进程内发送")
+
+
+def plan_arp_stress(addresses: int, tests: List[str], count: int, workers: int,
+                    cal: Calibration) -> List[Dict]:
+    """arp-scan发现一次，再按workers并发逐设备测试"""
+    devices = max(int(addresses * cal.alive()), 1)
+    scan_seconds = addresses * ARP_SCAN_SECONDS_PER_ADDRESS
+    rows = [_stage('arp-scan', addresses, addresses, ARP_FRAME, scan_seconds,
+                   ARP_FRAME * 8 / ARP_SCAN_SECONDS_PER_ADDRESS / 1e6, 1,
+                   f"预计发现 {devices} 个设备")]
+    concurrent = min(workers, devices)
+    waves = math.ceil(devices / concurrent)
+    # arp_stress.ping_device 间隔0.2s, hping3默认间隔u100
+    per_device = {'ping': count * 0.2 + 1, 'hping': count * 0.0001 + 1}
+    frames = {'ping': ICMP_FRAME, 'hping': SYN_FRAME}
+    for test in tests:
+        seconds = waves * per_device[test]
+        rows.append(_stage(f"ARP设备{test}", devices, devices * count, frames[test], seconds,
+                           concurrent * count * frames[test] * 8 / per_device[test] / 1e6,
+                           concurrent, f"{concurrent} 个设备并发"))
+    return rows
+
+
+def summarize(rows: List[Dict], max_children: Optional[int] = None) -> Dict:
+    """各阶段依次执行: 耗时相加，带宽和并发进程取峰值 (进程数受资源管控器上限约束)"""
+    peak = max((row['processes'] for row in rows), default=0)
+    return {
+        'packets': sum(row['packets'] for row in rows),
+        'bytes': sum(row['bytes'] for row in rows),
+        'seconds': round(sum(row['seconds'] for row in rows), 1),
+        'peak_mbps': max((row['mbps'] for row in rows), default=0.0),
+        'peak_processes': min(peak, max_children) if max_children else peak,
+    }
+
+
+def _size(count: float) -> str:
+    for unit in ('', 'K', 'M', 'G', 'T'):
+        if abs(count) < 1000:
+            return f"{count:.0f}{unit}" if not unit or count >= 100 else f"{count:.1f}{unit}"
+        count /= 1000
+    return f"{count:.0f}P"
+
+
+def _duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m"
+
+
+def format_plan(rows: List[Dict], totals: Dict) -> List[str]:
+    lines = [f"{'阶段':<10} {'目标':>7} {'数据包':>8} {'流量':>8} {'峰值带宽':>10} {'耗时':>8} {'进程':>4}  说明"]
+    for row in rows + [dict(totals, stage='合计', targets=0, mbps=totals['peak_mbps'],
+                            processes=totals['peak_processes'], note='')]:
+        lines.append(f"{row['stage']:<10} {_size(row['targets']) if row['targets'] else '':>7} "
+                     f"{_size(row['packets']):>8} {_size(row['bytes']) + 'B':>8} "
+                     f"{row['mbps']:>8.2f}Mb {_duration(row['seconds']):>8} {row['processes']:>4}  {row['note']}")
+    return lines
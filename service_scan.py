@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+两阶段扫描的第二阶段: 只对masscan发现的开放端口做nmap服务识别
+按开放端口集合把主机分组，合并成少量批次，每批一次
+`nmap -sV -Pn -n -p <端口> -iL <目标文件> -oX -`，
+XML输出用iterparse边读边解析，逐个主机合并结果，内存与主机数无关
+"""
+
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from resource_governor import get_governor
+
+# nmap -p 中各协议的前缀
+_PROTO_PREFIX = {'tcp': 'T', 'udp': 'U', 'sctp': 'S'}
+DEFAULT_BATCHES = 4
+
+
+def port_argument(entries: Iterable[str]) -> str:
+    """["80/tcp", "53/udp"] -> "T:80,U:53" """
+    by_proto: Dict[str, List[int]] = {}
+    for entry in entries:
+        port, proto = entry.split('/')
+        if proto in _PROTO_PREFIX:
+            by_proto.setdefault(proto, []).append(int(port))
+    return ",".join(f"{_PROTO_PREFIX[proto]}:{','.join(str(p) for p in sorted(ports))}"
+                    for proto, ports in sorted(by_proto.items()))
+
+
+def plan_batches(open_ports: Mapping[str, List[str]],
+                 max_batches: int = DEFAULT_BATCHES) -> List[Tuple[frozenset, List[str]]]:
+    """按端口集合分组，再贪心合并为不超过max_batches个批次
+
+    合并时选择新增探测数 (端口并集超出部分 x 主机数) 最少的批次
+    """
+    groups: Dict[frozenset, List[str]] = {}
+    for ip, entries in open_ports.items():
+        if entries:
+            groups.setdefault(frozenset(entries), []).append(ip)
+
+    batches: List[Tuple[frozenset, List[str]]] = []
+    for ports, hosts in sorted(groups.items(), key=lambda item: -len(item[1])):
+        if len(batches) < max_batches:
+            batches.append((ports, list(hosts)))
+            continue
+
+        def extra(batch):
+            union = batch[0] | ports
+            return len(union - batch[0]) * len(batch[1]) + len(union - ports) * len(hosts)
+
+        index = min(range(len(batches)), key=lambda i: extra(batches[i]))
+        batch_ports, batch_hosts = batches[index]
+        batches[index] = (batch_ports | ports, batch_hosts + hosts)
+    return batches
+
+
+def service_info(port: ET.Element) -> Dict:
+    state = port.find('state')
+    service = port.find('service')
+    info = {'state': state.get('state') if state is not None else 'unknown'}
+    if service is not None:
+        for key in ('name', 'product', 'version', 'extrainfo', 'tunnel'):
+            if service.get(key):
+                info[key] = service.get(key)
+    return info
+
+
+def iter_nmap_hosts(stream, on_times: Optional[Callable[[str, float, float], None]] = None
+                    ) -> Iterator[Tuple[str, Dict[str, Dict]]]:
+    """增量解析nmap XML，产出 (ip, {"80/tcp": {...}})，处理完的元素立即释放
+
+    on_times(ip, srtt_ms, rttvar_ms) 接收nmap对该主机测得的RTT (<times>，单位微秒)
+    """
+    context = ET.iterparse(stream, events=('start', 'end'))
+    root = None
+    for event, elem in context:
+        if root is None and event == 'start':
+            root = elem
+        if event != 'end' or elem.tag != 'host':
+            continue
+        ip = None
+        for address in elem.findall('address'):
+            if address.get('addrtype') == 'ipv4':
+                ip = address.get('addr')
+        services = {}
+        for port in elem.iter('port'):
+            services[f"{port.get('portid')}/{port.get('protocol')}"] = service_info(port)
+        times = elem.find('times')
+        if ip and on_times and times is not None:
+            try:
+                on_times(ip, int(times.get('srtt')) / 1000, int(times.get('rttvar')) / 1000)
+            except (TypeError, ValueError):
+                pass
+        if ip:
+            yield ip, services
+        elem.clear()
+        root.clear()
+
+
+def scan_batch(ports: Iterable[str], hosts: List[str], timeout: float = 300,
+               extra_args: Iterable[str] = (), on_times=None) -> Tuple[Dict[str, Dict[str, Dict]], bool]:
+    """对一批主机运行一次nmap -sV，返回 (每主机服务信息, 是否超时)"""
+    target_file = tempfile.NamedTemporaryFile('w', suffix='.txt', prefix='nmap_targets_', delete=False)
+    with target_file:
+        target_file.write("\n".join(hosts) + "\n")
+    port_spec = port_argument(ports)
+    cmd = ['nmap', '-sV', '-Pn', '-n', '-p', port_spec, '-iL', target_file.name, '-oX', '-',
+           *extra_args]
+    if 'U:' in port_spec:
+        cmd.insert(1, '-sU')
+        if 'T:' in port_spec:
+            cmd.insert(1, '-sS')
+
+    results: Dict[str, Dict[str, Dict]] = {}
+    timed_out = threading.Event()
+    try:
+        with get_governor().popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+            def kill():
+                timed_out.set()
+                proc.kill()
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            try:
+                for ip, services in iter_nmap_hosts(proc.stdout, on_times):
+                    results.setdefault(ip, {}).update(services)
+            except ET.ParseError:
+                # 被超时终止时XML不完整，保留已解析的主机
+                if not timed_out.is_set():
+                    raise
+            finally:
+                timer.cancel()
+    finally:
+        os.unlink(target_file.name)
+    return results, timed_out.is_set()
+
+
+def run_service_scan(open_ports: Mapping[str, List[str]], max_batches: int = DEFAULT_BATCHES,
+                     timeout: float = 300, on_times=None) -> Dict:
+    """分批并发执行服务识别 (并发数受资源管控器的nmap上限约束)"""
+    batches = plan_batches(open_ports, max_batches)
+    services: Dict[str, Dict[str, Dict]] = {}
+    summary = {'batches': len(batches), 'hosts': 0, 'timed_out_batches': 0, 'errors': []}
+    if not batches:
+        return {'services': services, **summary}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(batches)) as executor:
+        futures = [executor.submit(scan_batch, ports, hosts, timeout, (), on_times) for ports, hosts in batches]
+        for (ports, hosts), future in zip(batches, futures):
+            try:
+                results, timed_out = future.result()
+            except (OSError, ET.ParseError) as e:
+                summary['errors'].append(str(e))
+                continue
+            summary['timed_out_batches'] += timed_out
+            for ip, found in results.items():
+                # 只合并该主机在masscan中出现过的端口，批次合并带来的额外端口丢弃
+                wanted = set(open_ports.get(ip, ()))
+                merged = {key: info for key, info in found.items() if key in wanted}
+                if merged:
+                    services.setdefault(ip, {}).update(merged)
+    summary['hosts'] = len(services)
+    summary['seconds'] = round(time.perf_counter() - started, 3)
+    # 批次合并后实际探测的 (主机, 端口) 数，供 --plan 按探测数校准耗时
+    summary['probes'] = sum(len(ports) * len(hosts) for ports, hosts in batches)
+    logging.info(f"服务识别完成: {summary}",
+                 extra={'tool': 'nmap-sV', 'elapsed': summary['seconds'],
+                        'probes': summary['probes'], 'batches': summary['batches']})
+    return {'services': services, **summary}
+
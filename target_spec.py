@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+目标表达式解析与惰性展开
+支持单个IP、CIDR、IP范围 (10.0.0.1-10.0.0.50 / 10.0.0.1-50)、@文件 以及排除列表，
+内部只保存合并后的整数区间；按生成器逐个产出地址，
+随机顺序使用Feistel网络 + 循环行走构造的伪随机置换 (内存O(1))，
+并可按序号切分为互不重叠的分片
+
+    spec = TargetSpec(['10.0.0.0/8', '@extra.txt'], exclude=['10.1.0.0/16'],
+                      randomize=True, seed=1)
+    for ip in spec.shard(0, 4):
+        ...
+"""
+
+import bisect
+import ipaddress
+import random
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# Feistel轮数，4轮已足以打散相邻序号
+_ROUNDS = 4
+_MIX = 0x9E3779B97F4A7C15
+_MASK64 = (1 << 64) - 1
+# 主机名的单个标签
+_LABEL_RE = re.compile(r'[A-Za-z0-9_-]+')
+# 范围的结束部分: 完整地址或最后一个字节
+_RANGE_END_RE = re.compile(r'\d+(\.\d+){3}|\d+')
+
+
+def _parse_ip(text: str) -> int:
+    return int(ipaddress.IPv4Address(text))
+
+
+def _parse_range(spec: str) -> Optional[Tuple[int, int]]:
+    """解析 10.0.0.1-10.0.0.50 / 10.0.0.1-50，'-' 两侧不是地址/字节时返回None (按主机名处理)"""
+    start_text, end_text = spec.split('-', 1)
+    if not _RANGE_END_RE.fullmatch(end_text):
+        return None
+    try:
+        start = _parse_ip(start_text)
+    except ValueError:
+        return None
+    if '.' in end_text:
+        end = _parse_ip(end_text)
+    elif int(end_text) > 255:
+        raise ValueError(f"无效的地址范围: {spec}")
+    else:
+        end = (start & 0xFFFFFF00) | int(end_text)
+    if end < start:
+        raise ValueError(f"无效的地址范围: {spec}")
+    return start, end
+
+
+def parse_spec(spec: str) -> Tuple[List[Tuple[int, int]], List[str]]:
+    """解析单个目标表达式，返回 (闭区间列表, 无法解析为地址的主机名)"""
+    spec = spec.strip()
+    if not spec:
+        return [], []
+    if spec.startswith('@'):
+        return _parse_file(spec[1:])
+    if '/' in spec:
+        network = ipaddress.IPv4Network(spec, strict=False)
+        return [(int(network.network_address), int(network.broadcast_address))], []
+    if '-' in spec:
+        span = _parse_range(spec)
+        if span is not None:
+            return [span], []
+    try:
+        value = _parse_ip(spec)
+    except ValueError:
+        if not all(_LABEL_RE.fullmatch(label) for label in spec.rstrip('.').split('.')):
+            raise ValueError(f"无法解析的目标: {spec}")
+        # 主机名原样保留，交给ping等工具自行解析
+        return [], [spec]
+    return [(value, value)], []
+
+
+def _parse_file(path: str) -> Tuple[List[Tuple[int, int]], List[str]]:
+    """读取目标文件，每行可含多个以空格或逗号分隔的表达式，#后为注释"""
+    ranges, names = [], []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            for item in line.split('#', 1)[0].replace(',', ' ').split():
+                if item.startswith('@'):
+                    raise ValueError(f"目标文件中不支持嵌套引用: {item}")
+                item_ranges, item_names = parse_spec(item)
+                ranges.extend(item_ranges)
+                names.extend(item_names)
+    return ranges, names
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_ranges(ranges: List[Tuple[int, int]],
+                    excluded: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """从已合并的区间中扣除已合并的排除区间"""
+    result = []
+    index = 0
+    for start, end in ranges:
+        while index < len(excluded) and excluded[index][1] < start:
+            index += 1
+        cursor = start
+        probe = index
+        while probe < len(excluded) and excluded[probe][0] <= end:
+            ex_start, ex_end = excluded[probe]
+            if ex_start > cursor:
+                result.append((cursor, ex_start - 1))
+            cursor = max(cursor, ex_end + 1)
+            probe += 1
+        if cursor <= end:
+            result.append((cursor, end))
+    return result
+
+
+class Permutation:
+    """[0, n) 上的伪随机双射
+
+    在 2^bits >= n 的定义域上做平衡Feistel，结果超出n时继续迭代 (cycle walking)；
+    定义域最多为4n，平均迭代次数不超过4，只保存轮密钥
+    """
+
+    def __init__(self, n: int, seed: Optional[int] = None):
+        self.n = n
+        bits = max((n - 1).bit_length(), 2)
+        bits += bits & 1
+        self.half = bits // 2
+        self.mask = (1 << self.half) - 1
+        rng = random.Random(seed)
+        self.keys = [rng.getrandbits(64) for _ in range(_ROUNDS)]
+
+    def __call__(self, index: int) -> int:
+        half, mask, keys, n = self.half, self.mask, self.keys, self.n
+        x = index
+        while True:
+            left, right = x >> half, x & mask
+            for key in keys:
+                h = ((right ^ key) * _MIX) & _MASK64
+                left, right = right, left ^ ((h ^ (h >> 29)) & mask)
+            x = (left << half) | right
+            if x < n:
+                return x
+
+
+class TargetSpec:
+    """惰性目标集合: 只保存区间，按需产出地址字符串"""
+
+    def __init__(self, specs: Iterable[str] = (), exclude: Iterable[str] = (),
+                 randomize: bool = False, seed: Optional[int] = None,
+                 shard: Tuple[int, int] = (0, 1)):
+        self.specs = list(specs)
+        self.exclude = list(exclude)
+        self.randomize = randomize
+        self.seed = seed if seed is not None else random.getrandbits(32)
+        self.shard_index, self.shard_count = shard
+        if not 0 <= self.shard_index < self.shard_count:
+            raise ValueError(f"无效的分片: {self.shard_index}/{self.shard_count}")
+
+        ranges, names = [], []
+        for spec in self.specs:
+            spec_ranges, spec_names = parse_spec(spec)
+            ranges.extend(spec_ranges)
+            names.extend(spec_names)
+        excluded, excluded_names = [], set()
+        for spec in self.exclude:
+            spec_ranges, spec_names = parse_spec(spec)
+            excluded.extend(spec_ranges)
+            excluded_names.update(spec_names)
+
+        self.ranges = subtract_ranges(merge_ranges(ranges), merge_ranges(excluded))
+        self.names = [name for name in dict.fromkeys(names) if name not in excluded_names]
+        # 每个区间起点对应的全局序号，用于序号 -> 地址的二分查找
+        self._offsets = []
+        total = 0
+        for start, end in self.ranges:
+            self._offsets.append(total)
+            total += end - start + 1
+        self.address_count = total
+        self.total = total + len(self.names)
+        self._permutation = Permutation(self.total, self.seed) if self.total else None
+
+    @classmethod
+    def from_list(cls, targets: Iterable[str]) -> 'TargetSpec':
+        return cls(list(targets))
+
+    def shard(self, index: int, count: int) -> 'TargetSpec':
+        """返回第index个分片 (共count个)，各分片互不重叠且合起来覆盖全部目标"""
+        view = object.__new__(TargetSpec)
+        view.__dict__.update(self.__dict__)
+        view.shard_index, view.shard_count = index, count
+        if not 0 <= index < count:
+            raise ValueError(f"无效的分片: {index}/{count}")
+        return view
+
+    def __len__(self) -> int:
+        if self.total <= self.shard_index:
+            return 0
+        return (self.total - self.shard_index + self.shard_count - 1) // self.shard_count
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    def __contains__(self, target: str) -> bool:
+        """判断目标是否属于整个集合 (不区分分片)"""
+        try:
+            value = _parse_ip(target)
+        except ValueError:
+            return target in self.names
+        pos = bisect.bisect_right(self.ranges, (value, 0xFFFFFFFF)) - 1
+        return pos >= 0 and self.ranges[pos][0] <= value <= self.ranges[pos][1]
+
+    def target_at(self, index: int) -> str:
+        """全局序号 (未置换、未分片) 对应的目标"""
+        if index >= self.address_count:
+            return self.names[index - self.address_count]
+        pos = bisect.bisect_right(self._offsets, index) - 1
+        return str(ipaddress.IPv4Address(self.ranges[pos][0] + index - self._offsets[pos]))
+
+    def iter_ints(self) -> Iterator[int]:
+        """按本分片顺序产出地址的整数形式 (不含主机名)"""
+        for index in self._indices():
+            if index < self.address_count:
+                pos = bisect.bisect_right(self._offsets, index) - 1
+                yield self.ranges[pos][0] + index - self._offsets[pos]
+
+    def _indices(self) -> Iterator[int]:
+        positions = range(self.shard_index, self.total, self.shard_count)
+        if not self.randomize:
+            return iter(positions)
+        return map(self._permutation, positions)
+
+    def __iter__(self) -> Iterator[str]:
+        if not self.randomize and self.shard_count == 1:
+            # 顺序遍历时直接走区间，避免逐个二分查找
+            for start, end in self.ranges:
+                for value in range(start, end + 1):
+                    yield str(ipaddress.IPv4Address(value))
+            yield from self.names
+            return
+        for index in self._indices():
+            yield self.target_at(index)
+
+    def range_strings(self) -> List[str]:
+        """masscan可直接读取的区间列表 (仅在未分片时与迭代结果一致)"""
+        result = []
+        for start, end in self.ranges:
+            first = str(ipaddress.IPv4Address(start))
+            result.append(first if start == end else f"{first}-{ipaddress.IPv4Address(end)}")
+        return result
+
+    def __str__(self) -> str:
+        text = ", ".join(self.specs[:5]) + (" ..." if len(self.specs) > 5 else "")
+        if self.exclude:
+            text += f" (排除 {', '.join(self.exclude[:5])})"
+        if self.shard_count > 1:
+            text += f" [分片 {self.shard_index + 1}/{self.shard_count}]"
+        return f"{text} 共 {len(self)} 个目标"
+
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+带截止时间的优先级调度
+按优先级 (网关 > 疑似路由器 > 普通主机) 顺序执行测试任务，
+把全局时间预算按各任务的预估耗时切分为每个任务的截止时间；
+预算不足时截短正在执行的低优先级任务，放不下的任务直接跳过，
+每个任务的结果 (完成/截短/超时/跳过/失败/出错) 都记录到报告中
+
+少量高优先级任务放在堆中，大量普通任务以惰性任务流的形式追加，
+执行到时才创建，目标很多时不会预先为每个 目标×工具 生成任务
+"""
+
+import heapq
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+PRIORITY_GATEWAY = 0
+PRIORITY_ROUTER = 1
+PRIORITY_HOST = 2
+PRIORITY_NAMES = {PRIORITY_GATEWAY: 'gateway', PRIORITY_ROUTER: 'router', PRIORITY_HOST: 'host'}
+
+# 实际耗时达到分配时长的该比例即视为被截止时间打断
+_DEADLINE_HIT = 0.95
+
+
+class TaskFailed(Exception):
+    """任务未产生结果 (工具未安装、超时、出错)，status为记录到报告中的状态"""
+
+    def __init__(self, message: str, status: str = 'failed'):
+        super().__init__(message)
+        self.status = status
+
+
+class ScheduledTask:
+    __slots__ = ('target', 'tool', 'run', 'priority', 'timeout', 'estimate', 'min_time', 'seq')
+
+    def __init__(self, target: str, tool: str, run: Callable[[float], object], priority: int,
+                 timeout: float, estimate: float, min_time: float, seq: int):
+        self.target = target
+        self.tool = tool
+        self.run = run
+        self.priority = priority
+        self.timeout = timeout
+        self.estimate = estimate
+        self.min_time = min_time
+        self.seq = seq
+
+
+class DeadlineScheduler:
+    """顺序执行任务；budget为None时各任务使用自身的默认超时"""
+
+    def __init__(self, budget: Optional[float] = None, pause: float = 0.0):
+        self.budget = budget
+        self.pause = pause
+        self.records: List[Dict] = []
+        # 任务总数 (含尚未产出的任务流)
+        self.total = 0
+        self._heap: List[Tuple[int, int, ScheduledTask]] = []
+        # (任务参数迭代器, 剩余任务数, 单个任务的预估耗时)
+        self._streams: List[List] = []
+        # 尚未执行的任务的预估耗时之和，用于按比例分配剩余预算
+        self._pending = 0.0
+
+    def _task(self, target: str, tool: str, run: Callable[[float], object],
+              priority: int = PRIORITY_HOST, timeout: float = 60,
+              estimate: Optional[float] = None, min_time: Optional[float] = None) -> ScheduledTask:
+        estimate = min(estimate or timeout, timeout)
+        min_time = min(min_time or estimate, estimate)
+        return ScheduledTask(target, tool, run, priority, timeout, estimate, min_time, self.total)
+
+    def add(self, target: str, tool: str, run: Callable[[float], object],
+            priority: int = PRIORITY_HOST, timeout: float = 60,
+            estimate: Optional[float] = None, min_time: Optional[float] = None):
+        """添加任务，run(timeout) 需在timeout秒内返回"""
+        task = self._task(target, tool, run, priority, timeout, estimate, min_time)
+        heapq.heappush(self._heap, (task.priority, task.seq, task))
+        self.total += 1
+        self._pending += task.estimate
+
+    def add_stream(self, tasks: Iterable[Tuple], count: int, estimate: float):
+        """追加惰性任务流，在堆中的任务之后按产出顺序执行
+
+        tasks逐个产出 add() 的位置参数；count为任务数，
+        estimate为单个任务的平均预估耗时，二者只用于分配预算和显示进度
+        """
+        if count <= 0:
+            return
+        self._streams.append([iter(tasks), count, estimate])
+        self.total += count
+        self._pending += count * estimate
+
+    def _next(self) -> Optional[ScheduledTask]:
+        if self._heap:
+            task = heapq.heappop(self._heap)[2]
+            self._pending -= task.estimate
+            return task
+        while self._streams:
+            stream = self._streams[0]
+            args = next(stream[0], None)
+            if args is None:
+                # 实际产出的任务少于count时，扣除未产出部分
+                self._pending -= stream[1] * stream[2]
+                self.total -= stream[1]
+                self._streams.pop(0)
+                continue
+            stream[1] -= 1
+            self._pending -= stream[2]
+            return self._task(*args)
+        return None
+
+    def _has_next(self) -> bool:
+        return bool(self._heap) or any(stream[1] > 0 for stream in self._streams)
+
+    def run(self) -> List[Dict]:
+        started = time.monotonic()
+        end = started + self.budget if self.budget is not None else None
+        count = 0
+
+        while True:
+            task = self._next()
+            if task is None:
+                break
+            count += 1
+            record = {
+                'target': task.target,
+                'tool': task.tool,
+                'priority': PRIORITY_NAMES.get(task.priority, str(task.priority)),
+                'timeout': task.timeout,
+            }
+            self.records.append(record)
+
+            allotted = task.timeout
+            if end is not None:
+                remaining = end - time.monotonic()
+                if remaining < task.min_time:
+                    record.update(status='skipped', allotted=0, elapsed=0,
+                                  reason=f"剩余预算 {max(remaining, 0):.1f}s 少于最短所需 {task.min_time:.1f}s")
+                    logging.info(f"跳过任务: {task.tool} {task.target} ({record['reason']})")
+                    continue
+                # 按预估耗时占比分配剩余预算，低优先级任务排在后面，先被压缩
+                pending = max(self._pending, 0.0) + task.estimate
+                share = remaining * task.estimate / pending
+                allotted = min(task.timeout, max(share, task.min_time), remaining)
+
+            begin = time.monotonic()
+            try:
+                task.run(allotted)
+                status = 'done'
+            except TaskFailed as e:
+                status = e.status
+                record['reason' if status == 'skipped' else 'error'] = str(e)
+                logging.warning(f"任务未完成: {task.tool} {task.target} ({status}: {e})")
+            except Exception as e:
+                status = 'error'
+                record['error'] = str(e)
+                logging.error(f"任务出错: {task.tool} {task.target}, 异常: {e}")
+            elapsed = time.monotonic() - begin
+            if status == 'done' and elapsed >= allotted * _DEADLINE_HIT:
+                status = 'truncated' if allotted < task.timeout else 'timeout'
+            record.update(status=status, allotted=round(allotted, 2), elapsed=round(elapsed, 2))
+
+            if self.pause and self._has_next():
+                if end is None or end - time.monotonic() > self.pause:
+                    time.sleep(self.pause)
+
+        total = time.monotonic() - started
+        logging.info(f"调度完成: {count} 个任务, 用时 {total:.1f}s, {self.summary()}")
+        return self.records
+
+    def summary(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for record in self.records:
+            counts[record['status']] = counts.get(record['status'], 0) + 1
+        return counts
@@ -0,0 +1,48 @@
+"""测试直接导入仓库根目录下的模块"""
+
+import os
+import shutil
+import sys
+import textwrap
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CAP_NET_ADMIN = 12
+
+
+def has_net_admin() -> bool:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('CapEff:'):
+                    return bool(int(line.split()[1], 16) >> CAP_NET_ADMIN & 1)
+    except OSError:
+        pass
+    return False
+
+
+@pytest.fixture
+def net_admin():
+    """创建veth/命名空间的测试需要CAP_NET_ADMIN和iproute2，否则跳过"""
+    if not has_net_admin() or not shutil.which('ip'):
+        pytest.skip("需要CAP_NET_ADMIN和iproute2")
+
+
+@pytest.fixture
+def stub_tool(tmp_path, monkeypatch):
+    """stub_tool(name, body): 安装由当前Python解释器执行的替身工具
+
+    PATH只包含替身目录，没有安装替身的工具视为未安装，测试结果与本机装了哪些工具无关
+    """
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    monkeypatch.setenv('PATH', str(bin_dir))
+
+    def install(name, body):
+        script = bin_dir / name
+        script.write_text(f"#!{sys.executable}\n" + textwrap.dedent(body))
+        script.chmod(0o755)
+        return script
+    return install
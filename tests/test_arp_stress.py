@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+import arp_stress
+from arp_stress import arp_scan, is_router, ping_device, run_arp_stress, stress_device
+from rtt_model import TimingModel
+
+ARP_SCAN = """
+    import sys
+    print("Interface: eth0, type: EN10MB")
+    print("10.99.0.1\\t00:0C:29:AA:BB:01\\tCisco Systems")
+    print("10.99.0.7\\t02:00:00:00:00:07\\t")
+    print("10.99.0.7\\t02:00:00:00:00:07\\t(DUP: 2)")
+    print("10.99.0.254\\t02:00:00:00:00:fe\\tStub Vendor")
+    print("3 packets received by filter")
+"""
+
+PING = """
+    import sys
+    with open({log!r}, 'a') as f:
+        f.write(sys.argv[-1] + "\\n")
+    print("5 packets transmitted, 4 received, 20% packet loss, time 4ms")
+    print("rtt min/avg/max/mdev = 0.100/0.200/0.300/0.050 ms")
+"""
+
+
+PING_ARGS = """
+    import sys
+    with open({log!r}, 'a') as f:
+        f.write(" ".join(sys.argv[1:]) + "\\n")
+    print("5 packets transmitted, 5 received, 0% packet loss, time 4ms")
+"""
+
+PING_HANG = """
+    import time
+    time.sleep(30)
+"""
+
+PING_LOST = """
+    print("5 packets transmitted, 0 received, 100% packet loss, time 4ms")
+"""
+
+
+def test_is_router():
+    assert is_router('192.168.1.1', 'Unknown')
+    assert is_router('192.168.1.254', 'Unknown')
+    assert is_router('192.168.1.20', 'TP-Link Technologies')
+    assert not is_router('192.168.1.20', 'Dell Inc.')
+    assert not is_router('192.168.1.11', 'Unknown')
+
+
+def test_arp_scan_parses_and_dedupes(stub_tool):
+    stub_tool('arp-scan', ARP_SCAN)
+    devices = arp_scan('10.99.0.0/24')
+    assert devices == [
+        {'ip': '10.99.0.1', 'mac': '00:0c:29:aa:bb:01', 'vendor': 'Cisco Systems', 'is_router': True},
+        {'ip': '10.99.0.7', 'mac': '02:00:00:00:00:07', 'vendor': 'Unknown', 'is_router': False},
+        {'ip': '10.99.0.254', 'mac': '02:00:00:00:00:fe', 'vendor': 'Stub Vendor', 'is_router': True},
+    ]
+
+
+def test_ping_device(stub_tool, tmp_path):
+    stub_tool('ping', PING.format(log=str(tmp_path / 'ping.log')))
+    result = ping_device('10.99.0.7', count=5)
+    assert result['success'] and (result['sent'], result['received']) == (5, 4)
+    assert result['loss_percent'] == 20.0
+    assert (result['rtt_avg'], result['rtt_max']) == (0.2, 0.3)
+
+
+def test_ping_device_all_lost(stub_tool):
+    stub_tool('ping', PING_LOST)
+    result = ping_device('10.99.0.7', count=5)
+    assert not result['success'] and (result['sent'], result['received']) == (5, 0)
+    assert result['loss_percent'] == 100.0 and 'rtt_avg' not in result
+
+
+def test_ping_device_timeout_from_model(stub_tool, tmp_path):
+    log = tmp_path / 'ping.log'
+    stub_tool('ping', PING_ARGS.format(log=str(log)))
+    timing = TimingModel()
+    timing.observe('10.99.0.7', 200.0)
+    result = ping_device('10.99.0.7', count=5, timing=timing)
+    assert result['success']
+    # ping的截止时间 (-w) 取自RTT模型，运行记入模型
+    deadline = int(timing.timeout_for('10.99.0.7', 'ping', 5 * 0.2))
+    assert log.read_text().split()[:6] == ['-c', '5', '-i', '0.2', '-w', str(deadline)]
+    assert [(run['tool'], run['outcome']) for run in timing.runs] == [('ping', 'done')]
+
+
+def test_ping_device_retries_with_backoff(stub_tool, monkeypatch):
+    stub_tool('ping', PING_HANG)
+    monkeypatch.setattr(arp_stress, 'PING_GRACE', 0)
+    timing = TimingModel()
+    result = ping_device('10.99.0.7', count=5, timeout=0.3, timing=timing)
+    assert not result['success']
+    # 未知主机重试一次，超时加倍
+    assert [(run['outcome'], run['timeout']) for run in timing.runs] == [('timeout', 0.3), ('timeout', 0.6)]
+
+
+def test_stress_device_missing_tool(stub_tool):
+    results = stress_device({'ip': '10.99.0.7', 'is_router': False}, ['hping'], count=5)
+    assert results == [{'target': '10.99.0.7', 'success': False, 'test_type': 'HPING_SYN',
+                        'sent': 0, 'received': None, 'loss_percent': None,
+                        'error': 'hping3未安装', 'is_router': False}]
+
+
+def test_run_arp_stress_routers_first(stub_tool, tmp_path):
+    log = tmp_path / 'ping.log'
+    stub_tool('ping', PING.format(log=str(log)))
+    devices = [{'ip': f'10.99.0.{i}', 'is_router': i in (1, 254)} for i in (5, 6, 1, 7, 254)]
+    done = []
+    lock = threading.Lock()
+
+    def on_done(results):
+        with lock:
+            done.append(results[0]['target'])
+
+    results = run_arp_stress(devices, ['ping'], count=5, workers=1, on_done=on_done)
+    assert [r['target'] for r in results] == [d['ip'] for d in devices]
+    assert [r['is_router'] for r in results] == [d['is_router'] for d in devices]
+    assert log.read_text().split()[:2] == ['10.99.0.1', '10.99.0.254']
+    assert sorted(done) == sorted(d['ip'] for d in devices)
+    assert run_arp_stress([], ['ping']) == []
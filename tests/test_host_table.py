@@ -0,0 +1,89 @@
+import pytest
+
+from host_table import HostTable, pack_mac, unpack_mac
+
+
+def test_add_and_lookup():
+    table = HostTable()
+    table.add('10.0.0.1', 'aa:bb:cc:dd:ee:01', 'Cisco')
+    table.add('10.0.0.2', 'aa:bb:cc:dd:ee:02', 'Cisco')
+    table.add('10.0.0.3', 'Unknown', 'Unknown')
+
+    assert len(table) == 3
+    assert table.by_ip('10.0.0.2') == {'ip': '10.0.0.2', 'mac': 'aa:bb:cc:dd:ee:02', 'vendor': 'Cisco'}
+    assert table.by_ip('10.0.0.9') is None
+    assert table.by_ip('not-an-ip') is None
+    assert table.by_mac('aa:bb:cc:dd:ee:01')['ip'] == '10.0.0.1'
+    assert table[2]['mac'] == 'Unknown'
+    assert table[-1]['ip'] == '10.0.0.3'
+    assert '10.0.0.1' in table and {'ip': '10.0.0.3'} in table
+    assert table.ips() == ['10.0.0.1', '10.0.0.2', '10.0.0.3']
+    assert table.vendor_counts() == {'Cisco': 2, 'Unknown': 1}
+    with pytest.raises(IndexError):
+        table[3]
+
+
+def test_update_keeps_row():
+    table = HostTable()
+    table.add('10.0.0.1', 'Unknown')
+    table.add('10.0.0.1', 'aa:bb:cc:dd:ee:01', 'Dell')
+    table.add('10.0.0.1', 'aa:bb:cc:dd:ee:02', 'Dell')
+    assert len(table) == 1
+    assert table.by_mac('aa:bb:cc:dd:ee:01') is None
+    assert table.by_mac('aa:bb:cc:dd:ee:02')['vendor'] == 'Dell'
+
+
+def test_unknown_does_not_overwrite_known():
+    table = HostTable()
+    table.add('10.0.0.1', 'aa:bb:cc:dd:ee:01', 'Dell')
+    # 导入和ICMP扫描结果只知道IP，重新添加时保留ARP得到的MAC/厂商
+    table.add('10.0.0.1')
+    table.add_packed(0x0A000001, '', '')
+    assert table.by_ip('10.0.0.1') == {'ip': '10.0.0.1', 'mac': 'aa:bb:cc:dd:ee:01', 'vendor': 'Dell'}
+    table.add('10.0.0.1', 'Unknown', 'Dell Inc.')
+    assert table.by_mac('aa:bb:cc:dd:ee:01')['vendor'] == 'Dell Inc.'
+    table.add('10.0.0.2', 'incomplete')
+    table.add('10.0.0.2')
+    assert table.by_ip('10.0.0.2')['mac'] == 'incomplete'
+
+
+def test_mac_index_drops_stale_entries():
+    table = HostTable()
+    table.add('10.0.0.1', unpack_mac(1))
+    for i in range(2, 1001):
+        table.add('10.0.0.1', unpack_mac(i) if i % 3 else 'incomplete')
+    # 扩容时只按当前列值重建，旧MAC的项不会累积
+    assert len(table._by_mac._table) <= 16
+    assert table.by_mac(unpack_mac(1000))['ip'] == '10.0.0.1'
+    assert table.by_mac(unpack_mac(998)) is None
+
+
+@pytest.mark.parametrize('mac', ['00:0C:29:AB:CD:EF', '00-0c-29-ab-cd-ef', '00:0c:29:ab:cd:ef'])
+def test_mac_normalized(mac):
+    table = HostTable()
+    table.add('192.168.1.10', mac, 'VMware')
+    assert table[0]['mac'] == '00:0c:29:ab:cd:ef'
+    assert table.by_mac('00:0C:29:AB:CD:EF')['ip'] == '192.168.1.10'
+    assert table.by_mac('00:0c:29:ab:cd:ef')['ip'] == '192.168.1.10'
+
+
+def test_pack_mac():
+    assert pack_mac('00:0C:29:AB:CD:EF') == 0x000C29ABCDEF
+    assert unpack_mac(0x000C29ABCDEF) == '00:0c:29:ab:cd:ef'
+    assert pack_mac('Unknown') is None
+    assert pack_mac('00:0c:29:ab:cd') is None
+
+
+def test_roundtrip_and_clear():
+    hosts = [{'ip': f'10.1.0.{i}', 'mac': unpack_mac(0x001122000000 + i), 'vendor': f'V{i % 3}'}
+             for i in range(1, 200)]
+    table = HostTable(hosts)
+    assert table.to_list() == hosts
+    assert table[10:12] == hosts[10:12]
+
+    table.clear()
+    assert len(table) == 0
+    assert table.by_ip('10.1.0.1') is None
+    assert table.by_mac(hosts[0]['mac']) is None
+    table.add('10.1.0.1', hosts[0]['mac'])
+    assert table.by_mac(hosts[0]['mac'])['ip'] == '10.1.0.1'
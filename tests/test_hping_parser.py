@@ -0,0 +1,59 @@
+from hping_parser import HpingStats, run_hping
+
+REPLY = "len=46 ip=10.0.0.1 ttl=64 DF id=0 sport=0 flags={flags} seq={seq} win=0 rtt={rtt} ms\n"
+
+
+def test_feed_counts_flags_duplicates_and_reordering():
+    stats = HpingStats('10.0.0.1', expected=5)
+    stats.feed(REPLY.format(flags='SA', seq=0, rtt=1.0))
+    stats.feed(REPLY.format(flags='RA', seq=2, rtt=1.5))
+    stats.feed(REPLY.format(flags='SA', seq=1, rtt=2.0))
+    stats.feed(REPLY.format(flags='SA', seq=1, rtt=2.0))
+    stats.feed("--- 10.0.0.1 hping statistic ---\n")
+    stats.feed("5 packets transmitted, 3 packets received, 40% packet loss\n")
+
+    result = stats.to_dict()
+    assert result['sent'] == 5 and result['received'] == 3
+    assert result['flags'] == {'SA': 2, 'RA': 1, 'other': 0, 'timeout': 2}
+    assert result['loss_percent'] == 40.0
+    assert result['duplicates'] == 1 and result['out_of_order'] == 1
+
+
+def test_seq_wrap():
+    stats = HpingStats('10.0.0.1')
+    stats.feed(REPLY.format(flags='SA', seq=65535, rtt=1.0))
+    stats.feed(REPLY.format(flags='SA', seq=0, rtt=1.0))
+    assert stats.seq_wraps == 1 and stats.duplicates == 0
+    assert stats.sent_at_least() == 65537
+
+
+def test_no_summary_without_timeout_falls_back_to_expected():
+    stats = HpingStats('10.0.0.1', expected=10)
+    stats.feed(REPLY.format(flags='SA', seq=0, rtt=1.0))
+    result = stats.to_dict()
+    assert result['sent'] == 10 and result['loss_percent'] == 90.0
+
+
+def test_timeout_marks_sent_unknown():
+    stats = HpingStats('10.0.0.1', expected=1000)
+    for seq in range(3):
+        stats.feed(REPLY.format(flags='SA', seq=seq, rtt=1.0))
+    stats.timed_out = True
+    result = stats.to_dict()
+    assert result['sent'] is None and result['loss_percent'] is None
+    assert result['flags']['timeout'] is None
+    assert result['sent_at_least'] == 3 and result['received'] == 3
+
+
+def test_run_hping_killed_on_timeout(stub_tool):
+    stub_tool('hping3', """
+        import time
+        for seq in range(2):
+            print("len=46 ip=127.0.0.1 ttl=64 flags=RA seq=%d win=0 rtt=0.1 ms" % seq, flush=True)
+        time.sleep(30)
+    """)
+
+    result = run_hping('127.0.0.1', count=1000, timeout=0.5)
+    assert result['timed_out']
+    assert result['received'] == 2 and result['flags']['RA'] == 2
+    assert result['sent'] is None and result['loss_percent'] is None
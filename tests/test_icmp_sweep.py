@@ -0,0 +1,129 @@
+import multiprocessing
+import os
+import socket
+import statistics
+import time
+
+import pytest
+
+from icmp_sweep import (ICMP_ECHO_REQUEST, HostStats, IcmpSweeper, checksum, echo_request,
+                        loopback_hosts)
+
+DEAD = ['198.51.100.1', '198.51.100.2', '198.51.100.3']
+
+
+def open_sweeper(**options):
+    try:
+        return IcmpSweeper(**options)
+    except PermissionError as e:
+        pytest.skip(str(e))
+
+
+def busy_loop():
+    while True:
+        pass
+
+
+def p99(values):
+    return statistics.quantiles(values, n=100)[98]
+
+
+def test_echo_request_checksum():
+    packet = echo_request(0x1234, 7)
+    assert packet[0] == ICMP_ECHO_REQUEST
+    # 校验和正确的报文整体再求校验和为0
+    assert checksum(packet) == 0
+    assert loopback_hosts(3) == ['127.1.0.1', '127.1.0.2', '127.1.0.3']
+
+
+def test_loopback_hosts_are_alive():
+    done = []
+    with open_sweeper(interval=0.01) as sweeper:
+        result = sweeper.sweep(['127.0.0.1', '127.1.0.5', '127.0.0.1'], count=3,
+                               on_result=lambda host, stats: done.append(host))
+    assert sorted(done) == ['127.0.0.1', '127.1.0.5']
+    for host in ('127.0.0.1', '127.1.0.5'):
+        stats = result[host]
+        assert stats.alive and (stats.sent, stats.received) == (3, 3) and len(stats.rtts) == 3
+    record = result['127.0.0.1'].to_dict('127.0.0.1')
+    assert record['test_type'] == 'ICMP_SWEEP' and record['loss_percent'] == 0.0
+    assert record['rtt_min'] <= record['rtt_avg'] <= record['rtt_max']
+    assert sweeper.counters['retries'] == 0
+
+
+def test_dead_hosts_are_retried():
+    count, retries = 2, 2
+    with open_sweeper(timeout=0.05, retries=retries, interval=0.01) as sweeper:
+        result = sweeper.sweep(DEAD, count=count)
+    for host in DEAD:
+        stats = result[host]
+        assert not stats.alive
+        # 从未应答的主机每个请求都重试retries次
+        assert stats.sent == count * (retries + 1)
+        assert stats.to_dict(host)['loss_percent'] == 100.0
+    assert sweeper.counters['retries'] == len(DEAD) * count * retries
+
+
+def test_unresolvable_names():
+    done = []
+    with open_sweeper(timeout=0.1, retries=0) as sweeper:
+        result = sweeper.sweep(['no-such-host.invalid', 'localhost'],
+                               on_result=lambda host, stats: done.append(host))
+    missing = result['no-such-host.invalid']
+    assert missing.address is None and missing.sent == 0 and not missing.alive
+    assert missing.to_dict('no-such-host.invalid')['error'] == "无法解析主机名"
+    assert result['localhost'].address == '127.0.0.1' and result['localhost'].alive
+    assert sorted(done) == ['localhost', 'no-such-host.invalid']
+
+
+def test_raw_socket_ignores_other_identifiers():
+    with open_sweeper(sockets=1, backend='raw') as sweeper:
+        item = sweeper.sockets[0]
+        stats = {'127.0.0.1': HostStats('127.0.0.1')}
+        outstanding = {(0, 5): ('127.0.0.1', 0, 0, time.perf_counter(), 0)}
+        finished = []
+        with socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP) as other:
+            # 其他进程 (如ping) 相同seq的应答也会送到原始套接字
+            other.sendto(echo_request(item.ident ^ 0x5a5a, 5), ('127.0.0.1', 0))
+            time.sleep(0.05)
+            sweeper._receive(0, outstanding, stats, finished.append)
+            assert stats['127.0.0.1'].received == 0 and (0, 5) in outstanding
+
+            other.sendto(echo_request(item.ident, 5), ('127.0.0.1', 0))
+            time.sleep(0.05)
+            sweeper._receive(0, outstanding, stats, finished.append)
+    assert stats['127.0.0.1'].received == 1 and not outstanding
+    assert finished == ['127.0.0.1']
+
+
+def test_route_stress_sweep_resolves_hostnames(tmp_path, monkeypatch):
+    open_sweeper().close()
+    monkeypatch.chdir(tmp_path)
+    from route_stress_test import KaliNetworkTester
+
+    tester = KaliNetworkTester()
+    stats = tester.icmp_sweep(['localhost'], timeout=0.5)
+    assert stats['alive'] == 1 and stats['results'][0]['target'] == 'localhost'
+    assert '127.0.0.1' in tester.discovered_hosts
+
+
+def test_kernel_rtt_is_unaffected_by_cpu_contention():
+    targets = loopback_hosts(1000)
+    workers = [multiprocessing.Process(target=busy_loop, daemon=True)
+               for _ in range(2 * (os.cpu_count() or 1))]
+    with open_sweeper(sockets=1, interval=0.005, timestamps=True) as sweeper:
+        if sweeper.timestamping is None:
+            pytest.skip("套接字不支持内核时间戳")
+        for worker in workers:
+            worker.start()
+        try:
+            result = sweeper.sweep(targets)
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+    rtts = [rtt for stats in result.values() for rtt in stats.rtts]
+    kernel = [rtt for stats in result.values() for rtt in stats.kernel_rtts]
+    assert len(rtts) == len(targets) and len(kernel) > len(targets) // 2
+    # 应答在套接字中排队等待调度时，用户态RTT包含等待时间，内核时间戳不包含
+    assert p99(kernel) < p99(rtts)
@@ -0,0 +1,74 @@
+import pytest
+
+from host_table import HostTable
+from ingest import detect_format, ingest_files, plan_chunks, write_sample
+from port_store import PortStore
+
+FORMATS = ('masscan-list', 'masscan-json', 'masscan-binary', 'nmap-xml')
+ENTRIES = [(f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", (22, 80, 443, 53)[i % 4],
+            'udp' if i % 4 == 3 else 'tcp') for i in range(1, 2001)]
+
+
+def expected_store():
+    store = PortStore()
+    for ip, port, proto in ENTRIES:
+        store.add(ip, port, proto)
+    return store
+
+
+def test_plan_chunks():
+    assert plan_chunks(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert plan_chunks(0) == [(0, 0)]
+
+
+@pytest.mark.parametrize('fmt', FORMATS)
+@pytest.mark.parametrize('workers', (1, 2))
+def test_formats_match_across_chunk_boundaries(tmp_path, fmt, workers):
+    path = str(tmp_path / fmt)
+    write_sample(path, fmt, ENTRIES)
+    assert detect_format(path) == fmt
+    store, hosts = PortStore(), HostTable()
+    # 小块大小迫使块边界落在记录中间
+    stats = ingest_files([path], store, hosts, workers=workers, chunk_size=4099)
+    assert stats['chunks'] > 1
+    assert stats['records'] == stats['new_ports'] == len(ENTRIES) and stats['skipped'] == 0
+    assert store.to_dict() == expected_store().to_dict()
+    assert len(hosts) == stats['new_hosts'] == len(ENTRIES)
+
+
+def test_nmap_services_and_existing_mac(tmp_path):
+    path = str(tmp_path / 'scan.xml')
+    path_list = str(tmp_path / 'scan.txt')
+    write_sample(path, 'nmap-xml', ENTRIES[:3])
+    write_sample(path_list, 'masscan-list', ENTRIES[:3])
+    hosts = HostTable()
+    hosts.add(ENTRIES[0][0], '00:11:22:33:44:55', 'Cisco')
+    store, services, seen = PortStore(), {}, []
+    stats = ingest_files([path, path_list], store, hosts, services, workers=1,
+                         on_chunk=lambda path, chunk: seen.append(path))
+    assert seen == [path, path_list]
+    # 重复的端口不计为新端口，已有主机的MAC/厂商不被覆盖
+    assert stats['records'] == 6 and stats['new_ports'] == 3 and stats['new_hosts'] == 2
+    assert hosts.by_ip(ENTRIES[0][0])['vendor'] == 'Cisco'
+    assert services[ENTRIES[0][0]] == {'80/tcp': {'state': 'open', 'name': 'http', 'product': 'nginx'}}
+
+
+def test_bad_records_are_skipped(tmp_path):
+    path = tmp_path / 'bad.txt'
+    path.write_bytes(b'#masscan\nopen tcp 80 10.0.0.1 1700000000\nopen tcp 99999 10.0.0.2 1700000000\n'
+                     b'open xyz 80 10.0.0.3 1700000000\nopen tcp 22 10.0.0.999 1700000000\n# end\n')
+    store, hosts = PortStore(), HostTable()
+    stats = ingest_files([str(path)], store, hosts, workers=1)
+    assert stats['records'] == 1 and stats['skipped'] == 3
+    assert store['10.0.0.1'] == ['80/tcp']
+
+
+def test_empty_and_unknown_files(tmp_path):
+    empty = tmp_path / 'empty.txt'
+    empty.write_bytes(b'')
+    stats = ingest_files([str(empty)], PortStore(), HostTable(), workers=1)
+    assert stats['records'] == 0 and stats['chunks'] == 1
+    unknown = tmp_path / 'notes.txt'
+    unknown.write_text('hello\n')
+    with pytest.raises(ValueError):
+        detect_format(str(unknown))
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import time
+
+import pytest
+
+import load_profile
+import resource_governor
+from load_profile import _run_instance, aggregate, expand_profile, run_profile, validate_profile
+from log_pipeline import setup_logging, shutdown_logging
+from resource_governor import ResourceGovernor
+
+PROFILE = {
+    'name': 'test',
+    'phases': [
+        {'name': 'ramp', 'duration': 4, 'steps': 2,
+         'flows': [{'tool': 'ping', 'rate_start': 1, 'rate': 3}]},
+        {'name': 'spike', 'duration': 2,
+         'flows': [{'tool': 'hping', 'rate': 1000, 'instances': 2}]},
+    ],
+}
+
+
+def _task(tool, rate=10.0, duration=1.0):
+    return {'phase': 'p', 'tool': tool, 'target': '127.0.0.1', 'rate': rate,
+            'offset': 0.0, 'duration': duration}
+
+
+def test_expand_profile():
+    tasks = expand_profile(PROFILE, ['10.0.0.1'])
+    ping = [t for t in tasks if t['tool'] == 'ping']
+    hping = [t for t in tasks if t['tool'] == 'hping']
+    assert [(t['rate'], t['offset'], t['duration']) for t in ping] == [(1.0, 0.0, 2.0), (3.0, 2.0, 2.0)]
+    assert len(hping) == 2 and all(t['offset'] == 4.0 for t in hping)
+    assert load_profile._peak_concurrency(tasks) == 2
+
+
+def test_validate_rejects_bad_profiles(monkeypatch):
+    with pytest.raises(ValueError):
+        validate_profile({'phases': []})
+    with pytest.raises(ValueError):
+        validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'nmap', 'rate': 1}]}]})
+
+    monkeypatch.setattr(os, 'geteuid', lambda: 1000)
+    validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 5}]}]})
+    with pytest.raises(ValueError, match='ping'):
+        validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 10}]}]})
+
+    monkeypatch.setattr(os, 'geteuid', lambda: 0)
+    validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 500}]}]})
+    with pytest.raises(ValueError, match='ping'):
+        validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 1000}]}]})
+    validate_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'hping', 'rate': 10000}]}]})
+
+
+def test_ping_failure_reported(stub_tool):
+    stub_tool('ping', """
+        import sys
+        print("ping: cannot flood; minimal interval allowed for user is 200ms", file=sys.stderr)
+        sys.exit(2)
+    """)
+    result = _run_instance(_task('ping'), time.time())
+    assert 'cannot flood' in result['error'] and '返回码 2' in result['error']
+    assert result['timeline'] == {}
+
+
+def test_ping_timeline(stub_tool):
+    stub_tool('ping', """
+        import sys
+        print("[1.0] 64 bytes from 127.0.0.1: icmp_seq=1 ttl=64 time=0.50 ms")
+        print("[1.1] no answer yet for icmp_seq=2")
+        print("[1.2] 64 bytes from 127.0.0.1: icmp_seq=3 ttl=64 time=1.50 ms")
+        sys.exit(1)
+    """)
+    result = _run_instance(_task('ping'), time.time())
+    assert result['error'] is None
+    (entry,) = result['timeline'].values()
+    assert entry == [3, 2, 2.0]
+
+
+def test_hping_sent_measured(stub_tool):
+    stub_tool('hping3', """
+        print("len=46 ip=127.0.0.1 ttl=64 flags=RA seq=0 win=0 rtt=0.1 ms")
+        print("len=46 ip=127.0.0.1 ttl=64 flags=RA seq=1 win=0 rtt=0.3 ms")
+        print("--- 127.0.0.1 hping statistic ---")
+        print("7 packets transmitted, 2 packets received, 72% packet loss")
+    """)
+    task = _task('hping', rate=1000.0, duration=1.0)
+    result = _run_instance(task, time.time())
+    assert result['error'] is None
+    sent = sum(entry[0] for entry in result['timeline'].values())
+    received = sum(entry[1] for entry in result['timeline'].values())
+    assert (sent, received) == (7, 2)
+
+    summary = aggregate({'phases': [{'name': 'p', 'duration': 1}]}, [task], [result])
+    assert summary['sent'] == 7 and summary['received'] == 2
+    assert summary['loss_percent'] == round(100 * 5 / 7, 2)
+
+
+def test_hping_failure_reported(stub_tool):
+    stub_tool('hping3', """
+        import sys
+        print("[open_sockraw] socket(): Operation not permitted")
+        sys.exit(1)
+    """)
+    result = _run_instance(_task('hping'), time.time())
+    assert 'Operation not permitted' in result['error']
+    assert result['timeline'] == {}
+
+
+def test_silent_tool_killed_at_deadline(stub_tool, monkeypatch):
+    stub_tool('ping', """
+        import time
+        time.sleep(30)
+    """)
+    monkeypatch.setattr(load_profile, 'DEADLINE_GRACE', 0.3)
+    started = time.monotonic()
+    result = _run_instance(_task('ping', duration=0.2), time.time())
+    # 没有任何输出也在截止时间被终止
+    assert time.monotonic() - started < 5
+    assert '截止时间' in result['error'] and result['timeline'] == {}
+
+
+def test_run_profile_logs_from_workers(stub_tool, tmp_path, monkeypatch):
+    stub_tool('ping', """
+        import sys
+        print("ping: socket: Operation not permitted")
+        sys.exit(2)
+    """)
+    monkeypatch.setattr(load_profile, 'START_LEAD', 0.1)
+    log_path = tmp_path / 'profile.log'
+    setup_logging(str(log_path))
+    try:
+        result = run_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 1}]}]},
+                             ['127.0.0.1'], workers=1)
+    finally:
+        shutdown_logging()
+        root = logging.getLogger()
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+    assert 'Operation not permitted' in result['errors'][0]
+    records = [json.loads(line) for line in log_path.read_text(encoding='utf-8').splitlines()]
+    # 子进程中的失败记录经队列由父进程写入同一个日志文件
+    (failure,) = [r for r in records if r['msg'].startswith('负载实例失败')]
+    assert failure['tool'] == 'ping' and failure['target'] == '127.0.0.1'
+
+
+def test_workers_keep_parent_limits(stub_tool, monkeypatch):
+    stub_tool('ping', """
+        import resource, sys
+        print(f"ping: nofile {resource.getrlimit(resource.RLIMIT_NOFILE)[0]}")
+        sys.exit(2)
+    """)
+    monkeypatch.setattr(load_profile, 'START_LEAD', 0.1)
+    monkeypatch.setattr(resource_governor, '_default_governor', ResourceGovernor(child_nofile=200))
+    result = run_profile({'phases': [{'duration': 1, 'flows': [{'tool': 'ping', 'rate': 1}]}]},
+                         ['127.0.0.1'], workers=1)
+    # 进程池中启动的工具沿用父进程管控器的RLIMIT设置，而不是fork后重置的默认值
+    assert 'nofile 200' in result['errors'][0]
@@ -0,0 +1,87 @@
+import json
+import logging
+import multiprocessing
+import os
+
+import pytest
+
+import log_pipeline
+from log_pipeline import (DebugRateLimiter, process_log_queue, setup_logging, setup_worker_logging,
+                          shutdown_logging)
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    yield tmp_path / 'logs' / 'scan.log'
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+
+def _records(path):
+    return [json.loads(line) for line in path.read_text(encoding='utf-8').splitlines()]
+
+
+def _log_from_worker(index):
+    logging.info("子进程记录", extra={'index': index, 'pid': os.getpid()})
+    logging.debug("低于INFO被丢弃")
+
+
+def test_file_created_lazily(log_path, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    setup_logging(str(log_path))
+    setup_logging(str(log_path))
+    assert not log_path.exists()
+    assert not (tmp_path / log_pipeline.DEFAULT_LOG_FILE).exists()
+
+    logging.info("开始扫描")
+    shutdown_logging()
+    assert [r['msg'] for r in _records(log_path)] == ["开始扫描"]
+
+
+def test_json_extra_fields(log_path):
+    setup_logging(str(log_path))
+    logging.info("工具完成", extra={'tool': 'nmap', 'elapsed': 1.5})
+    logging.debug("详细模式关闭时不写入")
+    shutdown_logging()
+    (record,) = _records(log_path)
+    assert record['level'] == 'INFO'
+    assert record['tool'] == 'nmap' and record['elapsed'] == 1.5
+
+
+def test_debug_rate_limited_per_call_site(log_path):
+    setup_logging(str(log_path), verbose=False, debug_rate=0.001)
+    logging.getLogger().setLevel(logging.DEBUG)
+    for i in range(100):
+        logging.debug(f"事件 {i}")
+    for i in range(5):
+        logging.warning(f"警告 {i}")
+    shutdown_logging()
+
+    records = _records(log_path)
+    debug = [r for r in records if r['level'] == 'DEBUG']
+    assert len(debug) == 20
+    assert sum(r['level'] == 'WARNING' for r in records) == 5
+    assert any('丢弃 80 条' in r['msg'] for r in records)
+
+
+def test_rate_limiter_reports_suppressed():
+    limiter = DebugRateLimiter(rate=1000.0, burst=1)
+    record = logging.LogRecord('x', logging.DEBUG, 'f.py', 1, 'm', (), None)
+    assert limiter.filter(record)
+    assert not limiter.filter(record)
+    limiter._buckets[('f.py', 1)][1] -= 1
+    assert limiter.filter(record)
+    assert record.suppressed == 1
+
+
+def test_worker_processes_log_through_parent(log_path):
+    setup_logging(str(log_path))
+    with multiprocessing.Pool(2, initializer=setup_worker_logging,
+                              initargs=(process_log_queue(), logging.INFO)) as pool:
+        pool.map(_log_from_worker, range(4))
+    shutdown_logging()
+    records = _records(log_path)
+    assert sorted(r['index'] for r in records) == [0, 1, 2, 3]
+    assert all(r['msg'] == "子进程记录" and r['pid'] != os.getpid() for r in records)
@@ -0,0 +1,118 @@
+import subprocess
+
+import pytest
+
+import multi_link
+from multi_link import route_key, route_links, run_multi_link, summarize_link
+
+# 测试环境: 每条链路一对veth，网关端放在独立的网络命名空间中
+NETNS = 'kali-mlt-gw'
+
+
+def ip(*args, netns: bool = False) -> bool:
+    cmd = ['ip', 'netns', 'exec', NETNS, *args] if netns else list(args)
+    return subprocess.run(cmd, capture_output=True, timeout=10).returncode == 0
+
+
+def tx_packets(interface: str) -> int:
+    with open(f'/sys/class/net/{interface}/statistics/tx_packets') as f:
+        return int(f.read())
+
+
+def teardown_links(count: int):
+    for i in range(count):
+        ip('ip', 'link', 'del', f"mlt{i}")
+    ip('ip', 'netns', 'del', NETNS)
+
+
+@pytest.fixture
+def veth_links(net_admin):
+    """veth链路 mlt0/mlt1/...，网关 10.20N.1.1 位于命名空间中"""
+    count = 3
+    teardown_links(count)
+    if not ip('ip', 'netns', 'add', NETNS):
+        pytest.skip("无法创建网络命名空间")
+    links = []
+    try:
+        ip('ip', 'link', 'set', 'lo', 'up', netns=True)
+        for i in range(count):
+            local, peer = f"mlt{i}", f"mlt{i}gw"
+            gateway, source = f"10.20{i}.1.1", f"10.20{i}.1.2"
+            if not ip('ip', 'link', 'add', local, 'type', 'veth', 'peer', 'name', peer):
+                pytest.skip("无法创建veth")
+            assert ip('ip', 'link', 'set', peer, 'netns', NETNS)
+            assert ip('ip', 'addr', 'add', f"{source}/24", 'dev', local)
+            assert ip('ip', 'link', 'set', local, 'up')
+            assert ip('ip', 'addr', 'add', f"{gateway}/24", 'dev', peer, netns=True)
+            assert ip('ip', 'link', 'set', peer, 'up', netns=True)
+            links.append({'interface': local, 'gateway': gateway, 'source': source,
+                          'routes': [f"10.20{i}.1.0/24"]})
+        yield links
+    finally:
+        teardown_links(count)
+
+
+def test_route_key():
+    assert route_key({'gateway': '10.0.0.1', 'interface': 'eth0'}) == ('10.0.0.1', 'eth0')
+    assert route_key({'gateway': '10.0.0.1', 'raw': 'default via 10.0.0.1 dev wlan0 proto dhcp'}) == \
+        ('10.0.0.1', 'wlan0')
+    assert route_key({'network': '10.0.0.0/24', 'interface': 'eth0'}) is None
+
+
+def test_route_links_groups_by_gateway_and_interface():
+    routes = [
+        {'network': 'default', 'gateway': '10.0.0.1', 'raw': 'default via 10.0.0.1 dev eth0 src 10.0.0.5'},
+        {'network': '172.16.0.0/12', 'gateway': '10.0.0.1', 'interface': 'eth0', 'raw': ''},
+        {'network': '192.168.9.0/24', 'gateway': '10.1.0.1', 'interface': 'wg0',
+         'raw': '192.168.9.0/24 via 10.1.0.1 dev wg0 src 10.1.0.7'},
+        {'network': '10.0.0.0/24', 'interface': 'eth0', 'raw': ''},
+    ]
+    assert route_links(routes) == [
+        {'interface': 'eth0', 'gateway': '10.0.0.1', 'source': '10.0.0.5',
+         'routes': ['default', '172.16.0.0/12']},
+        {'interface': 'wg0', 'gateway': '10.1.0.1', 'source': '10.1.0.7', 'routes': ['192.168.9.0/24']},
+    ]
+
+
+def test_summarize_link_takes_worst():
+    link = {'results': [
+        {'sent': 20, 'loss_percent': 0.0, 'rtt_avg': 1.5},
+        {'sent': 50, 'loss_percent': 4.0, 'rtt': {'count': 48, 'avg': 3.25}},
+        {'sent': 0, 'loss_percent': None, 'error': 'hping3未安装'},
+        {'sent': 1000, 'pps': 500.0, 'loss_percent': 0.0},
+    ]}
+    assert summarize_link(link) == {'loss_percent': 4.0, 'rtt_avg': 3.25, 'pps': 500.0}
+
+
+def test_run_multi_link_ranks_links(monkeypatch):
+    outcomes = {'a': (5.0, 1.0), 'b': (0.0, 9.0), 'c': (0.0, 2.0), 'd': (None, None)}
+
+    def fake_test_link(link, tests, *args):
+        loss, rtt = outcomes[link['interface']]
+        result = {'sent': 10 if loss is not None else 0, 'loss_percent': loss}
+        if rtt is not None:
+            result['rtt_avg'] = rtt
+        return dict(link, results=[result])
+
+    monkeypatch.setattr(multi_link, 'test_link', fake_test_link)
+    links = [{'interface': name, 'gateway': '10.0.0.1', 'source': None, 'routes': []} for name in outcomes]
+    ranked = run_multi_link(links, ['ping'])
+    assert [link['interface'] for link in ranked] == ['c', 'b', 'a', 'd']
+    assert [link['rank'] for link in ranked] == [1, 2, 3, 4]
+    assert run_multi_link([], ['ping']) == []
+
+
+def test_veth_links_send_on_their_own_interface(veth_links):
+    before = {link['interface']: tx_packets(link['interface']) for link in veth_links}
+    results = run_multi_link(veth_links, ['udp'], count=5, timeout=5, traffic_duration=0.5)
+
+    assert sorted(link['interface'] for link in results) == ['mlt0', 'mlt1', 'mlt2']
+    for link in results:
+        probe, udp = link['results']
+        # 网关端口未监听，回RST也计入握手时延
+        assert probe['test_type'] == 'TCP_PROBE' and probe['received'] == probe['sent'] == 5
+        assert udp['interface'] == link['interface'] and not udp.get('error')
+        assert udp['sent'] > 0
+        # 流量从各自的veth发出，而不是内核选出的默认出口
+        assert tx_packets(link['interface']) - before[link['interface']] >= udp['sent']
+        assert link['summary']['loss_percent'] == 0.0
@@ -0,0 +1,123 @@
+import os
+import socket
+import struct
+
+import pytest
+
+import neighbor_cache
+from neighbor_cache import (OuiIndex, build_oui_index, parse_oui_source, passive_discover,
+                            read_neighbors, read_proc_arp, remainder_networks)
+
+SOURCES = {
+    'nmap-mac-prefixes': "# comment\n000C29 VMware\n001122 Cimsys Inc\n",
+    'oui.txt': "00-50-56   (hex)\t\tVMware, Inc.\n005056     (base 16)\t\tVMware, Inc.\n",
+    'manuf': "00:1B:21\tIntel\tIntel Corporate\n",
+}
+
+
+@pytest.fixture
+def oui_index(tmp_path):
+    source = tmp_path / 'prefixes'
+    source.write_text("".join(SOURCES.values()), encoding='utf-8')
+    path = str(tmp_path / 'oui.idx')
+    assert build_oui_index(str(source), path) == 4
+    index = OuiIndex(path)
+    yield index
+    index.close()
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('nmap-mac-prefixes', [(0x000C29, 'VMware'), (0x001122, 'Cimsys Inc')]),
+    ('oui.txt', [(0x005056, 'VMware, Inc.')]),
+    ('manuf', [(0x001B21, 'Intel Corporate')]),
+])
+def test_parse_oui_formats(tmp_path, name, expected):
+    path = tmp_path / name
+    path.write_text(SOURCES[name], encoding='utf-8')
+    assert list(parse_oui_source(str(path))) == expected
+
+
+def test_index_lookup(oui_index):
+    assert oui_index.lookup('00:0c:29:ab:cd:ef') == 'VMware'
+    assert oui_index.lookup('00-0C-29-AB-CD-EF') == 'VMware'
+    assert oui_index.lookup('00:50:56:00:00:01') == 'VMware, Inc.'
+    assert oui_index.lookup('00:1b:21:00:00:01') == 'Intel Corporate'
+    assert oui_index.lookup('ff:ff:ff:00:00:00') is None
+    assert oui_index.lookup('Unknown') is None
+
+
+def test_open_default_rebuilds_stale_index(tmp_path):
+    source = tmp_path / 'prefixes'
+    source.write_text("000C29 VMware\n", encoding='utf-8')
+    path = str(tmp_path / 'cache' / 'oui.idx')
+    index = OuiIndex.open_default(str(source), path)
+    assert index.lookup('00:0c:29:00:00:00') == 'VMware'
+    index.close()
+
+    source.write_text("000C29 VMware Renamed\n", encoding='utf-8')
+    os.utime(source, (os.path.getmtime(path) + 10,) * 2)
+    index = OuiIndex.open_default(str(source), path)
+    assert index.lookup('00:0c:29:00:00:00') == 'VMware Renamed'
+    index.close()
+
+    assert OuiIndex.open_default(None, str(tmp_path / 'missing.idx')) is None
+
+
+def test_invalid_index(tmp_path):
+    path = tmp_path / 'bad.idx'
+    path.write_bytes(b'XXXX' + bytes(12))
+    with pytest.raises(ValueError):
+        OuiIndex(str(path))
+
+
+def test_read_proc_arp(tmp_path):
+    path = tmp_path / 'arp'
+    path.write_text(
+        "IP address       HW type     Flags       HW address            Mask     Device\n"
+        "192.168.1.1      0x1         0x2         aa:bb:cc:dd:ee:01     *        eth0\n"
+        "192.168.1.2      0x1         0x0         00:00:00:00:00:00     *        eth0\n"
+        "192.168.1.3      0x1         0x6         aa:bb:cc:dd:ee:03     *        eth1\n")
+    assert list(read_proc_arp(str(path))) == [
+        ('192.168.1.1', 'aa:bb:cc:dd:ee:01', 'eth0'),
+        ('192.168.1.3', 'aa:bb:cc:dd:ee:03', 'eth1'),
+    ]
+
+
+def _rtattr(attr_type, value):
+    length = 4 + len(value)
+    return struct.pack('=HH', length, attr_type) + value + bytes(-length % 4)
+
+
+def test_parse_neighbor():
+    ifindex = socket.if_nametoindex('lo')
+    payload = (neighbor_cache._NDMSG.pack(socket.AF_INET, ifindex, 0x02, 0, 0)
+               + _rtattr(1, socket.inet_aton('10.0.0.7'))
+               + _rtattr(2, bytes.fromhex('aabbccddeeff')))
+    assert neighbor_cache._parse_neighbor(payload) == ('10.0.0.7', 'aa:bb:cc:dd:ee:ff', 'lo')
+
+    failed = neighbor_cache._NDMSG.pack(socket.AF_INET, ifindex, 0x20, 0, 0) + payload[12:]
+    assert neighbor_cache._parse_neighbor(failed) is None
+
+
+def test_read_neighbors_returns_source():
+    neighbors, source = read_neighbors()
+    assert source in ('netlink', 'netlink+proc', 'proc', 'none')
+    assert all(len(entry) == 3 for entry in neighbors)
+
+
+def test_passive_discover_filters_network(monkeypatch, oui_index):
+    monkeypatch.setattr(neighbor_cache, 'read_neighbors', lambda: ([
+        ('192.168.1.10', '00:0c:29:00:00:01', 'eth0'),
+        ('192.168.2.10', '00:50:56:00:00:02', 'eth0'),
+        ('192.168.1.11', '12:34:56:00:00:03', 'eth0'),
+    ], 'netlink'))
+    hosts, source = passive_discover('192.168.1.0/24', oui_index)
+    assert source == 'netlink'
+    assert hosts == [('192.168.1.10', '00:0c:29:00:00:01', 'VMware'),
+                     ('192.168.1.11', '12:34:56:00:00:03', 'Unknown')]
+
+
+def test_remainder_networks():
+    assert remainder_networks('10.0.0.0/29', ['10.0.0.0', '10.0.0.5', '10.9.9.9']) == \
+        ['10.0.0.1/32', '10.0.0.2/31', '10.0.0.4/32', '10.0.0.6/31']
+    assert remainder_networks('10.0.0.0/30', []) == ['10.0.0.0/30']
@@ -0,0 +1,135 @@
+import json
+import threading
+
+import pytest
+
+import network_api
+from network_api import (expand_job, load_jobs, nmap_test, parse_ping_summary, ping_test, run_job,
+                         run_jobs)
+from rtt_model import TimingModel
+
+PING = """
+    import sys
+    target = sys.argv[-1]
+    if target.endswith('.99'):
+        print("3 packets transmitted, 0 received, 100% packet loss, time 2003ms")
+    else:
+        print("64 bytes from %s: icmp_seq=1 ttl=64 time=0.4 ms" % target)
+        print("64 bytes from %s: icmp_seq=2 ttl=64 time=0.6 ms" % target)
+        print("2 packets transmitted, 2 received, 0% packet loss, time 1ms")
+        print("rtt min/avg/max/mdev = 0.400/0.500/0.600/0.100 ms")
+"""
+
+NMAP = """
+    print('<?xml version="1.0"?><nmaprun><host><address addr="10.0.0.1" addrtype="ipv4"/><ports>'
+          '<port protocol="tcp" portid="443"><state state="open"/></port>'
+          '<port protocol="tcp" portid="22"><state state="open"/></port>'
+          '<port protocol="udp" portid="53"><state state="open"/></port>'
+          '<port protocol="tcp" portid="25"><state state="closed"/></port></ports>'
+          '<times srtt="3000" rttvar="1000" to="100000"/></host></nmaprun>')
+"""
+
+
+def test_parse_ping_summary():
+    assert parse_ping_summary("garbage") == {'sent': 0, 'received': 0, 'loss_percent': 100.0}
+    output = ("4 packets transmitted, 3 received, 25% packet loss, time 3004ms\n"
+              "rtt min/avg/max/mdev = 0.100/0.200/0.300/0.050 ms\n")
+    assert parse_ping_summary(output) == {'sent': 4, 'received': 3, 'loss_percent': 25.0,
+                                          'rtt_min': 0.1, 'rtt_avg': 0.2, 'rtt_max': 0.3, 'rtt_mdev': 0.05}
+
+
+def test_ping_test_feeds_timing(stub_tool):
+    stub_tool('ping', PING)
+    timing = TimingModel()
+    result = ping_test('10.0.0.1', count=2, timing=timing)
+    assert (result['sent'], result['received'], result['rtt_avg']) == (2, 2, 0.5)
+    assert result['test_type'] == 'PING' and result['timeout'] > 0
+    assert timing.to_dict()['hosts']['10.0.0.1']['samples'] == 2
+
+    ping_test('10.0.0.99', count=3, timing=timing)
+    assert timing.to_dict()['hosts']['10.0.0.99']['failures'] == 1
+
+
+def test_nmap_test_sorts_open_ports(stub_tool):
+    stub_tool('nmap', NMAP)
+    timing = TimingModel()
+    result = nmap_test('10.0.0.1', timing=timing)
+    assert result['open_ports'] == ['22/tcp', '443/tcp', '53/udp']
+    assert result['ports']['25/tcp'] == {'state': 'closed'}
+    assert timing.to_dict()['hosts']['10.0.0.1']['srtt_ms'] == 3.0
+
+
+def test_load_jobs_jsonl_reports_bad_lines(tmp_path):
+    path = tmp_path / 'jobs.jsonl'
+    path.write_text('# 注释\n{"target": "10.0.0.1"}\n\n{bad\n[1, 2]\n{"id": "x", "target": "10.0.0.2"}\n')
+    jobs = list(load_jobs(str(path)))
+    assert [job['id'] for job in jobs] == ['line2', 'line4', 'line5', 'x']
+    assert jobs[1]['error'].startswith('第4行JSON错误') and jobs[2]['error'] == '第5行不是JSON对象'
+
+
+def test_load_jobs_json(tmp_path):
+    path = tmp_path / 'jobs.json'
+    path.write_text(json.dumps({'jobs': [{'target': '10.0.0.1'}, 'oops']}))
+    assert list(load_jobs(str(path))) == [{'target': '10.0.0.1', 'id': 'job1'},
+                                          {'id': 'job2', 'error': '第2个作业不是对象'}]
+    path.write_text(json.dumps({'target': '10.0.0.1'}))
+    with pytest.raises(ValueError):
+        list(load_jobs(str(path)))
+
+
+def test_expand_job():
+    assert list(expand_job({'id': 'a', 'target': '10.0.0.1', 'count': 3})) == [
+        {'id': 'a', 'count': 3, 'target': '10.0.0.1', 'test': 'ping'}]
+    tasks = list(expand_job({'id': 'b', 'target': '10.0.0.1-2', 'tests': ['ping', 'nmap']}))
+    assert [task['id'] for task in tasks] == ['b:10.0.0.1:ping', 'b:10.0.0.1:nmap',
+                                              'b:10.0.0.2:ping', 'b:10.0.0.2:nmap']
+    assert list(expand_job({'id': 'c'})) == [{'id': 'c', 'target': '', 'test': 'ping', 'error': '缺少 target'}]
+    assert list(expand_job({'id': 'd', 'target': '10.0.0.0/33'}))[0]['error'].startswith('目标解析错误')
+
+
+def test_run_job_errors(stub_tool):
+    assert run_job({'id': 'a', 'target': '10.0.0.1', 'test': 'smtp'}).error == "不支持的测试: smtp"
+    assert run_job({'id': 'b', 'target': '10.0.0.1', 'test': 'ping', 'colour': 1}).error == \
+        "不支持的参数: colour"
+    missing = run_job({'id': 'c', 'target': '10.0.0.1', 'test': 'hping'})
+    assert (missing.status, missing.error) == ('error', '工具未安装: hping3')
+    # 适用于其他测试的参数被忽略
+    stub_tool('ping', PING)
+    result = run_job({'id': 'd', 'target': '10.0.0.1', 'test': 'ping', 'count': 2, 'ports': '80'})
+    assert result.ok and result.data['received'] == 2
+    assert set(result.to_dict()) == {'job_id', 'target', 'test', 'status', 'started', 'elapsed',
+                                     'data', 'error'}
+
+
+def test_run_jobs_bounds_in_flight(stub_tool, monkeypatch):
+    stub_tool('ping', PING)
+    submitted = 0
+    peak = 0
+    lock = threading.Lock()
+    real_run_job = network_api.run_job
+
+    def jobs():
+        nonlocal submitted
+        for i in range(40):
+            with lock:
+                submitted += 1
+            yield {'id': str(i), 'target': f"10.0.0.{99 if i % 10 == 0 else i + 1}", 'count': 2}
+
+    def counting_run_job(task, timing):
+        nonlocal peak
+        with lock:
+            peak = max(peak, submitted - finished[0])
+        try:
+            return real_run_job(task, timing)
+        finally:
+            with lock:
+                finished[0] += 1
+
+    finished = [0]
+    monkeypatch.setattr(network_api, 'run_job', counting_run_job)
+    statuses = {}
+    for result in run_jobs(jobs(), workers=4):
+        statuses[result.status] = statuses.get(result.status, 0) + 1
+    assert statuses == {'ok': 36, 'failed': 4}
+    # 已读取但未完成的作业不超过 workers * 2
+    assert peak <= 8
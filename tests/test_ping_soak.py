@@ -0,0 +1,77 @@
+import json
+import threading
+import time
+
+from ping_soak import RttHistogram, SoakStats, feed_ping_line, run_ping_soak
+
+
+def test_histogram_percentiles():
+    hist = RttHistogram()
+    for rtt in [1.0] * 98 + [50.0, 100.0]:
+        hist.add(rtt)
+    summary = hist.to_dict()
+    assert summary['count'] == 100 and summary['min'] == 1.0 and summary['max'] == 100.0
+    assert summary['p50'] <= 1.3
+    assert 50.0 <= summary['p99'] <= 100.0
+
+
+def test_outage_and_late_reply():
+    stats = SoakStats('10.0.0.1', outage_threshold=3)
+    stats.on_reply(100.0, 1, 1.0)
+    for seq in range(2, 6):
+        stats.on_loss(100.0 + seq, seq)
+    stats.on_reply(106.0, 3, 900.0)
+    stats.on_reply(107.0, 6, 1.0)
+
+    snapshot = stats.snapshot()
+    assert snapshot['sent'] == 6 and snapshot['received'] == 2
+    assert snapshot['late'] == 1
+    assert snapshot['outage_count'] == 1
+    assert snapshot['outages'][0]['lost'] == 4
+
+
+def test_seq_wrap_not_counted_late():
+    stats = SoakStats('10.0.0.1')
+    stats.on_loss(0.0, 42)
+    # 0.2s间隔下序号回绕后再次出现42
+    stats.on_reply(65536 * 0.2, 42, 1.0)
+    assert stats.late == 0
+    assert stats.sent == 2 and stats.received == 1
+
+
+def test_feed_ping_line():
+    stats = SoakStats('10.0.0.1')
+    feed_ping_line(stats, "[1700000000.100000] 64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.52 ms")
+    feed_ping_line(stats, "[1700000000.300000] no answer yet for icmp_seq=2")
+    feed_ping_line(stats, "[1700000000.400000] 64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.60 ms (DUP!)")
+    feed_ping_line(stats, "PING 10.0.0.1 (10.0.0.1) 56(84) bytes of data.")
+    assert (stats.sent, stats.received, stats.duplicates) == (2, 1, 1)
+    assert stats.first_seen == 1700000000.1
+
+
+def test_checkpoint_on_timer_while_silent(tmp_path, stub_tool):
+    stub_tool('ping', """
+        import sys, time
+        print("[1.000000] 64 bytes from 127.0.0.1: icmp_seq=1 ttl=64 time=0.05 ms", flush=True)
+        time.sleep(1.5)
+        print("[2.500000] 64 bytes from 127.0.0.1: icmp_seq=2 ttl=64 time=0.05 ms", flush=True)
+    """)
+    checkpoint = tmp_path / 'out' / 'ping_soak_127.0.0.1.json'
+    checkpoint.parent.mkdir()
+    seen = []
+
+    def watch():
+        deadline = time.monotonic() + 1.2
+        while time.monotonic() < deadline and not seen:
+            if checkpoint.exists():
+                seen.append(json.loads(checkpoint.read_text())['sent'])
+            time.sleep(0.05)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    result = run_ping_soak('127.0.0.1', checkpoint_every=0.2, output_dir=str(checkpoint.parent))
+    watcher.join()
+
+    assert seen == [1]
+    assert result['sent'] == 2 and result['received'] == 2
+    assert json.loads(checkpoint.read_text())['sent'] == 2
@@ -0,0 +1,65 @@
+import pytest
+
+from port_store import PortStore, pack_ip, unpack_ip
+
+
+def test_add_and_lookup():
+    store = PortStore()
+    assert store.add('10.0.0.1', 80)
+    assert not store.add('10.0.0.1', 80)
+    store.add('10.0.0.1', 53, 'udp')
+    store.add('10.0.0.2', 443)
+
+    assert store.has('10.0.0.1', 80)
+    assert store.has('10.0.0.1', 53, 'udp')
+    assert not store.has('10.0.0.1', 53)
+    assert not store.has('10.0.0.9', 80)
+    assert store.ports('10.0.0.1') == [80]
+    assert sorted(store.ports('10.0.0.1', None)) == [53, 80]
+    assert store['10.0.0.1'] == ['80/tcp', '53/udp']
+    assert len(store) == 2 and '10.0.0.2' in store and 'not-an-ip' not in store
+
+
+def test_mapping_roundtrip():
+    data = {'192.168.1.1': ['22/tcp', '80/tcp'], '192.168.1.2': ['161/udp']}
+    store = PortStore.from_dict(data)
+    assert store.to_dict() == data
+    with pytest.raises(KeyError):
+        store['192.168.1.3']
+
+
+def test_set_operations():
+    store = PortStore()
+    store.add('10.0.0.1', 22)
+    store.add('10.0.0.1', 80)
+    store.add('10.0.0.2', 80)
+    store.add('10.0.0.3', 443)
+    assert store.hosts_with_port(80) == ['10.0.0.1', '10.0.0.2']
+    assert store.hosts_with_all([22, 80]) == ['10.0.0.1']
+    assert store.hosts_with_any([22, 443]) == ['10.0.0.1', '10.0.0.3']
+    assert store.port_counts() == {'22/tcp': 1, '80/tcp': 2, '443/tcp': 1}
+
+
+def test_add_after_listing_recompacts():
+    store = PortStore()
+    store.add('10.0.0.1', 80)
+    assert store['10.0.0.1'] == ['80/tcp']
+    store.add('10.0.0.1', 22)
+    assert store['10.0.0.1'] == ['22/tcp', '80/tcp']
+
+
+def test_clear():
+    store = PortStore.from_dict({'10.0.0.1': ['80/tcp']})
+    store.clear()
+    assert len(store) == 0 and not store.has('10.0.0.1', 80)
+    store.add('10.0.0.1', 22)
+    assert store.to_dict() == {'10.0.0.1': ['22/tcp']}
+
+
+def test_invalid_input():
+    store = PortStore()
+    with pytest.raises(ValueError):
+        store.add('10.0.0.1', 70000)
+    with pytest.raises(ValueError):
+        store.add('10.0.0.1', 80, 'gre')
+    assert unpack_ip(pack_ip('1.2.3.4')) == '1.2.3.4'
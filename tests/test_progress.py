@@ -0,0 +1,100 @@
+import io
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from progress import ProgressRenderer, Stage
+from target_spec import TargetSpec
+
+NETDISCOVER = """
+    import sys, time
+    for last in (5, 130, 200):
+        print(" 10.99.0.%d    02:00:00:00:00:%02x      1      60  Stub Vendor" % (last, last), flush=True)
+        time.sleep(0.3)
+"""
+
+# masscan的状态行写到stderr，用回车原地刷新
+MASSCAN = """
+    import sys, time
+    for percent in (25, 50):
+        sys.stderr.write("rate:  0.10-kpps, %.2f%% done,   0:00:01 remaining, found=0   \\r" % percent)
+        sys.stderr.flush()
+        time.sleep(0.3)
+    print("Discovered open port 80/tcp on 10.99.0.5", flush=True)
+    time.sleep(0.3)
+"""
+
+
+def test_stage_line():
+    stage = Stage('scan', 200)
+    stage.advance(50)
+    stage.finding('10.0.0.1 open 80/tcp')
+    stage.finding('10.0.0.2 open 22/tcp', detail='完整内容')
+    line = stage.line()
+    assert line.startswith('[scan] 50/200 25%') and 'ETA' in line
+    assert line.endswith('| 发现 2: 10.0.0.2 open 22/tcp; 10.0.0.1 open 80/tcp')
+    stage.set_done(200)
+    assert stage.line().startswith('[scan] 200/200 100%') and 'ETA' not in stage.line()
+    assert Stage('open').line().startswith('[open] 0 项 用时')
+
+
+def test_plain_renderer_throttles_output():
+    stream = io.StringIO()
+    renderer = ProgressRenderer(stream, interval=0.1, tty=False)
+    with renderer.stage('work', 400) as stage:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(lambda i: stage.advance(), range(400)))
+    lines = stream.getvalue().splitlines()
+    assert len(lines) <= 3
+    assert lines[-1].startswith('[work] 完成 400/400 100%')
+
+
+def test_tty_renderer_clears_status_before_print(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(sys, 'stdout', stream)
+    renderer = ProgressRenderer(stream, interval=0.05, tty=True)
+    with renderer.stage('tty', 10) as stage:
+        stage.advance(3)
+        threading.Event().wait(0.2)
+        print("结果行")
+        assert sys.stdout is not stream
+    assert sys.stdout is stream
+    output = stream.getvalue()
+    # 状态区先被清除再写出普通输出
+    assert "[tty] 3/10" in output
+    assert "\r\x1b[J结果行" in output
+
+
+@pytest.fixture
+def tester(stub_tool, tmp_path, monkeypatch):
+    # 依赖stub_tool: PATH只包含替身目录
+    monkeypatch.chdir(tmp_path)
+    from route_stress_test import KaliNetworkTester
+    tester = KaliNetworkTester()
+    tester.passive_discovery = False
+    tester.stream = io.StringIO()
+    tester.progress = ProgressRenderer(tester.stream, interval=0.05, tty=False)
+    return tester
+
+
+def test_netdiscover_stage_advances_while_running(tester, stub_tool):
+    stub_tool('netdiscover', NETDISCOVER)
+    hosts = tester.netdiscover_scan('10.99.0.0/24')
+    assert sorted(hosts.ips()) == ['10.99.0.130', '10.99.0.200', '10.99.0.5']
+    output = tester.stream.getvalue()
+    # 运行中按已应答地址的位置推进，结束时完成全部地址
+    assert '[netdiscover] 6/256' in output
+    assert '[netdiscover] 131/256' in output
+    assert '[netdiscover] 完成 256/256 100%' in output
+
+
+def test_masscan_stage_follows_status(tester, stub_tool):
+    stub_tool('masscan', MASSCAN)
+    tester.masscan_port_scan(TargetSpec(['10.99.0.0/24']), '80')
+    assert tester.open_ports['10.99.0.5'] == ['80/tcp']
+    output = tester.stream.getvalue()
+    assert '[masscan] 64/256 25%' in output
+    assert '[masscan] 128/256 50%' in output
+    assert '[masscan] 完成 256/256 100%' in output
@@ -0,0 +1,81 @@
+import json
+
+import report_diff
+from report_diff import IntHashMap, diff_reports, stream_report
+
+OLD = {
+    'timestamp': 1700000000,
+    'scan_date': '2026-01-01',
+    'hosts': [
+        {'ip': '10.0.0.1', 'mac': 'aa:bb:cc:00:00:01', 'vendor': 'Cisco'},
+        {'ip': '10.0.0.2', 'mac': 'aa:bb:cc:00:00:02', 'vendor': 'Dell'},
+        {'ip': '10.0.0.3', 'mac': 'aa:bb:cc:00:00:03', 'vendor': 'HP'},
+    ],
+    'open_ports': {'10.0.0.1': ['22/tcp', '80/tcp'], '10.0.0.2': ['443/tcp']},
+    'vulnerabilities': [{'target': '10.0.0.1', 'type': 'web', 'issues': ['old issue', 'kept']}],
+}
+NEW = {
+    'timestamp': 1700086400,
+    'scan_date': '2026-01-02',
+    'hosts': [
+        {'ip': '10.0.0.1', 'mac': 'aa:bb:cc:00:00:01', 'vendor': 'Cisco'},
+        {'ip': '10.0.0.2', 'mac': 'aa:bb:cc:00:00:99', 'vendor': 'Dell'},
+        {'ip': '10.0.0.4', 'mac': 'aa:bb:cc:00:00:04', 'vendor': '<script>'},
+    ],
+    'open_ports': {'10.0.0.1': ['22/tcp', '8080/tcp'], '10.0.0.2': ['443/tcp']},
+    'vulnerabilities': [{'target': '10.0.0.1', 'type': 'web', 'issues': ['kept', 'new issue']}],
+}
+
+
+def _write(path, report):
+    path.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return str(path)
+
+
+def test_stream_report_small_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_diff, '_CHUNK', 7)
+    items = list(stream_report(_write(tmp_path / 'old.json', OLD)))
+    assert ('meta', ('timestamp', 1700000000)) in items
+    assert [item for section, item in items if section == 'hosts'] == OLD['hosts']
+    assert ('open_ports', ('10.0.0.2', ['443/tcp'])) in items
+    assert sum(section == 'vulnerabilities' for section, _ in items) == 1
+
+
+def test_diff_reports(tmp_path):
+    result = diff_reports(_write(tmp_path / 'old.json', OLD), _write(tmp_path / 'new.json', NEW),
+                          str(tmp_path / 'diff'))
+    assert result['summary'] == {
+        'hosts_added': 1, 'hosts_removed': 1, 'hosts_changed': 1,
+        'ports_opened': 1, 'ports_closed': 1, 'findings_new': 1, 'findings_resolved': 1,
+    }
+
+    data = json.loads((tmp_path / 'diff.json').read_text(encoding='utf-8'))
+    assert data['old_scan_date'] == '2026-01-01' and data['new_scan_date'] == '2026-01-02'
+    assert data['hosts_added'][0]['ip'] == '10.0.0.4'
+    assert data['hosts_removed'][0]['ip'] == '10.0.0.3'
+    assert data['hosts_changed'][0]['mac'] == 'aa:bb:cc:00:00:99'
+    assert data['ports_opened'] == [{'ip': '10.0.0.1', 'port': '8080/tcp'}]
+    assert data['ports_closed'] == [{'ip': '10.0.0.1', 'port': '80/tcp'}]
+    assert data['findings_new'][0]['issue'] == 'new issue'
+    assert data['findings_resolved'][0]['issue'] == 'old issue'
+
+    page = (tmp_path / 'diff.html').read_text(encoding='utf-8')
+    assert '&lt;script&gt;' in page and '<script>' not in page
+
+
+def test_identical_reports(tmp_path):
+    path = _write(tmp_path / 'same.json', OLD)
+    result = diff_reports(path, path, str(tmp_path / 'diff'))
+    assert not any(result['summary'].values())
+    assert json.loads((tmp_path / 'diff.json').read_text(encoding='utf-8'))['ports_opened'] == []
+
+
+def test_int_hash_map_grows_and_tracks_matches():
+    table = IntHashMap()
+    for key in range(5000):
+        table.put(key * 7919, key)
+    assert len(table) == 5000
+    assert table.match(7919 * 42) == 42
+    assert table.match(1) is None
+    assert not table.is_unmatched(7919 * 42)
+    assert table.is_unmatched(7919 * 43)
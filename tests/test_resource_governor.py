@@ -0,0 +1,88 @@
+import os
+import subprocess
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from resource_governor import ResourceGovernor
+
+
+def test_inheritable_fd_not_leaked():
+    read_fd, write_fd = os.pipe()
+    os.set_inheritable(write_fd, True)
+    try:
+        result = ResourceGovernor().run(
+            [sys.executable, '-c', f"import os\ntry:\n os.fstat({write_fd})\nexcept OSError:\n print('closed')"],
+            capture_output=True, text=True)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+    assert result.stdout.strip() == 'closed'
+
+
+def test_missing_tool_raises():
+    governor = ResourceGovernor()
+    with pytest.raises(FileNotFoundError):
+        governor.run(['no-such-tool-for-governor-test'])
+    assert governor.stats()['tools']['no-such-tool-for-governor-test']['launched'] == 1
+
+
+def test_spawn_stats():
+    governor = ResourceGovernor()
+    governor.run(['true'])
+    stats = governor.stats()
+    expected = 'vfork' if getattr(subprocess, '_USE_VFORK', False) else 'fork'
+    assert stats['spawn_backend'] == expected
+    assert stats['spawn_ms_avg'] > 0
+
+
+def test_tool_limit_applies_backpressure():
+    governor = ResourceGovernor({'sleep': 2}, sample_interval=0.05)
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        list(executor.map(lambda _: governor.run(['sleep', '0.2']), range(6)))
+    elapsed = time.monotonic() - started
+    stats = governor.stats()['tools']['sleep']
+    assert stats['launched'] == 6
+    assert stats['peak_concurrent'] == 2
+    assert stats['waits'] >= 4
+    # 6个任务、并发2，至少需要3轮
+    assert elapsed >= 0.55
+
+
+def test_max_children_caps_all_tools():
+    governor = ResourceGovernor(max_children=2, sample_interval=0.05)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        with governor.popen(['sleep', '5']) as first, governor.popen(['sleep', '5']) as second:
+            future = executor.submit(governor.run, ['true'])
+            time.sleep(0.3)
+            assert not future.done()
+            first.kill()
+            second.kill()
+        # 两个子进程释放名额后才放行
+        assert future.result(timeout=5).returncode == 0
+    assert governor.stats()['tools']['true']['waits'] == 1
+
+
+def test_child_rlimits():
+    governor = ResourceGovernor(child_nofile=256, child_mem_mb=2048)
+    cmd = [sys.executable, '-c',
+           'import resource; print(*(resource.getrlimit(limit)[0] for limit in '
+           '(resource.RLIMIT_NOFILE, resource.RLIMIT_CORE, resource.RLIMIT_AS)))']
+    # 限制在exec之前生效，子进程一启动即可读到
+    result = governor.run(cmd, capture_output=True, text=True)
+    nofile, core, address_space = map(int, result.stdout.split())
+    hard = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+    assert nofile == (256 if hard == resource.RLIM_INFINITY else min(256, hard))
+    assert core == 0 and address_space == 2048 * 1024 * 1024
+    assert result.args == cmd
+
+
+def test_settings_round_trip():
+    governor = ResourceGovernor({'nmap': 2}, max_children=8, child_nofile=128)
+    copy = ResourceGovernor(**governor.settings())
+    assert copy.settings() == governor.settings()
+    assert (copy.limit_for('nmap'), copy.max_children, copy.child_nofile) == (2, 8, 128)
@@ -0,0 +1,148 @@
+import subprocess
+import threading
+import time
+
+import pytest
+
+import route_watch
+from route_watch import RouteWatcher, diff_routes, link_states, watch_routes
+
+# 测试用veth: 本端放在当前命名空间，路由经由对端地址
+TEST_LINK = 'kmw0'
+
+
+def ip(*args) -> bool:
+    return subprocess.run(['ip', *args], capture_output=True).returncode == 0
+
+
+def route(network, gateway, interface, extra=''):
+    return {'network': network, 'gateway': gateway, 'interface': interface,
+            'raw': f"{network} via {gateway} dev {interface}{extra}"}
+
+
+class FakeWatcher:
+    """按预设序列返回事件数，序列用完后等待stop"""
+
+    def __init__(self, events):
+        self.events = list(events)
+        self.drained = 0
+
+    def wait(self, timeout=None):
+        if self.events:
+            return self.events.pop(0)
+        time.sleep(0.01)
+        return 0
+
+    def drain(self):
+        self.drained += 1
+        return 0
+
+
+def test_link_states(tmp_path):
+    for name, state in (('eth0', 'up'), ('wg0', 'unknown')):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'operstate').write_text(state + "\n")
+    (tmp_path / 'bonding_masters').write_text('')
+    assert link_states(str(tmp_path)) == {'eth0': 'up', 'wg0': 'unknown'}
+    assert link_states(str(tmp_path / 'missing')) == {}
+
+
+def test_diff_routes():
+    old = [route('10.1.0.0/24', '10.0.0.1', 'eth0'), route('10.2.0.0/24', '10.0.0.2', 'eth1'),
+           route('10.3.0.0/24', '10.0.0.3', 'eth2'), route('10.4.0.0/24', '10.0.0.4', 'eth3'),
+           {'network': '10.0.0.0/24', 'interface': 'eth0', 'raw': '10.0.0.0/24 dev eth0'}]
+    new = [route('10.1.0.0/24', '10.0.0.1', 'eth0'), route('10.2.0.0/24', '10.0.0.2', 'eth1', ' linkdown'),
+           route('10.4.0.0/24', '10.0.0.4', 'eth3'), route('10.5.0.0/24', '10.0.0.5', 'eth4')]
+    diff = diff_routes(old, new, {'eth3': 'up'}, {'eth3': 'down'})
+    assert diff == {
+        'added': [('10.0.0.5', 'eth4')],
+        'changed': [('10.0.0.2', 'eth1'), ('10.0.0.4', 'eth3')],
+        'removed': [('10.0.0.3', 'eth2')],
+        'interfaces': ['eth3'],
+    }
+    assert not any(diff_routes(new, list(reversed(new))).values())
+
+
+def test_watch_routes_skips_unrelated_events_and_rate_limits():
+    tables = iter([
+        [route('10.1.0.0/24', '10.0.0.1', 'eth0')],                                            # 无变化
+        [route('10.1.0.0/24', '10.0.0.1', 'eth0'), route('10.2.0.0/24', '10.0.0.2', 'eth1')],
+        [route('10.2.0.0/24', '10.0.0.2', 'eth1')],
+    ])
+    baseline = [route('10.1.0.0/24', '10.0.0.1', 'eth0')]
+    calls = []
+    watcher = FakeWatcher([3, 5, 2])
+    started = time.monotonic()
+    runs = watch_routes(watcher, lambda: next(tables), lambda diff, routes: calls.append(
+        (time.monotonic() - started, diff)), min_interval=0.3, baseline=baseline, max_runs=2)
+    assert runs == 2
+    assert calls[0][1]['added'] == [('10.0.0.2', 'eth1')]
+    assert calls[1][1]['removed'] == [('10.0.0.1', 'eth0')]
+    # 第二次回调受min_interval限频，等待后丢弃期间排队的事件
+    assert calls[1][0] - calls[0][0] >= 0.25
+    assert watcher.drained == 1
+
+
+def test_watch_routes_stops():
+    stop = threading.Event()
+    stop.set()
+    assert watch_routes(FakeWatcher([1]), lambda: [], lambda *args: None, baseline=[], stop=stop) == 0
+
+
+def test_poll_backend_detects_change(tmp_path, monkeypatch):
+    table = tmp_path / 'route'
+    table.write_text("Iface\tDestination\tGateway\n")
+    monkeypatch.setattr(route_watch, 'PROC_ROUTE', str(table))
+    with RouteWatcher(debounce=0.05, poll_interval=0.05, use_netlink=False) as watcher:
+        assert watcher.backend == 'poll'
+        assert watcher.wait(0.15) == 0
+        threading.Timer(0.1, lambda: table.write_text("Iface\tDestination\tGateway\neth9\t0\t0101A8C0\n")).start()
+        assert watcher.wait(2) == 1
+        assert watcher.wait(0.15) == 0
+
+
+def test_netlink_change_is_debounced(net_admin, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from route_stress_test import KaliNetworkTester
+
+    debounce = 0.5
+    tester = KaliNetworkTester()
+    changes = []
+    stop = threading.Event()
+    watcher = RouteWatcher(debounce)
+    if watcher.backend != 'netlink':
+        watcher.close()
+        pytest.skip("无法订阅rtnetlink事件")
+    triggered = [0.0]
+
+    def on_change(diff, routes):
+        changes.append((time.monotonic() - triggered[0], diff))
+        stop.set()
+
+    thread = threading.Thread(target=watch_routes,
+                              args=(watcher, tester.get_route_table, on_change, 0, None, 1, stop))
+    thread.start()
+    time.sleep(0.2)
+    triggered[0] = time.monotonic()
+    try:
+        # 一次变化产生一串事件 (建链路、加地址、up、两条路由)
+        ok = (ip('link', 'add', TEST_LINK, 'type', 'veth', 'peer', 'name', f"{TEST_LINK}p")
+              and ip('addr', 'add', '10.250.0.2/24', 'dev', TEST_LINK)
+              and ip('link', 'set', TEST_LINK, 'up') and ip('link', 'set', f"{TEST_LINK}p", 'up')
+              and ip('route', 'add', '10.251.0.0/24', 'via', '10.250.0.1')
+              and ip('route', 'add', '10.252.0.0/24', 'via', '10.250.0.1'))
+        if not ok:
+            stop.set()
+            thread.join(5)
+            pytest.skip("无法创建veth测试链路")
+        thread.join(debounce + 10)
+    finally:
+        stop.set()
+        thread.join(5)
+        ip('link', 'del', TEST_LINK)
+        watcher.close()
+
+    assert len(changes) == 1
+    delay, diff = changes[0]
+    assert delay >= debounce
+    assert diff['added'] == [('10.250.0.1', TEST_LINK)]
@@ -0,0 +1,74 @@
+import pytest
+
+from rtt_model import DEAD_AFTER, INITIAL_RTO, MAX_RTO, MIN_RTO, TOOL_PROFILES, HostTiming, TimingModel
+
+
+def test_first_sample_and_smoothing():
+    host = HostTiming()
+    assert host.rto == INITIAL_RTO
+    host.observe(0.1)
+    assert (host.srtt, host.rttvar) == (0.1, 0.05)
+    assert host.rto == pytest.approx(0.3)
+    host.observe(0.2)
+    # RFC 6298: RTTVAR先用旧SRTT更新，SRTT再更新
+    assert host.rttvar == pytest.approx(0.75 * 0.05 + 0.25 * 0.1)
+    assert host.srtt == pytest.approx(0.875 * 0.1 + 0.125 * 0.2)
+
+
+def test_rto_is_clamped():
+    model = TimingModel()
+    model.observe('10.0.0.1', 0.1)
+    model.observe('10.0.0.2', 9000)
+    assert model.rto('10.0.0.1') == MIN_RTO
+    assert model.rto('10.0.0.2') == MAX_RTO
+    assert model.rto('10.0.0.3') == INITIAL_RTO
+
+
+def test_dead_host_gets_floor_and_no_retries():
+    model = TimingModel()
+    for _ in range(DEAD_AFTER):
+        assert not model.is_dead('10.0.0.9')
+        model.observe_timeout('10.0.0.9')
+    assert model.is_dead('10.0.0.9')
+    assert model.timeout_for('10.0.0.9', 'nmap') == TOOL_PROFILES['nmap'][2]
+    assert model.retries_for('10.0.0.9', 'whatweb') == 0
+    # 收到过应答的主机不会被判为死主机
+    model.observe('10.0.0.8', 5)
+    for _ in range(DEAD_AFTER + 1):
+        model.observe_timeout('10.0.0.8')
+    assert not model.is_dead('10.0.0.8')
+
+
+def test_timeout_for_scales_with_rtt():
+    model = TimingModel()
+    model.observe_many('10.0.0.1', [1.0] * 10)
+    model.observe_many('198.51.100.1', [100, 300, 120, 280, 150])
+    lan = model.timeout_for('10.0.0.1', 'ping', 10)
+    wan = model.timeout_for('198.51.100.1', 'ping', 10)
+    assert lan == 10 + 1 + 2 * MIN_RTO
+    assert lan < wan <= TOOL_PROFILES['ping'][3]
+    # 未知主机按初始RTO，网段级工具按已知主机的中位数
+    assert model.timeout_for('10.0.0.7', 'nmap') == 5 + 20 * INITIAL_RTO
+    assert model.median_rto() == pytest.approx((model.rto('10.0.0.1') + model.rto('198.51.100.1')) / 2)
+
+
+def test_retries_and_backoff():
+    model = TimingModel()
+    model.observe_many('10.0.0.1', [1.0] * 10)
+    model.observe_many('198.51.100.1', [10, 300, 10, 300])
+    assert model.retries_for('10.0.0.1', 'whatweb') == 1
+    assert model.retries_for('198.51.100.1', 'whatweb') == 2
+    assert model.retries_for('10.0.0.2', 'nikto') == 0
+    assert model.backoff('nmap', 40) == 80
+    assert model.backoff('nmap', 400) == TOOL_PROFILES['nmap'][3]
+
+
+def test_seed_and_report():
+    model = TimingModel()
+    model.seed('10.0.0.1', 2.0, 0.5)
+    model.record('10.0.0.1', 'nmap', 12.345, 0, 'ok', 1.23456)
+    report = model.to_dict()
+    assert report['hosts']['10.0.0.1'] == {'srtt_ms': 2.0, 'rttvar_ms': 0.5, 'rto_ms': 100.0,
+                                           'samples': 1, 'failures': 0, 'dead': False}
+    assert report['runs'] == [{'target': '10.0.0.1', 'tool': 'nmap', 'timeout': 12.35, 'attempt': 0,
+                               'outcome': 'ok', 'elapsed': 1.235, 'expected': 0.0}]
@@ -0,0 +1,159 @@
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from host_table import HostTable
+from port_store import PortStore
+from scan_checkpoint import (CHECKPOINT_FILE, SHARD_MIN_HOSTS, ScanCheckpoint, shard_size,
+                             shard_targets)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NETWORK = '10.0.0.0/20'
+TARGETS = [f"10.0.{i // 256}.{i % 256}" for i in range(4096)]
+# 检查点机制与分片大小无关，测试中用小分片
+SHARD_SIZE = 256
+
+
+class StubTester:
+    def __init__(self):
+        self.discovered_hosts = HostTable()
+        self.open_ports = PortStore()
+        self.web_services = []
+        self.services = {}
+        self.vulnerabilities = []
+
+
+# 子进程中执行分片扫描，扫描到 kill_at 分片中途时对自身发送SIGKILL
+WORKER = textwrap.dedent("""
+    import os, signal, sys
+    sys.path.insert(0, {root!r})
+    from host_table import HostTable
+    from port_store import PortStore
+    from scan_checkpoint import ScanCheckpoint, shard_targets
+
+    class StubTester:
+        def __init__(self):
+            self.discovered_hosts = HostTable()
+            self.open_ports = PortStore()
+            self.web_services = []
+            self.services = {{}}
+            self.vulnerabilities = []
+
+    targets = [f"10.0.{{i // 256}}.{{i % 256}}" for i in range(4096)]
+    shards = shard_targets(targets, 256)
+    tester = StubTester()
+    checkpoint = ScanCheckpoint({path!r}, {network!r}, min_interval={min_interval})
+    checkpoint.complete_stage('discovery', tester)
+    with open({log!r}, 'a') as log:
+        for index, shard in enumerate(shards):
+            log.write(f"{{index}}\\n")
+            log.flush()
+            ip = shard[0]
+            tester.open_ports.add(ip, 80)
+            if index == {kill_at}:
+                os.kill(os.getpid(), signal.SIGKILL)
+            checkpoint.complete_shard(index, len(shards), tester)
+""")
+
+
+def _run_killed_worker(tmp_path, kill_at, min_interval=0.0):
+    path = str(tmp_path / CHECKPOINT_FILE)
+    log = str(tmp_path / 'scanned.log')
+    code = WORKER.format(root=ROOT, path=path, network=NETWORK, log=log,
+                         kill_at=kill_at, min_interval=min_interval)
+    proc = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert proc.returncode == -9, proc.stderr
+    return path, log
+
+
+def _resume(path, log):
+    """从检查点恢复并扫描剩余分片，返回恢复后重新扫描的分片和tester"""
+    tester = StubTester()
+    checkpoint = ScanCheckpoint(path, NETWORK)
+    assert checkpoint.load(tester)
+    assert checkpoint.stage_done('discovery')
+    shards = shard_targets(TARGETS, SHARD_SIZE)
+    redone = []
+    with open(log) as f:
+        scanned = {int(line) for line in f}
+    for index, shard in enumerate(shards):
+        if checkpoint.shard_done(index):
+            continue
+        if index in scanned:
+            redone.append(index)
+        tester.open_ports.add(shard[0], 80)
+        checkpoint.complete_shard(index, len(shards), tester)
+    return redone, tester
+
+
+def test_resume_after_sigkill_redoes_only_interrupted_shard(tmp_path):
+    path, log = _run_killed_worker(tmp_path, kill_at=7)
+    redone, tester = _resume(path, log)
+
+    assert redone == [7]
+    assert len(tester.open_ports) == len(TARGETS) // SHARD_SIZE
+    assert all(tester.open_ports.has(ip, 80) for ip in TARGETS[::SHARD_SIZE])
+
+
+def test_throttled_saves_bound(tmp_path):
+    # 节流间隔远大于扫描耗时: 只剩阶段完成时的检查点，已完成的分片全部重做
+    path, log = _run_killed_worker(tmp_path, kill_at=5, min_interval=3600)
+    redone, tester = _resume(path, log)
+    assert redone == [0, 1, 2, 3, 4, 5]
+    assert len(tester.open_ports) == len(TARGETS) // SHARD_SIZE
+
+
+def test_load_restores_results(tmp_path):
+    path = str(tmp_path / CHECKPOINT_FILE)
+    tester = StubTester()
+    tester.discovered_hosts.add('10.0.0.1', 'aa:bb:cc:dd:ee:ff', 'Cisco')
+    tester.open_ports.add('10.0.0.1', 443)
+    tester.web_services = ['https://10.0.0.1:443']
+    checkpoint = ScanCheckpoint(path, NETWORK)
+    checkpoint.complete_stage('discovery', tester)
+    checkpoint.complete_shard(0, 3, tester)
+    checkpoint.complete_web('https://10.0.0.1:443', tester)
+    assert checkpoint.saves == 3
+
+    restored = StubTester()
+    checkpoint = ScanCheckpoint(path, NETWORK)
+    assert checkpoint.load(restored)
+    assert restored.discovered_hosts.by_mac('AA:BB:CC:DD:EE:FF')['ip'] == '10.0.0.1'
+    assert restored.open_ports.to_dict() == {'10.0.0.1': ['443/tcp']}
+    assert checkpoint.describe() == {'stages': ['discovery'], 'shards': '1/3', 'web_done': 1}
+
+    checkpoint.remove()
+    assert not os.path.exists(path)
+    checkpoint.remove()
+
+
+def test_shard_size_amortizes_masscan_startup():
+    # 1000端口@1000pps: 按最小主机数分片; 10端口: 每片发包约 SHARD_SECONDS 秒
+    assert shard_size(1000, 1000) == SHARD_MIN_HOSTS
+    assert shard_size(10, 1000) == 60000
+    hosts = [f"10.0.{i // 256}.{i % 256}" for i in range(65536)]
+    assert len(shard_targets(hosts, shard_size(10, 1000))) == 2
+
+
+def test_changed_shard_count_resets_progress(tmp_path):
+    checkpoint = ScanCheckpoint(str(tmp_path / CHECKPOINT_FILE), NETWORK)
+    checkpoint.start_shards(3)
+    checkpoint.complete_shard(0, 3, StubTester())
+    checkpoint.start_shards(3)
+    assert checkpoint.shard_done(0)
+    checkpoint.start_shards(2)
+    assert not checkpoint.shard_done(0) and checkpoint.describe()['shards'] == '0/2'
+
+
+@pytest.mark.parametrize('change', [{'network': '10.1.0.0/20'}, {'version': 0}])
+def test_load_rejects_mismatch(tmp_path, change):
+    path = tmp_path / CHECKPOINT_FILE
+    ScanCheckpoint(str(path), NETWORK).save(StubTester(), force=True)
+    data = json.loads(path.read_text(encoding='utf-8'))
+    data.update(change)
+    path.write_text(json.dumps(data), encoding='utf-8')
+    assert not ScanCheckpoint(str(path), NETWORK).load(StubTester())
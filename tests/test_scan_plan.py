@@ -0,0 +1,134 @@
+import json
+import os
+
+import pytest
+
+from scan_plan import (Calibration, _duration, _size, format_plan, history_files, plan_arp_stress,
+                       plan_discovery, plan_masscan, plan_services, plan_stress, plan_sweep, plan_web,
+                       summarize, web_targets)
+
+
+def write_log(path):
+    """masscan实际耗时约为预期的0.74倍，whatweb四次中有一次超时"""
+    with open(path, 'w') as f:
+        for i in range(20):
+            f.write(json.dumps({'tool': 'masscan', 'target': None, 'attempt': i, 'outcome': 'done',
+                                'elapsed': 50.0 + i, 'expected': 80.0}) + "\n")
+            f.write(json.dumps({'tool': 'whatweb', 'target': f"10.0.0.{i}", 'attempt': 0,
+                                'outcome': 'timeout' if i % 4 == 0 else 'done',
+                                'elapsed': 25.0 if i % 4 == 0 else 6.0}) + "\n")
+        f.write(json.dumps({'tool': 'nmap-sV', 'elapsed': 120.0, 'probes': 600, 'batches': 4}) + "\n")
+        f.write("不是JSON\n")
+        f.write(json.dumps({'msg': '没有tool字段'}) + "\n")
+
+
+REPORT = {
+    'timing': {
+        'runs': [{'tool': 'nmap', 'target': '10.0.0.1', 'attempt': 0, 'outcome': 'done', 'elapsed': 20.0}],
+        'hosts': {'10.0.0.1': {'samples': 5, 'rto_ms': 2000}, '10.0.0.2': {'samples': 0, 'rto_ms': 1000}},
+    },
+    'discovery': {'network': '10.0.0.0/24'},
+    'summary': {'total_hosts': 64},
+    'open_ports': {'10.0.0.1': ['22/tcp', '80/tcp'], '10.0.0.2': ['80/tcp', '443/tcp']},
+    'web_services': [{'url': 'http://10.0.0.1'}],
+    'stress_results': [{'test_type': 'NATIVE_UDP', 'pps_per_worker': 1000}],
+}
+
+
+def test_defaults_without_history():
+    cal = Calibration()
+    assert cal.tool_seconds('ping') == 11 and cal.tool_seconds('unknown') == 10
+    assert cal.tool_ratio('masscan') is None and cal.timeout_rate('whatweb') == 0.0
+    assert cal.describe() == "无历史数据，全部使用默认值"
+    # 无分片校准时: 发包时间加每片3倍RTO的等待
+    row = plan_masscan(25, 1000, 1000, cal)
+    assert (row['packets'], row['bytes'], row['seconds']) == (25000, 25000 * 60, 28.0)
+    assert row['note'] == "1000 端口, 1000 pps, 1 个分片"
+    assert plan_masscan(10000, 1000, 1000, cal)['note'].endswith("3 个分片")
+    assert plan_masscan(65536, 10, 1000, cal)['note'].endswith("2 个分片")
+
+
+def test_log_calibration(tmp_path):
+    path = str(tmp_path / 'network_test.log')
+    write_log(path)
+    cal = Calibration.from_history([path, str(tmp_path / 'missing.log')])
+    # 不存在的文件被忽略，无法解析的行和没有tool字段的记录被跳过
+    assert cal.sources == [path] and len(cal.runs['masscan']) == 20
+    assert cal.tool_ratio('masscan') == pytest.approx(59.5 / 80)
+    assert cal.tool_seconds('whatweb') == pytest.approx(6.0 + 5 / 20 * 25.0)
+    assert cal.timeout_rate('whatweb') == 0.25
+    assert cal.service_probe_seconds == [pytest.approx(0.8)]
+    assert plan_masscan(25, 1000, 1000, cal)['seconds'] == pytest.approx((25 * 1.2 + 3) * 59.5 / 80, abs=0.05)
+    web = plan_web(10, cal, 3)
+    assert (web['targets'], web['packets'], web['bytes'], web['processes']) == (3, 180, 72000, 1)
+    assert web['seconds'] == pytest.approx(3 * 12.25, abs=0.05)
+    assert web['note'] == "发现约 10 个, 扫描前 3 个"
+
+
+def test_report_calibration(tmp_path):
+    path = tmp_path / 'network_scan_report_1.json'
+    path.write_text(json.dumps(REPORT))
+    (tmp_path / 'broken.json').write_text('{')
+    cal = Calibration()
+    assert cal.load(str(path)) and not cal.load(str(tmp_path / 'broken.json'))
+    # 日志中已有的同一次运行不重复计入
+    cal._load_log([json.dumps(REPORT['timing']['runs'][0])])
+    assert len(cal.runs['nmap']) == 1
+    assert cal.rto == [2.0] and cal.median_rto() == 2.0
+    assert cal.alive() == 0.25 and cal.tool_seconds('nmap') == 20.0
+    assert cal.traffic_pps['udp'] == [1000]
+    # 一半开放端口主机上有Web服务，每个开放主机2个端口
+    assert web_targets(64, cal) == 1
+    services = plan_services(64, 8, cal)
+    assert services['targets'] == 2 and services['processes'] == 2
+    assert services['note'] == "约 4 个开放端口, 2 批"
+
+
+def test_history_files(tmp_path):
+    log = tmp_path / 'network_test.log'
+    for name in ('network_test.log', 'network_test.log.2', 'network_scan_report_a.json',
+                 'network_scan_report_b.json', 'other.json'):
+        (tmp_path / name).write_text('')
+    os.utime(tmp_path / 'network_scan_report_a.json', (0, 0))
+    assert history_files(str(tmp_path), str(log)) == [
+        str(log), f"{log}.2", str(tmp_path / 'network_scan_report_b.json'),
+        str(tmp_path / 'network_scan_report_a.json')]
+
+
+def test_plan_stress_budget_scales_rows():
+    cal = Calibration()
+    rows = plan_stress(2, ['tcp', 'ping', 'nmap'], cal, traffic_duration=5, traffic_workers=2)
+    assert [row['stage'] for row in rows] == ['ping', 'nmap', '原生TCP']
+    assert rows[0]['seconds'] == 2 * (11 + 1.0) and rows[0]['packets'] == 200
+    assert rows[2]['packets'] == 2 * 50000 * 2 * 5 and rows[2]['processes'] == 2
+    total = sum(row['seconds'] for row in rows)
+    scaled = plan_stress(2, ['tcp', 'ping', 'nmap'], cal, traffic_duration=5, traffic_workers=2,
+                         budget=total / 2)
+    assert sum(row['seconds'] for row in scaled) == pytest.approx(total / 2, abs=0.2)
+    assert all("预算截断至 50%" in row['note'] for row in scaled)
+
+
+def test_plan_sweep_and_arp_stress():
+    cal = Calibration()
+    sweep = plan_sweep(100, 1, 2, 1.0, cal)
+    # 90个无应答主机各重试2次，最后一批的重试按1.5倍退避
+    assert sweep['packets'] == 100 + 90 * 2
+    assert sweep['seconds'] == pytest.approx(100 / 20000 + 1 + 1.5 + 2.25, abs=0.05)
+    rows = plan_arp_stress(256, ['ping', 'hping'], 10, 4, cal)
+    assert [row['stage'] for row in rows] == ['arp-scan', 'ARP设备ping', 'ARP设备hping']
+    assert rows[0]['note'] == "预计发现 25 个设备"
+    # 25个设备，每次4个并发，共7轮
+    assert rows[1]['seconds'] == 7 * 3.0 and rows[1]['processes'] == 4
+
+
+def test_summarize_and_format_plan():
+    cal = Calibration()
+    rows = [plan_discovery(256, cal), plan_services(25, 64, cal)]
+    totals = summarize(rows, max_children=4)
+    assert totals['packets'] == rows[0]['packets'] + rows[1]['packets']
+    assert totals['peak_processes'] == 4 and summarize(rows)['peak_processes'] == 8
+    assert summarize([]) == {'packets': 0, 'bytes': 0, 'seconds': 0, 'peak_mbps': 0.0, 'peak_processes': 0}
+    lines = format_plan(rows, totals)
+    assert len(lines) == 4 and lines[1].startswith('主机发现') and lines[-1].startswith('合计')
+    assert (_size(999), _size(25000), _size(1.5e6)) == ('999', '25.0K', '1.5M')
+    assert (_duration(59), _duration(61), _duration(7322)) == ('59s', '1m01s', '2h02m')
@@ -0,0 +1,99 @@
+import io
+
+from service_scan import iter_nmap_hosts, plan_batches, port_argument, run_service_scan, scan_batch
+
+XML = b"""<?xml version="1.0"?><nmaprun>
+<host><address addr="10.0.0.1" addrtype="ipv4"/><address addr="00:11:22:33:44:55" addrtype="mac"/>
+<ports><port protocol="tcp" portid="80"><state state="open"/><service name="http" product="nginx" version="1.24"/></port>
+<port protocol="udp" portid="53"><state state="open|filtered"/></port></ports>
+<times srtt="1500" rttvar="250" to="100000"/></host>
+<host><address addr="10.0.0.2" addrtype="ipv4"/><ports/></host>
+</nmaprun>"""
+
+# 为 -iL 中每个主机输出80和443端口，443用于检查批次合并带来的多余端口被丢弃
+NMAP = """
+    import sys, time
+    args = sys.argv[1:]
+    with open({log!r}, 'a') as f:
+        f.write(" ".join(args) + "\\n")
+    time.sleep({delay})
+    hosts = open(args[args.index('-iL') + 1]).read().split()
+    out = ['<?xml version="1.0"?><nmaprun>']
+    for ip in hosts:
+        out.append('<host><address addr="%s" addrtype="ipv4"/><ports>' % ip)
+        for port in (80, 443):
+            out.append('<port protocol="tcp" portid="%d"><state state="open"/>'
+                       '<service name="http" product="stub"/></port>' % port)
+        out.append('</ports><times srtt="2000" rttvar="500" to="100000"/></host>')
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+        out = []
+    print('</nmaprun>')
+"""
+
+
+def test_port_argument():
+    assert port_argument(['443/tcp', '80/tcp', '53/udp', '9/ddp']) == "T:80,443,U:53"
+    assert port_argument([]) == ""
+
+
+def test_plan_batches_groups_and_merges():
+    open_ports = {
+        '10.0.0.1': ['80/tcp'], '10.0.0.2': ['80/tcp'], '10.0.0.3': ['80/tcp'],
+        '10.0.0.4': ['22/tcp'], '10.0.0.5': ['80/tcp', '443/tcp'], '10.0.0.6': [],
+    }
+    batches = plan_batches(open_ports, max_batches=10)
+    assert sorted((sorted(ports), sorted(hosts)) for ports, hosts in batches) == [
+        (['22/tcp'], ['10.0.0.4']),
+        (['443/tcp', '80/tcp'], ['10.0.0.5']),
+        (['80/tcp'], ['10.0.0.1', '10.0.0.2', '10.0.0.3']),
+    ]
+
+    merged = plan_batches(open_ports, max_batches=2)
+    assert len(merged) == 2
+    # 80/443主机并入80批次 (新增3个探测) 比并入22批次 (新增4个) 代价小
+    by_hosts = {frozenset(hosts): ports for ports, hosts in merged}
+    assert by_hosts[frozenset(['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.5'])] == {'80/tcp', '443/tcp'}
+    assert sum(len(hosts) for _, hosts in merged) == 5
+
+
+def test_iter_nmap_hosts():
+    times = []
+    hosts = list(iter_nmap_hosts(io.BytesIO(XML), lambda *args: times.append(args)))
+    assert hosts == [
+        ('10.0.0.1', {'80/tcp': {'state': 'open', 'name': 'http', 'product': 'nginx', 'version': '1.24'},
+                      '53/udp': {'state': 'open|filtered'}}),
+        ('10.0.0.2', {}),
+    ]
+    assert times == [('10.0.0.1', 1.5, 0.25)]
+
+
+def test_run_service_scan_batches_and_filters(stub_tool, tmp_path):
+    log = tmp_path / 'nmap.log'
+    stub_tool('nmap', NMAP.format(log=str(log), delay=0.0))
+    open_ports = {f'10.0.0.{i}': ['80/tcp'] for i in range(1, 7)}
+    open_ports['10.0.0.9'] = ['443/tcp', '22/tcp']
+    times = []
+    result = run_service_scan(open_ports, max_batches=4, on_times=lambda *args: times.append(args))
+
+    calls = log.read_text().splitlines()
+    assert len(calls) == result['batches'] == 2
+    assert all(' -sV -Pn -n ' in f" {call} " for call in calls)
+    assert result['hosts'] == 7 and not result['errors'] and result['timed_out_batches'] == 0
+    assert result['probes'] == 6 * 1 + 1 * 2
+    # 只保留masscan中出现过的端口
+    assert set(result['services']['10.0.0.1']) == {'80/tcp'}
+    assert set(result['services']['10.0.0.9']) == {'443/tcp'}
+    assert len(times) == 7 and times[0][1:] == (2.0, 0.5)
+
+
+def test_scan_batch_timeout_keeps_partial(stub_tool, tmp_path):
+    stub_tool('nmap', NMAP.format(log=str(tmp_path / 'nmap.log'), delay=5))
+    results, timed_out = scan_batch(['80/tcp'], ['10.0.0.1'], timeout=0.3)
+    assert timed_out
+    assert results == {}
+
+
+def test_run_service_scan_without_ports():
+    result = run_service_scan({'10.0.0.1': []})
+    assert result == {'services': {}, 'batches': 0, 'hosts': 0, 'timed_out_batches': 0, 'errors': []}
@@ -0,0 +1,79 @@
+import pytest
+
+from target_spec import Permutation, TargetSpec, merge_ranges, parse_spec, subtract_ranges
+
+
+def _ip(text):
+    a, b, c, d = (int(part) for part in text.split('.'))
+    return (a << 24) | (b << 16) | (c << 8) | d
+
+
+@pytest.mark.parametrize('spec, ranges', [
+    ('10.0.0.1', [('10.0.0.1', '10.0.0.1')]),
+    ('10.0.0.0/30', [('10.0.0.0', '10.0.0.3')]),
+    ('10.0.0.1-50', [('10.0.0.1', '10.0.0.50')]),
+    ('10.0.0.250-10.0.1.2', [('10.0.0.250', '10.0.1.2')]),
+])
+def test_parse_addresses(spec, ranges):
+    assert parse_spec(spec) == ([(_ip(a), _ip(b)) for a, b in ranges], [])
+
+
+@pytest.mark.parametrize('name', ['localhost', 'my-router.lan', 'gw_1', 'core-sw-01.example.com'])
+def test_parse_hostnames(name):
+    assert parse_spec(name) == ([], [name])
+
+
+@pytest.mark.parametrize('spec', ['10.0.0.5-1', '10.0.0.1-300', 'bad host', 'a..b', 'x/y'])
+def test_parse_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_spec(spec)
+
+
+def test_parse_file(tmp_path):
+    path = tmp_path / 'targets.txt'
+    path.write_text("10.0.0.1, 10.0.0.2  # 注释\nmy-router.lan\n\n10.0.1.0/31\n", encoding='utf-8')
+    ranges, names = parse_spec(f"@{path}")
+    assert len(ranges) == 3 and names == ['my-router.lan']
+
+    path.write_text("@other.txt\n", encoding='utf-8')
+    with pytest.raises(ValueError):
+        parse_spec(f"@{path}")
+
+
+def test_merge_and_subtract():
+    merged = merge_ranges([(5, 10), (1, 3), (4, 4), (20, 30)])
+    assert merged == [(1, 10), (20, 30)]
+    assert subtract_ranges(merged, [(2, 3), (8, 22)]) == [(1, 1), (4, 7), (23, 30)]
+
+
+def test_sequential_iteration_and_exclude():
+    spec = TargetSpec(['10.0.0.0/29', 'gw_1', 'my-router.lan'], exclude=['10.0.0.2-5', 'gw_1'])
+    assert list(spec) == ['10.0.0.0', '10.0.0.1', '10.0.0.6', '10.0.0.7', 'my-router.lan']
+    assert len(spec) == 5
+    assert '10.0.0.6' in spec and '10.0.0.3' not in spec
+    assert 'my-router.lan' in spec and 'gw_1' not in spec
+    assert spec.range_strings() == ['10.0.0.0-10.0.0.1', '10.0.0.6-10.0.0.7']
+
+
+def test_random_order_is_a_permutation():
+    spec = TargetSpec(['10.0.0.0/22', 'localhost'], randomize=True, seed=7)
+    order = list(spec)
+    assert sorted(order) == sorted(TargetSpec(['10.0.0.0/22', 'localhost']))
+    assert order != list(TargetSpec(['10.0.0.0/22', 'localhost']))
+    assert order == list(TargetSpec(['10.0.0.0/22', 'localhost'], randomize=True, seed=7))
+
+
+@pytest.mark.parametrize('randomize', [False, True])
+def test_shards_partition_targets(randomize):
+    spec = TargetSpec(['10.0.0.0/24', '10.0.2.0/25'], randomize=randomize, seed=3)
+    shards = [list(spec.shard(i, 7)) for i in range(7)]
+    assert sum(len(shard) for shard in shards) == len(spec) == 384
+    assert [len(spec.shard(i, 7)) for i in range(7)] == [len(shard) for shard in shards]
+    assert sorted(ip for shard in shards for ip in shard) == sorted(spec)
+    with pytest.raises(ValueError):
+        spec.shard(7, 7)
+
+
+def test_permutation_is_bijection():
+    for n in (1, 2, 5, 1000):
+        assert sorted(map(Permutation(n, seed=n), range(n))) == list(range(n))
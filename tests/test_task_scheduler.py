@@ -0,0 +1,137 @@
+import pytest
+
+import task_scheduler
+from target_spec import TargetSpec
+from task_scheduler import (DeadlineScheduler, PRIORITY_GATEWAY, PRIORITY_HOST,
+                            PRIORITY_ROUTER, TaskFailed)
+
+
+def recorder(order, name):
+    return lambda timeout: order.append(name)
+
+
+def test_heap_runs_by_priority_then_insertion():
+    order = []
+    scheduler = DeadlineScheduler()
+    scheduler.add('h1', 'ping', recorder(order, 'h1'), PRIORITY_HOST, 5)
+    scheduler.add('r1', 'ping', recorder(order, 'r1'), PRIORITY_ROUTER, 5)
+    scheduler.add('g1', 'ping', recorder(order, 'g1'), PRIORITY_GATEWAY, 5)
+    scheduler.add('r2', 'ping', recorder(order, 'r2'), PRIORITY_ROUTER, 5)
+    scheduler.run()
+    assert order == ['g1', 'r1', 'r2', 'h1']
+    assert scheduler.total == 4
+    assert scheduler.summary() == {'done': 4}
+
+
+def test_stream_is_consumed_lazily_after_heap():
+    order = []
+    produced = []
+    scheduler = DeadlineScheduler()
+
+    def hosts():
+        for i in range(3):
+            produced.append(i)
+            yield f"h{i}", 'ping', recorder(order, f"h{i}"), PRIORITY_HOST, 5
+
+    scheduler.add_stream(hosts(), 3, 5)
+    scheduler.add('g', 'ping', recorder(order, 'g'), PRIORITY_GATEWAY, 5)
+    assert produced == []
+    assert scheduler.total == 4
+
+    scheduler.run()
+    assert order == ['g', 'h0', 'h1', 'h2']
+    assert [r['priority'] for r in scheduler.records] == ['gateway', 'host', 'host', 'host']
+
+
+def test_short_stream_corrects_total():
+    scheduler = DeadlineScheduler()
+    scheduler.add_stream(iter([('h', 'ping', lambda t: None)]), 5, 1)
+    scheduler.run()
+    assert scheduler.total == 1
+    assert len(scheduler.records) == 1
+
+
+def test_budget_skips_tasks_that_do_not_fit():
+    scheduler = DeadlineScheduler(budget=0.5)
+    allotted = []
+    scheduler.add('g', 'ping', lambda t: allotted.append(t), PRIORITY_GATEWAY, 10, 0.2, 0.1)
+    scheduler.add_stream(iter([('h', 'nmap', lambda t: allotted.append(t), PRIORITY_HOST, 30, 30, 10)]), 1, 30)
+    records = scheduler.run()
+    assert [r['status'] for r in records] == ['done', 'skipped']
+    assert len(allotted) == 1 and allotted[0] <= 0.5
+
+
+def test_error_is_recorded():
+    def fail(timeout):
+        raise RuntimeError('boom')
+
+    scheduler = DeadlineScheduler()
+    scheduler.add('h', 'ping', fail)
+    records = scheduler.run()
+    assert records[0]['status'] == 'error'
+    assert records[0]['error'] == 'boom'
+
+
+def test_task_failed_sets_status():
+    def missing(timeout):
+        raise TaskFailed('hping3未安装', 'skipped')
+
+    def lost(timeout):
+        raise TaskFailed('ping超时', 'timeout')
+
+    scheduler = DeadlineScheduler()
+    scheduler.add('h', 'hping', missing)
+    scheduler.add('h', 'ping', lost)
+    records = scheduler.run()
+    assert [(r['status'], r.get('reason'), r.get('error')) for r in records] == [
+        ('skipped', 'hping3未安装', None), ('timeout', None, 'ping超时')]
+
+
+PING = """
+    print("64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.5 ms")
+    print("2 packets transmitted, 1 received, 50% packet loss, time 1ms")
+    print("rtt min/avg/max/mdev = 0.500/0.500/0.500/0.000 ms")
+"""
+
+
+@pytest.fixture
+def tester(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    from route_stress_test import KaliNetworkTester
+    tester = KaliNetworkTester()
+    monkeypatch.setattr(task_scheduler.time, 'sleep', lambda seconds: None)
+    return tester
+
+
+def test_run_stress_tests_streams_hosts(tester):
+    order = []
+    tester.gateways = {'10.0.0.5'}
+    tester.routes = [{'type': 'network', 'network': '10.0.0.0/29', 'interface': 'eth0'}]
+    tester.ping_stress_test = lambda ip, timeout: order.append(ip)
+    targets = TargetSpec(['10.0.0.0/29'])
+
+    records = tester.run_stress_tests(targets, ['ping'])
+    assert len(records) == len(targets)
+    # 网关 > .1 (疑似路由器) > 其余主机按网段顺序
+    assert order[:2] == ['10.0.0.5', '10.0.0.1']
+    assert order[2:] == [ip for ip in targets if ip not in ('10.0.0.5', '10.0.0.1')]
+    assert tester.schedule_records == records
+
+
+def test_priority_candidates_come_from_routes_and_hosts(tester):
+    tester.gateways = {'10.9.0.1'}
+    tester.routes = [{'type': 'default', 'gateway': '10.9.0.1'},
+                     {'type': 'network', 'network': '10.0.0.0/8', 'interface': 'eth0'}]
+    tester.discovered_hosts.add('10.2.3.4', 'aa:bb:cc:dd:ee:ff', 'Cisco Systems')
+    tester.discovered_hosts.add('10.2.3.5', 'aa:bb:cc:dd:ee:fe', 'Dell Inc.')
+    assert tester.priority_candidates() == ['10.9.0.1', '10.9.0.1', '10.0.0.1', '10.255.255.254',
+                                            '10.2.3.4']
+
+
+def test_failed_tools_are_recorded(tester, stub_tool):
+    # PATH中只有ping替身: ping产生结果，hping3未安装记为跳过
+    stub_tool('ping', PING)
+    records = tester.run_stress_tests(['10.0.0.1'], ['ping', 'hping'])
+    assert [(r['tool'], r['status']) for r in records] == [('ping', 'done'), ('hping', 'skipped')]
+    assert records[1]['reason'] == 'hping3未安装'
+    assert [(r['test_type'], r['received']) for r in tester.stress_results] == [('PING', 1)]
@@ -0,0 +1,60 @@
+import queue
+import socket
+import threading
+import time
+
+import pytest
+
+import traffic_gen
+from traffic_gen import HEADER, MAGIC, PacketBatch, _udp_sender, run_traffic
+
+
+def _free_port(kind=socket.SOCK_DGRAM) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_packet_batch_stamp():
+    batch = PacketBatch(32, 4, sender_id=3)
+    batch.stamp(100)
+    headers = [HEADER.unpack_from(batch.view, i * 32) for i in range(4)]
+    assert headers == [(MAGIC, 3, 100 + i) for i in range(4)]
+
+
+@pytest.mark.parametrize('proto', ['udp', 'tcp'])
+def test_loopback_with_local_sink(proto):
+    # 端口0: 使用系统分配的端口，接收端都绑定后才开始发送
+    result = run_traffic('127.0.0.1', 0, proto, duration=0.5, workers=2,
+                         size=128, rate=2000, local_sink=True)
+    assert result['error'] is None and result['port'] > 0
+    assert result['sent'] > 0 and result['payload_size'] == 128
+    assert result['received'] > 0
+    assert 0 <= result['loss_percent'] <= 100
+    assert sum(worker['packets'] for worker in result['per_worker']) == result['sent']
+
+
+def test_tcp_connection_refused_reported():
+    result = run_traffic('127.0.0.1', _free_port(socket.SOCK_STREAM), 'tcp', duration=0.5, workers=2)
+    assert result['sent'] == 0
+    assert 'ConnectionRefusedError' in result['error']
+
+
+def test_invalid_proto():
+    with pytest.raises(ValueError):
+        run_traffic('127.0.0.1', proto='icmp')
+    with pytest.raises(ValueError):
+        run_traffic('127.0.0.1', 0, 'udp')
+
+
+def test_udp_sender_waits_when_nothing_sent(monkeypatch):
+    # 网卡队列满 (ENOBUFS) 时每批都发不出，发送循环不应空转占满CPU
+    monkeypatch.setattr(traffic_gen, '_pin', lambda cpu: None)
+    monkeypatch.setattr(PacketBatch, 'send', lambda self, sock: 0)
+    results, start = queue.Queue(), threading.Event()
+    start.set()
+    cpu = time.thread_time()
+    _udp_sender(0, '127.0.0.1', _free_port(), 64, 8, 0.5, None, None, start, results)
+    assert time.thread_time() - cpu < 0.25
+    report = results.get_nowait()
+    assert report['packets'] == 0 and report['error'] is None
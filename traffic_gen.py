@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+原生UDP/TCP流量生成器
+不依赖外部ping/hping3：每个CPU核一个发送进程，负载缓冲区预先分配，
+UDP通过sendmmsg (ctypes, 不可用时退化为逐包send) 批量发送，
+TCP通过sendmsg一次提交多个缓冲区；配套的接收端统计pps、吞吐和丢包
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import multiprocessing
+import os
+import queue
+import select
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 负载头: 魔数, 发送进程编号, 序号
+HEADER = struct.Struct('!HHQ')
+MAGIC = 0x4B4E
+MIN_PAYLOAD = HEADER.size
+# Linux的SO_BINDTODEVICE，旧版本Python的socket模块未导出
+SO_BINDTODEVICE = getattr(socket, 'SO_BINDTODEVICE', 25)
+# 一个包也没发出时等待套接字可写的最长时间 (秒)
+SEND_WAIT = 0.01
+
+
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p), ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p), ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)), ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p), ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr), ('msg_len', ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    func.restype = ctypes.c_int
+    return func
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+class PacketBatch:
+    """预分配的一批UDP负载及对应的mmsghdr数组，发送时只改写序号"""
+
+    def __init__(self, size: int, count: int, sender_id: int):
+        self.size = size
+        self.count = count
+        self.sender_id = sender_id
+        self.raw = (ctypes.c_char * (size * count))()
+        self.view = memoryview(self.raw).cast('B')
+        self.iovecs = (_IOVec * count)()
+        self.msgs = (_MMsgHdr * count)()
+        base = ctypes.addressof(self.raw)
+        for i in range(count):
+            self.iovecs[i].iov_base = base + i * size
+            self.iovecs[i].iov_len = size
+            self.msgs[i].msg_hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            self.msgs[i].msg_hdr.msg_iovlen = 1
+
+    def stamp(self, first_seq: int):
+        for i in range(self.count):
+            HEADER.pack_into(self.view, i * self.size, MAGIC, self.sender_id, first_seq + i)
+
+    def send(self, sock: socket.socket) -> int:
+        """发送整批，返回实际发出的包数"""
+        if _sendmmsg is not None:
+            sent = _sendmmsg(sock.fileno(), self.msgs, self.count, 0)
+            if sent < 0:
+                err = ctypes.get_errno()
+                if err in (errno.EAGAIN, errno.ENOBUFS, errno.ECONNREFUSED):
+                    return 0
+                raise OSError(err, os.strerror(err))
+            return sent
+        sent = 0
+        for i in range(self.count):
+            try:
+                sock.send(self.view[i * self.size:(i + 1) * self.size])
+            except (BlockingIOError, ConnectionRefusedError):
+                break
+            except OSError as e:
+                if e.errno == errno.ENOBUFS:
+                    break
+                raise
+            sent += 1
+        return sent
+
+
+def _pin(cpu: Optional[int]):
+    """子进程初始化: 绑定CPU，并忽略SIGINT由父进程统一结束"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except OSError:
+            pass
+
+
+def _pace(start: float, done: int, rate: Optional[float]):
+    """按目标速率限速: 超前时休眠"""
+    if rate:
+        ahead = start + done / rate - time.perf_counter()
+        if ahead > 0:
+            time.sleep(ahead)
+
+
+def _wait_writable(poller, deadline: float):
+    """整批一个包都没发出时等待套接字可写，而不是立即重试空转
+
+    发送缓冲区满时等到POLLOUT；ENOBUFS (网卡队列满) 或ECONNREFUSED时套接字仍可写，
+    poll立即返回，改为短暂休眠
+    """
+    timeout = min(SEND_WAIT, deadline - time.perf_counter())
+    if timeout > 0 and poller.poll(timeout * 1000):
+        time.sleep(timeout / 10)
+
+
+def bind_to_device(sock: socket.socket, interface: str, source: Optional[str] = None) -> str:
+    """把套接字绑定到出接口 (SO_BINDTODEVICE)；权限不足时退回绑定源地址
+
+    返回实际使用的绑定方式
+    """
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, SO_BINDTODEVICE, interface.encode() + b'\0')
+        return 'SO_BINDTODEVICE'
+    except PermissionError:
+        if not source:
+            raise
+        sock.bind((source, 0))
+        return 'source'
+
+
+def _sender_failed(results, sender_id, cpu, error: OSError):
+    """发送进程出错时仍上报一条结果，错误信息交由父进程汇总"""
+    results.put({'role': 'sender', 'id': sender_id, 'cpu': cpu, 'packets': 0,
+                 'bytes': 0, 'elapsed': 0.0, 'error': f"{type(error).__name__}: {error}"})
+
+
+def _udp_sender(sender_id, target, port, size, batch, duration, rate, cpu, start_event, results,
+                interface=None):
+    _pin(cpu)
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+        if interface:
+            bind_to_device(sock, *interface)
+        sock.connect((target, port))
+    except OSError as e:
+        _sender_failed(results, sender_id, cpu, e)
+        return
+    packets = PacketBatch(size, batch, sender_id)
+    poller = select.poll()
+    poller.register(sock, select.POLLOUT)
+
+    start_event.wait()
+    start = time.perf_counter()
+    deadline = start + duration
+    seq = 0
+    error = None
+    try:
+        while time.perf_counter() < deadline:
+            packets.stamp(seq)
+            sent = packets.send(sock)
+            if not sent:
+                _wait_writable(poller, deadline)
+                continue
+            seq += sent
+            _pace(start, seq, rate)
+    except OSError as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    sock.close()
+    results.put({'role': 'sender', 'id': sender_id, 'cpu': cpu, 'packets': seq,
+                 'bytes': seq * size, 'elapsed': elapsed, 'error': error})
+
+
+def _tcp_sender(sender_id, target, port, size, batch, duration, rate, cpu, start_event, results,
+                interface=None):
+    _pin(cpu)
+    try:
+        if interface:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            bind_to_device(sock, *interface)
+            sock.settimeout(5)
+            sock.connect((target, port))
+        else:
+            sock = socket.create_connection((target, port), timeout=5)
+    except OSError as e:
+        # 连接被拒绝/超时等在子进程内捕获，否则父进程只能看到发送数为0
+        _sender_failed(results, sender_id, cpu, e)
+        return
+    sock.settimeout(None)
+    packets = PacketBatch(size, batch, sender_id)
+    views = [packets.view[i * size:(i + 1) * size] for i in range(batch)]
+    total = size * batch
+
+    start_event.wait()
+    start = time.perf_counter()
+    deadline = start + duration
+    sent_bytes = 0
+    seq = 0
+    error = None
+    try:
+        while time.perf_counter() < deadline:
+            packets.stamp(seq)
+            written = sock.sendmsg(views)
+            if written < total:
+                sock.sendall(packets.view[written:total])
+            sent_bytes += total
+            seq += batch
+            _pace(start, seq, rate)
+    except OSError as e:
+        error = f"{type(e).__name__}: {e}"
+    elapsed = time.perf_counter() - start
+    sock.close()
+    results.put({'role': 'sender', 'id': sender_id, 'cpu': cpu, 'packets': seq,
+                 'bytes': sent_bytes, 'elapsed': elapsed, 'error': error})
+
+
+def _udp_sink(sink_id, bind, port, size, cpu, ready, stop_event, results, bound=None):
+    _pin(cpu)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+    sock.bind((bind, port))
+    if bound is not None:
+        bound.value = sock.getsockname()[1]
+    sock.settimeout(0.2)
+    buffer = bytearray(max(size, 65536))
+    packets = 0
+    received_bytes = 0
+    max_seq: Dict[int, int] = {}
+    first = last = None
+    ready.release()
+
+    while not stop_event.is_set():
+        try:
+            length = sock.recv_into(buffer)
+        except socket.timeout:
+            continue
+        now = time.perf_counter()
+        if first is None:
+            first = now
+        last = now
+        packets += 1
+        received_bytes += length
+        if length >= HEADER.size:
+            magic, sender, seq = HEADER.unpack_from(buffer)
+            if magic == MAGIC and seq > max_seq.get(sender, -1):
+                max_seq[sender] = seq
+    sock.close()
+    results.put({'role': 'sink', 'id': sink_id, 'packets': packets, 'bytes': received_bytes,
+                 'elapsed': (last - first) if first is not None else 0.0,
+                 'max_seq': max_seq})
+
+
+def _tcp_sink(sink_id, bind, port, size, cpu, ready, stop_event, results, bound=None):
+    _pin(cpu)
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, 'SO_REUSEPORT'):
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    server.bind((bind, port))
+    if bound is not None:
+        bound.value = server.getsockname()[1]
+    server.listen(128)
+    server.setblocking(False)
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ)
+    buffer = bytearray(1024 * 1024)
+    received_bytes = 0
+    first = last = None
+    ready.release()
+
+    while not stop_event.is_set():
+        for key, _ in selector.select(timeout=0.2):
+            if key.fileobj is server:
+                conn, _ = server.accept()
+                conn.setblocking(False)
+                selector.register(conn, selectors.EVENT_READ)
+                continue
+            try:
+                length = key.fileobj.recv_into(buffer)
+            except BlockingIOError:
+                continue
+            except ConnectionResetError:
+                length = 0
+            if length == 0:
+                selector.unregister(key.fileobj)
+                key.fileobj.close()
+            else:
+                now = time.perf_counter()
+                first = first or now
+                last = now
+                received_bytes += length
+    selector.close()
+    server.close()
+    results.put({'role': 'sink', 'id': sink_id, 'packets': received_bytes // size,
+                 'bytes': received_bytes,
+                 'elapsed': (last - first) if first is not None else 0.0, 'max_seq': {}})
+
+
+def _cpus() -> List[int]:
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def _drain(results, expected: int, timeout: float) -> List[Dict]:
+    collected = []
+    deadline = time.time() + timeout
+    while len(collected) < expected and time.time() < deadline:
+        try:
+            collected.append(results.get(timeout=0.5))
+        except queue.Empty:
+            continue
+    return collected
+
+
+def run_traffic(target: str, port: int = 9, proto: str = 'udp', duration: float = 10,
+                workers: Optional[int] = None, size: int = 64, batch: int = 64,
+                rate: Optional[float] = None, local_sink: bool = False,
+                interface: Optional[Tuple[str, Optional[str]]] = None) -> Dict:
+    """运行多进程流量生成
+
+    rate 为每个发送进程的包速率上限 (None为不限速)；
+    local_sink 为True时在本机同时启动接收端 (用于回环测试)，否则只统计发送侧；
+    此时port为0表示使用系统分配的空闲端口 (结果中的port为实际端口)；
+    interface 为 (接口名, 源地址)，发送套接字绑定到该出接口
+    """
+    if proto not in ('udp', 'tcp'):
+        raise ValueError(f"不支持的协议: {proto}")
+    if not port and not local_sink:
+        raise ValueError("未启动本地接收端时必须指定端口")
+    size = max(size, MIN_PAYLOAD)
+    cpus = _cpus()
+    workers = workers or len(cpus)
+    ctx = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+    results = ctx.Queue()
+    start_event = ctx.Event()
+    stop_event = ctx.Event()
+
+    sinks = []
+    if local_sink:
+        # 接收端与发送端错开CPU，各发送进程的源端口不同，SO_REUSEPORT会分散到各接收进程
+        sink_func = _udp_sink if proto == 'udp' else _tcp_sink
+        ready = ctx.Semaphore(0)
+        bound = ctx.Value('i', 0)
+        pending = 0
+        for i in range(workers):
+            cpu = cpus[(workers + i) % len(cpus)] if len(cpus) > workers else None
+            proc = ctx.Process(target=sink_func, daemon=True,
+                               args=(i, target, port, size, cpu, ready, stop_event, results, bound))
+            proc.start()
+            sinks.append(proc)
+            pending += 1
+            if not port:
+                # 端口为0时第一个接收端绑定系统分配的端口，其余接收端加入同一端口
+                ready.acquire()
+                pending -= 1
+                port = bound.value
+        for _ in range(pending):
+            ready.acquire()
+
+    sender_func = _udp_sender if proto == 'udp' else _tcp_sender
+    senders = []
+    for i in range(workers):
+        proc = ctx.Process(target=sender_func, daemon=True,
+                           args=(i, target, port, size, batch, duration, rate,
+                                 cpus[i % len(cpus)], start_event, results, interface))
+        proc.start()
+        senders.append(proc)
+
+    start_event.set()
+    for proc in senders:
+        proc.join(duration + 10)
+    # 给接收端留出处理队列中残余数据的时间
+    time.sleep(0.3)
+    stop_event.set()
+    reports = _drain(results, len(senders) + len(sinks), timeout=5)
+    for proc in senders + sinks:
+        proc.join(1)
+        if proc.is_alive():
+            proc.terminate()
+
+    sender_reports = sorted((r for r in reports if r['role'] == 'sender'), key=lambda r: r['id'])
+    sink_reports = [r for r in reports if r['role'] == 'sink']
+    sent = sum(r['packets'] for r in sender_reports)
+    sent_bytes = sum(r['bytes'] for r in sender_reports)
+    elapsed = max((r['elapsed'] for r in sender_reports), default=0.0) or 1e-9
+    errors = sorted({r['error'] for r in sender_reports if r.get('error')})
+    if len(sender_reports) < len(senders):
+        errors.append(f"{len(senders) - len(sender_reports)} 个发送进程未上报结果")
+
+    result = {
+        'target': target,
+        'test_type': f"NATIVE_{proto.upper()}",
+        'port': port,
+        'interface': interface[0] if interface else None,
+        'workers': workers,
+        'payload_size': size,
+        'batch': batch,
+        'sendmmsg': proto == 'udp' and _sendmmsg is not None,
+        'sent': sent,
+        'received': None,
+        'loss_percent': None,
+        'error': "; ".join(errors) or None,
+        'duration': round(elapsed, 3),
+        'pps': round(sent / elapsed),
+        'pps_per_worker': round(sent / elapsed / max(len(sender_reports), 1)),
+        'mbps': round(sent_bytes * 8 / elapsed / 1e6, 2),
+        'per_worker': [{'id': r['id'], 'cpu': r['cpu'], 'packets': r['packets'],
+                        'pps': round(r['packets'] / r['elapsed']) if r['elapsed'] else 0}
+                       for r in sender_reports],
+    }
+    if local_sink:
+        received = sum(r['packets'] for r in sink_reports)
+        received_bytes = sum(r['bytes'] for r in sink_reports)
+        if proto == 'tcp':
+            received = min(received, sent)
+        result['received'] = received
+        result['loss_percent'] = round(100 * max(sent - received, 0) / sent, 3) if sent else 0.0
+        result['received_mbps'] = round(received_bytes * 8 / elapsed / 1e6, 2)
+    return result
+
+
+def run_sink(port: int = 9, proto: str = 'udp', duration: float = 0, bind: str = '0.0.0.0',
+             size: int = 64) -> Dict:
+    """单独运行接收端 (放在被测设备另一侧)，duration为0时运行到Ctrl-C"""
+    ctx = multiprocessing.get_context('fork' if sys.platform.startswith('linux') else None)
+    results = ctx.Queue()
+    ready = ctx.Semaphore(0)
+    stop_event = ctx.Event()
+    sink_func = _udp_sink if proto == 'udp' else _tcp_sink
+    proc = ctx.Process(target=sink_func, daemon=True,
+                       args=(0, bind, port, size, None, ready, stop_event, results))
+    proc.start()
+    ready.acquire()
+    try:
+        if duration:
+            time.sleep(duration)
+        else:
+            while True:
+                time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+    report = _drain(results, 1, timeout=5)
+    proc.join(1)
+    report = report[0] if report else {'packets': 0, 'bytes': 0, 'elapsed': 0.0, 'max_seq': {}}
+    elapsed = report['elapsed'] or 1e-9
+    expected = sum(seq + 1 for seq in report['max_seq'].values())
+    return {
+        'port': port,
+        'proto': proto,
+        'received': report['packets'],
+        'pps': round(report['packets'] / elapsed),
+        'mbps': round(report['bytes'] * 8 / elapsed / 1e6, 2),
+        # 按各发送进程的最大序号估算丢包
+        'loss_percent': round(100 * max(expected - report['packets'], 0) / expected, 3) if expected else None,
+    }
+